@@ -0,0 +1,407 @@
+"""
+Asyncio Batch Audit Runner
+Runs proposal audits as a three-stage pipeline connected by bounded
+queues:
+
+    read (batched store reads) -> compute (executor) -> write (batched store writes)
+
+Store round-trips overlap with computation instead of running back to
+back, the bounded queues apply backpressure so a slow writer throttles
+readers, and CPU-bound audit math runs in an executor so the event loop
+stays free for I/O. A batch whose executor call fails (for example a
+broken process pool) is recorded as COMPUTE_FAILED per proposal and the
+compute stage keeps draining its queue, so readers never block on it.
+Store errors of any kind are handled the same way in the read and write
+stages (READ_FAILED / WRITE_FAILED), so no stage can die and leave
+another blocked on a full queue.
+
+`LocalDocumentStore` is an in-memory stand-in with injectable latency and
+transient failures, used to measure throughput and exercise retries.
+
+Author: BaanBid Development Team
+"""
+
+import asyncio
+import random
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from instrumentation import begin_pool_task, end_pool_task, is_enabled, merge_pool_metrics
+
+
+# --- Constants ---
+PROPOSALS_COLLECTION = "project_proposals"
+PARCELS_COLLECTION = "land_parcels"
+AUDIT_RESULTS_COLLECTION = "audit_results"
+DEFAULT_LEASE_TERM_YEARS = 30
+DEFAULT_ASSET_LIFE_YEARS = 50
+
+
+class TransientStoreError(Exception):
+    """A store operation failed in a way that may succeed on retry."""
+
+
+# --- Local Stand-In Store ---
+class LocalDocumentStore:
+    """
+    In-memory async document store.
+
+    Args:
+        latency_s: Delay added to every round-trip (one batch = one trip).
+        jitter_s: Extra uniform random delay per round-trip.
+        failure_rate: Probability that a round-trip raises TransientStoreError.
+    """
+
+    def __init__(self, latency_s: float = 0.0, jitter_s: float = 0.0, failure_rate: float = 0.0, seed: int = 0):
+        self.latency_s = latency_s
+        self.jitter_s = jitter_s
+        self.failure_rate = failure_rate
+        self.collections: Dict[str, Dict[str, Dict]] = {}
+        self.round_trips = 0
+        self._rng = random.Random(seed)
+
+    async def _round_trip(self) -> None:
+        self.round_trips += 1
+        delay = self.latency_s + (self._rng.random() * self.jitter_s if self.jitter_s else 0.0)
+        if delay:
+            await asyncio.sleep(delay)
+        if self.failure_rate and self._rng.random() < self.failure_rate:
+            raise TransientStoreError("Injected transient failure")
+
+    def load(self, collection: str, docs: Iterable[Dict]) -> None:
+        """Synchronously seeds a collection (no latency)."""
+        target = self.collections.setdefault(collection, {})
+        for doc in docs:
+            target[doc["id"]] = dict(doc)
+
+    async def get_many(self, collection: str, doc_ids: List[str]) -> Dict[str, Dict]:
+        await self._round_trip()
+        source = self.collections.get(collection, {})
+        return {doc_id: dict(source[doc_id]) for doc_id in doc_ids if doc_id in source}
+
+    async def update_many(self, collection: str, updates: Dict[str, Dict]) -> None:
+        """Merges field updates into existing documents (Firestore `update`)."""
+        await self._round_trip()
+        target = self.collections.setdefault(collection, {})
+        for doc_id, fields in updates.items():
+            target.setdefault(doc_id, {"id": doc_id}).update(fields)
+
+
+# --- Compute ---
+def audit_proposal(
+    proposal: Dict,
+    parcel: Dict,
+    include_financial: bool = True,
+    lease_term_years: int = DEFAULT_LEASE_TERM_YEARS,
+    asset_useful_life_years: int = DEFAULT_ASSET_LIFE_YEARS
+) -> Tuple[Dict, Dict]:
+    """
+    Density, FAR and (optionally) financial audit of one proposal.
+    Returns (proposal field updates, audit result document).
+    """
+    from bertaud_engine import BertaudAuditEngine
+    from far_calculation import FARInputs, calculate_far
+
+    inputs = dict(proposal.get("calculation_inputs") or {})
+    snapshot = proposal.get("economic_parameters_snapshot") or {}
+    d0 = inputs.get("d0")
+    g = inputs.get("g", snapshot.get("bertaud_density_gradient_coefficient"))
+    distance_km = parcel["distance_from_cbd_km"]
+
+    far = calculate_far(FARInputs(
+        land_size_rai=parcel["land_area_rai"],
+        proposed_gfa=proposal["proposed_gfa"],
+        d0=d0,
+        g=g,
+        distance_km=distance_km,
+        legal_max_far=parcel["legal_far_limit"]
+    ))
+    engine = BertaudAuditEngine(d0, g)
+    density = engine.calculate_optimal_density(
+        capital_k=proposal.get("proposed_investment_cost", 0.0),
+        land_cost_e=parcel.get("appraisal_price_per_wah", 0.0),
+        transport_cost=0.0,
+        distance_km=distance_km,
+        proposed_density=far.proposed_far,
+        legal_far_limit=parcel["legal_far_limit"],
+        zone_color=parcel.get("zone_color")
+    )
+
+    updates = {
+        "efficiency_score": far.efficiency_score,
+        "calculation_inputs": dict(inputs, d0=d0, g=g, distance_km=distance_km),
+    }
+    result = {
+        "proposal_id": proposal["id"],
+        "far": far.to_dict(),
+        "density_status": density["status"],
+        "gap_analysis": density["gap_analysis"],
+    }
+    if include_financial:
+        from financial_audit import FinancialAudit, FinancialParams
+        params = FinancialParams(
+            upfront_fee=proposal["proposed_upfront_fee"],
+            initial_annual_rent=proposal["proposed_annual_rent"],
+            lease_term_years=lease_term_years,
+            discount_rate=snapshot.get("discount_rate_state", 0.05),
+            investment_cost=proposal["proposed_investment_cost"],
+            asset_useful_life_years=asset_useful_life_years
+        )
+        auditor = FinancialAudit()
+        result["state_npv"] = auditor.calculate_state_npv(params)
+        result["roa_percent"] = auditor.calculate_return_on_asset(params)["roa_percent"]
+    return updates, result
+
+
+def audit_batch(items: List[Tuple[Dict, Dict]], include_financial: bool = True) -> List[Tuple]:
+    """
+    Audits a batch in one executor call. Returns
+    (proposal_id, (updates, result) or None, error code or None) per item;
+    errors are captured per item so one bad record does not fail the batch.
+    """
+    results = []
+    for proposal, parcel in items:
+        try:
+            results.append((proposal["id"], audit_proposal(proposal, parcel, include_financial), None))
+        except Exception as e:  # Recorded per item, surfaced in the report
+            code = getattr(e, "code", type(e).__name__)
+            results.append((proposal["id"], None, code))
+    return results
+
+
+def _pooled_audit(audit_fn: Callable[..., List], items: List[Tuple[Dict, Dict]], include_financial: bool,
+                  metrics: bool) -> Tuple[List[Tuple], object]:
+    """Process-pool wrapper: (audit_fn results, this call's instrumentation snapshot)."""
+    begin_pool_task(metrics)
+    return audit_fn(items, include_financial), end_pool_task()
+
+
+# --- Pipeline ---
+@dataclass
+class AsyncAuditConfig:
+    """ค่าตั้งค่า Pipeline"""
+    read_batch_size: int = 100
+    write_batch_size: int = 100
+    queue_size: int = 8                # Max batches/results buffered between stages
+    read_concurrency: int = 4
+    compute_concurrency: int = 4
+    write_concurrency: int = 4
+    max_retries: int = 3
+    retry_backoff_s: float = 0.05      # Doubles per attempt
+    write_flush_interval_s: float = 0.05
+    executor: str = "process"          # "process", "thread" or "inline"
+    max_workers: Optional[int] = None
+    include_financial: bool = True
+
+
+@dataclass
+class AsyncAuditReport:
+    """ผลลัพธ์การรัน Pipeline"""
+    requested: int = 0
+    audited: int = 0
+    written: int = 0
+    retries: int = 0
+    missing: List[str] = field(default_factory=list)        # Proposal or parcel not found
+    errors: Dict[str, str] = field(default_factory=dict)    # proposal_id -> error code
+    elapsed_s: float = 0.0
+
+    @property
+    def throughput_per_s(self) -> float:
+        return self.written / self.elapsed_s if self.elapsed_s > 0 else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "requested": self.requested,
+            "audited": self.audited,
+            "written": self.written,
+            "retries": self.retries,
+            "missing": len(self.missing),
+            "errors": dict(self.errors),
+            "elapsedS": round(self.elapsed_s, 4),
+            "throughputPerS": round(self.throughput_per_s, 1)
+        }
+
+
+_DONE = object()
+
+
+class AsyncAuditRunner:
+    """
+    Bounded-queue read/compute/write pipeline over a document store that
+    exposes async `get_many(collection, ids)` and
+    `update_many(collection, {id: fields})`.
+    """
+
+    def __init__(
+        self,
+        store,
+        config: Optional[AsyncAuditConfig] = None,
+        audit_fn: Callable[..., List] = audit_batch
+    ):
+        self.store = store
+        self.config = config or AsyncAuditConfig()
+        self.audit_fn = audit_fn
+
+    def _make_executor(self) -> Optional[Executor]:
+        if self.config.executor == "process":
+            return ProcessPoolExecutor(max_workers=self.config.max_workers)
+        if self.config.executor == "thread":
+            return ThreadPoolExecutor(max_workers=self.config.max_workers)
+        return None
+
+    async def _with_retry(self, report: AsyncAuditReport, op, *args):
+        attempt = 0
+        while True:
+            try:
+                return await op(*args)
+            except TransientStoreError:
+                if attempt >= self.config.max_retries:
+                    raise
+                report.retries += 1
+                await asyncio.sleep(self.config.retry_backoff_s * (2 ** attempt))
+                attempt += 1
+
+    def run(self, proposal_ids: Iterable[str]) -> AsyncAuditReport:
+        """Synchronous entry point."""
+        return asyncio.run(self.run_async(proposal_ids))
+
+    async def run_async(self, proposal_ids: Iterable[str]) -> AsyncAuditReport:
+        cfg = self.config
+        ids = list(proposal_ids)
+        report = AsyncAuditReport(requested=len(ids))
+        id_queue: asyncio.Queue = asyncio.Queue()
+        compute_queue: asyncio.Queue = asyncio.Queue(maxsize=cfg.queue_size)
+        write_queue: asyncio.Queue = asyncio.Queue(maxsize=cfg.queue_size * cfg.write_batch_size)
+        for start in range(0, len(ids), cfg.read_batch_size):
+            id_queue.put_nowait(ids[start:start + cfg.read_batch_size])
+
+        loop = asyncio.get_running_loop()
+        executor = self._make_executor()
+        pooled = isinstance(executor, ProcessPoolExecutor)  # Worker metrics come back per call
+        metrics = is_enabled()
+        started = time.perf_counter()
+
+        async def reader():
+            while True:
+                try:
+                    batch = id_queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    proposals = await self._with_retry(report, self.store.get_many, PROPOSALS_COLLECTION, batch)
+                    parcel_ids = sorted({p["parcel_id"] for p in proposals.values()})
+                    parcels = await self._with_retry(report, self.store.get_many, PARCELS_COLLECTION, parcel_ids)
+                except Exception:  # Retries exhausted or a non-transient store error; keep reading
+                    for proposal_id in batch:
+                        report.errors[proposal_id] = "READ_FAILED"
+                    continue
+                items = []
+                for proposal_id in batch:
+                    proposal = proposals.get(proposal_id)
+                    parcel = parcels.get(proposal["parcel_id"]) if proposal else None
+                    if parcel is None:
+                        report.missing.append(proposal_id)
+                    else:
+                        items.append((proposal, parcel))
+                if items:
+                    await compute_queue.put(items)
+
+        async def computer():
+            while True:
+                items = await compute_queue.get()
+                if items is _DONE:
+                    return
+                try:
+                    if executor is None:
+                        results = self.audit_fn(items, cfg.include_financial)
+                    elif pooled:
+                        results, snapshot = await loop.run_in_executor(
+                            executor, _pooled_audit, self.audit_fn, items, cfg.include_financial, metrics
+                        )
+                        merge_pool_metrics(snapshot)
+                    else:
+                        results = await loop.run_in_executor(executor, self.audit_fn, items, cfg.include_financial)
+                except Exception:  # e.g. BrokenProcessPool; keep draining so readers never block
+                    for proposal, _ in items:
+                        report.errors[proposal["id"]] = "COMPUTE_FAILED"
+                    continue
+                for proposal_id, output, error in results:
+                    if error is not None:
+                        report.errors[proposal_id] = error
+                    else:
+                        report.audited += 1
+                        await write_queue.put((proposal_id, output))
+
+        async def flush(pending: Dict[str, Tuple[Dict, Dict]]):
+            updates = {proposal_id: output[0] for proposal_id, output in pending.items()}
+            results = {proposal_id: output[1] for proposal_id, output in pending.items()}
+            try:
+                await self._with_retry(report, self.store.update_many, AUDIT_RESULTS_COLLECTION, results)
+                await self._with_retry(report, self.store.update_many, PROPOSALS_COLLECTION, updates)
+                report.written += len(pending)
+            except Exception:  # Retries exhausted or a non-transient store error; keep writing
+                for proposal_id in pending:
+                    report.errors[proposal_id] = "WRITE_FAILED"
+
+        async def writer():
+            pending: Dict[str, Tuple[Dict, Dict]] = {}
+            while True:
+                try:
+                    item = await asyncio.wait_for(write_queue.get(), timeout=cfg.write_flush_interval_s)
+                except asyncio.TimeoutError:
+                    item = None
+                if item is _DONE:
+                    if pending:
+                        await flush(pending)
+                    return
+                if item is not None:
+                    proposal_id, output = item
+                    pending[proposal_id] = output
+                if pending and (item is None or len(pending) >= cfg.write_batch_size):
+                    batch, pending = pending, {}
+                    await flush(batch)
+
+        try:
+            readers = [asyncio.create_task(reader()) for _ in range(cfg.read_concurrency)]
+            computers = [asyncio.create_task(computer()) for _ in range(cfg.compute_concurrency)]
+            writers = [asyncio.create_task(writer()) for _ in range(cfg.write_concurrency)]
+            await asyncio.gather(*readers)
+            for _ in computers:
+                await compute_queue.put(_DONE)
+            await asyncio.gather(*computers)
+            for _ in writers:
+                await write_queue.put(_DONE)
+            await asyncio.gather(*writers)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True)
+        report.elapsed_s = time.perf_counter() - started
+        return report
+
+
+async def run_sequential(store, proposal_ids: Iterable[str], include_financial: bool = True) -> AsyncAuditReport:
+    """Baseline: one read, compute and write round-trip per proposal, back to back."""
+    ids = list(proposal_ids)
+    report = AsyncAuditReport(requested=len(ids))
+    started = time.perf_counter()
+    for proposal_id in ids:
+        proposal = (await store.get_many(PROPOSALS_COLLECTION, [proposal_id])).get(proposal_id)
+        parcel = None
+        if proposal is not None:
+            parcel = (await store.get_many(PARCELS_COLLECTION, [proposal["parcel_id"]])).get(proposal["parcel_id"])
+        if parcel is None:
+            report.missing.append(proposal_id)
+            continue
+        [(_, output, error)] = audit_batch([(proposal, parcel)], include_financial)
+        if error is not None:
+            report.errors[proposal_id] = error
+            continue
+        report.audited += 1
+        updates, result = output
+        await store.update_many(AUDIT_RESULTS_COLLECTION, {proposal_id: result})
+        await store.update_many(PROPOSALS_COLLECTION, {proposal_id: updates})
+        report.written += 1
+    report.elapsed_s = time.perf_counter() - started
+    return report
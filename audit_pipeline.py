@@ -0,0 +1,328 @@
+"""
+End-to-End Audit Pipeline
+Runs the full audit of a ProjectProposal on its LandParcel:
+
+    density (BertaudAuditEngine) -> FAR (calculate_far)
+        -> finance (NPV / ROA / construction cost) -> report (PDFReportGenerator)
+
+and produces the `audit_data` dict that PDFReportGenerator.generate_report
+expects. Each stage caches its output by its own inputs, so proposals
+that share a parcel location or financial terms reuse earlier stage
+results, and per-stage timings are recorded.
+
+Batch mode spreads thousands of proposals over a process pool; each
+worker keeps its own pipeline (and caches) across chunks and timings are
+merged back. When the pipeline is given a ZoneSummaries, the density and
+FAR results of every successful run() are folded into the per-(zone,
+district) summaries, and worker summaries are merged back the same way.
+
+Author: BaanBid Development Team
+"""
+
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from bertaud_engine import BertaudAuditEngine
+from caching import LRUCache
+from far_calculation import FARCalculationError, FARInputs, calculate_far
+from firestore_models import LandParcel, ProjectProposal
+from instrumentation import begin_pool_task, count_cache, count_error, end_pool_task, is_enabled, merge_pool_metrics
+
+
+# --- Constants ---
+STAGES = ("density", "far", "finance", "report")
+DEFAULT_CACHE_SIZE = 10_000
+PASS_STATUS_THAI = "ผ่านเกณฑ์ (Pass)"
+FAIL_STATUS_THAI = "ไม่ผ่านเกณฑ์ (Fail)"
+
+DENSITY_STATUS_THAI = {
+    "Optimal": "เหมาะสม (Optimal)",
+    "Under-utilization": "ใช้ประโยชน์น้อยเกินไป (Under-utilization)",
+    "Low Density Warning": "เฝ้าระวังความหนาแน่นต่ำ (Low Density Warning)",
+    "High Density Warning": "เฝ้าระวังความหนาแน่นสูง (High Density Warning)",
+    "Over-densification": "หนาแน่นเกินไป (Over-densification)",
+}
+ROA_STATUS_THAI = {
+    "On Target": "ตามเป้าหมาย (Target)",
+    "Below Target": "ต่ำกว่าเป้าหมาย (Below Target)",
+}
+COST_STATUS_THAI = {
+    "Pass": "ผ่านเกณฑ์ (Pass)",
+    "Cost Anomaly Detected": "ค่าก่อสร้างผิดปกติ (Cost Anomaly)",
+    "Unknown Type": "ไม่ทราบประเภทอาคาร (Unknown Type)",
+}
+
+
+@dataclass
+class PipelineConfig:
+    """ค่าตั้งค่า Audit Pipeline"""
+    lease_term_years: int = 30
+    asset_useful_life_years: int = 50
+    province: str = "Bangkok"
+    default_d0: Optional[float] = None   # Used when calculation_inputs has no d0
+    report_dir: Optional[str] = None     # Write one PDF per proposal when set
+    cache_size: int = DEFAULT_CACHE_SIZE
+
+
+@dataclass
+class StageTimings:
+    """Accumulated wall time and call/cache counters per stage."""
+    seconds: Dict[str, float] = field(default_factory=lambda: {s: 0.0 for s in STAGES})
+    calls: Dict[str, int] = field(default_factory=lambda: {s: 0 for s in STAGES})
+    cache_hits: Dict[str, int] = field(default_factory=lambda: {s: 0 for s in STAGES})
+
+    def merge(self, other: "StageTimings") -> None:
+        for stage in STAGES:
+            self.seconds[stage] += other.seconds[stage]
+            self.calls[stage] += other.calls[stage]
+            self.cache_hits[stage] += other.cache_hits[stage]
+
+    def to_dict(self) -> dict:
+        return {
+            stage: {
+                "seconds": round(self.seconds[stage], 6),
+                "calls": self.calls[stage],
+                "cacheHits": self.cache_hits[stage],
+            }
+            for stage in STAGES
+        }
+
+
+@dataclass
+class PipelineResult:
+    """ผลลัพธ์การตรวจสอบหนึ่งโครงการ"""
+    proposal_id: str
+    audit_data: Optional[Dict] = None
+    report_path: Optional[str] = None
+    error: Optional[str] = None
+
+
+_MISS = object()
+
+
+class AuditPipeline:
+    """
+    Single entry point for density, FAR, financial and report stages.
+
+    Example:
+        >>> pipeline = AuditPipeline(PipelineConfig(report_dir="reports"))
+        >>> result = pipeline.run(proposal, parcel)
+        >>> result.audit_data["overall_status"]
+    """
+
+    def __init__(self, config: Optional[PipelineConfig] = None, summaries=None):
+        self.config = config or PipelineConfig()
+        self.summaries = summaries  # Optional zone_summaries.ZoneSummaries
+        self.timings = StageTimings()
+        self._caches = {stage: LRUCache(self.config.cache_size) for stage in STAGES[:-1]}
+        self._auditor = None
+
+    def _staged(self, stage: str, key: Hashable, compute: Callable[[], Any]) -> Any:
+        start = time.perf_counter()
+        cache = self._caches.get(stage)
+        value = cache.get(key, _MISS) if cache is not None else _MISS
+        if value is _MISS:
+            value = compute()
+            if cache is not None:
+                cache.put(key, value)
+                count_cache(stage, hit=False)
+        else:
+            self.timings.cache_hits[stage] += 1
+            count_cache(stage, hit=True)
+        self.timings.calls[stage] += 1
+        self.timings.seconds[stage] += time.perf_counter() - start
+        return value
+
+    # --- Stages ---
+    def _density(self, d0: float, g: float, distance_km: float, proposed_far: float,
+                 legal_far_limit: float, zone_color: Optional[str]) -> Dict:
+        engine = BertaudAuditEngine(d0, g)
+        return engine.calculate_optimal_density(
+            capital_k=0.0,
+            land_cost_e=0.0,
+            transport_cost=0.0,
+            distance_km=distance_km,
+            proposed_density=proposed_far,
+            legal_far_limit=legal_far_limit,
+            zone_color=zone_color
+        )
+
+    def _finance(self, upfront_fee: float, annual_rent: float, investment_cost: float,
+                 discount_rate: float, cost_per_sqm: float, building_type: str) -> Dict:
+        from financial_audit import FinancialAudit, FinancialParams
+        if self._auditor is None:
+            self._auditor = FinancialAudit()
+        params = FinancialParams(
+            upfront_fee=upfront_fee,
+            initial_annual_rent=annual_rent,
+            lease_term_years=self.config.lease_term_years,
+            discount_rate=discount_rate,
+            investment_cost=investment_cost,
+            asset_useful_life_years=self.config.asset_useful_life_years
+        )
+        return {
+            "state_npv": self._auditor.calculate_state_npv(params),
+            "roa": self._auditor.calculate_return_on_asset(params),
+            "cost": self._auditor.validate_construction_cost(cost_per_sqm, building_type, self.config.province),
+        }
+
+    # --- Run ---
+    def build_audit_data(self, proposal: ProjectProposal, parcel: LandParcel) -> Dict:
+        """Runs density, FAR and finance stages and assembles `audit_data`."""
+        return self._audit(proposal, parcel)[0]
+
+    def _audit(self, proposal: ProjectProposal, parcel: LandParcel) -> Tuple[Dict, Dict, Any]:
+        """(audit_data, density result, FARResult) for one proposal."""
+        inputs = proposal.calculation_inputs or {}
+        snapshot = proposal.economic_parameters_snapshot or {}
+        d0 = inputs.get("d0", self.config.default_d0)
+        g = inputs.get("g", snapshot.get("bertaud_density_gradient_coefficient"))
+        if d0 is None or g is None:
+            raise FARCalculationError(
+                code="MISSING_MODEL_INPUTS",
+                message="Proposal has no d0/g in calculation_inputs and no default is configured",
+                message_thai="ไม่พบค่า D₀ หรือ g สำหรับการคำนวณ"
+            )
+        distance_km = parcel.distance_from_cbd_km
+
+        far_key = (parcel.land_area_rai, proposal.proposed_gfa, d0, g, distance_km, parcel.legal_far_limit)
+        far = self._staged("far", far_key, lambda: calculate_far(FARInputs(*far_key)))
+
+        density_key = (d0, g, distance_km, far.proposed_far, parcel.legal_far_limit, parcel.zone_color)
+        density = self._staged("density", density_key, lambda: self._density(*density_key))
+
+        cost_per_sqm = proposal.proposed_investment_cost / proposal.proposed_gfa if proposal.proposed_gfa else 0.0
+        finance_key = (
+            proposal.proposed_upfront_fee, proposal.proposed_annual_rent, proposal.proposed_investment_cost,
+            snapshot.get("discount_rate_state", 0.05), cost_per_sqm, proposal.proposed_building_type
+        )
+        finance = self._staged("finance", finance_key, lambda: self._finance(*finance_key))
+
+        density_ok = density["status"] in ("Optimal", "Low Density Warning", "High Density Warning")
+        npv_ok = finance["state_npv"] > 0
+        roa_ok = finance["roa"]["status"] == "On Target"
+        cost_ok = finance["cost"]["status"] == "Pass"
+        passed = density_ok and npv_ok and roa_ok and cost_ok
+
+        findings = []
+        if not density_ok:
+            findings.append(f"ความหนาแน่นไม่เหมาะสม ({density['status']})")
+        if not npv_ok:
+            findings.append("NPV ของรัฐติดลบ")
+        if not roa_ok:
+            findings.append("ผลตอบแทนต่อสินทรัพย์ต่ำกว่าเป้าหมาย")
+        if not cost_ok:
+            findings.append(f"ค่าก่อสร้าง: {finance['cost']['status']}")
+
+        audit_data = {
+            "project_name": proposal.id,
+            "overall_status": PASS_STATUS_THAI if passed else FAIL_STATUS_THAI,
+            "summary_text": "ผ่านทุกเกณฑ์การตรวจสอบ" if passed else " / ".join(findings),
+            "efficiency_index": round(density["efficiency_index"], 2),
+            "density_status": DENSITY_STATUS_THAI.get(density["status"], density["status"]),
+            "theoretical_far": far.theoretical_far,
+            "proposed_far": far.proposed_far,
+            "gap_analysis": density["gap_analysis"],
+            "state_npv": finance["state_npv"],
+            "roa_percent": finance["roa"]["roa_percent"],
+            "roa_status": ROA_STATUS_THAI.get(finance["roa"]["status"], finance["roa"]["status"]),
+            "cost_deviation": finance["cost"]["deviation_percent"],
+            "cost_status": COST_STATUS_THAI.get(finance["cost"]["status"], finance["cost"]["status"]),
+        }
+        return audit_data, density, far
+
+    def run(self, proposal: ProjectProposal, parcel: LandParcel, chart_image_path: str = None) -> PipelineResult:
+        """Full audit of one proposal; errors are returned, not raised."""
+        result = PipelineResult(proposal_id=proposal.id)
+        try:
+            result.audit_data, density, far = self._audit(proposal, parcel)
+        except FARCalculationError as e:
+            result.error = e.code
+            count_error("audit_pipeline")
+            return result
+        except ValueError as e:  # pydantic ValidationError subclasses ValueError
+            result.error = f"INVALID_FINANCIAL_PARAMS: {e}"
+            count_error("audit_pipeline")
+            return result
+        except (TypeError, AttributeError) as e:  # e.g. a None parcel or proposal field
+            result.error = f"INVALID_INPUT: {type(e).__name__}: {e}"
+            count_error("audit_pipeline")
+            return result
+
+        if self.config.report_dir:
+            path = os.path.join(self.config.report_dir, f"{proposal.id}.pdf")
+
+            def generate():
+                from report_generator import PDFReportGenerator
+                PDFReportGenerator(path).generate_report(result.audit_data, chart_image_path=chart_image_path)
+                return path
+
+            try:
+                result.report_path = self._staged("report", None, generate)
+            except (ImportError, OSError) as e:  # Missing reportlab/PIL, unwritable report_dir
+                result.error = f"REPORT_FAILED: {type(e).__name__}: {e}"
+                count_error("audit_pipeline")
+                return result
+        # Only audits that made it through every stage count towards the summaries
+        if self.summaries is not None:
+            self.summaries.observe(parcel.zone_color, parcel.district, density=density, far=far)
+        return result
+
+    # --- Batch ---
+    def run_batch(
+        self,
+        pairs: Sequence[Tuple[ProjectProposal, LandParcel]],
+        workers: Optional[int] = None,
+        chunk_size: int = 256
+    ) -> List[PipelineResult]:
+        """
+        Audits many (proposal, parcel) pairs. With `workers` > 1 the pairs
+        are split into chunks across a process pool; worker timings are
+        merged into `self.timings` (and `self.summaries`), and worker
+        instrumentation metrics into the parent's registry. Results keep
+        input order.
+        """
+        if self.config.report_dir:
+            os.makedirs(self.config.report_dir, exist_ok=True)
+        if not workers or workers <= 1:
+            return [self.run(proposal, parcel) for proposal, parcel in pairs]
+
+        from concurrent.futures import ProcessPoolExecutor  # Not needed on single-process paths
+
+        chunks = [list(pairs[i:i + chunk_size]) for i in range(0, len(pairs), chunk_size)]
+        results: List[PipelineResult] = []
+        template = self.summaries.empty_like() if self.summaries is not None else None
+        metrics = [is_enabled()] * len(chunks)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for chunk_results, timings, summaries, snapshot in pool.map(
+                _run_chunk, [self.config] * len(chunks), chunks, [template] * len(chunks), metrics
+            ):
+                results.extend(chunk_results)
+                self.timings.merge(timings)
+                if summaries is not None:
+                    self.summaries.merge(summaries)
+                merge_pool_metrics(snapshot)
+        return results
+
+
+# --- Process Pool Worker ---
+_worker_pipeline: Optional[AuditPipeline] = None
+
+
+def _run_chunk(config: PipelineConfig, chunk: List[Tuple[ProjectProposal, LandParcel]], summaries=None,
+               metrics: bool = False):
+    """
+    Runs a chunk on the worker's long-lived pipeline; returns results and
+    this chunk's timings, summaries (`summaries` is an empty template) and
+    instrumentation snapshot.
+    """
+    global _worker_pipeline
+    begin_pool_task(metrics)
+    if _worker_pipeline is None or _worker_pipeline.config != config:
+        _worker_pipeline = AuditPipeline(config)
+    _worker_pipeline.timings = StageTimings()
+    _worker_pipeline.summaries = summaries
+    results = [_worker_pipeline.run(proposal, parcel) for proposal, parcel in chunk]
+    return results, _worker_pipeline.timings, summaries, end_pool_task()
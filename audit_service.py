@@ -0,0 +1,417 @@
+"""
+Local Audit HTTP Service
+Serves the backend FAR, density and NPV calculations so the dashboard
+does not have to duplicate the math client-side.
+
+Endpoints (JSON in, JSON out):
+    POST /far       FARInputs fields            -> calculate_far_safe
+    POST /density   d0, g, distance_km, proposed_density,
+                    legal_far_limit?, zone_color? -> calculate_optimal_density
+    POST /npv       FinancialParams fields      -> { "npv": ... }
+    POST /batch     { "requests": [ { "op": "far", "params": {...} }, ... ] }
+                    -> { "results": [...] } in request order
+    GET  /stats     cache / coalescing counters
+    GET  /curve?d0=&g=[&max_km=&samples=]  binary density curve (density_tiles)
+    GET  /tiles/{z}/{x}/{y}                binary heatmap tile (needs --centers)
+
+Every calculation is keyed by its canonical input (op + sorted params,
+numbers normalised). Results are cached in an LRU, and concurrent
+identical requests are coalesced so only one of them computes while the
+others wait for its result.
+
+Usage:
+    python audit_service.py --port 8765
+    python audit_service.py --load-test http://127.0.0.1:8765 --requests 5000 --concurrency 32
+
+Author: BaanBid Development Team
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from bertaud_engine import BertaudAuditEngine
+from caching import LRUCache
+from far_calculation import FARInputs, calculate_far_safe
+
+
+# --- Constants ---
+DEFAULT_PORT = 8765
+DEFAULT_CACHE_SIZE = 100_000
+MAX_BATCH_SIZE = 10_000
+MAX_BODY_BYTES = 8 * 1024 * 1024
+
+
+class BadRequest(Exception):
+    """Malformed request; reported as HTTP 400."""
+
+
+# --- Operations ---
+def _op_far(params: Dict) -> Dict:
+    try:
+        inputs = FARInputs(**params)
+    except TypeError as e:
+        raise BadRequest(str(e)) from None
+    return calculate_far_safe(inputs)
+
+
+def _op_density(params: Dict) -> Dict:
+    try:
+        d0, g = params["d0"], params["g"]
+        distance_km, proposed = params["distance_km"], params["proposed_density"]
+    except KeyError as e:
+        raise BadRequest(f"Missing field {e}") from None
+    errors = BertaudAuditEngine.validate_inputs(d0, g, distance_km)
+    if errors:
+        raise BadRequest("; ".join(errors))
+    engine = BertaudAuditEngine(d0, g)
+    result = engine.calculate_optimal_density(
+        capital_k=params.get("capital_k", 0.0),
+        land_cost_e=params.get("land_cost_e", 0.0),
+        transport_cost=0.0,
+        distance_km=distance_km,
+        proposed_density=proposed,
+        legal_far_limit=params.get("legal_far_limit"),
+        zone_color=params.get("zone_color")
+    )
+    return result
+
+
+def _op_npv(params: Dict) -> Dict:
+    from financial_audit import FinancialAudit, FinancialParams, ValidationError
+    try:
+        financial_params = FinancialParams(**params)
+    except ValidationError as e:
+        raise BadRequest(str(e)) from None
+    return {"npv": FinancialAudit().calculate_state_npv(financial_params)}
+
+
+OPERATIONS: Dict[str, Callable[[Dict], Dict]] = {
+    "far": _op_far,
+    "density": _op_density,
+    "npv": _op_npv,
+}
+
+
+def canonical_key(op: str, params: Dict) -> str:
+    """Canonical cache key: sorted keys, ints and floats normalised to float."""
+    if not isinstance(params, dict):
+        raise BadRequest("params must be a JSON object")
+    normalised = {
+        k: float(v) if isinstance(v, (int, float)) and not isinstance(v, bool) else v
+        for k, v in params.items()
+    }
+    return json.dumps([op, normalised], sort_keys=True, separators=(",", ":"))
+
+
+# --- Coalescing Cache ---
+_MISSING = object()
+
+
+class _Pending:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class CoalescingCache:
+    """
+    LRU result cache plus single-flight execution: while a key is being
+    computed, identical requests wait for that computation instead of
+    starting their own.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_CACHE_SIZE):
+        self._cache = LRUCache(max_size)
+        self._inflight: Dict[str, _Pending] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0}
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Any:
+        with self._lock:
+            cached = self._cache.get(key, _MISSING)
+            if cached is not _MISSING:
+                self.stats["hits"] += 1
+                return cached
+            pending = self._inflight.get(key)
+            owner = pending is None
+            if owner:
+                pending = _Pending()
+                self._inflight[key] = pending
+                self.stats["misses"] += 1
+            else:
+                self.stats["coalesced"] += 1
+
+        if not owner:
+            pending.event.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.result
+
+        try:
+            pending.result = compute()
+            with self._lock:
+                self._cache.put(key, pending.result)
+            return pending.result
+        except BaseException as e:
+            pending.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            pending.event.set()
+
+    def snapshot_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.stats, size=len(self._cache))
+
+
+
+# --- HTTP Service ---
+class AuditService:
+    """Dispatches operations through the coalescing cache."""
+
+    def __init__(self, cache_size: int = DEFAULT_CACHE_SIZE, tiles=None):
+        self.cache = CoalescingCache(cache_size)
+        self.tiles = tiles  # Optional density_tiles.DensityTileService
+
+    def execute(self, op: str, params: Dict) -> Dict:
+        fn = OPERATIONS.get(op)
+        if fn is None:
+            raise BadRequest(f"Unknown operation '{op}' (expected one of {sorted(OPERATIONS)})")
+        return self.cache.get_or_compute(canonical_key(op, params), lambda: fn(params))
+
+    def execute_batch(self, body: Dict) -> Dict:
+        requests = body.get("requests") if isinstance(body, dict) else None
+        if not isinstance(requests, list):
+            raise BadRequest("Batch body must be { \"requests\": [ ... ] }")
+        if len(requests) > MAX_BATCH_SIZE:
+            raise BadRequest(f"Batch too large: {len(requests)} > {MAX_BATCH_SIZE}")
+        results = []
+        for item in requests:
+            try:
+                results.append(self.execute(item.get("op"), item.get("params", {})))
+            except (BadRequest, AttributeError, TypeError, ValueError) as e:
+                # One malformed item (e.g. a non-numeric d0) fails alone, not the whole batch
+                results.append(_error_body(str(e) if isinstance(e, BadRequest) else f"Invalid request: {e}"))
+        return {"results": results}
+
+
+def _error_body(message: str, code: str = "BAD_REQUEST") -> Dict:
+    return {"error": True, "code": code, "message": message}
+
+
+def make_handler(service: AuditService):
+    class AuditRequestHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True  # Headers and body go out as separate writes
+
+        def _send(self, status: int, payload: Dict) -> None:
+            body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_OPTIONS(self):
+            self.send_response(204)
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.send_header("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
+            self.send_header("Access-Control-Allow-Headers", "Content-Type")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def _send_binary(self, body: bytes) -> None:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            path, _, query = self.path.partition("?")
+            try:
+                if path == "/stats":
+                    stats = service.cache.snapshot_stats()
+                    if service.tiles is not None:
+                        stats["tiles"] = dict(service.tiles.stats)
+                    self._send(200, stats)
+                elif path == "/curve":
+                    from density_tiles import DEFAULT_CURVE_MAX_KM, DEFAULT_CURVE_SAMPLES, density_curve
+                    args = {k: v[-1] for k, v in parse_qs(query).items()}
+                    self._send_binary(density_curve(
+                        float(args["d0"]), float(args["g"]),
+                        float(args.get("max_km", DEFAULT_CURVE_MAX_KM)),
+                        int(args.get("samples", DEFAULT_CURVE_SAMPLES))
+                    ))
+                elif path.startswith("/tiles/") and service.tiles is not None:
+                    z, x, y = (int(part) for part in path[len("/tiles/"):].split("/"))
+                    self._send_binary(service.tiles.get_tile(z, x, y))
+                else:
+                    self._send(404, _error_body(f"Not found: {path}", "NOT_FOUND"))
+            except (KeyError, ValueError) as e:
+                self._send(400, _error_body(f"Invalid request: {e}"))
+
+        def do_POST(self):
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                if length > MAX_BODY_BYTES:
+                    raise BadRequest("Request body too large")
+                body = json.loads(self.rfile.read(length) or b"{}")
+                op = self.path.strip("/")
+                if op == "batch":
+                    self._send(200, service.execute_batch(body))
+                else:
+                    self._send(200, service.execute(op, body))
+            except (BadRequest, json.JSONDecodeError, TypeError, ValueError) as e:
+                self._send(400, _error_body(str(e)))
+            except Exception as e:
+                self._send(500, _error_body(f"{type(e).__name__}: {e}", "INTERNAL_ERROR"))
+
+        def log_message(self, format, *args):
+            pass
+
+    return AuditRequestHandler
+
+
+def create_server(
+    host: str = "127.0.0.1",
+    port: int = DEFAULT_PORT,
+    cache_size: int = DEFAULT_CACHE_SIZE,
+    tiles=None
+) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), make_handler(AuditService(cache_size, tiles)))
+    server.daemon_threads = True
+    return server
+
+
+# --- Load Test Harness ---
+def load_test(
+    base_url: str,
+    n_requests: int = 2000,
+    concurrency: int = 16,
+    payload_factory: Optional[Callable[[int], Tuple[str, Dict]]] = None
+) -> Dict[str, float]:
+    """
+    Fires `n_requests` POSTs from `concurrency` threads (keep-alive
+    connections) and reports requests/s and latency percentiles.
+    The default payload sweeps FAR inputs with ~10% repeats.
+    """
+    import http.client
+    from urllib.parse import urlparse
+
+    if payload_factory is None:
+        def payload_factory(i: int) -> Tuple[str, Dict]:
+            return "/far", {"land_size_rai": 5, "proposed_gfa": 40000 + (i % (n_requests // 10 or 1)),
+                            "d0": 10, "g": 0.1, "distance_km": 2}
+
+    target = urlparse(base_url)
+    latencies: List[float] = []
+    failures = [0]
+    lock = threading.Lock()
+    counter = iter(range(n_requests))
+
+    def worker():
+        conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=30)
+        local = []
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                break
+            path, payload = payload_factory(i)
+            body = json.dumps(payload)
+            start = time.perf_counter()
+            try:
+                conn.request("POST", path, body=body, headers={"Content-Type": "application/json"})
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    with lock:
+                        failures[0] += 1
+            except OSError:
+                with lock:
+                    failures[0] += 1
+                conn.close()
+                conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=30)
+            local.append(time.perf_counter() - start)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+
+    def pct(q: float) -> float:
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000.0 if latencies else float("nan")
+
+    return {
+        "requests": len(latencies),
+        "failures": failures[0],
+        "elapsed_s": elapsed,
+        "requests_per_s": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "p50_ms": pct(0.50),
+        "p99_ms": pct(0.99),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Local Bertaud audit HTTP service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE)
+    parser.add_argument("--centers", metavar="JSON",
+                        help='Enable /tiles from { "center_id": { "lat": ..., "lon": ..., "d0": ..., "g": ... } }')
+    parser.add_argument("--load-test", metavar="URL", help="Run the load-test harness against URL instead of serving")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args(argv)
+
+    if args.load_test:
+        result = load_test(args.load_test, args.requests, args.concurrency)
+        print(f"Requests: {result['requests']} ({result['failures']} failed) in {result['elapsed_s']:.2f}s")
+        print(f"Throughput: {result['requests_per_s']:,.0f} req/s")
+        print(f"Latency p50: {result['p50_ms']:.2f} ms, p99: {result['p99_ms']:.2f} ms")
+        return 0
+
+    tiles = None
+    if args.centers:
+        from density_tiles import DensityTileService
+        with open(args.centers, "r", encoding="utf-8") as f:
+            centers = json.load(f)
+        tiles = DensityTileService(
+            {cid: (c["lat"], c["lon"]) for cid, c in centers.items()},
+            {cid: {"d0": c["d0"], "g": c["g"]} for cid, c in centers.items()}
+        )
+
+    server = create_server(args.host, args.port, args.cache_size, tiles)
+    print(f"Audit service listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
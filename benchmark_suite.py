@@ -0,0 +1,403 @@
+"""
+Scaling Benchmark Suite
+Runs the engine, FAR, NPV, distance and report hot paths at growing input
+sizes (10^3 .. 10^7) and records wall time, throughput and peak traced
+memory per size. Results are compared with a saved JSON baseline
+(benchmark_baseline.json next to this file), and the run fails when any
+path regresses beyond the threshold.
+
+Times are medians over at least MIN_REPEATS runs. The allowed slowdown
+widens by the measured run-to-run spread. A fixed calibration loop is
+timed as well, and a path fails only if it is also slower in those
+machine-independent units.
+
+The verify_*.py scripts remain the correctness checks. This suite only
+measures cost.
+
+Usage:
+    python benchmark_suite.py                      # 10^3..10^5, compare with baseline
+    python benchmark_suite.py --full               # 10^3..10^7 (paths are capped, see max_size)
+    python benchmark_suite.py --only far,engine --sizes 1000,100000
+    python benchmark_suite.py --update-baseline    # accept current numbers
+
+The first run without a baseline file writes one. Exit code 1 on regression.
+
+Author: BaanBid Development Team
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+# --- Constants ---
+DEFAULT_SIZES = (10**3, 10**4, 10**5)
+FULL_SIZES = (10**3, 10**4, 10**5, 10**6, 10**7)
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(REPO_DIR, "benchmark_baseline.json")
+DEFAULT_THRESHOLD = 0.25       # Allowed slowdown / memory growth (fraction)
+MEMORY_SLACK_BYTES = 64 * 1024  # Absolute slack so tiny peaks do not flap
+MIN_TIME_S = 0.5               # Small sizes repeat until this much time is spent
+MIN_REPEATS = 5
+MAX_REPEATS = 25
+NOISE_FLOOR_S = 0.002          # Absolute slack for timings this short
+NOISE_SIGMAS = 3.0             # Measured run-to-run spread allowed on top of the threshold
+CALIBRATION_LOOPS = 200_000
+POOL_SIZE = 4096               # Distinct inputs cycled through by per-call paths
+SEED = 42
+
+
+@dataclass
+class Benchmark:
+    name: str
+    setup: Callable[[], Callable[[int], float]]  # Builds inputs; returns run(n) -> checksum
+    max_size: int
+    requires: Tuple[str, ...] = ()
+    description: str = ""
+
+
+# --- Input Pools ---
+def _parcel_pool(rng: random.Random) -> List[Tuple[float, ...]]:
+    """(distance_km, land_rai, proposed_far, legal_far, land_cost) tuples."""
+    return [
+        (rng.uniform(0.1, 40.0), rng.uniform(0.5, 50.0), rng.uniform(0.5, 12.0),
+         rng.choice((4.0, 6.0, 8.0, 10.0)), rng.uniform(20_000, 600_000))
+        for _ in range(POOL_SIZE)
+    ]
+
+
+_ZONES = ("Red", "Orange", "Yellow", "Brown", None)
+
+
+# --- Hot Paths ---
+def bench_engine() -> Callable[[int], float]:
+    from bertaud_engine import BertaudAuditEngine
+
+    pool = _parcel_pool(random.Random(SEED))
+    engine = BertaudAuditEngine(20.0, 0.15)
+    mask = POOL_SIZE - 1
+
+    def run(n: int) -> float:
+        checksum = 0.0
+        for i in range(n):
+            distance, _, proposed, legal, land_cost = pool[i & mask]
+            result = engine.calculate_optimal_density(
+                capital_k=0.0, land_cost_e=land_cost, transport_cost=0.0,
+                distance_km=distance, proposed_density=proposed,
+                legal_far_limit=legal, zone_color=_ZONES[i % 5]
+            )
+            checksum += result["efficiency_index"]
+        return checksum
+    return run
+
+
+def bench_far() -> Callable[[int], float]:
+    from far_calculation import FARInputs, calculate_far
+
+    pool = _parcel_pool(random.Random(SEED))
+    mask = POOL_SIZE - 1
+
+    def run(n: int) -> float:
+        checksum = 0.0
+        for i in range(n):
+            distance, rai, proposed, legal, _ = pool[i & mask]
+            result = calculate_far(FARInputs(
+                land_size_rai=rai, proposed_gfa=proposed * rai * 1600.0,
+                d0=20.0, g=0.15, distance_km=distance, legal_max_far=legal
+            ))
+            checksum += result.efficiency_score
+        return checksum
+    return run
+
+
+def bench_npv() -> Callable[[int], float]:
+    from financial_audit import FinancialAudit, FinancialParams
+
+    rng = random.Random(SEED)
+    pool = [
+        FinancialParams(
+            upfront_fee=rng.uniform(0, 1e8), initial_annual_rent=rng.uniform(1e6, 5e7),
+            lease_term_years=rng.choice((30, 50, 99)), discount_rate=rng.uniform(0.02, 0.08),
+            investment_cost=rng.uniform(1e8, 5e9), asset_useful_life_years=50
+        )
+        for _ in range(POOL_SIZE)
+    ]
+    audit = FinancialAudit()
+    mask = POOL_SIZE - 1
+
+    def run(n: int) -> float:
+        checksum = 0.0
+        for i in range(n):
+            checksum += audit.calculate_state_npv(pool[i & mask])
+        return checksum
+    return run
+
+
+def bench_center_distances() -> Callable[[int], float]:
+    from geodesic_distance import CenterDistanceStage
+
+    centers = {"CBD": (13.7563, 100.5018), "NORTH": (13.91, 100.55), "EAST": (13.72, 100.78)}
+    centers_config = {cid: {"d0": 10.0, "g": 0.2} for cid in centers}
+
+    def run(n: int) -> float:
+        # Parcels are generated lazily; the stage's own O(n) state is what gets measured
+        rng = random.Random(SEED)
+        stage = CenterDistanceStage(centers)
+        stage.load_parcels(
+            {"id": f"p{i}", "gps_coordinates": f"{rng.uniform(13.5, 14.1):.6f}, {rng.uniform(100.3, 100.9):.6f}"}
+            for i in range(n)
+        )
+        stage.compute()
+        return sum(stage.polycentric_densities(centers_config).values())
+    return run
+
+
+_REPORT_DATA = {
+    "project_name": "Benchmark Project", "overall_status": "Pass", "summary_text": "",
+    "efficiency_index": 0.92, "density_status": "Optimal", "state_npv": 1.5e9,
+    "roa_percent": 4.2, "roa_status": "On Target", "cost_deviation": 3.1, "cost_status": "Pass",
+}
+
+
+def bench_report() -> Callable[[int], float]:
+    import contextlib
+    import io
+
+    from report_generator import PDFReportGenerator
+
+    def run(n: int) -> float:
+        total_bytes = 0
+        with tempfile.TemporaryDirectory() as tmp_dir, contextlib.redirect_stdout(io.StringIO()):
+            path = os.path.join(tmp_dir, "report.pdf")
+            for _ in range(n):
+                PDFReportGenerator(path).generate_report(_REPORT_DATA)
+                total_bytes += os.path.getsize(path)
+        return float(total_bytes)
+    return run
+
+
+BENCHMARKS: Dict[str, Benchmark] = {
+    b.name: b for b in (
+        Benchmark("engine", bench_engine, 10**7, description="BertaudAuditEngine.calculate_optimal_density"),
+        Benchmark("far", bench_far, 10**7, description="calculate_far(FARInputs)"),
+        Benchmark("npv", bench_npv, 10**6, ("pydantic",), "FinancialAudit.calculate_state_npv"),
+        Benchmark("distances", bench_center_distances, 10**6,
+                  description="CenterDistanceStage load + 3 centers + polycentric densities"),
+        Benchmark("report", bench_report, 10**3, ("reportlab",), "PDFReportGenerator.generate_report"),
+    )
+}
+
+
+# --- Measurement ---
+def _missing_requirements(bench: Benchmark) -> List[str]:
+    import importlib.util
+    return [name for name in bench.requires if importlib.util.find_spec(name) is None]
+
+
+def _median(values: List[float]) -> float:
+    ordered = sorted(values)
+    mid = len(ordered) // 2
+    return ordered[mid] if len(ordered) % 2 else 0.5 * (ordered[mid - 1] + ordered[mid])
+
+
+def _relative_spread(times: List[float]) -> float:
+    """Median absolute deviation / median, scaled to a normal sigma."""
+    median = _median(times)
+    if median <= 0:
+        return 0.0
+    return 1.4826 * _median([abs(t - median) for t in times]) / median
+
+
+def calibrate_machine() -> float:
+    """
+    Median time of a fixed pure-Python loop. Timings are also compared in
+    units of this loop, so a machine that is uniformly slower or busier
+    (CPU frequency scaling, shared CI runners) does not read as a regression.
+    """
+    def loop() -> float:
+        start = time.perf_counter()
+        total = 0.0
+        values = {}
+        for i in range(CALIBRATION_LOOPS):
+            total += (i * 0.5) % 7.0
+            values[i & 1023] = total
+        return time.perf_counter() - start
+
+    return _median([loop() for _ in range(7)])
+
+
+def measure(run: Callable[[int], float], n: int, trace_memory: bool = True) -> Dict[str, float]:
+    """Median wall time over repeats (untraced) with its spread, plus one tracemalloc pass for peak memory."""
+    times = []
+    spent = 0.0
+    while len(times) < MAX_REPEATS and (len(times) < MIN_REPEATS or spent < MIN_TIME_S):
+        start = time.perf_counter()
+        run(n)
+        elapsed = time.perf_counter() - start
+        times.append(elapsed)
+        spent += elapsed
+
+    median = _median(times)
+    result = {
+        "seconds": median,
+        "best_seconds": min(times),
+        "spread": _relative_spread(times),
+        "ops_per_s": n / median if median > 0 else float("inf"),
+        "repeats": len(times),
+    }
+    if trace_memory:
+        tracemalloc.start()
+        try:
+            run(n)
+            result["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def run_suite(
+    names: List[str],
+    sizes: Tuple[int, ...],
+    trace_memory: bool = True,
+    log: Callable[[str], None] = print
+) -> Dict:
+    results: Dict[str, Dict[str, Dict[str, float]]] = {}
+    calibration = calibrate_machine()
+    log(f"calibration loop: {calibration * 1000:.1f} ms")
+    for name in names:
+        bench = BENCHMARKS[name]
+        missing = _missing_requirements(bench)
+        if missing:
+            log(f"{name:<10} skipped (requires {', '.join(missing)})")
+            continue
+        results[name] = {}
+        run = bench.setup()
+        for n in sizes:
+            if n > bench.max_size:
+                continue
+            r = measure(run, n, trace_memory)
+            results[name][str(n)] = r
+            peak = f"{r['peak_bytes'] / 1024:>10,.0f} KiB" if "peak_bytes" in r else ""
+            log(f"{name:<10} n={n:<10,} {r['seconds']:>9.4f} s {r['ops_per_s']:>14,.0f} ops/s {peak}")
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "calibration_s": calibration,
+        },
+        "results": results,
+    }
+
+
+def compare(current: Dict, baseline: Dict, threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    """
+    Regression messages for every (path, size) present in both runs.
+
+    A time regresses only when it is slower than the baseline by more than
+    `threshold` plus NOISE_SIGMAS times the two runs' measured spread, in
+    absolute seconds (beyond NOISE_FLOOR_S) and in calibration-loop units
+    alike. The second test ignores a machine that is uniformly slower today.
+    """
+    speed = 1.0
+    now_cal = current.get("meta", {}).get("calibration_s")
+    base_cal = baseline.get("meta", {}).get("calibration_s")
+    if now_cal and base_cal:
+        speed = now_cal / base_cal  # > 1: this machine is slower right now
+
+    regressions = []
+    for name, by_size in current["results"].items():
+        for size, r in by_size.items():
+            base = baseline.get("results", {}).get(name, {}).get(size)
+            if base is None:
+                continue
+            allowed = 1.0 + threshold + NOISE_SIGMAS * (r.get("spread", 0.0) + base.get("spread", 0.0))
+            limit = base["seconds"] * allowed + NOISE_FLOOR_S
+            if r["seconds"] > limit and r["seconds"] > limit * speed:
+                regressions.append(
+                    f"{name} n={size}: {r['seconds']:.4f}s vs baseline {base['seconds']:.4f}s "
+                    f"(+{(r['seconds'] / base['seconds'] - 1) * 100:.0f}%, allowed +{(allowed - 1) * 100:.0f}%, "
+                    f"machine speed x{speed:.2f})"
+                )
+            if "peak_bytes" in r and "peak_bytes" in base:
+                limit = base["peak_bytes"] * (1.0 + threshold) + MEMORY_SLACK_BYTES
+                if r["peak_bytes"] > limit:
+                    regressions.append(
+                        f"{name} n={size}: peak {r['peak_bytes'] / 1024:,.0f} KiB "
+                        f"vs baseline {base['peak_bytes'] / 1024:,.0f} KiB"
+                    )
+    return regressions
+
+
+def _write_json(path: str, data: Dict) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Scaling benchmarks for the audit hot paths")
+    parser.add_argument("--full", action="store_true", help="Run sizes 10^3 .. 10^7")
+    parser.add_argument("--sizes", help="Comma-separated input sizes (overrides --full)")
+    parser.add_argument("--only", help=f"Comma-separated subset of: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON path")
+    parser.add_argument("--output", help="Also write this run's results to a JSON file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed regression as a fraction (default 0.25)")
+    parser.add_argument("--update-baseline", action="store_true", help="Overwrite the baseline with this run")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc pass")
+    args = parser.parse_args(argv)
+
+    if args.sizes:
+        sizes = tuple(int(float(s)) for s in args.sizes.split(","))
+    else:
+        sizes = FULL_SIZES if args.full else DEFAULT_SIZES
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Unknown benchmark(s): {', '.join(unknown)}")
+
+    current = run_suite(names, sizes, trace_memory=not args.no_memory)
+    if args.output:
+        _write_json(args.output, current)
+
+    if args.update_baseline or not os.path.exists(args.baseline):
+        if os.path.exists(args.baseline):
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                merged = json.load(f)
+            for name, by_size in current["results"].items():
+                merged.setdefault("results", {}).setdefault(name, {}).update(by_size)
+            merged["meta"] = current["meta"]
+            current = merged
+        _write_json(args.baseline, current)
+        print(f"Baseline written: {args.baseline}")
+        return 0
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("meta", {}).get("machine") != current["meta"]["machine"]:
+        print("Warning: baseline was recorded on a different machine type; timings may not be comparable")
+    regressions = compare(current, baseline, args.threshold)
+    if regressions:
+        print("FAIL: performance regressions beyond "
+              f"{args.threshold * 100:.0f}%:")
+        for message in regressions:
+            print(f"  {message}")
+        return 1
+    print("PASS: no regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
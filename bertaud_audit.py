@@ -0,0 +1,405 @@
+"""
+bertaud-audit: Bulk Audit Command
+Runs FAR, density and (for proposals) financial audits over parcel and
+proposal files, in parallel and resumably.
+
+Usage:
+    python bertaud_audit.py --parcels parcels.csv --output out/ --d0 20 --g 0.15
+    python bertaud_audit.py --parcels parcels.parquet --proposals proposals.jsonl \\
+        --output out/ --workers 8 --chunk-size 5000
+
+Inputs may be CSV, JSONL or Parquet (Parquet needs pyarrow). Without
+--proposals every parcel is audited on its `current_far`; with
+--proposals every proposal goes through AuditPipeline on its parcel.
+
+Input records are cut into fixed chunks in file order. Each finished
+chunk is written atomically to out/part-NNNNNN.jsonl, and the part file
+is the checkpoint. Re-running the same command skips chunks that already
+have a part file, so a crash midway resumes instead of starting over.
+`_run.json` records the inputs and options so a resume with different
+inputs is refused (use --restart to discard old parts). Resumed chunks are
+skipped before their records are decoded.
+
+A record that cannot be decoded or audited (blank or malformed fields)
+becomes an {"error": "INVALID_INPUT"} row and the run continues.
+
+Author: BaanBid Development Team
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass, fields
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union, get_args, get_origin
+
+from firestore_models import LandParcel, ProjectProposal
+from instrumentation import begin_pool_task, end_pool_task, is_enabled, merge_pool_metrics
+from model_codec import CodecError, get_codec
+
+
+# --- Constants ---
+RUN_MANIFEST = "_run.json"
+INVALID_INPUT = "INVALID_INPUT"
+_END = object()
+PART_TEMPLATE = "part-{:06d}.jsonl"
+DEFAULT_CHUNK_SIZE = 10_000
+
+
+# --- Input Readers ---
+def _field_converters(cls) -> Dict[str, type]:
+    """Maps each model field to the scalar type CSV strings should be parsed as."""
+    converters = {}
+    for f in fields(cls):
+        tp = f.type
+        if get_origin(tp) is Union:
+            tp = next(a for a in get_args(tp) if a is not type(None))
+        converters[f.name] = tp
+    return converters
+
+
+def _coerce_csv_row(row: Dict[str, str], converters: Dict[str, type]) -> Dict:
+    out = {}
+    for key, raw in row.items():
+        tp = converters.get(key)
+        if tp is None:
+            continue
+        if raw is None or raw == "":
+            out[key] = None
+        elif tp is bool:
+            out[key] = raw.strip().lower() in ("1", "true", "yes")
+        elif tp in (int, float):
+            out[key] = tp(raw)
+        elif tp is dict or get_origin(tp) is dict or tp is Dict:
+            out[key] = json.loads(raw)
+        else:
+            out[key] = raw
+    return out
+
+
+def _raw_records(path: str) -> Iterator:
+    """Streams undecoded records (CSV row dicts, JSONL lines, Parquet row dicts)."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            yield from csv.DictReader(f)
+    elif ext in (".jsonl", ".ndjson"):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield line
+    elif ext in (".parquet", ".pq"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise SystemExit("Reading Parquet requires pyarrow (pip install pyarrow)") from e
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=DEFAULT_CHUNK_SIZE):
+            yield from batch.to_pylist()
+    else:
+        raise SystemExit(f"Unsupported input format '{ext}' for {path} (expected .csv, .jsonl or .parquet)")
+
+
+def _record_decoder(path: str, cls) -> Callable:
+    """Turns one raw record of `path` into a model object (raises on bad input)."""
+    decode = get_codec(cls).decode
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        converters = _field_converters(cls)
+        return lambda row: decode(_coerce_csv_row(row, converters))
+    if ext in (".jsonl", ".ndjson"):
+        return lambda line: decode(json.loads(line))
+    return decode
+
+
+def read_records(path: str, cls) -> Iterator:
+    """Streams model objects from a CSV, JSONL or Parquet file."""
+    return map(_record_decoder(path, cls), _raw_records(path))
+
+
+@dataclass
+class InvalidRecord:
+    """Input record that could not be decoded; audited as an INVALID_INPUT row."""
+    record_id: Optional[str]
+    detail: str
+
+
+def _decode_or_invalid(decode: Callable, raw):
+    try:
+        return decode(raw)
+    except (CodecError, TypeError, ValueError) as e:
+        record_id = raw.get("id") if isinstance(raw, dict) else None
+        if isinstance(raw, str):
+            try:
+                record_id = json.loads(raw).get("id")
+            except (ValueError, AttributeError):
+                pass
+        return InvalidRecord(record_id, f"{type(e).__name__}: {e}")
+
+
+def chunked(records: Iterable, size: int, skip: Iterable[int] = ()) -> Iterator[Tuple[int, List]]:
+    """Fixed-size chunks in order; chunk indices in `skip` are consumed without being materialized."""
+    iterator = iter(records)
+    skip = set(skip)
+    index = 0
+    while True:
+        if index in skip:
+            if next(islice(iterator, size - 1, size), _END) is _END:
+                return
+        else:
+            chunk = list(islice(iterator, size))
+            if not chunk:
+                return
+            yield index, chunk
+        index += 1
+
+
+# --- Audits (run inside workers) ---
+def audit_parcel(parcel: LandParcel, d0: float, g: float) -> Dict:
+    """Density and FAR audit of a parcel's existing build-out (current_far)."""
+    from bertaud_engine import BertaudAuditEngine
+    from far_calculation import FARCalculationError, FARInputs, calculate_far
+
+    row = {"parcel_id": parcel.id, "zone_color": parcel.zone_color, "ownership_type": parcel.ownership_type}
+    try:
+        far = calculate_far(FARInputs(
+            land_size_rai=parcel.land_area_rai,
+            proposed_gfa=parcel.current_far * parcel.land_area_rai * 1600.0,
+            d0=d0,
+            g=g,
+            distance_km=parcel.distance_from_cbd_km,
+            legal_max_far=parcel.legal_far_limit
+        ))
+        density = BertaudAuditEngine(d0, g).calculate_optimal_density(
+            capital_k=0.0,
+            land_cost_e=parcel.appraisal_price_per_wah,
+            transport_cost=0.0,
+            distance_km=parcel.distance_from_cbd_km,
+            proposed_density=parcel.current_far,
+            legal_far_limit=parcel.legal_far_limit,
+            zone_color=parcel.zone_color
+        )
+    except FARCalculationError as e:
+        row["error"] = e.code
+        return row
+    except (TypeError, ValueError) as e:
+        # Blank or malformed fields (e.g. an empty CSV cell decoded as None)
+        row["error"] = INVALID_INPUT
+        row["detail"] = f"{type(e).__name__}: {e}"
+        return row
+    row.update(far.to_dict())
+    row["densityStatus"] = density["status"]
+    row["efficiencyIndex"] = density["efficiency_index"]
+    row["gapAnalysis"] = density["gap_analysis"]
+    return row
+
+
+_worker_pipeline = None
+
+
+def _audit_chunk(job: Dict) -> Tuple[int, int, int, object]:
+    """
+    Audits one chunk and writes its part file atomically. Returns (index,
+    rows, errors, metrics snapshot); the snapshot is only taken for pooled
+    jobs (job["pooled"]) and is None otherwise.
+    """
+    global _worker_pipeline
+    pooled = job.get("pooled", False)
+    if pooled:
+        begin_pool_task(job["metrics"])
+    rows = []
+    if job["mode"] == "parcels":
+        for parcel in job["records"]:
+            if isinstance(parcel, InvalidRecord):
+                rows.append({"parcel_id": parcel.record_id, "error": INVALID_INPUT, "detail": parcel.detail})
+                continue
+            rows.append(audit_parcel(parcel, job["d0"], job["g"]))
+    else:
+        from audit_pipeline import AuditPipeline, PipelineConfig
+        if _worker_pipeline is None:
+            _worker_pipeline = AuditPipeline(PipelineConfig(default_d0=job["d0"]))
+        for proposal, parcel in job["records"]:
+            invalid = next((r for r in (proposal, parcel) if isinstance(r, InvalidRecord)), None)
+            if isinstance(proposal, InvalidRecord):
+                rows.append({"proposal_id": proposal.record_id, "error": INVALID_INPUT, "detail": proposal.detail})
+                continue
+            if parcel is None:
+                rows.append({"proposal_id": proposal.id, "error": "PARCEL_NOT_FOUND"})
+                continue
+            row = {"proposal_id": proposal.id, "parcel_id": parcel.record_id if invalid else parcel.id}
+            if invalid:
+                rows.append(dict(row, error=INVALID_INPUT, detail=f"parcel: {invalid.detail}"))
+                continue
+            try:
+                result = _worker_pipeline.run(proposal, parcel)
+            except (TypeError, ValueError) as e:
+                rows.append(dict(row, error=INVALID_INPUT, detail=f"{type(e).__name__}: {e}"))
+                continue
+            if result.error:
+                row["error"] = result.error
+            else:
+                row.update(result.audit_data)
+            rows.append(row)
+
+    path = os.path.join(job["output"], PART_TEMPLATE.format(job["index"]))
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False, default=str))
+            f.write("\n")
+    os.replace(tmp_path, path)
+    return job["index"], len(rows), sum(1 for r in rows if "error" in r), end_pool_task() if pooled else None
+
+
+# --- Run Control ---
+def _input_fingerprint(args) -> Dict:
+    def describe(path: Optional[str]):
+        if not path:
+            return None
+        st = os.stat(path)
+        return {"path": os.path.abspath(path), "size": st.st_size, "mtime": int(st.st_mtime)}
+
+    return {
+        "parcels": describe(args.parcels),
+        "proposals": describe(args.proposals),
+        "chunk_size": args.chunk_size,
+        "d0": args.d0,
+        "g": args.g,
+    }
+
+
+def _prepare_output(args) -> set:
+    """Creates/validates the output directory and returns the completed chunk indices."""
+    os.makedirs(args.output, exist_ok=True)
+    manifest_path = os.path.join(args.output, RUN_MANIFEST)
+    fingerprint = _input_fingerprint(args)
+
+    if args.restart:
+        for name in os.listdir(args.output):
+            if name.startswith("part-") or name == RUN_MANIFEST:
+                os.remove(os.path.join(args.output, name))
+
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+        if previous != fingerprint:
+            raise SystemExit(
+                f"{args.output} holds a run with different inputs or options. "
+                "Use a new --output directory or pass --restart."
+            )
+    else:
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump(fingerprint, f, indent=2)
+
+    done = set()
+    for name in os.listdir(args.output):
+        if name.startswith("part-") and name.endswith(".jsonl"):
+            done.add(int(name[len("part-"):-len(".jsonl")]))
+        elif name.endswith(".jsonl.tmp"):
+            os.remove(os.path.join(args.output, name))  # Partial write from a crashed run
+    return done
+
+
+def _jobs(args, done: set) -> Iterator[Dict]:
+    # Records are decoded one by one after done chunks are skipped, so a bad
+    # record becomes an INVALID_INPUT row instead of ending the run
+    if args.proposals:
+        decode_parcel = _record_decoder(args.parcels, LandParcel)
+        parcels = {}
+        for raw in _raw_records(args.parcels):
+            parcel = _decode_or_invalid(decode_parcel, raw)
+            if isinstance(parcel, InvalidRecord):
+                if parcel.record_id is not None:
+                    parcels[parcel.record_id] = parcel
+            else:
+                parcels[parcel.id] = parcel
+        decode_proposal = _record_decoder(args.proposals, ProjectProposal)
+
+        def decode(raw):
+            proposal = _decode_or_invalid(decode_proposal, raw)
+            if isinstance(proposal, InvalidRecord):
+                return proposal, None
+            return proposal, parcels.get(proposal.parcel_id)
+
+        raw_records = _raw_records(args.proposals)
+        mode = "proposals"
+    else:
+        decode_parcel = _record_decoder(args.parcels, LandParcel)
+        decode = lambda raw: _decode_or_invalid(decode_parcel, raw)
+        raw_records = _raw_records(args.parcels)
+        mode = "parcels"
+    for index, chunk in chunked(raw_records, args.chunk_size, skip=done):
+        yield {"index": index, "records": [decode(raw) for raw in chunk], "mode": mode,
+               "d0": args.d0, "g": args.g, "output": args.output}
+
+
+def run(args) -> Dict[str, int]:
+    done = _prepare_output(args)
+    stats = {"chunks_skipped": len(done), "chunks_written": 0, "rows": 0, "errors": 0}
+    started = time.perf_counter()
+
+    def record(result):
+        _, n_rows, n_errors, snapshot = result
+        merge_pool_metrics(snapshot)
+        stats["chunks_written"] += 1
+        stats["rows"] += n_rows
+        stats["errors"] += n_errors
+        if not args.quiet:
+            rate = stats["rows"] / max(time.perf_counter() - started, 1e-9)
+            print(f"chunks: {stats['chunks_written']} written, {stats['chunks_skipped']} resumed | "
+                  f"rows: {stats['rows']:,} ({rate:,.0f}/s)", file=sys.stderr)
+
+    if args.workers <= 1:
+        for job in _jobs(args, done):
+            record(_audit_chunk(job))
+        return stats
+
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+    # Bounded submission: at most 2 chunks per worker in flight
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        in_flight = set()
+        for job in _jobs(args, done):
+            if len(in_flight) >= 2 * args.workers:
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    record(future.result())
+            in_flight.add(pool.submit(_audit_chunk, dict(job, pooled=True, metrics=is_enabled())))
+        for future in in_flight:
+            record(future.result())
+    return stats
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="bertaud-audit",
+        description="Bulk FAR / density / financial audit with resumable checkpoints."
+    )
+    parser.add_argument("--parcels", required=True, help="Land parcels file (.csv, .jsonl, .parquet)")
+    parser.add_argument("--proposals", help="Project proposals file; audits proposals instead of parcels")
+    parser.add_argument("--output", required=True, help="Output directory for part files and checkpoint")
+    parser.add_argument("--d0", type=float, default=None,
+                        help="Center density D0 (required for parcel mode; fallback for proposals)")
+    parser.add_argument("--g", type=float, default=None, help="Density gradient g (parcel mode)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Records per chunk/part file")
+    parser.add_argument("--restart", action="store_true", help="Discard existing part files and start over")
+    parser.add_argument("--quiet", action="store_true", help="No progress output")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.chunk_size <= 0:
+        raise SystemExit("--chunk-size must be positive")
+    if not args.proposals and (args.d0 is None or args.g is None):
+        raise SystemExit("Parcel mode needs --d0 and --g")
+    stats = run(args)
+    print(json.dumps(stats))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,42 @@
 import math
 from typing import Dict, Union, Callable
 
+from instrumentation import timed
+
+# --- Status Bands ---
+# Shared by classify_status and the vectorized density_projection.status_code
+STATUSES = (
+    "Under-utilization",
+    "Low Density Warning",
+    "Optimal",
+    "High Density Warning",
+    "Over-densification",
+)
+OPTIMAL_LOWER_LIMIT = 0.8
+DEFAULT_UPPER_LIMIT = 1.2
+YELLOW_UPPER_LIMIT = 1.1      # Stricter upper limit for low-density residential zones
+BAND_WIDTH = 0.1
+# (under-utilization edge, optimal low, optimal high, upper limit) per Yellow flag,
+# written as the same float expressions classify_status has always evaluated
+STATUS_BANDS = {
+    False: (OPTIMAL_LOWER_LIMIT - BAND_WIDTH, OPTIMAL_LOWER_LIMIT,
+            DEFAULT_UPPER_LIMIT - BAND_WIDTH, DEFAULT_UPPER_LIMIT),
+    True: (OPTIMAL_LOWER_LIMIT - BAND_WIDTH, OPTIMAL_LOWER_LIMIT,
+           YELLOW_UPPER_LIMIT - BAND_WIDTH, YELLOW_UPPER_LIMIT),
+}
+
+# --- Gap Analysis Thresholds ---
+# Shared with zoning_ranking, which ranks the parcels that cross the upsize cut
+UPSIZE_GAP_THRESHOLD = 1.0       # Theoretical FAR above legal by more than this: request an upsize
+OVERSUPPLY_GAP_THRESHOLD = 2.0   # Legal FAR above theoretical by more than this: zone over-supply
+
 class BertaudAuditEngine:
     """
     Implements the Alain Bertaud Urban Economic Model for land audit.
     Focuses on calculating optimal density and auditing efficiency.
     """
     
-    def __init__(self, d0_center_density: float, density_gradient_g: float):
+    def __init__(self, d0_center_density: float, density_gradient_g: float, bid_rent_params=None):
         """
         Initialize the engine with theoretical model parameters.
         
@@ -15,6 +44,10 @@ class BertaudAuditEngine:
             d0_center_density: The theoretical density at the CBD center (D0). 
                                Unit: Floor Area Ratio (FAR) or equivalent.
             density_gradient_g: The density gradient coefficient (g).
+            bid_rent_params: Optional bid_rent.BidRentParams. When given,
+                             calculate_optimal_density also solves the
+                             Alonso-Muth-Mills bid rent from capital_k,
+                             land_cost_e and transport_cost.
         """
         # Guardrails: Check for Realistic Gradient Values
         if density_gradient_g > 0.5:
@@ -24,6 +57,8 @@ class BertaudAuditEngine:
 
         self.d0 = d0_center_density
         self.g = density_gradient_g
+        self.bid_rent_params = bid_rent_params
+        self._bid_rent_solver = None
 
     @staticmethod
     def validate_inputs(d0: float, g: float, distance_km: float) -> list[str]:
@@ -40,6 +75,7 @@ class BertaudAuditEngine:
             errors.append(f"Distance (x) cannot be negative: {distance_km}")
         return errors
 
+    @timed("calculate_optimal_density")
     def calculate_optimal_density(
         self,
         capital_k: float,
@@ -68,66 +104,7 @@ class BertaudAuditEngine:
             efficiency_index = proposed_density / theoretical_density
             
         # 3. Determine Audit Status (Context Aware)
-        # Default Thresholds
-        lower_limit = 0.8
-        upper_limit = 1.2
-        
-        # Contextual Overrides
-        if zone_color:
-            color = zone_color.lower()
-            if "yellow" in color: # Low Densitiy Residential
-                upper_limit = 1.1 # Stricter upper limit
-            # Red (Commercial) keeps default 1.2 or could be higher
-        
-        # Granular Status Logic
-        status = "Optimal"
-        
-        if efficiency_index < (lower_limit - 0.1): # < 0.7 by default
-            status = "Under-utilization"
-        elif efficiency_index < lower_limit: # 0.7 - 0.8
-            status = "Low Density Warning"
-        elif efficiency_index > (upper_limit + 0.1): # > 1.3 (if limit 1.2)
-            status = "Over-densification"
-        elif efficiency_index > upper_limit: # 1.2 - 1.3
-            status = "High Density Warning"
-        # Else remains "Optimal" (0.8 - 1.2) - wait, math check below
-        
-        # Logic Recap for Default (0.8 - 1.2):
-        # < 0.7: Under
-        # 0.7 - 0.8: Warning Low
-        # 0.8 - 1.2: Optimal
-        # 1.2 - 1.3: Warning High (Wait, user said 1.1-1.2 is warning)
-        
-        # Let's adjust to match user request explicitly:
-        # "0.7 - 0.8: Low Density Warning"
-        # "1.1 - 1.2: High Density Warning" (Implies Optimal is 0.8 - 1.1 or the warning is PART of optimal?)
-        # Usually Warning means "Acceptable but watch out". 
-        # But if > 1.2 is Over, then 1.1-1.2 as Warning implies Optimal is 0.8-1.1.
-        
-        # Let's try this logic structure:
-        # Critical Low: < 0.7
-        # Warning Low: 0.7 - 0.8
-        # Optimal: 0.8 - 1.1 (Safe)
-        # Warning High: 1.1 - 1.2
-        # Critical High: > 1.2
-        
-        # Adjusting for Zone Override (Yellow: Max 1.1)
-        # If max is 1.1, then Warning High might be 1.0 - 1.1, and > 1.1 is Critical.
-        
-        # Dynamic Logic:
-        optimal_low = lower_limit # 0.8
-        optimal_high = upper_limit - 0.1 # 1.1 (if 1.2 limit)
-        
-        if efficiency_index < (optimal_low - 0.1):
-            status = "Under-utilization"
-        elif efficiency_index < optimal_low:
-            status = "Low Density Warning"
-        elif efficiency_index <= optimal_high:
-            status = "Optimal"
-        elif efficiency_index <= upper_limit:
-            status = "High Density Warning"
-        else:
-            status = "Over-densification"
+        status = self.classify_status(efficiency_index, zone_color)
 
         # 4. Gap Analysis (Supply-Demand Mismatch)
         gap_analysis = {}
@@ -138,9 +115,9 @@ class BertaudAuditEngine:
             is_constrained = far_gap > 0
             
             policy_recommendation = "None"
-            if is_constrained and far_gap > 1.0: # Significant gap
+            if is_constrained and far_gap > UPSIZE_GAP_THRESHOLD: # Significant gap
                 policy_recommendation = "Request Zoning Upgrade (Upsize)"
-            elif not is_constrained and (legal_far_limit - theoretical_density) > 2.0:
+            elif not is_constrained and (legal_far_limit - theoretical_density) > OVERSUPPLY_GAP_THRESHOLD:
                 policy_recommendation = "Zone Over-supply (Focus on infrastructure)"
 
             gap_analysis = {
@@ -151,7 +128,7 @@ class BertaudAuditEngine:
                 "policy_recommendation": policy_recommendation
             }
             
-        return {
+        result = {
             "distance_km": distance_km,
             "theoretical_density": theoretical_density,
             "proposed_density": proposed_density,
@@ -162,6 +139,80 @@ class BertaudAuditEngine:
             "input_capital_k": capital_k
         }
 
+        # 5. Bid-Rent Equilibrium (only when configured)
+        # Inputs the model cannot solve (capital_k <= 0, D0 households cannot afford)
+        # are recorded in the block instead of failing the density audit.
+        # One grid profile per (transport, capital, land cost) is interpolated
+        # at the parcel, so per-parcel distances do not each take a cache entry.
+        if self.bid_rent_params is not None:
+            try:
+                profile = self._get_bid_rent_solver().interpolate(
+                    [distance_km], capital_k, land_cost_e, transport_cost
+                )
+            except ValueError as e:
+                result["bid_rent"] = {"error": str(e)}
+                return result
+            result["bid_rent"] = {
+                "floor_rent": profile.floor_rent[0],
+                "land_rent": profile.land_rent[0],
+                "equilibrium_far": profile.far[0],
+                "households_per_sqm": profile.households_per_sqm[0],
+                "inside_fringe": profile.far[0] > 0
+            }
+        return result
+
+    def calculate_bid_rent_profile(
+        self,
+        distances_km: list[float],
+        capital_k: float,
+        land_cost_e: float,
+        transport_cost: Union[float, Callable[[float], float]]
+    ):
+        """
+        Alonso-Muth-Mills equilibrium (floor rent, land rent, FAR) at many
+        distances in one vectorized solve, anchored to FAR(0) = D0.
+        Profiles are memoized per transport cost, capital and land cost.
+        """
+        return self._get_bid_rent_solver().solve(distances_km, capital_k, land_cost_e, transport_cost)
+
+    def _get_bid_rent_solver(self):
+        from bid_rent import BidRentParams, BidRentSolver
+
+        if self._bid_rent_solver is None:
+            self._bid_rent_solver = BidRentSolver(self.d0, self.bid_rent_params or BidRentParams())
+        return self._bid_rent_solver
+
+    @staticmethod
+    def classify_status(efficiency_index: float, zone_color: str = None) -> str:
+        """
+        Maps an efficiency index to the audit status band.
+
+        Default bands (Yellow zones shift the upper bands down by 0.1;
+        see STATUS_BANDS):
+            < 0.7       Under-utilization
+            0.7 - 0.8   Low Density Warning
+            0.8 - 1.1   Optimal
+            1.1 - 1.2   High Density Warning
+            > 1.2       Over-densification
+        """
+        # Contextual Overrides: Yellow (Low Density Residential) has a stricter upper limit,
+        # Red (Commercial) keeps the default
+        yellow = bool(zone_color) and "yellow" in zone_color.lower()
+        under, optimal_low, optimal_high, upper_limit = STATUS_BANDS[yellow]
+
+        if efficiency_index < under:
+            status = STATUSES[0]
+        elif efficiency_index < optimal_low:
+            status = STATUSES[1]
+        elif efficiency_index <= optimal_high:
+            status = STATUSES[2]
+        elif efficiency_index <= upper_limit:
+            status = STATUSES[3]
+        else:
+            status = STATUSES[4]
+
+        return status
+
     def calculate_polycentric_density(
         self,
         distance_map: Dict[str, float], # { "center_id": distance_km }
@@ -182,16 +233,29 @@ class BertaudAuditEngine:
         return total_density
 
     @staticmethod
-    def calibrate_parameters(samples: list[tuple[float, float]]) -> tuple[float, float]:
+    def calibrate_parameters(samples: list[tuple[float, float]], method: str = "ols", **options) -> tuple[float, float]:
         """
         Estimates D0 and g from empirical data samples [(distance, density), ...].
         Linearizes the exponential function: ln(Dx) = ln(D0) - g*x
         Returns (estimated_d0, estimated_g)
+
+        method="huber" or "tukey" fits with robust IRLS instead of least
+        squares (options go to robust_calibration.calibrate); use
+        calibrate_robust() for the full result with CIs and diagnostics.
         """
+        if method != "ols":
+            result = BertaudAuditEngine.calibrate_robust(samples, loss=method, **options)
+            for warning in result.warnings:
+                print(f"Warning: {warning}.")
+            return (result.d0, result.g)
+
         import statistics
         
         # Filter valid samples (density > 0)
         valid_samples = [(x, math.log(y)) for x, y in samples if y > 0]
+        dropped = len(samples) - len(valid_samples)
+        if dropped:
+            print(f"Warning: {dropped} samples with density <= 0 were excluded from calibration (log undefined).")
         
         if len(valid_samples) < 2:
             return (0.0, 0.0) # Insufficient data
@@ -217,6 +281,17 @@ class BertaudAuditEngine:
         
         return (estimated_d0, estimated_g)
 
+    @staticmethod
+    def calibrate_robust(samples: list[tuple[float, float]], **options):
+        """
+        Outlier-resistant D0 and g (Huber/Tukey IRLS, optional RANSAC start)
+        with stratified subsampling and optional bootstrap CIs.
+        Returns robust_calibration.CalibrationResult.
+        """
+        from robust_calibration import calibrate_samples
+
+        return calibrate_samples(samples, **options)
+
     @staticmethod
     def convert_rai_to_sqm(rai: float) -> float:
         """Converts Rai to Square Meters."""
@@ -0,0 +1,285 @@
+"""
+Alonso-Muth-Mills Bid-Rent Solver
+Derives floor rent, land rent and optimal FAR from transport cost, capital
+cost and fringe land rent, for many distances at once.
+
+Model (open city, all rents annual THB per sqm):
+    Households: income y, transport cost t(x), Stone-Geary utility with a
+        minimum floor space q_min. At the common utility level the bid
+        floor rent p(x) solves
+            y - t(x) - p * q_min = u * p^beta        (1)
+        which has one root in (0, (y - t(x)) / q_min).
+    Developers: floor per sqm of land H = S^alpha from capital S at unit
+        cost capital_k, so
+            S*(x) = (alpha * p / capital_k)^(1 / (1 - alpha))
+            FAR(x) = S*^alpha
+            R(x)   = (1 - alpha) * p * FAR        (land rent)
+    Fringe: land is only developed while R(x) >= land_cost_e.
+
+The utility level u is calibrated so that FAR(0) = D0, which ties the
+profile to the engine's center density. (1) is solved for every distance
+together with a bracketed Newton iteration over the whole column, and
+solved profiles are memoized per (transport cost, parameters, distances).
+Callable transport costs are keyed by identity, so pass the same function
+object to reuse its profiles.
+
+Per-parcel audits use `interpolate()`: one memoized solve on a fixed
+distance grid per (transport cost, capital, land cost), with p(x)
+interpolated between grid points, instead of one cache entry per parcel
+distance.
+
+Author: BaanBid Development Team
+"""
+
+import threading
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence, Tuple, Union
+
+from caching import LRUCache
+from instrumentation import count_cache
+
+
+# --- Constants ---
+DEFAULT_TOLERANCE = 1e-10       # Relative tolerance on p(x)
+MAX_ITERATIONS = 60
+DEFAULT_CACHE_SIZE = 256
+DEFAULT_GRID_STEP_KM = 0.05     # Grid spacing of interpolate(); p(x) error ~1e-6 relative
+DEFAULT_GRID_MAX_KM = 50.0      # Grid length, doubled for parcels farther out
+
+TransportCost = Union[float, Callable[[float], float]]
+
+
+@dataclass(frozen=True)
+class BidRentParams:
+    """Household and construction parameters of the bid-rent model."""
+    income_y: float = 360_000.0        # Household income per year (THB)
+    housing_share_beta: float = 0.3    # Budget share of floor space above the minimum
+    min_floor_sqm: float = 20.0        # q_min: minimum floor space per household (sqm)
+    capital_share_alpha: float = 0.75  # Floor output elasticity to capital
+
+    def validate(self) -> List[str]:
+        errors = []
+        if self.income_y <= 0:
+            errors.append(f"Income must be positive: {self.income_y}")
+        if not 0 < self.housing_share_beta < 1:
+            errors.append(f"Housing share beta must be in (0, 1): {self.housing_share_beta}")
+        if self.min_floor_sqm < 0:
+            errors.append(f"Minimum floor space cannot be negative: {self.min_floor_sqm}")
+        if not 0 < self.capital_share_alpha < 1:
+            errors.append(f"Capital share alpha must be in (0, 1): {self.capital_share_alpha}")
+        return errors
+
+
+@dataclass
+class BidRentProfile:
+    """ผลดุลยภาพค่าเช่าที่ดินตามระยะทาง (Bid-Rent Profile)"""
+    distances_km: Tuple[float, ...]
+    floor_rent: List[float]         # p(x), THB / sqm floor / year
+    land_rent: List[float]          # R(x), THB / sqm land / year (0 beyond the fringe)
+    far: List[float]                # Optimal FAR (0 beyond the fringe)
+    households_per_sqm: List[float] # FAR / floor per household
+    fringe_km: Optional[float]      # First distance where R(x) < land_cost_e (None if inside)
+
+    def to_dict(self) -> dict:
+        return {
+            "distancesKm": list(self.distances_km),
+            "floorRent": self.floor_rent,
+            "landRent": self.land_rent,
+            "far": self.far,
+            "householdsPerSqm": self.households_per_sqm,
+            "fringeKm": self.fringe_km,
+        }
+
+
+# --- Vectorized Root-Finding ---
+def solve_floor_rent(net_income: Sequence[float], utility: float, beta: float, q_min: float,
+                     tolerance: float = DEFAULT_TOLERANCE) -> List[float]:
+    """
+    Solves m - p*q_min = utility * p^beta for p, for every m in `net_income`
+    at once. Non-positive m has no bid (p = 0).
+
+    f(p) = m - p*q_min - utility*p^beta is decreasing and convex, so a
+    Newton step from a bracket end never leaves the bracket for long; steps
+    that do fall back to bisection. Converged rows drop out of the loop.
+    """
+    n = len(net_income)
+    p = [0.0] * n
+    lo = [0.0] * n
+    hi = [0.0] * n
+    active = []
+    for i, m in enumerate(net_income):
+        if m <= 0:
+            continue
+        # Both (m / utility)^(1/beta) and m / q_min bound the root from above
+        upper = (m / utility) ** (1.0 / beta)
+        if q_min > 0:
+            upper = min(upper, m / q_min)
+        hi[i] = upper
+        p[i] = upper
+        active.append(i)
+
+    for _ in range(MAX_ITERATIONS):
+        if not active:
+            break
+        still = []
+        for i in active:
+            m, x = net_income[i], p[i]
+            powered = utility * x ** beta
+            f = m - x * q_min - powered
+            if f > 0:
+                lo[i] = x
+            else:
+                hi[i] = x
+            slope = -q_min - beta * powered / x
+            step = x - f / slope
+            if not lo[i] < step < hi[i]:
+                step = 0.5 * (lo[i] + hi[i])
+            p[i] = step
+            if abs(step - x) > tolerance * step and hi[i] - lo[i] > tolerance * hi[i]:
+                still.append(i)
+        active = still
+    return p
+
+
+def _transport_column(transport_cost: TransportCost, distances: Sequence[float]) -> List[float]:
+    if callable(transport_cost):
+        return [float(transport_cost(x)) for x in distances]
+    return [float(transport_cost) * x for x in distances]
+
+
+# --- Solver ---
+class BidRentSolver:
+    """
+    Memoized AMM bid-rent profiles anchored to a center FAR of D0.
+
+    Args:
+        d0: FAR at the center (the engine's D0); calibrates the utility level.
+        params: BidRentParams.
+        cache_size: Solved profiles kept (LRU).
+    """
+
+    def __init__(self, d0: float, params: Optional[BidRentParams] = None,
+                 cache_size: int = DEFAULT_CACHE_SIZE):
+        self.params = params or BidRentParams()
+        errors = self.params.validate()
+        if d0 <= 0:
+            errors.append(f"D0 (Center Density) must be positive for bid-rent: {d0}")
+        if errors:
+            raise ValueError("; ".join(errors))
+        self.d0 = d0
+        self._cache = LRUCache(cache_size)
+        self._grids = LRUCache(cache_size)  # Grid floor rents of interpolate(), keyed without the distances
+        self._lock = threading.Lock()
+
+    def utility_level(self, capital_k: float, transport_cost: TransportCost) -> float:
+        """u such that the equilibrium FAR at x = 0 equals D0."""
+        alpha, beta = self.params.capital_share_alpha, self.params.housing_share_beta
+        capital_at_center = self.d0 ** (1.0 / alpha)
+        rent_at_center = capital_k * capital_at_center ** (1.0 - alpha) / alpha
+        net_income = self.params.income_y - _transport_column(transport_cost, [0.0])[0]
+        surplus = net_income - rent_at_center * self.params.min_floor_sqm
+        if surplus <= 0:
+            raise ValueError(
+                f"D0={self.d0} needs floor rent {rent_at_center:,.0f} THB/sqm, which households "
+                f"cannot afford above the minimum floor space; lower capital_k or D0"
+            )
+        return surplus / rent_at_center ** beta
+
+    def solve(
+        self,
+        distances_km: Sequence[float],
+        capital_k: float,
+        land_cost_e: float,
+        transport_cost: TransportCost
+    ) -> BidRentProfile:
+        """Equilibrium profile at `distances_km` (memoized)."""
+        if capital_k <= 0:
+            raise ValueError(f"Capital cost must be positive: {capital_k}")
+        distances = tuple(float(x) for x in distances_km)
+        key = (transport_cost, capital_k, land_cost_e, distances)
+        with self._lock:
+            profile = self._cache.get(key)
+        count_cache("bid_rent", profile is not None)
+        if profile is not None:
+            return profile
+
+        params = self.params
+        utility = self.utility_level(capital_k, transport_cost)
+        net_income = [params.income_y - t for t in _transport_column(transport_cost, distances)]
+        floor_rent = solve_floor_rent(net_income, utility, params.housing_share_beta, params.min_floor_sqm)
+        profile = self._profile_from_rents(distances, net_income, floor_rent, capital_k, land_cost_e)
+        with self._lock:
+            self._cache.put(key, profile)
+        return profile
+
+    def _profile_from_rents(self, distances: Tuple[float, ...], net_income: List[float],
+                            floor_rent: List[float], capital_k: float, land_cost_e: float) -> BidRentProfile:
+        """Developer and household side of the equilibrium, given the floor rents."""
+        alpha, beta, q_min = self.params.capital_share_alpha, self.params.housing_share_beta, self.params.min_floor_sqm
+        exponent = alpha / (1.0 - alpha)
+        scale = (alpha / capital_k) ** exponent
+        far = [scale * p ** exponent for p in floor_rent]
+        land_rent = [(1.0 - alpha) * p * f for p, f in zip(floor_rent, far)]
+
+        fringe_km = None
+        for x, rent in sorted(zip(distances, land_rent)):
+            if rent < land_cost_e:
+                fringe_km = x
+                break
+        undeveloped = [rent < land_cost_e for rent in land_rent]
+        far = [0.0 if out else f for f, out in zip(far, undeveloped)]
+        land_rent = [0.0 if out else r for r, out in zip(land_rent, undeveloped)]
+        # Floor per household from Stone-Geary demand: q = q_min + beta * surplus / p
+        households = [
+            f / (q_min + beta * (m - p * q_min) / p) if f > 0 and p > 0 else 0.0
+            for f, p, m in zip(far, floor_rent, net_income)
+        ]
+
+        return BidRentProfile(distances, floor_rent, land_rent, far, households, fringe_km)
+
+    def profile(self, max_km: float, step_km: float, capital_k: float, land_cost_e: float,
+                transport_cost: TransportCost) -> BidRentProfile:
+        """Citywide profile on a regular grid 0, step, ..., max_km."""
+        count = int(round(max_km / step_km)) + 1
+        return self.solve([i * step_km for i in range(count)], capital_k, land_cost_e, transport_cost)
+
+    def interpolate(
+        self,
+        distances_km: Sequence[float],
+        capital_k: float,
+        land_cost_e: float,
+        transport_cost: TransportCost,
+        step_km: float = DEFAULT_GRID_STEP_KM
+    ) -> BidRentProfile:
+        """
+        Profile at arbitrary distances from one memoized grid profile per
+        (transport cost, capital, land cost). Floor rent is interpolated
+        linearly between grid points; FAR, land rent, households and the
+        fringe then follow from it exactly as in `solve`.
+        """
+        distances = tuple(float(x) for x in distances_km)
+        max_km = DEFAULT_GRID_MAX_KM
+        while distances and max_km < max(distances):
+            max_km *= 2.0
+        key = (transport_cost, capital_k, land_cost_e, max_km, step_km)
+        with self._lock:
+            rents = self._grids.get(key)
+        if rents is None:
+            rents = self.profile(max_km, step_km, capital_k, land_cost_e, transport_cost).floor_rent
+            with self._lock:
+                self._grids.put(key, rents)
+        else:
+            count_cache("bid_rent", True)
+        last = len(rents) - 2
+        floor_rent = []
+        for x in distances:
+            position = max(x, 0.0) / step_km
+            i = min(int(position), last)
+            floor_rent.append(rents[i] + (rents[i + 1] - rents[i]) * (position - i))
+        net_income = [self.params.income_y - t for t in _transport_column(transport_cost, distances)]
+        return self._profile_from_rents(distances, net_income, floor_rent, capital_k, land_cost_e)
+
+    def clear_cache(self) -> None:
+        with self._lock:
+            self._cache = LRUCache(self._cache.max_size)
+            self._grids = LRUCache(self._grids.max_size)
@@ -0,0 +1,35 @@
+"""
+Shared Bounded Caches
+The LRU cache used by the audit pipeline stages, the bid-rent profile
+memo, the density tile server and the audit HTTP service. It lives here,
+next to instrumentation.py, so those modules can share it without
+importing each other.
+
+Author: BaanBid Development Team
+"""
+
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+class LRUCache:
+    """Bounded least-recently-used cache (not thread-safe; callers lock if shared)."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    def get(self, key: Hashable, default=None):
+        if key in self._data:
+            self._data.move_to_end(key)
+            return self._data[key]
+        return default
+
+    def put(self, key: Hashable, value: Any) -> None:
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -0,0 +1,283 @@
+"""
+Multi-Year Density Projection
+Projects how parcel audit statuses change as D0 and g evolve over a plan
+horizon (e.g. 30 years), monocentric or per polycentric center:
+
+    D_x(year) = Sum_i( D0_i(year) * e^(-g_i(year) * x_i) )
+    efficiency(year) = proposed_density / D_x(year)
+    status(year) = BertaudAuditEngine.classify_status(efficiency, zone_color)
+
+Parcels are processed in chunks, and each chunk is evaluated year by year
+against the previous year's statuses. Status counts and transition counts
+(e.g. "Optimal→Under-utilization" between 2030 and 2031) are accumulated
+without ever holding the (years x parcels) matrix. The full matrices are
+only built when `keep_matrices=True`, or can be streamed with
+`iter_chunks()`.
+
+Trajectories: { "center_id": { year: {"d0": ..., "g": ...}, ... } }.
+Missing years are linearly interpolated, and years outside a center's
+range hold its nearest value.
+
+Author: BaanBid Development Team
+"""
+
+import math
+from array import array
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from bertaud_engine import STATUS_BANDS, STATUSES, BertaudAuditEngine
+from geodesic_distance import CBD_CENTER_ID
+
+
+# --- Constants ---
+DEFAULT_CHUNK_SIZE = 65_536
+
+
+def status_code(efficiency_index: float, yellow: bool) -> int:
+    """Index into STATUSES; same bands as BertaudAuditEngine.classify_status."""
+    under, low, optimal_high, upper = STATUS_BANDS[yellow]
+    if efficiency_index < under:
+        return 0
+    if efficiency_index < low:
+        return 1
+    if efficiency_index <= optimal_high:
+        return 2
+    if efficiency_index <= upper:
+        return 3
+    return 4
+
+
+# --- Trajectories ---
+def expand_trajectory(points: Dict[int, Dict[str, float]], years: List[int]) -> Tuple[List[float], List[float]]:
+    """Per-year (d0, g) lists over `years`, linearly interpolated between given years."""
+    if not points:
+        raise ValueError("Trajectory has no years")
+    known = sorted(points)
+    d0s, gs = [], []
+    for year in years:
+        if year <= known[0]:
+            p = points[known[0]]
+            d0s.append(p["d0"])
+            gs.append(p["g"])
+        elif year >= known[-1]:
+            p = points[known[-1]]
+            d0s.append(p["d0"])
+            gs.append(p["g"])
+        else:
+            after = next(y for y in known if y >= year)
+            before = max(y for y in known if y <= year)
+            t = 0.0 if after == before else (year - before) / (after - before)
+            a, b = points[before], points[after]
+            d0s.append(a["d0"] + (b["d0"] - a["d0"]) * t)
+            gs.append(a["g"] + (b["g"] - a["g"]) * t)
+    return d0s, gs
+
+
+# --- Inputs ---
+@dataclass
+class ProjectionInputs:
+    """Column-oriented parcel inputs: ids, proposed density, zone flag and per-center distances."""
+    ids: List[str]
+    proposed: array                         # Proposed / current density (FAR) per parcel
+    yellow: List[bool]                      # Yellow-zone flag (stricter upper bands)
+    distances: Dict[str, array]             # center_id -> km per parcel
+    skipped: List[str] = field(default_factory=list)  # Parcel ids left out (no usable distance)
+
+    @classmethod
+    def from_parcels(cls, parcels: Iterable, proposed_field: str = "current_far",
+                     center_id: str = CBD_CENTER_ID) -> "ProjectionInputs":
+        """
+        Monocentric inputs from LandParcel objects or dicts (distance_from_cbd_km).
+        Parcels whose distance is missing or not a number are listed in
+        `skipped` instead of being projected.
+        """
+        ids, proposed, yellow, distances, skipped = [], array('d'), [], array('d'), []
+        for parcel in parcels:
+            get = parcel.get if isinstance(parcel, dict) else (lambda name, p=parcel: getattr(p, name, None))
+            try:
+                distance = float(get("distance_from_cbd_km"))
+            except (TypeError, ValueError):
+                skipped.append(get("id"))
+                continue
+            ids.append(get("id"))
+            proposed.append(get(proposed_field) or 0.0)
+            yellow.append("yellow" in (get("zone_color") or "").lower())
+            distances.append(distance)
+        return cls(ids, proposed, yellow, {center_id: distances}, skipped)
+
+    @classmethod
+    def from_distance_stage(cls, stage, proposed_field: str = "current_far") -> "ProjectionInputs":
+        """Polycentric inputs reusing a computed CenterDistanceStage's distance columns."""
+        proposed, yellow = array('d'), []
+        for row in range(len(stage.ids)):
+            parcel = stage.parcel_at(row)
+            get = parcel.get if isinstance(parcel, dict) else (lambda name, p=parcel: getattr(p, name, None))
+            proposed.append(get(proposed_field) or 0.0)
+            yellow.append("yellow" in (get("zone_color") or "").lower())
+        return cls(list(stage.ids), proposed, yellow, dict(stage.distances))
+
+
+# --- Results ---
+def _transition_label(a: int, b: int) -> str:
+    return f"{STATUSES[a]}→{STATUSES[b]}"
+
+
+@dataclass
+class ProjectionResult:
+    """ผลการคาดการณ์สถานะความหนาแน่นรายปี"""
+    years: List[int]
+    parcel_count: int
+    status_counts: Dict[int, Dict[str, int]]                 # year -> status -> parcels
+    transitions: Dict[Tuple[int, int], Dict[str, int]]       # (year, next year) -> "A→B" -> parcels
+    base_to_final: Dict[str, int]                            # first year -> last year
+    skipped: int = 0                                         # Input parcels without a usable distance
+    theoretical: Optional[Dict[int, array]] = None           # Only with keep_matrices
+    efficiency: Optional[Dict[int, array]] = None
+    status: Optional[Dict[int, array]] = None                # STATUSES codes ('b')
+
+    def to_dict(self) -> dict:
+        return {
+            "years": self.years,
+            "parcelCount": self.parcel_count,
+            "statusCounts": {str(y): counts for y, counts in self.status_counts.items()},
+            "transitions": {f"{a}→{b}": counts for (a, b), counts in self.transitions.items()},
+            "baseToFinal": self.base_to_final,
+            "skipped": self.skipped,
+        }
+
+
+@dataclass
+class _Accumulator:
+    n_years: int
+    status: List[List[int]] = field(default_factory=list)             # [year][code]
+    transitions: List[List[List[int]]] = field(default_factory=list)  # [year step][from][to]
+    base_final: List[List[int]] = field(default_factory=lambda: [[0] * 5 for _ in range(5)])
+
+    def __post_init__(self):
+        self.status = [[0] * 5 for _ in range(self.n_years)]
+        self.transitions = [[[0] * 5 for _ in range(5)] for _ in range(max(0, self.n_years - 1))]
+
+
+# --- Engine ---
+class DensityProjection:
+    """
+    Projects statuses over per-year (d0, g) trajectories.
+
+    Args:
+        trajectories: { center_id: { year: {"d0", "g"} } }. Use
+            `DensityProjection.monocentric({year: (d0, g)})` for the
+            single-CBD case.
+        years: Years to project (default: every year from the earliest to
+            the latest trajectory point).
+    """
+
+    def __init__(
+        self,
+        trajectories: Dict[str, Dict[int, Dict[str, float]]],
+        years: Optional[Iterable[int]] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE
+    ):
+        if not trajectories:
+            raise ValueError("At least one center trajectory is required")
+        all_years = [y for points in trajectories.values() for y in points]
+        self.years = sorted(years) if years is not None else list(range(min(all_years), max(all_years) + 1))
+        self.chunk_size = chunk_size
+        self.params: Dict[str, Tuple[List[float], List[float]]] = {
+            center_id: expand_trajectory(points, self.years) for center_id, points in trajectories.items()
+        }
+        for center_id, (d0s, gs) in self.params.items():
+            for d0, g in zip(d0s, gs):
+                errors = BertaudAuditEngine.validate_inputs(d0, g, 0.0)
+                if errors:
+                    raise ValueError(f"Center {center_id}: {'; '.join(errors)}")
+
+    @classmethod
+    def monocentric(cls, trajectory: Dict[int, Tuple[float, float]], **kwargs) -> "DensityProjection":
+        return cls({CBD_CENTER_ID: {y: {"d0": d0, "g": g} for y, (d0, g) in trajectory.items()}}, **kwargs)
+
+    # --- Chunk Evaluation ---
+    def iter_chunks(self, inputs: ProjectionInputs) -> Iterator[Tuple[int, int, List[List[float]], List[List[float]], List[List[int]]]]:
+        """
+        Yields (start, stop, theoretical[year][row], efficiency[year][row],
+        status[year][row]) per parcel chunk. Memory is O(years x chunk).
+        """
+        missing = [cid for cid in self.params if cid not in inputs.distances]
+        if missing:
+            raise ValueError(f"No distance column for center(s): {', '.join(missing)}")
+        n = len(inputs.ids)
+        exp = math.exp
+        for start in range(0, n, self.chunk_size):
+            stop = min(start + self.chunk_size, n)
+            proposed = inputs.proposed[start:stop]
+            yellow = inputs.yellow[start:stop]
+            decay_cache: Dict[Tuple[str, float], List[float]] = {}
+            theo_rows, eff_rows, status_rows = [], [], []
+            for y in range(len(self.years)):
+                theo = [0.0] * (stop - start)
+                for center_id, (d0s, gs) in self.params.items():
+                    d0, g = d0s[y], gs[y]
+                    # e^(-g x) only depends on g, which plans usually hold
+                    # constant for several years
+                    decay = decay_cache.get((center_id, g))
+                    if decay is None:
+                        decay = [exp(-g * x) for x in inputs.distances[center_id][start:stop]]
+                        decay_cache[(center_id, g)] = decay
+                    theo = [t + d0 * e for t, e in zip(theo, decay)]
+                eff = [p / t if t != 0 else 0.0 for p, t in zip(proposed, theo)]
+                codes = [status_code(e, yl) for e, yl in zip(eff, yellow)]
+                theo_rows.append(theo)
+                eff_rows.append(eff)
+                status_rows.append(codes)
+            yield start, stop, theo_rows, eff_rows, status_rows
+
+    def run(self, inputs: ProjectionInputs, keep_matrices: bool = False) -> ProjectionResult:
+        """Status and transition counts by year (plus full matrices if `keep_matrices`)."""
+        n_years = len(self.years)
+        acc = _Accumulator(n_years)
+        matrices = None
+        if keep_matrices:
+            matrices = (
+                {year: array('d') for year in self.years},
+                {year: array('d') for year in self.years},
+                {year: array('b') for year in self.years},
+            )
+
+        for _, _, theo_rows, eff_rows, status_rows in self.iter_chunks(inputs):
+            for y, codes in enumerate(status_rows):
+                counts = acc.status[y]
+                for c in codes:
+                    counts[c] += 1
+                if y > 0:
+                    table = acc.transitions[y - 1]
+                    for a, b in zip(status_rows[y - 1], codes):
+                        table[a][b] += 1
+            for a, b in zip(status_rows[0], status_rows[-1]):
+                acc.base_final[a][b] += 1
+            if matrices is not None:
+                for y, year in enumerate(self.years):
+                    matrices[0][year].extend(theo_rows[y])
+                    matrices[1][year].extend(eff_rows[y])
+                    matrices[2][year].extend(status_rows[y])
+
+        def changed(table: List[List[int]]) -> Dict[str, int]:
+            return {
+                _transition_label(a, b): table[a][b]
+                for a in range(5) for b in range(5) if a != b and table[a][b]
+            }
+
+        result = ProjectionResult(
+            years=list(self.years),
+            parcel_count=len(inputs.ids),
+            status_counts={
+                year: {STATUSES[c]: acc.status[y][c] for c in range(5)} for y, year in enumerate(self.years)
+            },
+            transitions={
+                (self.years[y], self.years[y + 1]): changed(acc.transitions[y]) for y in range(n_years - 1)
+            },
+            base_to_final=changed(acc.base_final),
+            skipped=len(inputs.skipped),
+        )
+        if matrices is not None:
+            result.theoretical, result.efficiency, result.status = matrices
+        return result
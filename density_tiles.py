@@ -0,0 +1,299 @@
+"""
+Binary Density Curves and Heatmap Tiles
+Precomputes Bertaud density curves and polycentric heatmap tiles as
+compact little-endian binary buffers for the dashboard, instead of
+verbose JSON or in-browser recomputation.
+
+Density curve (`density_curve`):
+    20-byte header  "<4sBBHfff"  magic b"BDC1", version, dtype, count, d0, g, step_km
+    payload         Float32[count], D(i * step_km) for i in 0..count-1
+
+Heatmap tile (`render_tile`, XYZ / Web Mercator tiling):
+    24-byte header  "<4sBBBBHHIIf"  magic b"BDT1", version, dtype, zoom, reserved,
+                                    width, height, x, y, scale
+    payload         Float32[width * height] densities            (dtype 1), or
+                    Uint8[width * height], density = v / 255 * scale  (dtype 2)
+
+Both headers are multiples of 4 bytes, so a browser can view the payload
+directly with `new Float32Array(buffer, HEADER_SIZE)`. A 256x256 Uint8
+tile is 64 KB before HTTP compression.
+
+Pixel density is D = Sum(D0_i * e^(-g_i * x_i)), the formula of
+BertaudAuditEngine.calculate_polycentric_density, with x_i the haversine
+distance to center i.
+
+Author: BaanBid Development Team
+"""
+
+import math
+import struct
+import sys
+import threading
+from array import array
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+from caching import LRUCache
+from spatial_index import EARTH_RADIUS_KM, haversine_km
+
+
+# --- Constants ---
+FORMAT_VERSION = 1
+DTYPE_FLOAT32 = 1
+DTYPE_UINT8 = 2
+DTYPES = {"float32": DTYPE_FLOAT32, "uint8": DTYPE_UINT8}
+
+CURVE_MAGIC = b"BDC1"
+CURVE_HEADER = struct.Struct("<4sBBHfff")
+TILE_MAGIC = b"BDT1"
+TILE_HEADER = struct.Struct("<4sBBBBHHIIf")
+
+DEFAULT_TILE_SIZE = 256
+DEFAULT_CURVE_SAMPLES = 256
+DEFAULT_CURVE_MAX_KM = 50.0
+MAX_ZOOM = 22
+# A center is skipped for a tile when its largest contribution there is
+# below this fraction of the scale (well under one Uint8 step)
+NEGLIGIBLE_FRACTION = 1e-4
+
+
+def _float32_bytes(values) -> bytes:
+    buf = array('f', values)
+    if sys.byteorder != "little":
+        buf.byteswap()
+    return buf.tobytes()
+
+
+# --- Density Curve ---
+@lru_cache(maxsize=256)
+def density_curve(
+    d0: float,
+    g: float,
+    max_distance_km: float = DEFAULT_CURVE_MAX_KM,
+    samples: int = DEFAULT_CURVE_SAMPLES
+) -> bytes:
+    """Monocentric curve D(x) = D0 * e^(-g x) sampled evenly over [0, max_distance_km]."""
+    if samples < 2 or samples > 0xFFFF:
+        raise ValueError(f"samples must be in 2..65535: {samples}")
+    if max_distance_km <= 0:
+        raise ValueError(f"max_distance_km must be positive: {max_distance_km}")
+    step = max_distance_km / (samples - 1)
+    exp = math.exp
+    header = CURVE_HEADER.pack(CURVE_MAGIC, FORMAT_VERSION, DTYPE_FLOAT32, samples, d0, g, step)
+    return header + _float32_bytes(d0 * exp(-g * i * step) for i in range(samples))
+
+
+def decode_density_curve(buf: bytes) -> Tuple[Dict, array]:
+    magic, version, dtype, count, d0, g, step = CURVE_HEADER.unpack_from(buf)
+    if magic != CURVE_MAGIC:
+        raise ValueError("Not a density curve buffer")
+    values = array('f')
+    values.frombytes(buf[CURVE_HEADER.size:CURVE_HEADER.size + 4 * count])
+    if sys.byteorder != "little":
+        values.byteswap()
+    return {"version": version, "dtype": dtype, "count": count, "d0": d0, "g": g, "step_km": step}, values
+
+
+# --- Tiles ---
+def tile_bounds(zoom: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """(south, west, north, east) in degrees of an XYZ tile."""
+    n = 1 << zoom
+    west = x / n * 360.0 - 180.0
+    east = (x + 1) / n * 360.0 - 180.0
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return south, west, north, east
+
+
+def _pixel_centers(zoom: int, x: int, y: int, size: int) -> Tuple[List[float], List[float]]:
+    """Latitudes (per row) and longitudes (per column) of pixel centers, in radians."""
+    n = 1 << zoom
+    lats = [
+        math.atan(math.sinh(math.pi * (1 - 2 * (y + (j + 0.5) / size) / n)))
+        for j in range(size)
+    ]
+    lons = [math.radians((x + (i + 0.5) / size) / n * 360.0 - 180.0) for i in range(size)]
+    return lats, lons
+
+
+def _validate_tile(zoom: int, x: int, y: int, size: int) -> None:
+    if not 0 <= zoom <= MAX_ZOOM:
+        raise ValueError(f"zoom must be in 0..{MAX_ZOOM}: {zoom}")
+    n = 1 << zoom
+    if not (0 <= x < n and 0 <= y < n):
+        raise ValueError(f"Tile {zoom}/{x}/{y} is outside the tile grid")
+    if not 1 <= size <= 1024:
+        raise ValueError(f"Tile size must be in 1..1024: {size}")
+
+
+def tile_scale(centers: List[Tuple[float, float, float, float]]) -> float:
+    """Upper bound of the polycentric density (Sum D0_i), the fixed Uint8 scale."""
+    return float(sum(max(d0, 0.0) for _, _, d0, _ in centers)) or 1.0
+
+
+def render_tile(
+    centers: List[Tuple[float, float, float, float]],
+    zoom: int,
+    x: int,
+    y: int,
+    size: int = DEFAULT_TILE_SIZE,
+    dtype: str = "uint8",
+    scale: float = None
+) -> bytes:
+    """
+    Renders one heatmap tile.
+
+    Args:
+        centers: [(lat, lon, d0, g), ...]
+        scale: Uint8 full-scale density. Defaults to `tile_scale(centers)`
+            so every tile of one parameter set shares the same color scale.
+    """
+    _validate_tile(zoom, x, y, size)
+    if dtype not in DTYPES:
+        raise ValueError(f"dtype must be one of {sorted(DTYPES)}: {dtype}")
+    if scale is None:
+        scale = tile_scale(centers)
+
+    lats, lons = _pixel_centers(zoom, x, y, size)
+    south, west, north, east = tile_bounds(zoom, x, y)
+    totals = [[0.0] * size for _ in range(size)]
+    two_r = 2.0 * EARTH_RADIUS_KM
+    sin, cos, exp, asin, sqrt = math.sin, math.cos, math.exp, math.asin, math.sqrt
+
+    for c_lat_deg, c_lon_deg, d0, g in centers:
+        # Nearest point of the tile to the center bounds its largest contribution
+        nearest_km = haversine_km(
+            c_lat_deg, c_lon_deg,
+            min(max(c_lat_deg, south), north), min(max(c_lon_deg, west), east)
+        )
+        if d0 * exp(-g * nearest_km * 0.9) < NEGLIGIBLE_FRACTION * scale:
+            continue
+
+        # Haversine is separable: the latitude terms vary by row only and
+        # the longitude term by column only
+        c_lat = math.radians(c_lat_deg)
+        c_lon = math.radians(c_lon_deg)
+        c_cos = cos(c_lat)
+        col_terms = [sin((c_lon - lon) * 0.5) ** 2 for lon in lons]
+        neg_g_2r = -g * two_r
+        for j, lat in enumerate(lats):
+            row_term = sin((c_lat - lat) * 0.5) ** 2
+            weight = cos(lat) * c_cos
+            row = totals[j]
+            totals[j] = [
+                t + d0 * exp(neg_g_2r * asin(sqrt(min(1.0, row_term + weight * s))))
+                for t, s in zip(row, col_terms)
+            ]
+
+    header = TILE_HEADER.pack(
+        TILE_MAGIC, FORMAT_VERSION, DTYPES[dtype], zoom, 0, size, size, x, y, scale
+    )
+    if dtype == "float32":
+        return header + b"".join(_float32_bytes(row) for row in totals)
+
+    k = 255.0 / scale
+    payload = bytearray()
+    for row in totals:
+        payload.extend(min(255, int(v * k + 0.5)) for v in row)
+    return header + bytes(payload)
+
+
+def decode_tile(buf: bytes) -> Tuple[Dict, array]:
+    """Header dict and densities (floats, de-quantized for Uint8 tiles)."""
+    magic, version, dtype, zoom, _, width, height, x, y, scale = TILE_HEADER.unpack_from(buf)
+    if magic != TILE_MAGIC:
+        raise ValueError("Not a heatmap tile buffer")
+    payload = buf[TILE_HEADER.size:]
+    if dtype == DTYPE_FLOAT32:
+        values = array('f')
+        values.frombytes(payload[:4 * width * height])
+        if sys.byteorder != "little":
+            values.byteswap()
+    else:
+        values = array('f', (v / 255.0 * scale for v in payload[:width * height]))
+    header = {"version": version, "dtype": dtype, "zoom": zoom, "x": x, "y": y,
+              "width": width, "height": height, "scale": scale}
+    return header, values
+
+
+# --- Tile Service ---
+class DensityTileService:
+    """
+    Caches rendered tiles by (center parameters, centers version, zoom, x, y).
+
+    `set_parameters` (new D0/g) and `update_centers` (moved or added
+    centers) invalidate the cache. Because both are part of the key, a
+    tile rendered concurrently with an update can never be served for the
+    new parameters.
+
+    Args:
+        center_locations: { "center_id": (lat, lon) }
+        centers_config: { "center_id": { "d0": ..., "g": ... } }
+    """
+
+    def __init__(
+        self,
+        center_locations: Dict[str, Tuple[float, float]],
+        centers_config: Dict[str, Dict[str, float]],
+        tile_size: int = DEFAULT_TILE_SIZE,
+        dtype: str = "uint8",
+        cache_size: int = 4096
+    ):
+        if dtype not in DTYPES:
+            raise ValueError(f"dtype must be one of {sorted(DTYPES)}: {dtype}")
+        self.tile_size = tile_size
+        self.dtype = dtype
+        self.cache_size = cache_size
+        self.centers_version = 0
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+        self._lock = threading.Lock()
+        self._cache = LRUCache(cache_size)
+        self._locations = dict(center_locations)
+        self._config = {k: dict(v) for k, v in centers_config.items()}
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        self._centers = [
+            (lat, lon, float(self._config[cid].get('d0', 0)), float(self._config[cid].get('g', 0)))
+            for cid, (lat, lon) in sorted(self._locations.items())
+            if cid in self._config
+        ]
+        self._params_key = tuple(
+            (cid, float(p.get('d0', 0)), float(p.get('g', 0))) for cid, p in sorted(self._config.items())
+        )
+        self._scale = tile_scale(self._centers)
+
+    def _invalidate(self) -> None:
+        self._cache = LRUCache(self.cache_size)
+        self.stats["invalidations"] += 1
+
+    def set_parameters(self, centers_config: Dict[str, Dict[str, float]]) -> None:
+        with self._lock:
+            self._config = {k: dict(v) for k, v in centers_config.items()}
+            self._rebuild()
+            self._invalidate()
+
+    def update_centers(self, center_locations: Dict[str, Tuple[float, float]]) -> int:
+        """Adds or moves centers; returns the new centers version."""
+        with self._lock:
+            self._locations.update(center_locations)
+            self.centers_version += 1
+            self._rebuild()
+            self._invalidate()
+            return self.centers_version
+
+    def get_tile(self, zoom: int, x: int, y: int) -> bytes:
+        with self._lock:
+            key = (self._params_key, self.centers_version, zoom, x, y)
+            cached = self._cache.get(key)
+            if cached is not None:
+                self.stats["hits"] += 1
+                return cached
+            self.stats["misses"] += 1
+            centers, scale = self._centers, self._scale
+
+        tile = render_tile(centers, zoom, x, y, self.tile_size, self.dtype, scale)
+        with self._lock:
+            if key[0] == self._params_key and key[1] == self.centers_version:
+                self._cache.put(key, tile)
+        return tile
@@ -17,6 +17,8 @@ from dataclasses import dataclass
 from enum import Enum
 from typing import Union
 
+from instrumentation import timed
+
 
 # --- Constants ---
 SQM_PER_RAI = 1600
@@ -86,6 +88,7 @@ class FARCalculationError(Exception):
 
 
 # --- Main Calculation Function ---
+@timed("calculate_far")
 def calculate_far(inputs: FARInputs) -> FARResult:
     """
     คำนวณค่า FAR 3 รูปแบบตาม Bertaud Model
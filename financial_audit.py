@@ -1,26 +1,109 @@
 from typing import Dict, Union, Tuple, List, Optional
 import math
-from pydantic import BaseModel, Field, field_validator, ValidationError
+import threading
 
-class FinancialParams(BaseModel):
+from instrumentation import timed
+
+# pydantic is imported the first time FinancialParams is used (module
+# __getattr__ below), so FAR/density-only code paths never load it.
+_params_model = None
+_params_model_lock = threading.Lock()
+
+
+def _build_params_model():
+    from pydantic import BaseModel, Field, field_validator
+
+    class FinancialParams(BaseModel):
+        """
+        Data model for Financial Audit parameters with strict validation.
+        """
+        upfront_fee: float = Field(..., ge=0, description="Upfront fee paid at T=0 (THB)")
+        initial_annual_rent: float = Field(..., ge=0, description="Initial annual rent (THB)")
+        lease_term_years: int = Field(..., gt=0, le=100, description="Lease term in years")
+        discount_rate: float = Field(..., ge=0, le=1.0, description="Discount rate (decimal, e.g. 0.035)")
+        investment_cost: float = Field(..., ge=0, description="Total investment cost (THB)")
+        asset_useful_life_years: int = Field(..., gt=0, description="Useful life of the asset for depreciation")
+        rent_escalation_rate: float = Field(0.15, ge=0, description="Rent increase rate (decimal)")
+        escalation_interval_years: int = Field(3, gt=0, description="Years between rent increases")
+
+        @field_validator('lease_term_years')
+        @classmethod # Fixed: field_validator is a classmethod implicitly or needs mode='before'? No, usually works on field.
+        def check_lease_logic(cls, v):
+            if v > 100:
+                raise ValueError("Lease term is unusually long (>100 years). Please verify.")
+            return v
+
+    FinancialParams.__qualname__ = "FinancialParams"  # Picklable as financial_audit.FinancialParams
+    return FinancialParams
+
+
+def _get_params_model():
+    global _params_model
+    if _params_model is None:
+        with _params_model_lock:
+            if _params_model is None:
+                _params_model = _build_params_model()
+    return _params_model
+
+
+def __getattr__(name: str):
+    """Lazily exposes FinancialParams and pydantic's ValidationError."""
+    if name == "FinancialParams":
+        return _get_params_model()
+    if name == "ValidationError":
+        from pydantic import ValidationError
+        return ValidationError
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def state_npv(
+    upfront_fee: float,
+    initial_annual_rent: float,
+    lease_term_years: int,
+    discount_rate: float,
+    investment_cost: float,
+    asset_useful_life_years: int,
+    rent_escalation_rate: float = 0.15,
+    escalation_interval_years: int = 3
+) -> float:
     """
-    Data model for Financial Audit parameters with strict validation.
+    State NPV on already-validated plain numbers (FinancialAudit.calculate_state_npv
+    without the model, for bulk callers such as shared_plane workers).
     """
-    upfront_fee: float = Field(..., ge=0, description="Upfront fee paid at T=0 (THB)")
-    initial_annual_rent: float = Field(..., ge=0, description="Initial annual rent (THB)")
-    lease_term_years: int = Field(..., gt=0, le=100, description="Lease term in years")
-    discount_rate: float = Field(..., ge=0, le=1.0, description="Discount rate (decimal, e.g. 0.035)")
-    investment_cost: float = Field(..., ge=0, description="Total investment cost (THB)")
-    asset_useful_life_years: int = Field(..., gt=0, description="Useful life of the asset for depreciation")
-    rent_escalation_rate: float = Field(0.15, ge=0, description="Rent increase rate (decimal)")
-    escalation_interval_years: int = Field(3, gt=0, description="Years between rent increases")
-
-    @field_validator('lease_term_years')
-    @classmethod # Fixed: field_validator is a classmethod implicitly or needs mode='before'? No, usually works on field.
-    def check_lease_logic(cls, v):
-        if v > 100:
-            raise ValueError("Lease term is unusually long (>100 years). Please verify.")
-        return v
+    npv = 0.0
+    
+    # 1. Cash Inflows: Upfront Fee (T=0)
+    npv += upfront_fee
+    
+    # 2. Cash Inflows: Annual Rent (T=1 to T=lease_term)
+    current_rent = initial_annual_rent
+    lease_term = lease_term_years
+    
+    for year in range(1, lease_term + 1):
+        # Apply rent escalation
+        if year > 1 and (year - 1) % escalation_interval_years == 0:
+            current_rent *= (1 + rent_escalation_rate)
+        
+        # Discount back to T=0
+        discount_factor = (1 + discount_rate) ** year
+        discounted_rent = current_rent / discount_factor
+        npv += discounted_rent
+
+    # 3. Terminal Value (Asset transfer at end of lease)
+    # Residual Value = Cost * (Remaining Life / Useful Life)
+    if lease_term < asset_useful_life_years:
+        remaining_life = asset_useful_life_years - lease_term
+        # Straight-line depreciation basis
+        residual_value = investment_cost * (remaining_life / asset_useful_life_years)
+    else:
+        residual_value = 0.0
+
+    # Discount Terminal Value
+    discounted_terminal_value = residual_value / ((1 + discount_rate) ** lease_term)
+    npv += discounted_terminal_value
+    
+    return npv
+
 
 class FinancialAudit:
     """
@@ -28,47 +111,19 @@ class FinancialAudit:
     Based on Thai Treasury Department regulations.
     """
 
-    def calculate_state_npv(self, params: FinancialParams) -> float:
+    @timed("calculate_state_npv")
+    def calculate_state_npv(self, params: "FinancialParams") -> float:
         """
         Calculates the Net Present Value (NPV) of the state's potential return.
         Uses Pydantic model for validation.
         """
-        npv = 0.0
-        
-        # 1. Cash Inflows: Upfront Fee (T=0)
-        npv += params.upfront_fee
-        
-        # 2. Cash Inflows: Annual Rent (T=1 to T=lease_term)
-        current_rent = params.initial_annual_rent
-        lease_term = params.lease_term_years
-        
-        for year in range(1, lease_term + 1):
-            # Apply rent escalation
-            if year > 1 and (year - 1) % params.escalation_interval_years == 0:
-                current_rent *= (1 + params.rent_escalation_rate)
-            
-            # Discount back to T=0
-            discount_factor = (1 + params.discount_rate) ** year
-            discounted_rent = current_rent / discount_factor
-            npv += discounted_rent
-
-        # 3. Terminal Value (Asset transfer at end of lease)
-        # Residual Value = Cost * (Remaining Life / Useful Life)
-        if lease_term < params.asset_useful_life_years:
-            remaining_life = params.asset_useful_life_years - lease_term
-            # Straight-line depreciation basis
-            residual_value = params.investment_cost * (remaining_life / params.asset_useful_life_years)
-        else:
-            residual_value = 0.0
-
-        # Discount Terminal Value
-        discounted_terminal_value = residual_value / ((1 + params.discount_rate) ** lease_term)
-        npv += discounted_terminal_value
-        
-        return npv
-
-        return npv
+        return state_npv(
+            params.upfront_fee, params.initial_annual_rent, params.lease_term_years,
+            params.discount_rate, params.investment_cost, params.asset_useful_life_years,
+            params.rent_escalation_rate, params.escalation_interval_years
+        )
 
+    @timed("validate_construction_cost")
     def validate_construction_cost(
         self,
         proposed_cost_per_sqm: float,
@@ -130,7 +185,7 @@ class FinancialAudit:
             "province_context": province
         }
 
-    def calculate_return_on_asset(self, params: FinancialParams) -> Dict[str, Union[str, float]]:
+    def calculate_return_on_asset(self, params: "FinancialParams") -> Dict[str, Union[str, float]]:
         """
         Calculates ROA based on Average Annual Benefit / Asset Value.
         Uses validated FinancialParams.
@@ -209,7 +264,7 @@ class FinancialAudit:
         
         def run_scenario(rate):
             # Instantiate FinancialParams for validation and calculation
-            params = FinancialParams(
+            params = _get_params_model()(
                 upfront_fee=upfront,
                 initial_annual_rent=initial_rent,
                 lease_term_years=lease_years,
@@ -18,6 +18,7 @@ class LandParcel:
     ownership_type: str = "T.Ratchaphatsadu" # e.g. "T.Ratchaphatsadu" (Treasury), "Private", "Other"
     land_title_no: Optional[str] = None # Title Deed Number (Chanote)
     zone_color: Optional[str] = None # City Planning Zone Color (e.g. "Red", "Orange")
+    district: Optional[str] = None # Administrative district (Khet / Amphoe), used for dashboard rollups
     gps_coordinates: str # In production, use Firestore GeoPoint(lat, long)
     
     # Audit Trail
@@ -61,7 +62,7 @@ class ProjectProposal:
     id: str # Firestore Document ID
     parcel_id: str # Reference to LandParcel ID
     param_id: str # Reference to EconomicParameters ID (Origin)
-    economic_parameters_snapshot: Dict # Full snapshot of the parameters used at calculation time
+    economic_parameters_snapshot: Dict # Full snapshot of the parameters used at calculation time ({} when stored by hash)
     proposed_gfa: float # Gross Floor Area in sq.m.
     proposed_building_type: str # 'high-rise' or 'low-rise'
     proposed_investment_cost: float # Total investment cost in THB
@@ -73,6 +74,7 @@ class ProjectProposal:
     efficiency_score: Optional[float] = None # Bertaud Efficiency Index (0.8 - 1.2 is Optimal)
     audit_status: str = "Pending" # e.g. "Pending", "Approved", "Rejected"
     analyst_id: Optional[str] = None # User ID of the auditor
+    economic_parameters_hash: Optional[str] = None # Content hash into 'economic_parameter_snapshots' (see snapshot_store.py)
 
     # Audit Trail
     created_at: str = "" # ISO Format
@@ -93,7 +95,12 @@ class ProposalHistory:
     changed_by: str # User ID who made the change
     changed_at: str # ISO Format timestamp
     change_summary: str # Description of changes
-    previous_snapshot: Dict # Snapshot of the proposal BEFORE this change
+    previous_snapshot: Dict # Snapshot of the proposal BEFORE this change (full copy only on checkpoints)
+
+    # Delta Encoding (see proposal_history.py)
+    sequence: int = 0 # Position of this entry in the proposal's history (0-based)
+    is_checkpoint: bool = True # True: previous_snapshot is a full copy. False: use delta
+    delta: Optional[Dict] = None # Field-level diff from the previous entry: { "set": [[path, value], ...], "unset": [path, ...] }
     
     def to_dict(self) -> Dict:
         return asdict(self)
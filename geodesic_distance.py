@@ -0,0 +1,214 @@
+"""
+Bulk Geodesic Distance Stage
+Computes haversine distances from every parcel to every configured
+center as a (parcels x centers) matrix, chunked over parcels so memory
+stays bounded, and feeds the result to
+BertaudAuditEngine.calculate_polycentric_density.
+
+The matrix is stored column-per-center in `array('d')` buffers, so moving
+one center only recomputes that column and editing a parcel only
+recomputes its row.
+
+Author: BaanBid Development Team
+"""
+
+import math
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from spatial_index import EARTH_RADIUS_KM, parse_gps_coordinates
+
+
+# --- Constants ---
+DEFAULT_CHUNK_SIZE = 65_536
+CBD_CENTER_ID = "CBD"
+
+
+def _haversine_column(
+    lat_rad: array, cos_lat: array, lon_rad: array,
+    center_lat: float, center_lon: float,
+    start: int, stop: int
+) -> List[float]:
+    """Distances (km) from rows [start, stop) to a single center."""
+    c_lat = math.radians(center_lat)
+    c_lon = math.radians(center_lon)
+    c_cos = math.cos(c_lat)
+    sin = math.sin
+    asin = math.asin
+    sqrt = math.sqrt
+    two_r = 2.0 * EARTH_RADIUS_KM
+    return [
+        two_r * asin(min(1.0, sqrt(
+            sin((c_lat - p_lat) * 0.5) ** 2 + p_cos * c_cos * sin((c_lon - p_lon) * 0.5) ** 2
+        )))
+        for p_lat, p_cos, p_lon in zip(lat_rad[start:stop], cos_lat[start:stop], lon_rad[start:stop])
+    ]
+
+
+class CenterDistanceStage:
+    """
+    Holds parsed parcel coordinates and the parcel-to-center distance matrix.
+
+    Args:
+        center_locations: { "center_id": (lat, lon) }. The CBD center
+            (`cbd_center_id`) is written back to `distance_from_cbd_km`.
+        chunk_size: Number of parcels processed per chunk.
+    """
+
+    def __init__(
+        self,
+        center_locations: Dict[str, Tuple[float, float]],
+        cbd_center_id: str = CBD_CENTER_ID,
+        chunk_size: int = DEFAULT_CHUNK_SIZE
+    ):
+        if chunk_size <= 0:
+            raise ValueError(f"chunk_size must be positive: {chunk_size}")
+        self.center_locations = dict(center_locations)
+        self.cbd_center_id = cbd_center_id
+        self.chunk_size = chunk_size
+
+        self.ids: List[str] = []
+        self.invalid_ids: List[str] = []
+        self._parcels: List[object] = []
+        self._row_by_id: Dict[str, int] = {}
+        self._lat_rad = array('d')
+        self._lon_rad = array('d')
+        self._cos_lat = array('d')
+        self.distances: Dict[str, array] = {}  # center_id -> column of km per parcel row
+
+    # --- Loading ---
+    def load_parcels(self, parcels: Iterable) -> None:
+        """
+        Parses coordinates for new parcels (LandParcel objects or dicts).
+        Call `compute()` afterwards to fill their distances.
+        """
+        for parcel in parcels:
+            parcel_id, text = self._id_and_text(parcel)
+            try:
+                lat, lon = parse_gps_coordinates(text)
+            except (TypeError, ValueError):
+                self.invalid_ids.append(parcel_id)
+                continue
+            row = self._row_by_id.get(parcel_id)
+            if row is None:
+                row = len(self.ids)
+                self._row_by_id[parcel_id] = row
+                self.ids.append(parcel_id)
+                self._parcels.append(parcel)
+                self._lat_rad.append(0.0)
+                self._lon_rad.append(0.0)
+                self._cos_lat.append(0.0)
+                for column in self.distances.values():
+                    column.append(math.nan)
+            else:
+                self._parcels[row] = parcel
+            self._set_row(row, lat, lon)
+
+    @staticmethod
+    def _id_and_text(parcel) -> Tuple[str, Optional[str]]:
+        if isinstance(parcel, dict):
+            return parcel["id"], parcel.get("gps_coordinates")
+        return parcel.id, parcel.gps_coordinates
+
+    def _set_row(self, row: int, lat: float, lon: float) -> None:
+        lat_r = math.radians(lat)
+        self._lat_rad[row] = lat_r
+        self._lon_rad[row] = math.radians(lon)
+        self._cos_lat[row] = math.cos(lat_r)
+
+    # --- Computation ---
+    def compute(self, center_ids: Optional[Iterable[str]] = None) -> None:
+        """
+        Fills the distance columns for `center_ids` (default: all centers)
+        chunk by chunk, then writes the CBD distance back to the parcels.
+        """
+        targets = list(self.center_locations) if center_ids is None else list(center_ids)
+        n = len(self.ids)
+        for center_id in targets:
+            c_lat, c_lon = self.center_locations[center_id]
+            column = array('d')
+            for start in range(0, n, self.chunk_size):
+                stop = min(start + self.chunk_size, n)
+                column.extend(_haversine_column(
+                    self._lat_rad, self._cos_lat, self._lon_rad, c_lat, c_lon, start, stop
+                ))
+            self.distances[center_id] = column
+        if self.cbd_center_id in targets:
+            self._write_back(range(n))
+
+    def update_parcels(self, parcels: Iterable) -> int:
+        """
+        Re-parses changed parcels and recomputes only their rows.
+        Returns the number of rows recomputed.
+        """
+        parcels = list(parcels)
+        self.load_parcels(parcels)
+        rows = sorted({
+            self._row_by_id[pid] for pid in (self._id_and_text(p)[0] for p in parcels)
+            if pid in self._row_by_id
+        })
+        for center_id, (c_lat, c_lon) in self.center_locations.items():
+            column = self.distances.get(center_id)
+            if column is None:
+                continue
+            for row in rows:
+                column[row] = _haversine_column(
+                    self._lat_rad, self._cos_lat, self._lon_rad, c_lat, c_lon, row, row + 1
+                )[0]
+        self._write_back(rows)
+        return len(rows)
+
+    def update_centers(self, center_locations: Dict[str, Tuple[float, float]]) -> List[str]:
+        """
+        Applies a new center layout. Only centers that were added or moved
+        are recomputed; removed centers are dropped. Returns recomputed ids.
+        """
+        changed = [
+            center_id for center_id, location in center_locations.items()
+            if self.center_locations.get(center_id) != tuple(location)
+            or center_id not in self.distances
+        ]
+        for center_id in set(self.center_locations) - set(center_locations):
+            self.distances.pop(center_id, None)
+        self.center_locations = {cid: tuple(loc) for cid, loc in center_locations.items()}
+        if changed:
+            self.compute(changed)
+        return changed
+
+    def _write_back(self, rows: Iterable[int]) -> None:
+        column = self.distances.get(self.cbd_center_id)
+        if column is None:
+            return
+        for row in rows:
+            parcel = self._parcels[row]
+            if isinstance(parcel, dict):
+                parcel["distance_from_cbd_km"] = column[row]
+            else:
+                parcel.distance_from_cbd_km = column[row]
+
+    # --- Engine Integration ---
+    def parcel_at(self, row: int):
+        """The parcel (object or dict) stored at `row`; rows follow `ids`."""
+        return self._parcels[row]
+
+    def distance_map(self, parcel_id: str) -> Dict[str, float]:
+        """Per-center distance map in the shape calculate_polycentric_density expects."""
+        row = self._row_by_id[parcel_id]
+        return {center_id: column[row] for center_id, column in self.distances.items()}
+
+    def polycentric_densities(self, centers_config: Dict[str, Dict[str, float]]) -> Dict[str, float]:
+        """
+        Evaluates D_x = Sum(D0_i * e^(-g_i * x_i)) for every parcel straight
+        from the distance columns (same formula as
+        BertaudAuditEngine.calculate_polycentric_density).
+        """
+        totals = [0.0] * len(self.ids)
+        exp = math.exp
+        for center_id, params in centers_config.items():
+            column = self.distances.get(center_id)
+            if column is None:
+                continue
+            d0_i = params.get('d0', 0)
+            g_i = params.get('g', 0)
+            totals = [t + d0_i * exp(-g_i * x) for t, x in zip(totals, column)]
+        return dict(zip(self.ids, totals))
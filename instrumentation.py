@@ -0,0 +1,286 @@
+"""
+Hot-Path Instrumentation
+Latency histograms and counters for the core audit calls, exported in
+Prometheus text format (to a file for the node_exporter textfile
+collector, or from a local /metrics endpoint).
+
+Disabled by default. While disabled, `@timed` adds one flag check per call
+and records nothing. Enable with `enable()` or BERTAUD_METRICS=1.
+
+Metrics:
+    bertaud_stage_duration_seconds{stage}     histogram
+    bertaud_stage_errors_total{stage}         counter
+    bertaud_cache_requests_total{cache,result} counter (result = hit | miss)
+
+Process pools: each worker process has its own REGISTRY. Pool tasks call
+`begin_pool_task()` first and return `end_pool_task()` with their result,
+and the parent folds that snapshot in with `merge_pool_metrics()`.
+AuditPipeline.run_batch, the bertaud_audit CLI and the process executor of
+AsyncAuditRunner do this.
+
+Author: BaanBid Development Team
+"""
+
+import bisect
+import functools
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+# --- Constants ---
+# 1 µs .. 10 s, roughly 1-2.5-5 per decade
+DEFAULT_BUCKETS: Tuple[float, ...] = tuple(
+    base * 10.0 ** exp for exp in range(-6, 1) for base in (1.0, 2.5, 5.0)
+) + (10.0,)
+
+_enabled = os.environ.get("BERTAUD_METRICS", "").lower() in ("1", "true", "yes")
+_lock = threading.Lock()
+
+
+def enable() -> None:
+    global _enabled
+    _enabled = True
+
+
+def disable() -> None:
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+# --- Metric Types ---
+class Histogram:
+    """Cumulative-bucket latency histogram (Prometheus semantics)."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts: List[int] = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other: "Histogram") -> "Histogram":
+        if self.buckets != other.buckets:
+            raise ValueError("Cannot merge histograms with different buckets")
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.sum += other.sum
+        self.count += other.count
+        return self
+
+    def quantile(self, q: float) -> float:
+        """Estimates a quantile by linear interpolation inside the bucket (like histogram_quantile)."""
+        if self.count == 0:
+            return float("nan")
+        rank = q * self.count
+        cumulative = 0
+        for i, n in enumerate(self.counts):
+            if cumulative + n >= rank and n > 0:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - cumulative) / n
+            cumulative += n
+        return self.buckets[-1]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.durations: Dict[str, Histogram] = {}
+        self.errors: Dict[str, int] = {}
+        self.cache: Dict[Tuple[str, str], int] = {}
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with _lock:
+            hist = self.durations.get(stage)
+            if hist is None:
+                hist = self.durations[stage] = Histogram()
+            hist.observe(seconds)
+
+    def count_error(self, stage: str) -> None:
+        with _lock:
+            self.errors[stage] = self.errors.get(stage, 0) + 1
+
+    def count_cache(self, cache: str, hit: bool) -> None:
+        key = (cache, "hit" if hit else "miss")
+        with _lock:
+            self.cache[key] = self.cache.get(key, 0) + 1
+
+    def reset(self) -> None:
+        with _lock:
+            self.durations.clear()
+            self.errors.clear()
+            self.cache.clear()
+
+    def drain(self) -> "MetricsRegistry":
+        """Moves everything recorded so far into a new (picklable) registry and resets this one."""
+        snapshot = MetricsRegistry()
+        with _lock:
+            snapshot.durations, self.durations = self.durations, {}
+            snapshot.errors, self.errors = self.errors, {}
+            snapshot.cache, self.cache = self.cache, {}
+        return snapshot
+
+    def merge(self, other: "MetricsRegistry") -> "MetricsRegistry":
+        """Adds another registry's histograms and counters (e.g. a pool worker's snapshot)."""
+        with _lock:
+            for stage, hist in other.durations.items():
+                mine = self.durations.get(stage)
+                if mine is None:
+                    mine = self.durations[stage] = Histogram(hist.buckets)
+                mine.merge(hist)
+            for stage, n in other.errors.items():
+                self.errors[stage] = self.errors.get(stage, 0) + n
+            for key, n in other.cache.items():
+                self.cache[key] = self.cache.get(key, 0) + n
+        return self
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """p50/p99/count per stage, for logs and quick checks."""
+        with _lock:
+            return {
+                stage: {"count": h.count, "p50_s": h.quantile(0.5), "p99_s": h.quantile(0.99)}
+                for stage, h in self.durations.items()
+            }
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = [
+            "# HELP bertaud_stage_duration_seconds Wall time of instrumented audit calls.",
+            "# TYPE bertaud_stage_duration_seconds histogram",
+        ]
+        with _lock:
+            for stage in sorted(self.durations):
+                hist = self.durations[stage]
+                cumulative = 0
+                for bound, n in zip(hist.buckets, hist.counts):
+                    cumulative += n
+                    lines.append(f'bertaud_stage_duration_seconds_bucket{{stage="{stage}",le="{bound:g}"}} {cumulative}')
+                lines.append(f'bertaud_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}} {hist.count}')
+                lines.append(f'bertaud_stage_duration_seconds_sum{{stage="{stage}"}} {hist.sum:.9g}')
+                lines.append(f'bertaud_stage_duration_seconds_count{{stage="{stage}"}} {hist.count}')
+
+            lines.append("# HELP bertaud_stage_errors_total Exceptions raised by instrumented audit calls.")
+            lines.append("# TYPE bertaud_stage_errors_total counter")
+            for stage in sorted(self.errors):
+                lines.append(f'bertaud_stage_errors_total{{stage="{stage}"}} {self.errors[stage]}')
+
+            lines.append("# HELP bertaud_cache_requests_total Stage cache lookups by result.")
+            lines.append("# TYPE bertaud_cache_requests_total counter")
+            for (cache, result) in sorted(self.cache):
+                lines.append(f'bertaud_cache_requests_total{{cache="{cache}",result="{result}"}} {self.cache[(cache, result)]}')
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+# --- Hooks ---
+def timed(stage: str) -> Callable:
+    """Decorator recording call latency (and exceptions) under `stage`."""
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                REGISTRY.count_error(stage)
+                raise
+            finally:
+                REGISTRY.observe(stage, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def count_cache(cache: str, hit: bool) -> None:
+    if _enabled:
+        REGISTRY.count_cache(cache, hit)
+
+
+def count_error(stage: str) -> None:
+    if _enabled:
+        REGISTRY.count_error(stage)
+
+
+# --- Process Pools ---
+def begin_pool_task(enabled: bool) -> None:
+    """
+    Starts a task in a pool worker. Mirrors the parent's enabled flag
+    (enable() does not reach spawned workers) and drops anything recorded
+    earlier, including metrics a forked worker inherited from the parent.
+    Only call this in a separate process: it resets REGISTRY.
+    """
+    global _enabled
+    _enabled = enabled
+    REGISTRY.reset()
+
+
+def end_pool_task() -> Optional[MetricsRegistry]:
+    """This task's metrics for the parent's merge_pool_metrics() (None while disabled)."""
+    return REGISTRY.drain() if _enabled else None
+
+
+def merge_pool_metrics(snapshot: Optional[MetricsRegistry]) -> None:
+    if snapshot is not None:
+        REGISTRY.merge(snapshot)
+
+
+# --- Exposition ---
+def write_prometheus(path: str) -> None:
+    """Atomically writes the current metrics to `path` (textfile collector friendly)."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(REGISTRY.render_prometheus())
+    os.replace(tmp_path, path)
+
+
+def start_metrics_server(port: int = 9464, host: str = "127.0.0.1"):
+    """
+    Serves GET /metrics from a daemon thread. Returns the server; call
+    `shutdown()` on it to stop.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class _MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = REGISTRY.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name="bertaud-metrics", daemon=True)
+    thread.start()
+    return server
+
+
+def start_periodic_file_export(path: str, interval_s: float = 15.0) -> threading.Event:
+    """Rewrites `path` every `interval_s` seconds; set the returned event to stop."""
+    stop = threading.Event()
+
+    def loop():
+        while not stop.wait(interval_s):
+            write_prometheus(path)
+        write_prometheus(path)
+
+    threading.Thread(target=loop, name="bertaud-metrics-file", daemon=True).start()
+    return stop
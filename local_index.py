@@ -0,0 +1,406 @@
+"""
+In-Memory Composite Indexes (Local Firestore Stand-In)
+Reads the composite indexes declared in firestore.indexes.json and keeps
+each one as a sorted key list over an in-memory collection, so offline
+analytics answer equality-plus-range queries and ordered pagination the
+way production Firestore does, in logarithmic time instead of list scans.
+
+Key layout per index entry:
+    (field_1, field_2, ..., document_id)
+with every value encoded by Firestore's cross-type ordering
+(null < bool < number < string) and DESCENDING fields inverted.
+
+Single-field ascending indexes are created on first use, mirroring
+Firestore's automatic single-field indexing. Unfiltered, unordered queries
+return documents in document-ID order, like Firestore's default
+`__name__` ordering.
+
+Author: BaanBid Development Team
+"""
+
+import bisect
+import json
+import os
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+# --- Constants ---
+DEFAULT_INDEX_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "firestore.indexes.json")
+ASCENDING = "ASCENDING"
+DESCENDING = "DESCENDING"
+_CHUNK_SIZE = 1024  # Entries per chunk of a sorted key list
+DELETED_CURSOR_LIMIT = 10_000  # Deleted documents remembered as pagination cursors
+
+
+class MissingIndexError(Exception):
+    """Raised when no declared index can serve a query (Firestore FAILED_PRECONDITION)."""
+
+
+# --- Key Encoding ---
+class _Max:
+    """Sorts after every other key component."""
+    __slots__ = ()
+
+    def __lt__(self, other):
+        return False
+
+    def __gt__(self, other):
+        return other is not self
+
+    def __le__(self, other):
+        return other is self
+
+    def __ge__(self, other):
+        return True
+
+    def __eq__(self, other):
+        return other is self
+
+    def __hash__(self):
+        return id(self)
+
+
+MAX = _Max()
+
+
+class _Desc:
+    """Inverts the ordering of a wrapped key component."""
+    __slots__ = ("inner",)
+
+    def __init__(self, inner):
+        self.inner = inner
+
+    def __lt__(self, other):
+        if isinstance(other, _Desc):
+            return other.inner < self.inner
+        return NotImplemented
+
+    def __gt__(self, other):
+        if isinstance(other, _Desc):
+            return self.inner < other.inner
+        return NotImplemented
+
+    def __eq__(self, other):
+        return isinstance(other, _Desc) and self.inner == other.inner
+
+    def __hash__(self):
+        return hash(self.inner)
+
+
+def _type_rank(value) -> int:
+    if value is None:
+        return 0
+    if isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float)):
+        return 2
+    return 3
+
+
+def encode_value(value, order: str = ASCENDING):
+    """Encodes a field value by Firestore type ordering."""
+    key = (0,) if value is None else (_type_rank(value), value)
+    return _Desc(key) if order == DESCENDING else key
+
+
+def _get_field(doc, path: str, default=None):
+    node = doc
+    for part in path.split("."):
+        if isinstance(node, dict):
+            if part not in node:
+                return default
+            node = node[part]
+        else:
+            if not hasattr(node, part):
+                return default
+            node = getattr(node, part)
+    return node
+
+
+_MISSING = object()
+
+
+# --- Sorted Key List ---
+class _SortedKeyList:
+    """
+    Sorted list split into bounded chunks: O(log n) search, inserts and
+    deletes move at most one chunk instead of the whole list.
+    """
+
+    def __init__(self):
+        self._chunks: List[List[tuple]] = []
+        self._maxes: List[tuple] = []
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def add(self, key: tuple) -> None:
+        if not self._chunks:
+            self._chunks.append([key])
+            self._maxes.append(key)
+        else:
+            pos = bisect.bisect_left(self._maxes, key)
+            if pos == len(self._maxes):
+                pos -= 1
+                self._chunks[pos].append(key)
+                self._maxes[pos] = key
+            else:
+                bisect.insort(self._chunks[pos], key)
+            chunk = self._chunks[pos]
+            if len(chunk) > 2 * _CHUNK_SIZE:
+                self._chunks[pos:pos + 1] = [chunk[:_CHUNK_SIZE], chunk[_CHUNK_SIZE:]]
+                self._maxes[pos:pos + 1] = [chunk[_CHUNK_SIZE - 1], chunk[-1]]
+        self._len += 1
+
+    def remove(self, key: tuple) -> None:
+        pos = bisect.bisect_left(self._maxes, key)
+        if pos == len(self._maxes):
+            raise KeyError(key)
+        chunk = self._chunks[pos]
+        i = bisect.bisect_left(chunk, key)
+        if i == len(chunk) or chunk[i] != key:
+            raise KeyError(key)
+        del chunk[i]
+        self._len -= 1
+        if not chunk:
+            del self._chunks[pos]
+            del self._maxes[pos]
+        else:
+            self._maxes[pos] = chunk[-1]
+
+    def irange(self, lower: tuple, upper: tuple, lower_inclusive: bool = True) -> Iterator[tuple]:
+        """Yields keys k with lower <= k < upper (lower < k if not inclusive)."""
+        if not self._chunks:
+            return
+        pos = bisect.bisect_left(self._maxes, lower)
+        if pos == len(self._chunks):
+            return
+        chunk = self._chunks[pos]
+        i = (bisect.bisect_left if lower_inclusive else bisect.bisect_right)(chunk, lower)
+        while pos < len(self._chunks):
+            chunk = self._chunks[pos]
+            for key in chunk[i:]:
+                if not key < upper:
+                    return
+                yield key
+            pos += 1
+            i = 0
+
+
+# --- Index ---
+class CompositeIndex:
+    """One sorted index over a collection for the given (field, order) list."""
+
+    def __init__(self, collection: str, fields: List[Tuple[str, str]]):
+        self.collection = collection
+        self.fields = fields
+        self.field_paths = [path for path, _ in fields]
+        self._keys = _SortedKeyList()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def key_for(self, doc_id: str, doc) -> Optional[tuple]:
+        """Index key of a document, or None if a field is missing (not indexed)."""
+        parts = []
+        for path, order in self.fields:
+            value = _get_field(doc, path, _MISSING)
+            if value is _MISSING:
+                return None
+            parts.append(encode_value(value, order))
+        parts.append(doc_id)
+        return tuple(parts)
+
+    def add(self, key: Optional[tuple]) -> None:
+        if key is not None:
+            self._keys.add(key)
+
+    def remove(self, key: Optional[tuple]) -> None:
+        if key is not None:
+            self._keys.remove(key)
+
+    def scan(self, lower: tuple, upper: tuple, lower_inclusive: bool = True) -> Iterator[str]:
+        for key in self._keys.irange(lower, upper, lower_inclusive):
+            yield key[-1]
+
+
+# --- Collection ---
+class IndexedCollection:
+    """
+    In-memory collection of documents (dicts or dataclasses) with its
+    composite indexes maintained incrementally on every put/delete.
+    """
+
+    def __init__(self, name: str, index_fields: Iterable[List[Tuple[str, str]]] = ()):
+        self.name = name
+        self.docs: Dict[str, Any] = {}
+        self.indexes: List[CompositeIndex] = [CompositeIndex(name, list(f)) for f in index_fields]
+        self._keys: Dict[str, List[Optional[tuple]]] = {}
+        # Recently deleted documents, so a page cursor on one still resolves
+        self._deleted: "OrderedDict[str, Any]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def put(self, doc_id: str, doc) -> None:
+        """Inserts or replaces a document and updates every index."""
+        if doc_id in self.docs:
+            self.delete(doc_id)
+        keys = [index.key_for(doc_id, doc) for index in self.indexes]
+        for index, key in zip(self.indexes, keys):
+            index.add(key)
+        self.docs[doc_id] = doc
+        self._keys[doc_id] = keys
+        self._deleted.pop(doc_id, None)
+
+    def put_many(self, docs: Iterable) -> None:
+        """Inserts documents keyed by their `id` field."""
+        for doc in docs:
+            self.put(_get_field(doc, "id"), doc)
+
+    def delete(self, doc_id: str) -> bool:
+        if doc_id not in self.docs:
+            return False
+        for index, key in zip(self.indexes, self._keys.pop(doc_id)):
+            index.remove(key)
+        self._deleted[doc_id] = self.docs.pop(doc_id)
+        if len(self._deleted) > DELETED_CURSOR_LIMIT:
+            self._deleted.popitem(last=False)
+        return True
+
+    def _add_index(self, fields: List[Tuple[str, str]]) -> CompositeIndex:
+        index = CompositeIndex(self.name, fields)
+        self.indexes.append(index)
+        for doc_id, doc in self.docs.items():
+            key = index.key_for(doc_id, doc)
+            index.add(key)
+            self._keys[doc_id].append(key)
+        return index
+
+    def _find_index(self, equals: Dict[str, Any], order_field: Optional[str]) -> CompositeIndex:
+        n_eq = len(equals)
+        if n_eq == 0:
+            # No filters: the single-field index on the order field, or
+            # document-ID order (an index with no fields) when unordered
+            fields = [(order_field, ASCENDING)] if order_field is not None else []
+            for index in self.indexes:
+                if index.field_paths == [path for path, _ in fields]:
+                    return index
+            return self._add_index(fields)
+        for index in self.indexes:
+            paths = index.field_paths
+            if set(paths[:n_eq]) != set(equals):
+                continue
+            if order_field is None or (len(paths) > n_eq and paths[n_eq] == order_field):
+                return index
+        if n_eq == 1 and order_field is None:
+            # Automatic single-field index
+            return self._add_index([(next(iter(equals)), ASCENDING)])
+        requested = [f"{path} ==" for path in sorted(equals)]
+        if order_field is not None:
+            requested.append(f"{order_field} (order)")
+        raise MissingIndexError(
+            f"The query requires an index on '{self.name}' with fields [{', '.join(requested)}]. "
+            f"Add it to firestore.indexes.json."
+        )
+
+    def _cursor_key(self, index: CompositeIndex, doc_id: str) -> Optional[tuple]:
+        """Index key of a cursor document: stored for live documents, rebuilt for deleted ones."""
+        if doc_id in self.docs:
+            return self._keys[doc_id][self.indexes.index(index)]
+        if doc_id in self._deleted:
+            return index.key_for(doc_id, self._deleted[doc_id])
+        raise KeyError(f"Unknown start_after document '{doc_id}' in '{self.name}'")
+
+    def query(
+        self,
+        equals: Optional[Dict[str, Any]] = None,
+        range_field: Optional[str] = None,
+        lower: Any = None,
+        upper: Any = None,
+        lower_inclusive: bool = True,
+        upper_inclusive: bool = True,
+        limit: Optional[int] = None,
+        start_after: Optional[str] = None,
+        order_by: Optional[str] = None
+    ) -> List[Any]:
+        """
+        Equality filters on a prefix of an index, an optional range on the
+        next field (which also defines the result order, using that field's
+        declared direction), and cursor pagination via `start_after`
+        (the last document ID of the previous page, which may since have
+        been deleted). Without a range, `order_by` picks the ordering field;
+        without either, results come in document-ID order.
+        """
+        equals = equals or {}
+        if range_field is not None and order_by not in (None, range_field):
+            raise ValueError(f"order_by '{order_by}' must be the range field '{range_field}'")
+        index = self._find_index(equals, range_field or order_by)
+        n_eq = len(equals)
+        prefix = tuple(
+            encode_value(equals[path], order) for path, order in index.fields[:n_eq]
+        )
+
+        lower_key: tuple = prefix
+        upper_key: tuple = prefix + (MAX,)
+        lower_incl = True
+        if range_field is not None and (lower is not None or upper is not None):
+            order = index.fields[n_eq][1]
+            # Range comparisons only match values of the bound's type (Firestore semantics)
+            rank = _type_rank(lower if lower is not None else upper)
+            lo = (rank,) if lower is None else encode_value(lower)
+            hi = (rank, MAX) if upper is None else encode_value(upper)
+            lo_incl = lower_inclusive or lower is None
+            hi_incl = upper_inclusive or upper is None
+            if order == DESCENDING:
+                lo, hi = _Desc(hi), _Desc(lo)
+                lo_incl, hi_incl = hi_incl, lo_incl
+            lower_key = prefix + (lo,) if lo_incl else prefix + (lo, MAX)
+            upper_key = prefix + (hi, MAX) if hi_incl else prefix + (hi,)
+
+        if start_after is not None:
+            cursor_key = self._cursor_key(index, start_after)
+            if cursor_key is not None and cursor_key >= lower_key:
+                lower_key, lower_incl = cursor_key, False
+
+        results = []
+        for doc_id in index.scan(lower_key, upper_key, lower_incl):
+            results.append(self.docs[doc_id])
+            if limit is not None and len(results) >= limit:
+                break
+        return results
+
+
+# --- Engine ---
+class LocalIndexEngine:
+    """
+    Collections keyed by name, with indexes loaded from firestore.indexes.json.
+
+    Example:
+        >>> engine = LocalIndexEngine.from_index_file()
+        >>> engine.collection("project_proposals").put_many(proposals)
+        >>> engine.collection("project_proposals").query(
+        ...     equals={"audit_status": "Approved"}, range_field="efficiency_score",
+        ...     lower=0.8, upper=1.2, limit=50)
+    """
+
+    def __init__(self, index_definitions: Optional[Dict] = None):
+        self._definitions: Dict[str, List[List[Tuple[str, str]]]] = {}
+        for entry in (index_definitions or {}).get("indexes", []):
+            fields = [(f["fieldPath"], f.get("order", ASCENDING)) for f in entry["fields"]]
+            self._definitions.setdefault(entry["collectionGroup"], []).append(fields)
+        self._collections: Dict[str, IndexedCollection] = {}
+
+    @classmethod
+    def from_index_file(cls, path: str = DEFAULT_INDEX_FILE) -> "LocalIndexEngine":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def collection(self, name: str) -> IndexedCollection:
+        coll = self._collections.get(name)
+        if coll is None:
+            coll = IndexedCollection(name, self._definitions.get(name, []))
+            self._collections[name] = coll
+        return coll
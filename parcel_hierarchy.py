@@ -0,0 +1,577 @@
+"""
+Subdivision Hierarchy Index
+Rolls parcel measures up the subdivision trees defined by
+`LandParcel.parent_parcel_id`. For any parcel (typically a root) it gives
+the total land area, land-weighted current FAR, legal FAR headroom and
+audit status counts of its current parcels.
+
+A parcel counts only while it has no children: once subdivided, it is a
+historical record and its land is carried by its children. Merging the
+children back makes it count again.
+
+Index layout:
+    - Parent array plus children in CSR form (child_start / child_rows,
+      built with one counting sort).
+    - Euler-tour (pre-order) positions tin / tout, so the subtree of v
+      is the position range [tin[v], tout[v]).
+    - Per-measure prefix sums over positions: O(1) subtree queries on a
+      freshly built index.
+    - Per-measure Fenwick trees: O(log n) point updates and queries after
+      incremental changes.
+
+Incremental changes (subdivide / merge / update_parcel) do not re-layout
+the tour. A parcel added after the last build is "hosted" on the Euler
+slot of its nearest indexed ancestor, which keeps every indexed subtree
+range correct. New roots get new slots appended at the end. Rollups of
+the (small) un-indexed subtrees walk them directly. The index is rebuilt
+once un-indexed parcels exceed `rebuild_fraction` of the total.
+
+Parent links are checked for cycles while building. HierarchyCycleError
+lists every cycle found, or with `break_cycles=True` the smallest id in
+each cycle is detached as a root and reported.
+
+Author: BaanBid Development Team
+"""
+
+import math
+from array import array
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from density_projection import STATUSES, status_code
+
+
+# --- Constants ---
+SQM_PER_RAI = 1600.0
+DEFAULT_REBUILD_FRACTION = 0.05
+UNKNOWN_STATUS = -1
+NO_PARENT = -1
+MEASURES = ("parcels", "land", "floor", "headroom") + tuple(f"status:{s}" for s in STATUSES)
+_STATUS_BASE = 4  # Index of the first status measure
+
+
+class HierarchyCycleError(Exception):
+    """Raised when parent_parcel_id links form a cycle."""
+
+    def __init__(self, cycles: List[List[str]]):
+        self.cycles = cycles
+        shown = "; ".join(" -> ".join(c + [c[0]]) for c in cycles[:5])
+        more = f" (+{len(cycles) - 5} more)" if len(cycles) > 5 else ""
+        super().__init__(f"{len(cycles)} parent_parcel_id cycle(s): {shown}{more}")
+
+
+@dataclass
+class SubtreeRollup:
+    """ผลรวมของแปลงย่อยทั้งหมดภายใต้แปลงแม่ (Subdivision Rollup)"""
+    parcel_id: str
+    parcels: int                    # Current (undivided) parcels in the subtree
+    land_area_sqm: float
+    floor_area_sqm: float           # Sum of current_far * land area
+    far_headroom_sqm: float         # Sum of (legal_far_limit - current_far) * land area; < 0 if over-built
+    status_counts: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def land_area_rai(self) -> float:
+        return self.land_area_sqm / SQM_PER_RAI
+
+    @property
+    def weighted_far(self) -> float:
+        """Land-weighted current FAR of the subtree."""
+        return self.floor_area_sqm / self.land_area_sqm if self.land_area_sqm > 0 else 0.0
+
+    @property
+    def unknown_status(self) -> int:
+        return self.parcels - sum(self.status_counts.values())
+
+    def to_dict(self) -> dict:
+        return {
+            "parcelId": self.parcel_id,
+            "parcels": self.parcels,
+            "landAreaSqm": self.land_area_sqm,
+            "landAreaRai": self.land_area_rai,
+            "floorAreaSqm": self.floor_area_sqm,
+            "weightedFar": self.weighted_far,
+            "farHeadroomSqm": self.far_headroom_sqm,
+            "statusCounts": self.status_counts,
+            "unknownStatus": self.unknown_status,
+        }
+
+
+# --- Fenwick Tree ---
+class FenwickTree:
+    """Prefix sums with O(log n) point updates; supports appending slots."""
+
+    def __init__(self, values: Sequence[float] = ()):
+        tree = [0.0]
+        tree.extend(values)
+        n = len(tree) - 1
+        for i in range(1, n + 1):
+            j = i + (i & -i)
+            if j <= n:
+                tree[j] += tree[i]
+        self._tree = tree
+
+    def __len__(self) -> int:
+        return len(self._tree) - 1
+
+    def add(self, position: int, delta: float) -> None:
+        tree = self._tree
+        i = position + 1
+        n = len(tree)
+        while i < n:
+            tree[i] += delta
+            i += i & -i
+
+    def prefix(self, stop: int) -> float:
+        """Sum of positions [0, stop)."""
+        tree = self._tree
+        total = 0.0
+        i = stop
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+    def range_sum(self, start: int, stop: int) -> float:
+        return self.prefix(stop) - self.prefix(start)
+
+    def append(self, value: float = 0.0) -> None:
+        i = len(self._tree)
+        # Node i covers (i - lowbit(i), i]: the new value plus earlier positions it spans
+        self._tree.append(value + self.prefix(i - 1) - self.prefix(i - (i & -i)))
+
+
+def _parcel_fields(parcel) -> Tuple[str, Optional[str], Dict]:
+    get = parcel.get if isinstance(parcel, dict) else lambda name, default=None: getattr(parcel, name, default)
+    return get("id"), get("parent_parcel_id") or None, {
+        "land_area_rai": get("land_area_rai") or 0.0,
+        "current_far": get("current_far") or 0.0,
+        "legal_far_limit": get("legal_far_limit") or 0.0,
+        "distance_from_cbd_km": get("distance_from_cbd_km"),
+        "zone_color": get("zone_color"),
+    }
+
+
+# --- Hierarchy Index ---
+class ParcelHierarchy:
+    """
+    Subtree rollups over parent_parcel_id trees.
+
+    Args:
+        d0, g: When given, each parcel's audit status is classified from
+            current_far against D0 * e^(-g * distance_from_cbd_km) with
+            the bands of BertaudAuditEngine.classify_status.
+        statuses: { parcel_id: status } from earlier audits (e.g. the
+            densityStatus of bertaud_audit rows); takes precedence over d0/g.
+        break_cycles: Detach one parcel per cycle instead of raising.
+        rebuild_fraction: Re-layout the tour once parcels added since the
+            last build exceed this fraction of all parcels.
+    """
+
+    def __init__(
+        self,
+        d0: Optional[float] = None,
+        g: Optional[float] = None,
+        statuses: Optional[Dict[str, str]] = None,
+        break_cycles: bool = False,
+        rebuild_fraction: float = DEFAULT_REBUILD_FRACTION
+    ):
+        self.d0 = d0
+        self.g = g
+        self.statuses = dict(statuses or {})
+        self.break_cycles = break_cycles
+        self.rebuild_fraction = rebuild_fraction
+
+        self.ids: List[str] = []
+        self._row_by_id: Dict[str, int] = {}
+        self.parent = array('l')
+        self.alive = bytearray()
+        self.child_count = array('l')          # Alive children per row
+        self._own = [array('d') for _ in MEASURES[1:4]]  # land, floor, headroom per row
+        self._status = array('b')
+
+        self.orphans: List[str] = []           # parent_parcel_id not found; treated as roots
+        self.broken_cycles: List[List[str]] = []
+
+        # Layout (rebuilt by build())
+        self.child_start = array('l')
+        self.child_rows = array('l')
+        self._extra_children: Dict[int, List[int]] = {}
+        self.tin = array('l')
+        self.tout = array('l')
+        self.order = array('l')                # Row at each Euler position
+        self._prefix: Optional[List[List[float]]] = None
+        self._fenwick: List[FenwickTree] = []
+        self._unindexed = 0
+
+    # --- Construction ---
+    @classmethod
+    def from_parcels(cls, parcels: Iterable, **options) -> "ParcelHierarchy":
+        """Index LandParcel objects or dicts (id, parent_parcel_id, land_area_rai, current_far, ...)."""
+        hierarchy = cls(**options)
+        pending_parents = []
+        for parcel in parcels:
+            parcel_id, parent_id, values = _parcel_fields(parcel)
+            if parcel_id in hierarchy._row_by_id:
+                raise ValueError(f"Duplicate parcel id: {parcel_id}")
+            hierarchy._append_row(parcel_id, values)
+            pending_parents.append(parent_id)
+        row_by_id = hierarchy._row_by_id
+        for row, parent_id in enumerate(pending_parents):
+            if parent_id is None:
+                continue
+            parent_row = row_by_id.get(parent_id)
+            if parent_row is None:
+                hierarchy.orphans.append(hierarchy.ids[row])
+            else:
+                hierarchy.parent[row] = parent_row
+        hierarchy._check_cycles()
+        hierarchy.build()
+        return hierarchy
+
+    def _classify(self, parcel_id: str, values: Dict) -> int:
+        status = self.statuses.get(parcel_id)
+        if status is not None:
+            return STATUSES.index(status) if status in STATUSES else UNKNOWN_STATUS
+        distance = values["distance_from_cbd_km"]
+        if self.d0 is None or self.g is None or distance is None:
+            return UNKNOWN_STATUS
+        optimal = self.d0 * math.exp(-self.g * distance)
+        if optimal <= 0:
+            return UNKNOWN_STATUS
+        yellow = "yellow" in (values["zone_color"] or "").lower()
+        return status_code(values["current_far"] / optimal, yellow)
+
+    def _append_row(self, parcel_id: str, values: Dict) -> int:
+        row = len(self.ids)
+        self.ids.append(parcel_id)
+        self._row_by_id[parcel_id] = row
+        self.parent.append(NO_PARENT)
+        self.alive.append(1)
+        self.child_count.append(0)
+        land = values["land_area_rai"] * SQM_PER_RAI
+        self._own[0].append(land)
+        self._own[1].append(values["current_far"] * land)
+        self._own[2].append((values["legal_far_limit"] - values["current_far"]) * land)
+        self._status.append(self._classify(parcel_id, values))
+        self.tin.append(-1)
+        self.tout.append(-1)
+        return row
+
+    def _check_cycles(self) -> None:
+        """Colors each parent chain once; a chain that meets itself is a cycle."""
+        parent = self.parent
+        state = bytearray(len(self.ids))  # 0 new, 1 on the current chain, 2 done
+        cycles: List[List[int]] = []
+        for start in range(len(self.ids)):
+            if state[start]:
+                continue
+            chain = []
+            row = start
+            while row != NO_PARENT and not state[row]:
+                state[row] = 1
+                chain.append(row)
+                row = parent[row]
+            if row != NO_PARENT and state[row] == 1:
+                cycles.append(chain[chain.index(row):])
+            for r in chain:
+                state[r] = 2
+        if not cycles:
+            return
+        named = [[self.ids[r] for r in cycle] for cycle in cycles]
+        if not self.break_cycles:
+            raise HierarchyCycleError(named)
+        for cycle, names in zip(cycles, named):
+            parent[min(cycle, key=self.ids.__getitem__)] = NO_PARENT
+            self.broken_cycles.append(names)
+
+    def build(self) -> None:
+        """(Re)builds adjacency, Euler tour, prefix sums and Fenwick trees; drops merged-away rows."""
+        if not all(self.alive):
+            self._compact()
+        n = len(self.ids)
+        parent = self.parent
+
+        # Children CSR by counting sort on parent
+        counts = array('l', [0] * (n + 1))
+        for p in parent:
+            if p != NO_PARENT:
+                counts[p + 1] += 1
+        for i in range(n):
+            counts[i + 1] += counts[i]
+        self.child_start = array('l', counts)
+        fill = array('l', counts)
+        child_rows = array('l', [0] * counts[n])
+        for row, p in enumerate(parent):
+            if p != NO_PARENT:
+                child_rows[fill[p]] = row
+                fill[p] += 1
+        self.child_rows = child_rows
+        self._extra_children = {}
+        self.child_count = array('l', (counts[i + 1] - counts[i] for i in range(n)))
+
+        # Pre-order tour from every root (iterative)
+        tin = array('l', [-1] * n)
+        order = array('l')
+        start = self.child_start
+        for root in range(n):
+            if parent[root] != NO_PARENT:
+                continue
+            stack = [root]
+            while stack:
+                row = stack.pop()
+                tin[row] = len(order)
+                order.append(row)
+                stack.extend(reversed(child_rows[start[row]:start[row + 1]]))
+        size = array('l', [1] * n)
+        for row in reversed(order):
+            if parent[row] != NO_PARENT:
+                size[parent[row]] += size[row]
+        self.tin = tin
+        self.tout = array('l', (t + s for t, s in zip(tin, size)))
+        self.order = order
+
+        # Contributions per position
+        columns = [[0.0] * n for _ in MEASURES]
+        for pos, row in enumerate(order):
+            if self.child_count[row] == 0:
+                for m, value in enumerate(self._contribution(row)):
+                    columns[m][pos] = value
+        self._prefix = []
+        for column in columns:
+            prefix = [0.0]
+            total = 0.0
+            for value in column:
+                total += value
+                prefix.append(total)
+            self._prefix.append(prefix)
+        self._fenwick = [FenwickTree(column) for column in columns]
+        self._unindexed = 0
+
+    def _compact(self) -> None:
+        keep = [row for row in range(len(self.ids)) if self.alive[row]]
+        new_row = {old: new for new, old in enumerate(keep)}
+        self.ids = [self.ids[r] for r in keep]
+        self._row_by_id = {pid: r for r, pid in enumerate(self.ids)}
+        self.parent = array('l', (new_row.get(self.parent[r], NO_PARENT) for r in keep))
+        self.alive = bytearray(b"\x01" * len(keep))
+        self._own = [array('d', (column[r] for r in keep)) for column in self._own]
+        self._status = array('b', (self._status[r] for r in keep))
+
+    # --- Contributions ---
+    def _contribution(self, row: int) -> List[float]:
+        """Measure vector of a row if it were a current parcel."""
+        values = [1.0, self._own[0][row], self._own[1][row], self._own[2][row]] + [0.0] * len(STATUSES)
+        if self._status[row] != UNKNOWN_STATUS:
+            values[_STATUS_BASE + self._status[row]] = 1.0
+        return values
+
+    def _slot(self, row: int) -> int:
+        """Euler position carrying the row's values: its own, or its nearest indexed ancestor's."""
+        while self.tin[row] < 0:
+            row = self.parent[row]
+        return self.tin[row]
+
+    def _apply(self, row: int, sign: float) -> None:
+        slot = self._slot(row)
+        for tree, value in zip(self._fenwick, self._contribution(row)):
+            if value:
+                tree.add(slot, sign * value)
+        self._prefix = None  # Prefix sums are stale until the next build
+
+    def _is_current(self, row: int) -> bool:
+        return bool(self.alive[row]) and self.child_count[row] == 0
+
+    # --- Queries ---
+    def __len__(self) -> int:
+        return sum(self.alive)
+
+    def __contains__(self, parcel_id: str) -> bool:
+        row = self._row_by_id.get(parcel_id)
+        return row is not None and bool(self.alive[row])
+
+    def _row(self, parcel_id: str) -> int:
+        row = self._row_by_id.get(parcel_id)
+        if row is None or not self.alive[row]:
+            raise KeyError(f"Parcel not in hierarchy: {parcel_id}")
+        return row
+
+    def children_of(self, parcel_id: str) -> List[str]:
+        row = self._row(parcel_id)
+        rows = list(self.child_rows[self.child_start[row]:self.child_start[row + 1]]) if row + 1 < len(self.child_start) else []
+        rows.extend(self._extra_children.get(row, ()))
+        return [self.ids[r] for r in rows if self.alive[r]]
+
+    def parent_of(self, parcel_id: str) -> Optional[str]:
+        p = self.parent[self._row(parcel_id)]
+        return None if p == NO_PARENT else self.ids[p]
+
+    def root_of(self, parcel_id: str) -> str:
+        row = self._row(parcel_id)
+        while self.parent[row] != NO_PARENT:
+            row = self.parent[row]
+        return self.ids[row]
+
+    def roots(self) -> List[str]:
+        return [pid for row, pid in enumerate(self.ids) if self.alive[row] and self.parent[row] == NO_PARENT]
+
+    def _sums(self, row: int) -> List[float]:
+        if self.tin[row] >= 0:
+            start, stop = self.tin[row], self.tout[row]
+            if self._prefix is not None:
+                return [prefix[stop] - prefix[start] for prefix in self._prefix]
+            return [tree.range_sum(start, stop) for tree in self._fenwick]
+        # Added since the last build: walk the (small) new subtree
+        totals = [0.0] * len(MEASURES)
+        stack = [row]
+        while stack:
+            r = stack.pop()
+            if self._is_current(r):
+                totals = [a + b for a, b in zip(totals, self._contribution(r))]
+            stack.extend(c for c in self._extra_children.get(r, ()) if self.alive[c])
+        return totals
+
+    def rollup(self, parcel_id: str) -> SubtreeRollup:
+        """Aggregates over the current parcels under `parcel_id` (itself included)."""
+        sums = self._sums(self._row(parcel_id))
+        return SubtreeRollup(
+            parcel_id=parcel_id,
+            parcels=int(round(sums[0])),
+            land_area_sqm=sums[1],
+            floor_area_sqm=sums[2],
+            far_headroom_sqm=sums[3],
+            status_counts={s: int(round(c)) for s, c in zip(STATUSES, sums[_STATUS_BASE:])},
+        )
+
+    def root_rollups(self) -> Iterator[SubtreeRollup]:
+        """Rollup of every root parcel."""
+        for parcel_id in self.roots():
+            yield self.rollup(parcel_id)
+
+    # --- Incremental Changes ---
+    def _attach(self, parcel, parent_row: int) -> int:
+        parcel_id, _, values = _parcel_fields(parcel)
+        if parcel_id in self._row_by_id:
+            raise ValueError(f"Parcel id already exists: {parcel_id}")
+        row = self._append_row(parcel_id, values)
+        self.parent[row] = parent_row
+        if parent_row == NO_PARENT:
+            # New root: give it a slot at the end of the tour
+            self.tin[row] = len(self.order)
+            self.tout[row] = self.tin[row] + 1
+            self.order.append(row)
+            for tree in self._fenwick:
+                tree.append()
+        else:
+            self._extra_children.setdefault(parent_row, []).append(row)
+            self.child_count[parent_row] += 1
+            self._unindexed += 1
+        self._apply(row, 1.0)
+        return row
+
+    def _maybe_rebuild(self) -> None:
+        if self._unindexed > self.rebuild_fraction * max(1, len(self.ids)):
+            self.build()
+
+    def subdivide(self, parent_id: str, children: Iterable) -> List[str]:
+        """
+        Splits a current parcel into `children` (LandParcel objects or
+        dicts). The parent stops counting; its children carry the land.
+        """
+        parent_row = self._row(parent_id)
+        children = list(children)
+        if not children:
+            raise ValueError("subdivide needs at least one child parcel")
+        for child in children:
+            child_id, declared, _ = _parcel_fields(child)
+            if declared not in (None, parent_id):
+                raise ValueError(f"Child {child_id} declares parent {declared}, not {parent_id}")
+        if self._is_current(parent_row):
+            self._apply(parent_row, -1.0)
+        added = [self.ids[self._attach(child, parent_row)] for child in children]
+        self._maybe_rebuild()
+        return added
+
+    def merge(self, parcel_ids: Sequence[str], merged=None) -> Optional[str]:
+        """
+        Merges current sibling parcels. With `merged` (a parcel), it
+        replaces them under their common parent (or as a new root). With
+        no `merged`, they must be all of their parent's children, and the
+        parent becomes a current parcel again.
+        """
+        rows = [self._row(pid) for pid in parcel_ids]
+        if not rows:
+            raise ValueError("merge needs at least one parcel")
+        if len(set(rows)) != len(rows):
+            raise ValueError("merge got the same parcel twice")
+        parents = {self.parent[r] for r in rows}
+        if len(parents) != 1:
+            raise ValueError("Only sibling parcels (same parent_parcel_id) can be merged")
+        not_current = [self.ids[r] for r in rows if not self._is_current(r)]
+        if not_current:
+            raise ValueError(f"Parcels with children cannot be merged: {', '.join(not_current)}")
+        parent_row = parents.pop()
+        if merged is None:
+            if parent_row == NO_PARENT:
+                raise ValueError("Root parcels can only be merged into a new merged parcel")
+            if self.child_count[parent_row] != len(rows):
+                raise ValueError("merge without a merged parcel must cover all children of the parent")
+        else:
+            merged_id, declared, _ = _parcel_fields(merged)
+            expected = None if parent_row == NO_PARENT else self.ids[parent_row]
+            if declared not in (None, expected):
+                raise ValueError(f"Merged parcel {merged_id} declares parent {declared}, not {expected}")
+
+        for row in rows:
+            self._apply(row, -1.0)
+            self.alive[row] = 0
+            if parent_row != NO_PARENT:
+                self.child_count[parent_row] -= 1
+        if merged is None:
+            self._apply(parent_row, 1.0)  # Whole again
+            result = self.ids[parent_row]
+        else:
+            result = self.ids[self._attach(merged, parent_row)]
+        self._maybe_rebuild()
+        return result
+
+    def update_parcel(self, parcel) -> None:
+        """
+        Applies new values of an existing parcel. A changed
+        parent_parcel_id is checked for cycles and re-lays out the index.
+        """
+        parcel_id, parent_id, values = _parcel_fields(parcel)
+        row = self._row(parcel_id)
+        new_parent = NO_PARENT if parent_id is None else self._row(parent_id)
+
+        if new_parent != self.parent[row]:
+            ancestor = new_parent
+            while ancestor != NO_PARENT:
+                if ancestor == row:
+                    raise HierarchyCycleError([[parcel_id] + self._path_up(new_parent, row)])
+                ancestor = self.parent[ancestor]
+            self.parent[row] = new_parent
+            self._set_values(row, parcel_id, values)
+            self.build()
+            return
+
+        current = self._is_current(row)
+        if current:
+            self._apply(row, -1.0)
+        self._set_values(row, parcel_id, values)
+        if current:
+            self._apply(row, 1.0)
+
+    def _path_up(self, start: int, stop: int) -> List[str]:
+        path = []
+        while start != stop:
+            path.append(self.ids[start])
+            start = self.parent[start]
+        return path
+
+    def _set_values(self, row: int, parcel_id: str, values: Dict) -> None:
+        land = values["land_area_rai"] * SQM_PER_RAI
+        self._own[0][row] = land
+        self._own[1][row] = values["current_far"] * land
+        self._own[2][row] = (values["legal_far_limit"] - values["current_far"]) * land
+        self._status[row] = self._classify(parcel_id, values)
@@ -0,0 +1,234 @@
+"""
+Delta-Encoded Proposal History
+Stores ProposalHistory entries as field-level diffs against the previous
+entry, with a full checkpoint every N entries.
+
+Entry k describes the proposal snapshot recorded by the k-th change
+(the state BEFORE that change, as in the original full-copy scheme).
+Checkpoint entries keep the full copy in `previous_snapshot`; the others
+leave it empty and carry a `delta`:
+
+    { "set": [[["field", "nested_field"], value], ...], "unset": [["field"], ...] }
+
+Nested dicts (e.g. economic_parameters_snapshot, calculation_inputs) are
+diffed per key, so a one-field edit stores one value. Paths are key lists
+rather than dotted strings, so keys that contain "." round-trip.
+
+Author: BaanBid Development Team
+"""
+
+import bisect
+import copy
+import json
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from firestore_models import ProposalHistory
+
+
+# --- Constants ---
+DEFAULT_CHECKPOINT_INTERVAL = 10
+
+
+# --- Diff Helpers ---
+def diff_snapshots(old: Dict, new: Dict, _prefix: Tuple = ()) -> Dict:
+    """
+    Field-level diff turning `old` into `new`.
+    Dicts are descended into; any other value is replaced whole. Paths are
+    key lists, so keys may contain any character (including ".").
+    """
+    changes: Dict = {"set": [], "unset": []}
+    for key, new_value in new.items():
+        path = _prefix + (key,)
+        if key not in old:
+            changes["set"].append([list(path), copy.deepcopy(new_value)])
+            continue
+        old_value = old[key]
+        if isinstance(old_value, dict) and isinstance(new_value, dict):
+            nested = diff_snapshots(old_value, new_value, path)
+            changes["set"].extend(nested["set"])
+            changes["unset"].extend(nested["unset"])
+        elif old_value != new_value or type(old_value) is not type(new_value):
+            changes["set"].append([list(path), copy.deepcopy(new_value)])
+    for key in old:
+        if key not in new:
+            changes["unset"].append(list(_prefix + (key,)))
+    return changes
+
+
+def apply_delta(snapshot: Dict, delta: Dict) -> Dict:
+    """
+    Returns a new snapshot with `delta` applied. Only the dicts on changed
+    paths are copied; untouched nested values are shared with `snapshot`.
+    """
+    result = dict(snapshot)
+    copied = {id(result)}
+
+    def parent_for(path):
+        node = result
+        for part in path[:-1]:
+            child = node.get(part)
+            if not isinstance(child, dict):
+                child = {}
+            if id(child) not in copied:
+                child = dict(child)
+                copied.add(id(child))
+            node[part] = child
+            node = child
+        return node, path[-1]
+
+    for path in delta.get("unset", []):
+        node, key = parent_for(path)
+        node.pop(key, None)
+    for path, value in delta.get("set", []):
+        node, key = parent_for(path)
+        node[key] = copy.deepcopy(value)
+    return result
+
+
+class ProposalHistoryLog:
+    """
+    History of one ProjectProposal kept as checkpoints plus deltas.
+
+    Args:
+        proposal_id: Parent proposal ID.
+        entries: Existing entries (any order; sorted by `sequence`).
+        checkpoint_interval: A full copy is stored every N entries.
+    """
+
+    def __init__(
+        self,
+        proposal_id: str,
+        entries: Optional[Iterable[ProposalHistory]] = None,
+        checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL
+    ):
+        if checkpoint_interval <= 0:
+            raise ValueError(f"checkpoint_interval must be positive: {checkpoint_interval}")
+        self.proposal_id = proposal_id
+        self.checkpoint_interval = checkpoint_interval
+        self.entries: List[ProposalHistory] = sorted(entries or [], key=lambda e: e.sequence)
+        self._checkpoints: List[int] = [e.sequence for e in self.entries if e.is_checkpoint]
+        self._latest: Optional[Dict] = None  # Cached snapshot of the last entry
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def record(
+        self,
+        previous_snapshot: Dict,
+        changed_by: str,
+        changed_at: str,
+        change_summary: str,
+        entry_id: Optional[str] = None
+    ) -> ProposalHistory:
+        """
+        Appends a history entry for a change whose pre-change state is
+        `previous_snapshot`. Returns the entry to persist.
+        """
+        sequence = len(self.entries)
+        entry_id = entry_id or f"hist_{sequence:06d}"
+        since_checkpoint = sequence - self._checkpoints[-1] if self._checkpoints else None
+
+        if since_checkpoint is None or since_checkpoint >= self.checkpoint_interval:
+            entry = ProposalHistory(
+                id=entry_id,
+                proposal_id=self.proposal_id,
+                changed_by=changed_by,
+                changed_at=changed_at,
+                change_summary=change_summary,
+                previous_snapshot=copy.deepcopy(previous_snapshot),
+                sequence=sequence,
+                is_checkpoint=True,
+                delta=None
+            )
+            self._checkpoints.append(sequence)
+        else:
+            entry = ProposalHistory(
+                id=entry_id,
+                proposal_id=self.proposal_id,
+                changed_by=changed_by,
+                changed_at=changed_at,
+                change_summary=change_summary,
+                previous_snapshot={},
+                sequence=sequence,
+                is_checkpoint=False,
+                delta=diff_snapshots(self._latest_snapshot(), previous_snapshot)
+            )
+        self.entries.append(entry)
+        self._latest = copy.deepcopy(previous_snapshot)
+        return entry
+
+    def _latest_snapshot(self) -> Dict:
+        if self._latest is None:
+            self._latest = self.reconstruct(len(self.entries) - 1)
+        return self._latest
+
+    def reconstruct(self, sequence: int) -> Dict:
+        """
+        Rebuilds the snapshot stored by entry `sequence`: the nearest
+        checkpoint at or before it plus at most N-1 deltas.
+        """
+        if not 0 <= sequence < len(self.entries):
+            raise IndexError(f"History entry {sequence} does not exist for proposal {self.proposal_id}")
+        pos = bisect.bisect_right(self._checkpoints, sequence) - 1
+        if pos < 0:
+            raise ValueError(f"No checkpoint precedes history entry {sequence} for proposal {self.proposal_id}")
+        start = self._checkpoints[pos]
+        snapshot = copy.deepcopy(self.entries[start].previous_snapshot)
+        for entry in self.entries[start + 1:sequence + 1]:
+            snapshot = apply_delta(snapshot, entry.delta or {})
+        return snapshot
+
+
+# --- Bulk Compaction ---
+def compact_history(
+    entries: Iterable[ProposalHistory],
+    checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL
+) -> List[ProposalHistory]:
+    """
+    Converts one proposal's full-copy history (legacy entries, ordered by
+    changed_at) into checkpoint + delta entries. Entry IDs, authors,
+    timestamps and summaries are kept.
+    """
+    entries = sorted(entries, key=lambda e: (e.sequence, e.changed_at))
+    if not entries:
+        return []
+    log = ProposalHistoryLog(entries[0].proposal_id, checkpoint_interval=checkpoint_interval)
+    snapshot: Dict = {}
+    for entry in entries:
+        # Already-compacted entries are expanded first so mixed histories survive
+        if entry.is_checkpoint:
+            snapshot = entry.previous_snapshot
+        else:
+            snapshot = apply_delta(snapshot, entry.delta or {})
+        log.record(snapshot, entry.changed_by, entry.changed_at, entry.change_summary, entry_id=entry.id)
+    return log.entries
+
+
+def compact_all(
+    histories: Dict[str, List[ProposalHistory]],
+    checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL
+) -> Dict[str, List[ProposalHistory]]:
+    """Runs compact_history over { proposal_id: [entries] }."""
+    return {
+        proposal_id: compact_history(entries, checkpoint_interval)
+        for proposal_id, entries in histories.items()
+    }
+
+
+def measure_storage_bytes(entries: Iterable[ProposalHistory]) -> int:
+    """Approximate stored size: total bytes of the JSON-encoded entries."""
+    return sum(
+        len(json.dumps(entry.to_dict(), separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+        for entry in entries
+    )
+
+
+def storage_savings(before: Iterable[ProposalHistory], after: Iterable[ProposalHistory]) -> Dict[str, float]:
+    """Compares stored bytes before and after compaction."""
+    before_bytes = measure_storage_bytes(before)
+    after_bytes = measure_storage_bytes(after)
+    return {
+        "before_bytes": before_bytes,
+        "after_bytes": after_bytes,
+        "saved_percent": (1 - after_bytes / before_bytes) * 100.0 if before_bytes else 0.0
+    }
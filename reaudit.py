@@ -0,0 +1,278 @@
+"""
+Incremental Re-Audit
+Tracks which ProjectProposal records depend on which EconomicParameters
+(`param_id`) and LandParcel (`parcel_id`), together with the
+`calculation_inputs` each audit was computed from (d0, g, distance_km,
+formula_version).
+
+On a parameter or parcel change only the dependent proposals are
+considered, and of those only the ones whose derived inputs actually
+differ are recomputed. Recomputed proposals get a new `efficiency_score`,
+an updated `audit_status` and a delta-encoded history entry; the rest are
+reported as skipped (still valid). Skipped proposals are still moved onto
+a rebased parameter version (param_id and parameter snapshot), with a
+history entry, since only their audit result is unaffected.
+
+Parameter snapshots are compared by content hash, and a rebased proposal
+gets the new `economic_parameters_hash` from the ParameterSnapshotStore
+(with the interned, shared snapshot dict), so re-audits keep the hash
+interning instead of embedding a fresh copy per proposal.
+
+Status rule: if the recomputed score moves the proposal into a different
+FARStatus band (UNDER / OPTIMAL / OVER), the analyst decision no longer
+applies and `audit_status` is reset to "Pending". Otherwise the existing
+decision is kept.
+
+Author: BaanBid Development Team
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from far_calculation import FARCalculationError, FARInputs, calculate_far, get_far_status
+from firestore_models import EconomicParameters, LandParcel, ProjectProposal
+from proposal_history import DEFAULT_CHECKPOINT_INTERVAL, ProposalHistoryLog
+from snapshot_store import ParameterSnapshotStore, get_default_store
+
+
+# --- Constants ---
+FORMULA_VERSION = "v1.0"
+PENDING_STATUS = "Pending"
+INPUT_KEYS = ("d0", "g", "distance_km", "formula_version")
+
+
+@dataclass
+class ReauditReport:
+    """ผลลัพธ์การตรวจสอบซ้ำแบบ Incremental"""
+    trigger: str                                   # e.g. "params:tax_year_2025"
+    considered: int = 0                            # Proposals depending on the change
+    skipped_still_valid: int = 0                   # Inputs unchanged, audit kept
+    rebased: List[str] = field(default_factory=list)        # Skipped, but moved onto the new parameters
+    recomputed: List[str] = field(default_factory=list)
+    status_reset: List[str] = field(default_factory=list)  # Moved FARStatus band -> "Pending"
+    errors: Dict[str, str] = field(default_factory=dict)   # proposal_id -> error code
+
+    def to_dict(self) -> dict:
+        return {
+            "trigger": self.trigger,
+            "considered": self.considered,
+            "skippedStillValid": self.skipped_still_valid,
+            "rebased": len(self.rebased),
+            "recomputed": len(self.recomputed),
+            "statusReset": len(self.status_reset),
+            "errors": dict(self.errors)
+        }
+
+
+def _input_key(inputs: Optional[Dict]) -> Optional[Tuple]:
+    if not inputs:
+        return None
+    return tuple(inputs.get(k) for k in INPUT_KEYS)
+
+
+class ReauditTracker:
+    """
+    Dependency index from parameters and parcels to proposals.
+
+    Args:
+        proposals: Proposals to track (mutated in place on re-audit).
+        parcels: Parcels referenced by the proposals.
+        parameters: Known EconomicParameters by id.
+        history_logs: Optional existing { proposal_id: ProposalHistoryLog }.
+        snapshot_store: Parameter snapshot store (default: the process-wide one).
+    """
+
+    def __init__(
+        self,
+        proposals: Iterable[ProjectProposal],
+        parcels: Iterable[LandParcel],
+        parameters: Iterable[EconomicParameters] = (),
+        history_logs: Optional[Dict[str, ProposalHistoryLog]] = None,
+        checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL,
+        snapshot_store: Optional[ParameterSnapshotStore] = None
+    ):
+        self.snapshots = snapshot_store if snapshot_store is not None else get_default_store()
+        self.proposals: Dict[str, ProjectProposal] = {}
+        self.parcels: Dict[str, LandParcel] = {p.id: p for p in parcels}
+        self.parameters: Dict[str, EconomicParameters] = {p.id: p for p in parameters}
+        self.history_logs: Dict[str, ProposalHistoryLog] = history_logs if history_logs is not None else {}
+        self.checkpoint_interval = checkpoint_interval
+        self._by_param: Dict[str, Set[str]] = {}
+        self._by_parcel: Dict[str, Set[str]] = {}
+        for proposal in proposals:
+            self.track(proposal)
+
+    # --- Dependency Index ---
+    def track(self, proposal: ProjectProposal) -> None:
+        """Adds or re-indexes a proposal."""
+        self.untrack(proposal.id)
+        self.proposals[proposal.id] = proposal
+        self._by_param.setdefault(proposal.param_id, set()).add(proposal.id)
+        self._by_parcel.setdefault(proposal.parcel_id, set()).add(proposal.id)
+
+    def untrack(self, proposal_id: str) -> None:
+        proposal = self.proposals.pop(proposal_id, None)
+        if proposal is None:
+            return
+        self._by_param.get(proposal.param_id, set()).discard(proposal_id)
+        self._by_parcel.get(proposal.parcel_id, set()).discard(proposal_id)
+
+    def dependents_of_params(self, param_id: str) -> Set[str]:
+        return set(self._by_param.get(param_id, ()))
+
+    def dependents_of_parcel(self, parcel_id: str) -> Set[str]:
+        return set(self._by_parcel.get(parcel_id, ()))
+
+    # --- Input Derivation ---
+    def derive_inputs(self, proposal: ProjectProposal, params: EconomicParameters) -> Dict:
+        """
+        Inputs the audit should use now: g from the parameters, distance from
+        the parcel, d0 carried over from the proposal's previous inputs.
+        """
+        previous = proposal.calculation_inputs or {}
+        parcel = self.parcels[proposal.parcel_id]
+        return {
+            "d0": previous.get("d0"),
+            "g": params.bertaud_density_gradient_coefficient,
+            "distance_km": parcel.distance_from_cbd_km,
+            "formula_version": FORMULA_VERSION
+        }
+
+    # --- Change Events ---
+    def on_parameters_changed(
+        self,
+        params: EconomicParameters,
+        changed_by: str,
+        changed_at: str,
+        rebase_from: Iterable[str] = ()
+    ) -> ReauditReport:
+        """
+        Handles a revised or newly activated EconomicParameters.
+
+        Args:
+            params: The new parameter version.
+            rebase_from: Older param_ids whose proposals move onto `params`
+                (e.g. last tax year's id when a new year becomes active).
+        """
+        self.parameters[params.id] = params
+        candidates = self.dependents_of_params(params.id)
+        for old_id in rebase_from:
+            candidates |= self.dependents_of_params(old_id)
+        report = ReauditReport(trigger=f"params:{params.id}")
+        digest = self.snapshots.hash_of(params.to_dict())
+        for proposal_id in sorted(candidates):
+            proposal = self.proposals[proposal_id]
+            self._reaudit(proposal, params, digest, changed_by, changed_at, report)
+        return report
+
+    def on_parcel_changed(self, parcel: LandParcel, changed_by: str, changed_at: str) -> ReauditReport:
+        """Handles an edited parcel (e.g. recomputed distance_from_cbd_km)."""
+        self.parcels[parcel.id] = parcel
+        report = ReauditReport(trigger=f"parcel:{parcel.id}")
+        for proposal_id in sorted(self.dependents_of_parcel(parcel.id)):
+            proposal = self.proposals[proposal_id]
+            params = self.parameters.get(proposal.param_id)
+            if params is None:
+                report.considered += 1
+                report.errors[proposal_id] = "UNKNOWN_PARAMS"
+                continue
+            self._reaudit(proposal, params, None, changed_by, changed_at, report)
+        return report
+
+    def _snapshot_hash(self, proposal: ProjectProposal) -> Optional[str]:
+        if proposal.economic_parameters_hash:
+            return proposal.economic_parameters_hash
+        if proposal.economic_parameters_snapshot:
+            return self.snapshots.hash_of(proposal.economic_parameters_snapshot)
+        return None
+
+    def _needs_rebase(self, proposal: ProjectProposal, params: EconomicParameters, digest: Optional[str]) -> bool:
+        """True if the proposal is on another param_id or (for parameter events) another snapshot."""
+        if proposal.param_id != params.id:
+            return True
+        return digest is not None and self._snapshot_hash(proposal) != digest
+
+    def _reaudit(
+        self,
+        proposal: ProjectProposal,
+        params: EconomicParameters,
+        digest: Optional[str],
+        changed_by: str,
+        changed_at: str,
+        report: ReauditReport
+    ) -> None:
+        report.considered += 1
+        new_inputs = self.derive_inputs(proposal, params)
+        if (
+            _input_key(new_inputs) == _input_key(proposal.calculation_inputs)
+            and proposal.efficiency_score is not None
+        ):
+            report.skipped_still_valid += 1
+            # The audit stands, but the proposal still moves onto the new parameters
+            if self._needs_rebase(proposal, params, digest):
+                previous_snapshot = proposal.to_dict()
+                self._rebase(proposal, params)
+                proposal.updated_at = changed_at
+                proposal.version += 1
+                self._log(proposal).record(
+                    previous_snapshot,
+                    changed_by=changed_by,
+                    changed_at=changed_at,
+                    change_summary=f"Rebased onto {params.id} ({report.trigger}): audit inputs unchanged"
+                )
+                report.rebased.append(proposal.id)
+            return
+
+        parcel = self.parcels[proposal.parcel_id]
+        try:
+            result = calculate_far(FARInputs(
+                land_size_rai=parcel.land_area_rai,
+                proposed_gfa=proposal.proposed_gfa,
+                d0=new_inputs["d0"] if new_inputs["d0"] is not None else 0.0,
+                g=new_inputs["g"],
+                distance_km=new_inputs["distance_km"],
+                legal_max_far=parcel.legal_far_limit
+            ))
+        except FARCalculationError as e:
+            report.errors[proposal.id] = e.code
+            return
+
+        previous_snapshot = proposal.to_dict()
+        old_band = get_far_status(proposal.efficiency_score) if proposal.efficiency_score is not None else None
+
+        proposal.calculation_inputs = new_inputs
+        proposal.efficiency_score = result.efficiency_score
+        if self._needs_rebase(proposal, params, digest):
+            self._rebase(proposal, params)
+        if old_band is not result.status and proposal.audit_status != PENDING_STATUS:
+            proposal.audit_status = PENDING_STATUS
+            report.status_reset.append(proposal.id)
+        proposal.updated_at = changed_at
+        proposal.version += 1
+
+        self._log(proposal).record(
+            previous_snapshot,
+            changed_by=changed_by,
+            changed_at=changed_at,
+            change_summary=(
+                f"Re-audit ({report.trigger}): efficiency "
+                f"{previous_snapshot['efficiency_score']} -> {result.efficiency_score:.4f}"
+            )
+        )
+        report.recomputed.append(proposal.id)
+
+    def _log(self, proposal: ProjectProposal) -> ProposalHistoryLog:
+        log = self.history_logs.get(proposal.id)
+        if log is None:
+            log = ProposalHistoryLog(proposal.id, checkpoint_interval=self.checkpoint_interval)
+            self.history_logs[proposal.id] = log
+        return log
+
+    def _rebase(self, proposal: ProjectProposal, params: EconomicParameters) -> None:
+        if proposal.param_id != params.id:
+            self._by_param.get(proposal.param_id, set()).discard(proposal.id)
+            self._by_param.setdefault(params.id, set()).add(proposal.id)
+            proposal.param_id = params.id
+        digest = self.snapshots.put(params)
+        proposal.economic_parameters_hash = digest
+        proposal.economic_parameters_snapshot = self.snapshots.get(digest)  # Shared, read-only
@@ -1,15 +1,11 @@
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image as ReportLabImage
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib.enums import TA_CENTER, TA_LEFT
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
 from datetime import datetime
 import os
 
+from instrumentation import timed
+
+# reportlab is imported inside the methods that use it, so importing this
+# module (e.g. from a computation-only entry point) stays cheap.
+
 class PDFReportGenerator:
     """
     Generates an 'Official Audit Report' PDF using ReportLab.
@@ -17,6 +13,8 @@ class PDFReportGenerator:
     """
 
     def __init__(self, output_filename: str):
+        from reportlab.lib.styles import getSampleStyleSheet
+
         self.output_filename = output_filename
         self.styles = getSampleStyleSheet()
         self.font_name = 'Helvetica' # Default fallback
@@ -28,6 +26,9 @@ class PDFReportGenerator:
         Attempts to register THSarabunNew font for Thai support.
         Looks in 'assets/fonts/' relative to this script.
         """
+        from reportlab.pdfbase import pdfmetrics
+        from reportlab.pdfbase.ttfonts import TTFont
+
         base_dir = os.path.dirname(os.path.abspath(__file__))
         font_path = os.path.join(base_dir, "assets", "fonts", "THSarabunNew.ttf")
         
@@ -42,6 +43,10 @@ class PDFReportGenerator:
             print(f"Warning: Thai font not found at '{font_path}'. Using default Helvetica (Thai text will not render correctly).")
 
     def _setup_custom_styles(self):
+        from reportlab.lib import colors
+        from reportlab.lib.enums import TA_CENTER
+        from reportlab.lib.styles import ParagraphStyle
+
         self.title_style = ParagraphStyle(
             'ReportTitle',
             parent=self.styles['Heading1'],
@@ -69,10 +74,16 @@ class PDFReportGenerator:
             leading=18
         )
 
+    @timed("generate_report")
     def generate_report(self, audit_data: dict, chart_image_path: str = None):
         """
         Generates the PDF report based on audit_data.
         """
+        from reportlab.lib import colors
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib.units import inch
+        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image as ReportLabImage
+
         doc = SimpleDocTemplate(self.output_filename, pagesize=A4)
         elements = []
 
@@ -144,6 +155,8 @@ class PDFReportGenerator:
         print(f"Report generated: {self.output_filename}")
 
     def _footer(self, canvas, doc):
+        from reportlab.lib.units import inch
+
         canvas.saveState()
         canvas.setFont(self.font_name, 10)
         canvas.drawString(inch, 0.75 * inch, f"สร้างโดยระบบตรวจสอบ Bertaud - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
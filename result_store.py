@@ -0,0 +1,411 @@
+"""
+Columnar Audit Result Store
+Streams audit results into Hive-partitioned Parquet (or Arrow IPC) files
+and reads them back with filter pushdown.
+
+Layout:
+    <root>/tax_year=2025/zone_color=Red/part-<writer>-00000.parquet
+
+Every result shape the repo produces is flattened to one schema
+(RESULT_COLUMNS): FARResult.to_dict(), engine calculate_optimal_density
+dicts, bertaud_audit parcel rows, AuditPipeline audit_data and NPV dicts.
+Rows are buffered per partition. Each file is one window of up to
+`rows_per_file` rows sorted by (status, efficiency_index), then cut into
+row groups, so each row group covers a narrow status / efficiency range. Queries on status, zone, year and efficiency
+range then skip whole directories (partition pruning) and row groups
+(statistics) instead of scanning everything. Arrow IPC files get
+partition pruning only.
+
+Needs pyarrow (pip install pyarrow); it is imported on first use.
+
+Usage:
+    python result_store.py export --input out/ --output results/ --tax-year 2025
+    python result_store.py query --root results/ --zone Red --status Over-densification \\
+        --min-efficiency 1.5 --explain
+
+Author: BaanBid Development Team
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import uuid
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import quote
+
+
+# --- Constants ---
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+PARTITION_COLUMNS = ("tax_year", "zone_color")
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"   # pyarrow reads it back as null
+DEFAULT_ROW_GROUP_SIZE = 131_072
+DEFAULT_ROWS_PER_FILE = 1_048_576     # Also the sort window
+DEFAULT_MAX_BUFFERED_ROWS = 2_097_152
+
+# name -> arrow type name; partition columns live in the directory names only
+RESULT_COLUMNS: Dict[str, str] = {
+    "tax_year": "int16",
+    "zone_color": "string",
+    "parcel_id": "string",
+    "proposal_id": "string",
+    "district": "string",
+    "status": "string",                 # Density status (engine, English)
+    "far_status": "string",             # FARStatus name
+    "efficiency_index": "float64",
+    "far_efficiency": "float64",
+    "theoretical_far": "float64",
+    "proposed_far": "float64",
+    "legal_max_far": "float64",
+    "far_mismatch_gap": "float64",
+    "policy_recommendation": "string",
+    "state_npv": "float64",
+    "roa_percent": "float64",
+    "overall_status": "string",
+    "error": "string",
+}
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError("The result store requires pyarrow (pip install pyarrow)") from e
+    return pyarrow
+
+
+def result_schema(include_partitions: bool = False):
+    pa = _pyarrow()
+    return pa.schema([
+        (name, getattr(pa, type_name)())
+        for name, type_name in RESULT_COLUMNS.items()
+        if include_partitions or name not in PARTITION_COLUMNS
+    ])
+
+
+# --- Flattening ---
+def _first(*values):
+    for value in values:
+        if value is not None:
+            return value
+    return None
+
+
+def _density_status(result: Dict) -> Optional[str]:
+    """English engine status from any shape (pipeline rows carry the Thai label)."""
+    if result.get("densityStatus") is not None:
+        return result["densityStatus"]
+    if "efficiency_index" in result and "status" in result:
+        return result["status"]
+    thai = result.get("density_status")
+    if thai is not None:
+        from audit_pipeline import DENSITY_STATUS_THAI
+
+        english = {label: status for status, label in DENSITY_STATUS_THAI.items()}
+        return english.get(thai, thai)
+    return None
+
+
+def flatten_result(result: Dict, tax_year: Optional[int] = None) -> Dict:
+    """Maps any audit result dict onto RESULT_COLUMNS (missing values are None)."""
+    gap = result.get("gapAnalysis") or result.get("gap_analysis") or {}
+    error = result.get("error")
+    if isinstance(error, bool):  # FARCalculationError.to_dict() style
+        error = result.get("code") if error else None
+    return {
+        "tax_year": _first(result.get("tax_year"), tax_year),
+        "zone_color": result.get("zone_color"),
+        "parcel_id": result.get("parcel_id"),
+        "proposal_id": _first(result.get("proposal_id"), result.get("project_name")),
+        "district": result.get("district"),
+        "status": _density_status(result),
+        "far_status": result.get("status") if "efficiencyScore" in result else None,
+        "efficiency_index": _first(result.get("efficiencyIndex"), result.get("efficiency_index")),
+        "far_efficiency": result.get("efficiencyScore"),
+        "theoretical_far": _first(result.get("theoreticalFar"), result.get("theoretical_far"),
+                                  result.get("theoretical_density")),
+        "proposed_far": _first(result.get("proposedFar"), result.get("proposed_far"), result.get("proposed_density")),
+        "legal_max_far": _first(result.get("legalMaxFar"), gap.get("legal_max_far")),
+        "far_mismatch_gap": gap.get("far_mismatch_gap"),
+        "policy_recommendation": gap.get("policy_recommendation"),
+        "state_npv": result.get("state_npv"),
+        "roa_percent": result.get("roa_percent"),
+        "overall_status": result.get("overall_status"),
+        "error": None if error is None else str(error),
+    }
+
+
+# --- Writer ---
+class ResultWriter:
+    """
+    Buffers flattened rows per (tax_year, zone_color) partition. Each file
+    is one sorted window of up to `rows_per_file` rows, cut into row groups.
+
+    Args:
+        root: Dataset directory (created if needed).
+        file_format: "parquet" or "arrow".
+        tax_year: Default tax year for rows that carry none.
+        row_group_size: Rows per row group / record batch.
+        rows_per_file: Sort window: a partition's buffer is sorted and
+            written as one file when it reaches this many rows.
+        max_buffered_rows: Across all partitions; beyond it the largest
+            buffer is written early (bounds memory with many partitions).
+    """
+
+    def __init__(
+        self,
+        root: str,
+        file_format: str = "parquet",
+        tax_year: Optional[int] = None,
+        row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+        rows_per_file: int = DEFAULT_ROWS_PER_FILE,
+        compression: str = "zstd",
+        max_buffered_rows: int = DEFAULT_MAX_BUFFERED_ROWS
+    ):
+        if file_format not in FORMATS:
+            raise ValueError(f"file_format must be one of {tuple(FORMATS)}: {file_format}")
+        self.root = root
+        self.file_format = file_format
+        self.tax_year = tax_year
+        self.row_group_size = row_group_size
+        self.rows_per_file = rows_per_file
+        self.max_buffered_rows = max(max_buffered_rows, rows_per_file)
+        self.compression = compression
+        self.schema = result_schema()
+        self.rows_written = 0
+        self.files_written: List[str] = []
+        self._writer_id = uuid.uuid4().hex[:12]
+        self._buffers: Dict[Tuple, Dict[str, list]] = {}
+        self._buffered = 0
+        self._file_counter = 0
+        os.makedirs(root, exist_ok=True)
+
+    def write(self, result: Dict) -> None:
+        """Adds one audit result (any supported shape)."""
+        self.write_flat(flatten_result(result, self.tax_year))
+
+    def write_many(self, results: Iterable[Dict]) -> None:
+        for result in results:
+            self.write(result)
+
+    def write_flat(self, row: Dict) -> None:
+        key = (row["tax_year"], row["zone_color"])
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            buffer = {name: [] for name in self.schema.names}
+            self._buffers[key] = buffer
+        for name, column in buffer.items():
+            column.append(row.get(name))
+        self._buffered += 1
+        if len(buffer["status"]) >= self.rows_per_file:
+            self._flush(key)
+        elif self._buffered >= self.max_buffered_rows:
+            self._flush(max(self._buffers, key=lambda k: len(self._buffers[k]["status"])))
+
+    def _partition_dir(self, key: Tuple) -> str:
+        parts = [
+            f"{name}={NULL_PARTITION if value is None else quote(str(value), safe='')}"
+            for name, value in zip(PARTITION_COLUMNS, key)
+        ]
+        return os.path.join(self.root, *parts)
+
+    def _flush(self, key: Tuple) -> None:
+        """Sorts a partition's whole buffer and writes it as one file."""
+        pa = _pyarrow()
+        buffer = self._buffers.pop(key, None)
+        if not buffer or not buffer["status"]:
+            return
+        self._buffered -= len(buffer["status"])
+        # Sorting the whole window (not each row group) gives every row group a
+        # narrow status / efficiency range, so min-max statistics can prune it
+        order = sorted(
+            range(len(buffer["status"])),
+            key=lambda i: (buffer["status"][i] or "", buffer["efficiency_index"][i]
+                           if buffer["efficiency_index"][i] is not None else float("inf"))
+        )
+        table = pa.table({name: [column[i] for i in order] for name, column in buffer.items()}, schema=self.schema)
+
+        directory = self._partition_dir(key)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"part-{self._writer_id}-{self._file_counter:05d}{FORMATS[self.file_format]}")
+        self._file_counter += 1
+        tmp_path = path + ".tmp"
+        if self.file_format == "parquet":
+            import pyarrow.parquet as pq
+            pq.write_table(table, tmp_path, row_group_size=self.row_group_size, compression=self.compression)
+        else:
+            with pa.ipc.new_file(tmp_path, self.schema) as writer:
+                writer.write_table(table, max_chunksize=self.row_group_size)
+        os.replace(tmp_path, path)  # Readers never see half-written files
+        self.rows_written += table.num_rows
+        self.files_written.append(path)
+
+    def close(self) -> None:
+        for key in list(self._buffers):
+            self._flush(key)
+
+    def __enter__(self) -> "ResultWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# --- Reader ---
+class ResultReader:
+    """
+    Filtered scans over a result store written by ResultWriter.
+
+    Filters (all optional, combined with AND): tax_year, zone, status (one
+    value or a list), min_efficiency / max_efficiency (inclusive).
+    """
+
+    def __init__(self, root: str, file_format: str = "parquet"):
+        if file_format not in FORMATS:
+            raise ValueError(f"file_format must be one of {tuple(FORMATS)}: {file_format}")
+        _pyarrow()
+        import pyarrow.dataset as ds
+
+        self.root = root
+        self.file_format = file_format
+        full = result_schema(True)
+        partitioning = ds.partitioning(
+            _pyarrow().schema([full.field(name) for name in PARTITION_COLUMNS]), flavor="hive"
+        )
+        self.dataset = ds.dataset(
+            root, format="ipc" if file_format == "arrow" else "parquet",
+            partitioning=partitioning, exclude_invalid_files=True,
+            ignore_prefixes=[".", "_"]
+        )
+
+    @staticmethod
+    def _as_list(value) -> Optional[List]:
+        if value is None:
+            return None
+        return list(value) if isinstance(value, (list, tuple, set, frozenset)) else [value]
+
+    def build_filter(
+        self,
+        tax_year=None,
+        zone=None,
+        status=None,
+        min_efficiency: Optional[float] = None,
+        max_efficiency: Optional[float] = None
+    ):
+        import pyarrow.dataset as ds
+
+        conditions = []
+        for name, value in (("tax_year", tax_year), ("zone_color", zone), ("status", status)):
+            values = self._as_list(value)
+            if not values:
+                continue
+            present = [v for v in values if v is not None]
+            condition = None
+            if present:
+                condition = ds.field(name).isin(present) if len(present) > 1 else ds.field(name) == present[0]
+            if len(present) < len(values):  # None selects rows without a value (e.g. unzoned)
+                condition = ds.field(name).is_null() if condition is None else condition | ds.field(name).is_null()
+            conditions.append(condition)
+        if min_efficiency is not None:
+            conditions.append(ds.field("efficiency_index") >= min_efficiency)
+        if max_efficiency is not None:
+            conditions.append(ds.field("efficiency_index") <= max_efficiency)
+        expression = None
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+        return expression
+
+    def scanner(self, columns: Optional[Sequence[str]] = None, batch_size: int = DEFAULT_ROW_GROUP_SIZE, **filters):
+        return self.dataset.scanner(
+            columns=list(columns) if columns else None,
+            filter=self.build_filter(**filters),
+            batch_size=batch_size
+        )
+
+    def query(self, columns: Optional[Sequence[str]] = None, **filters):
+        """Matching rows as a pyarrow.Table."""
+        return self.scanner(columns, **filters).to_table()
+
+    def iter_batches(self, columns: Optional[Sequence[str]] = None, **filters) -> Iterator:
+        """Matching rows as a stream of pyarrow.RecordBatch (bounded memory)."""
+        for batch in self.scanner(columns, **filters).to_batches():
+            if batch.num_rows:
+                yield batch
+
+    def explain(self, **filters) -> Dict[str, int]:
+        """How much data a query touches: files and row groups after pruning."""
+        expression = self.build_filter(**filters)
+        all_fragments = list(self.dataset.get_fragments())
+        fragments = list(self.dataset.get_fragments(filter=expression)) if expression is not None else all_fragments
+        stats = {"files": len(all_fragments), "filesMatched": len(fragments)}
+        if self.file_format == "parquet":
+            stats["rowGroups"] = sum(f.num_row_groups for f in all_fragments)
+            stats["rowGroupsMatched"] = sum(
+                len(f.split_by_row_group(expression, schema=self.dataset.schema)) if expression is not None else f.num_row_groups
+                for f in fragments
+            )
+        return stats
+
+
+# --- Export From bertaud_audit Part Files ---
+def export_parts(input_dir: str, output_dir: str, tax_year: Optional[int] = None,
+                 file_format: str = "parquet") -> ResultWriter:
+    """Streams bertaud_audit part-*.jsonl files into a result store."""
+    with ResultWriter(output_dir, file_format, tax_year=tax_year) as writer:
+        for path in sorted(glob.glob(os.path.join(input_dir, "part-*.jsonl"))):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        writer.write(json.loads(line))
+    return writer
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Columnar audit result store (Parquet / Arrow IPC)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="Convert bertaud_audit JSONL parts into a partitioned store")
+    export.add_argument("--input", required=True, help="bertaud_audit output directory")
+    export.add_argument("--output", required=True, help="Result store directory")
+    export.add_argument("--tax-year", type=int, help="Tax year for rows that carry none")
+    export.add_argument("--format", choices=tuple(FORMATS), default="parquet")
+
+    query = commands.add_parser("query", help="Filtered scan of a result store")
+    query.add_argument("--root", required=True)
+    query.add_argument("--format", choices=tuple(FORMATS), default="parquet")
+    query.add_argument("--tax-year", type=int, action="append")
+    query.add_argument("--zone", action="append")
+    query.add_argument("--status", action="append")
+    query.add_argument("--min-efficiency", type=float)
+    query.add_argument("--max-efficiency", type=float)
+    query.add_argument("--columns", nargs="+")
+    query.add_argument("--limit", type=int, default=20, help="Rows printed (JSONL)")
+    query.add_argument("--explain", action="store_true", help="Print files / row groups touched instead of rows")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        writer = export_parts(args.input, args.output, args.tax_year, args.format)
+        print(f"Wrote {writer.rows_written:,} rows in {len(writer.files_written)} files to {args.output}")
+        return 0
+
+    reader = ResultReader(args.root, args.format)
+    filters = dict(
+        tax_year=args.tax_year, zone=args.zone, status=args.status,
+        min_efficiency=args.min_efficiency, max_efficiency=args.max_efficiency
+    )
+    if args.explain:
+        print(json.dumps(reader.explain(**filters), indent=2))
+        return 0
+    printed = 0
+    for batch in reader.iter_batches(args.columns, **filters):
+        for row in batch.to_pylist():
+            if printed >= args.limit:
+                return 0
+            print(json.dumps(row, ensure_ascii=False, default=str))
+            printed += 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,579 @@
+"""
+Road-Network Distance Field
+Replaces straight-line `distance_from_cbd_km` with travel distance over a
+local road graph. The graph is read from an edge-list CSV or an OSM XML
+extract and stored as CSR adjacency. One Dijkstra run per center (the CBD
+and every polycentric center) gives network km and travel minutes for
+every node. Each center is its own run, so they run in parallel
+processes. Parcels are snapped to their nearest node through a
+ParcelSpatialIndex over the node coordinates.
+
+Parcel distance = access leg (straight line to the snapped node) + network
+distance from that node. The field can be saved and reloaded without the
+graph, and its `distance_map()` feeds
+BertaudAuditEngine.calculate_polycentric_density directly.
+
+Edge CSV columns:
+    from_id, to_id                        required
+    from_lat, from_lon, to_lat, to_lon    node coordinates (or pass a nodes CSV: id, lat, lon)
+    length_m | length_km                  optional, haversine between the nodes otherwise
+    minutes | speed_kph | highway         optional, travel time or speed (default by road class)
+    oneway                                optional (1/true/yes)
+
+Usage:
+    python road_network.py --graph bangkok_roads.csv --centers centers.json \\
+        --output bangkok.field --weight minutes --workers 8
+
+Author: BaanBid Development Team
+"""
+
+import argparse
+import csv
+import heapq
+import json
+import math
+import os
+import struct
+import sys
+import time
+from array import array
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from spatial_index import ParcelSpatialIndex, haversine_km, parse_gps_coordinates
+
+
+# --- Constants ---
+DEFAULT_SPEED_KPH = 30.0
+ACCESS_SPEED_KPH = 20.0   # Access leg to the network (walk / motorcycle taxi)
+MAX_SNAP_KM = 2.0         # Parcels further than this from any node are left unsnapped
+SNAP_START_KM = 0.1
+NODE_CELL_SIZE_DEG = 0.005
+WEIGHTS = ("length", "minutes")
+
+# OSM highway classes -> typical Bangkok urban speeds (kph); unlisted classes are not routable
+HIGHWAY_SPEEDS_KPH = {
+    "motorway": 80.0, "motorway_link": 50.0,
+    "trunk": 60.0, "trunk_link": 40.0,
+    "primary": 40.0, "primary_link": 30.0,
+    "secondary": 35.0, "secondary_link": 30.0,
+    "tertiary": 30.0, "tertiary_link": 25.0,
+    "unclassified": 25.0, "residential": 20.0,
+    "living_street": 10.0, "service": 15.0, "road": 25.0,
+}
+
+FIELD_MAGIC = b"BRN1"
+FIELD_VERSION = 1
+_FIELD_HEADER = struct.Struct("<4sBBIII")  # magic, version, weight, nodes, centers, meta bytes
+
+
+def _le(buf: array) -> array:
+    if sys.byteorder != "little":
+        buf.byteswap()
+    return buf
+
+
+def _truthy(value) -> bool:
+    return str(value).strip().lower() in ("1", "true", "yes", "-1")
+
+
+# --- Graph ---
+class RoadGraphBuilder:
+    """Collects nodes and edges, then packs them into a CSR RoadGraph."""
+
+    def __init__(self):
+        self.node_ids: List[str] = []
+        self.lats = array('d')
+        self.lons = array('d')
+        self._index: Dict[str, int] = {}
+        self._from = array('i')
+        self._to = array('i')
+        self._length_km = array('d')
+        self._minutes = array('d')
+
+    def add_node(self, node_id: str, lat: float, lon: float) -> int:
+        index = self._index.get(node_id)
+        if index is None:
+            index = len(self.node_ids)
+            self._index[node_id] = index
+            self.node_ids.append(node_id)
+            self.lats.append(lat)
+            self.lons.append(lon)
+        return index
+
+    def add_edge(self, from_id: str, to_id: str, length_km: Optional[float] = None,
+                 minutes: Optional[float] = None, speed_kph: Optional[float] = None,
+                 oneway: bool = False) -> None:
+        u = self._index.get(from_id)
+        v = self._index.get(to_id)
+        if u is None or v is None:
+            raise ValueError(f"Edge {from_id}->{to_id} references a node without coordinates")
+        if length_km is None:
+            length_km = haversine_km(self.lats[u], self.lons[u], self.lats[v], self.lons[v])
+        if minutes is None:
+            minutes = length_km / (speed_kph or DEFAULT_SPEED_KPH) * 60.0
+        if length_km < 0 or minutes < 0:
+            raise ValueError(f"Edge {from_id}->{to_id} has a negative length or time")
+        for a, b in ((u, v),) if oneway else ((u, v), (v, u)):
+            self._from.append(a)
+            self._to.append(b)
+            self._length_km.append(length_km)
+            self._minutes.append(minutes)
+
+    def build(self) -> "RoadGraph":
+        return _pack_csr(self.node_ids, self.lats, self.lons,
+                         self._from, self._to, self._length_km, self._minutes)
+
+
+def _pack_csr(node_ids: List[str], lats: array, lons: array, sources: array, targets_in: array,
+              length_in: array, minutes_in: array) -> "RoadGraph":
+    """Counting sort of an edge list by source node into CSR arrays."""
+    n = len(node_ids)
+    offsets = array('l', [0]) * (n + 1)
+    for u in sources:
+        offsets[u + 1] += 1
+    for i in range(n):
+        offsets[i + 1] += offsets[i]
+    cursor = offsets[:-1]
+    m = len(sources)
+    targets = array('i', [0]) * m
+    length_km = array('d', [0.0]) * m
+    minutes = array('d', [0.0]) * m
+    for e in range(m):
+        u = sources[e]
+        slot = cursor[u]
+        cursor[u] = slot + 1
+        targets[slot] = targets_in[e]
+        length_km[slot] = length_in[e]
+        minutes[slot] = minutes_in[e]
+    return RoadGraph(node_ids, lats, lons, offsets, targets, length_km, minutes)
+
+
+@dataclass
+class RoadGraph:
+    """Directed road graph in CSR form: edges of node u are offsets[u]:offsets[u + 1]."""
+    node_ids: List[str]
+    lats: array
+    lons: array
+    offsets: array
+    targets: array
+    length_km: array
+    minutes: array
+
+    @property
+    def node_count(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.targets)
+
+    def reversed(self) -> "RoadGraph":
+        """Same graph with every edge flipped (distances *to* a node become distances *from* it)."""
+        sources = array('i')
+        for u in range(self.node_count):
+            sources.extend([u] * (self.offsets[u + 1] - self.offsets[u]))
+        return _pack_csr(self.node_ids, self.lats, self.lons, self.targets, sources, self.length_km, self.minutes)
+
+
+def load_edge_csv(path: str, nodes_path: Optional[str] = None) -> RoadGraph:
+    """Reads an edge-list CSV (see module docstring) into a RoadGraph."""
+    builder = RoadGraphBuilder()
+    if nodes_path:
+        with open(nodes_path, "r", encoding="utf-8-sig", newline="") as f:
+            for row in csv.DictReader(f):
+                builder.add_node(row["id"], float(row["lat"]), float(row["lon"]))
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        for row in csv.DictReader(f):
+            u, v = row["from_id"], row["to_id"]
+            if row.get("from_lat"):
+                builder.add_node(u, float(row["from_lat"]), float(row["from_lon"]))
+            if row.get("to_lat"):
+                builder.add_node(v, float(row["to_lat"]), float(row["to_lon"]))
+            length_km = None
+            if row.get("length_km"):
+                length_km = float(row["length_km"])
+            elif row.get("length_m"):
+                length_km = float(row["length_m"]) / 1000.0
+            speed_kph = float(row["speed_kph"]) if row.get("speed_kph") else HIGHWAY_SPEEDS_KPH.get(row.get("highway"))
+            builder.add_edge(
+                u, v, length_km,
+                minutes=float(row["minutes"]) if row.get("minutes") else None,
+                speed_kph=speed_kph,
+                oneway=_truthy(row.get("oneway", ""))
+            )
+    return builder.build()
+
+
+def _parse_maxspeed(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    head = value.split(";")[0].strip().split(" ")[0]
+    try:
+        speed = float(head)
+    except ValueError:
+        return None
+    return speed * 1.609344 if "mph" in value else speed
+
+
+def load_osm_xml(path: str) -> RoadGraph:
+    """
+    Reads an OSM XML extract (.osm). Only ways with a routable `highway` tag
+    are kept; `maxspeed` and `oneway` are honoured. PBF extracts must be
+    converted first (e.g. `osmium cat extract.pbf -o extract.osm`).
+    """
+    import xml.etree.ElementTree as ET
+
+    coords: Dict[str, Tuple[float, float]] = {}
+    ways: List[Tuple[List[str], Dict[str, str]]] = []
+    for _, elem in ET.iterparse(path, events=("end",)):
+        if elem.tag == "node":
+            coords[elem.get("id")] = (float(elem.get("lat")), float(elem.get("lon")))
+            elem.clear()
+        elif elem.tag == "way":
+            tags = {t.get("k"): t.get("v") for t in elem.iter("tag")}
+            if tags.get("highway") in HIGHWAY_SPEEDS_KPH:
+                ways.append(([nd.get("ref") for nd in elem.iter("nd")], tags))
+            elem.clear()
+
+    builder = RoadGraphBuilder()
+    for refs, tags in ways:
+        speed_kph = _parse_maxspeed(tags.get("maxspeed")) or HIGHWAY_SPEEDS_KPH[tags["highway"]]
+        oneway = tags.get("oneway")
+        if oneway == "-1":
+            refs = refs[::-1]
+        is_oneway = _truthy(oneway or "") or tags.get("highway") in ("motorway", "motorway_link")
+        refs = [r for r in refs if r in coords]
+        for a, b in zip(refs, refs[1:]):
+            builder.add_node(a, *coords[a])
+            builder.add_node(b, *coords[b])
+            builder.add_edge(a, b, speed_kph=speed_kph, oneway=is_oneway)
+    return builder.build()
+
+
+def load_graph(path: str, nodes_path: Optional[str] = None) -> RoadGraph:
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return load_edge_csv(path, nodes_path)
+    if ext in (".osm", ".xml"):
+        return load_osm_xml(path)
+    if ext == ".pbf":
+        raise ValueError("OSM PBF is not supported; convert to .osm XML first (osmium cat in.pbf -o out.osm)")
+    raise ValueError(f"Unsupported road graph format '{ext}' for {path} (expected .csv or .osm)")
+
+
+# --- Shortest Paths ---
+def multi_source_dijkstra(
+    offsets: Sequence[int],
+    targets: Sequence[int],
+    primary: Sequence[float],
+    secondary: Sequence[float],
+    sources: Iterable[Tuple[int, float, float, int]]
+) -> Tuple[List[float], List[float], List[int]]:
+    """
+    Dijkstra from several sources at once on `primary` edge weights, also
+    accumulating `secondary` along the chosen paths.
+
+    Args:
+        sources: (node, primary offset, secondary offset, label) per source.
+            The offsets are the access legs, and the label says which
+            source reached a node.
+
+    Returns:
+        (primary cost, secondary cost, label) per node; inf / -1 if unreachable.
+    """
+    n = len(offsets) - 1
+    inf = math.inf
+    cost = [inf] * n
+    other = [inf] * n
+    label = [-1] * n
+    heap = []
+    for node, offset, other_offset, source_label in sources:
+        if offset < cost[node]:
+            cost[node] = offset
+            other[node] = other_offset
+            label[node] = source_label
+            heap.append((offset, node))
+    heapq.heapify(heap)
+
+    pop, push = heapq.heappop, heapq.heappush
+    while heap:
+        c, u = pop(heap)
+        if c > cost[u]:
+            continue  # Stale entry
+        o, lab = other[u], label[u]
+        for e in range(offsets[u], offsets[u + 1]):
+            v = targets[e]
+            nc = c + primary[e]
+            if nc < cost[v]:
+                cost[v] = nc
+                other[v] = o + secondary[e]
+                label[v] = lab
+                push(heap, (nc, v))
+    return cost, other, label
+
+
+_worker_graph: Optional[Tuple[list, list, Dict[str, list]]] = None
+
+
+def _init_worker(offsets: array, targets: array, length_km: array, minutes: array) -> None:
+    global _worker_graph
+    # Plain lists index noticeably faster than arrays in the relaxation loop
+    _worker_graph = (offsets.tolist(), targets.tolist(), {"length": length_km.tolist(), "minutes": minutes.tolist()})
+
+
+def _field_for_source(job: Tuple[int, float, str]) -> Tuple[array, array]:
+    node, access_km, weight = job
+    offsets, targets, weights = _worker_graph
+    access_minutes = access_km / ACCESS_SPEED_KPH * 60.0
+    if weight == "length":
+        km, minutes, _ = multi_source_dijkstra(
+            offsets, targets, weights["length"], weights["minutes"], [(node, access_km, access_minutes, 0)]
+        )
+    else:
+        minutes, km, _ = multi_source_dijkstra(
+            offsets, targets, weights["minutes"], weights["length"], [(node, access_minutes, access_km, 0)]
+        )
+    return array('f', km), array('f', minutes)
+
+
+# --- Distance Field ---
+class NetworkDistanceField:
+    """
+    Per-node network distance (km) and travel time (minutes) to each center.
+
+    Args:
+        node_lats, node_lons: Node coordinates (row = node index).
+        center_locations: { "center_id": (lat, lon) }.
+        length_km / minutes: { "center_id": array('f') per node }.
+        weight: Metric the paths minimise ("length" or "minutes"); the
+            other metric is measured along the same paths.
+    """
+
+    def __init__(
+        self,
+        node_lats: array,
+        node_lons: array,
+        center_locations: Dict[str, Tuple[float, float]],
+        center_nodes: Dict[str, int],
+        length_km: Dict[str, array],
+        minutes: Dict[str, array],
+        weight: str = "length"
+    ):
+        if weight not in WEIGHTS:
+            raise ValueError(f"weight must be one of {WEIGHTS}: {weight}")
+        self.node_lats = node_lats
+        self.node_lons = node_lons
+        self.center_locations = dict(center_locations)
+        self.center_nodes = dict(center_nodes)
+        self.length_km = length_km
+        self.minutes = minutes
+        self.weight = weight
+        self._node_index: Optional[ParcelSpatialIndex] = None
+
+    # --- Building ---
+    @classmethod
+    def compute(
+        cls,
+        graph: RoadGraph,
+        center_locations: Dict[str, Tuple[float, float]],
+        weight: str = "length",
+        workers: int = os.cpu_count() or 1
+    ) -> "NetworkDistanceField":
+        """
+        Snaps every center to the graph and runs one Dijkstra per center on
+        the reversed graph, so one-way streets count in the parcel -> center
+        (commute) direction.
+        """
+        if weight not in WEIGHTS:
+            raise ValueError(f"weight must be one of {WEIGHTS}: {weight}")
+        if graph.node_count == 0:
+            raise ValueError("Road graph has no nodes")
+        field = cls(graph.lats, graph.lons, center_locations, {}, {}, {}, weight)
+        jobs = []
+        for center_id, (lat, lon) in center_locations.items():
+            node, access_km = field._nearest_node(lat, lon)
+            field.center_nodes[center_id] = node
+            jobs.append((node, access_km, weight))
+
+        inbound = graph.reversed()
+        graph_arrays = (inbound.offsets, inbound.targets, inbound.length_km, inbound.minutes)
+        if workers <= 1 or len(jobs) <= 1:
+            _init_worker(*graph_arrays)
+            results = [_field_for_source(job) for job in jobs]
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=min(workers, len(jobs)),
+                                     initializer=_init_worker, initargs=graph_arrays) as pool:
+                results = list(pool.map(_field_for_source, jobs))
+        for center_id, (km, minutes) in zip(center_locations, results):
+            field.length_km[center_id] = km
+            field.minutes[center_id] = minutes
+        return field
+
+    # --- Snapping ---
+    def _nodes(self) -> ParcelSpatialIndex:
+        if self._node_index is None:
+            index = ParcelSpatialIndex(NODE_CELL_SIZE_DEG)
+            for node, (node_lat, node_lon) in enumerate(zip(self.node_lats, self.node_lons)):
+                index.insert(node, node_lat, node_lon)
+            self._node_index = index
+        return self._node_index
+
+    def _nearest_node(self, lat: float, lon: float) -> Tuple[int, float]:
+        return self._nodes().query_nearest(lat, lon, 1)[0]
+
+    def snap(self, lat: float, lon: float, max_snap_km: float = MAX_SNAP_KM) -> Optional[Tuple[int, float]]:
+        """(node, access km) of the nearest node, or None if it is beyond `max_snap_km`."""
+        # Growing radius searches stay local, where an unbounded nearest
+        # search would walk the whole grid for parcels far off the network
+        index = self._nodes()
+        radius = min(SNAP_START_KM, max_snap_km)
+        while True:
+            hits = index.query_radius(lat, lon, radius, with_distance=True)
+            if hits:
+                return hits[0]
+            if radius >= max_snap_km:
+                return None
+            radius = min(radius * 4.0, max_snap_km)
+
+    # --- Engine Integration ---
+    def distance_map(self, lat: float, lon: float, max_snap_km: float = MAX_SNAP_KM) -> Optional[Dict[str, float]]:
+        """
+        { center_id: network km } for a location, in the shape
+        calculate_polycentric_density expects. Unreachable centers are
+        left out. Returns None if the location cannot be snapped.
+        """
+        snapped = self.snap(lat, lon, max_snap_km)
+        if snapped is None:
+            return None
+        node, access_km = snapped
+        return {
+            center_id: access_km + column[node]
+            for center_id, column in self.length_km.items()
+            if column[node] != math.inf
+        }
+
+    def travel_time_map(self, lat: float, lon: float, max_snap_km: float = MAX_SNAP_KM) -> Optional[Dict[str, float]]:
+        """{ center_id: minutes } including the access leg at ACCESS_SPEED_KPH."""
+        snapped = self.snap(lat, lon, max_snap_km)
+        if snapped is None:
+            return None
+        node, access_km = snapped
+        access_minutes = access_km / ACCESS_SPEED_KPH * 60.0
+        return {
+            center_id: access_minutes + column[node]
+            for center_id, column in self.minutes.items()
+            if column[node] != math.inf
+        }
+
+    def parcel_columns(
+        self,
+        parcels: Iterable,
+        max_snap_km: float = MAX_SNAP_KM
+    ) -> Tuple[List[str], Dict[str, array], List[str]]:
+        """
+        Network distance columns for parcels (LandParcel objects or dicts):
+        (ids, { center_id: array('d') of km }, unsnapped ids). Unsnapped or
+        unreachable rows hold inf. The columns fit ProjectionInputs and
+        CenterDistanceStage-style consumers.
+        """
+        ids: List[str] = []
+        unsnapped: List[str] = []
+        columns = {center_id: array('d') for center_id in self.length_km}
+        for parcel in parcels:
+            if isinstance(parcel, dict):
+                parcel_id, text = parcel["id"], parcel.get("gps_coordinates")
+            else:
+                parcel_id, text = parcel.id, parcel.gps_coordinates
+            ids.append(parcel_id)
+            try:
+                snapped = self.snap(*parse_gps_coordinates(text), max_snap_km)
+            except (TypeError, ValueError):
+                snapped = None
+            if snapped is None:
+                unsnapped.append(parcel_id)
+                for column in columns.values():
+                    column.append(math.inf)
+                continue
+            node, access_km = snapped
+            for center_id, column in columns.items():
+                column.append(access_km + self.length_km[center_id][node])
+        return ids, columns, unsnapped
+
+    # --- Persistence ---
+    def save(self, path: str) -> None:
+        """Writes the field (node coordinates plus per-center columns) without the graph."""
+        center_ids = list(self.length_km)
+        meta = json.dumps({
+            "centers": {cid: list(self.center_locations[cid]) for cid in center_ids},
+            "centerNodes": {cid: self.center_nodes[cid] for cid in center_ids},
+            "order": center_ids,
+        }, ensure_ascii=False).encode("utf-8")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_FIELD_HEADER.pack(
+                FIELD_MAGIC, FIELD_VERSION, WEIGHTS.index(self.weight),
+                len(self.node_lats), len(center_ids), len(meta)
+            ))
+            f.write(meta)
+            _le(array('d', self.node_lats)).tofile(f)
+            _le(array('d', self.node_lons)).tofile(f)
+            for cid in center_ids:
+                _le(array('f', self.length_km[cid])).tofile(f)
+                _le(array('f', self.minutes[cid])).tofile(f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "NetworkDistanceField":
+        with open(path, "rb") as f:
+            magic, version, weight, n_nodes, _, meta_len = _FIELD_HEADER.unpack(f.read(_FIELD_HEADER.size))
+            if magic != FIELD_MAGIC or version != FIELD_VERSION:
+                raise ValueError(f"Not a network distance field (v{FIELD_VERSION}): {path}")
+            meta = json.loads(f.read(meta_len).decode("utf-8"))
+
+            def read(typecode: str) -> array:
+                column = array(typecode)
+                column.fromfile(f, n_nodes)
+                return _le(column)
+
+            lats, lons = read('d'), read('d')
+            length_km, minutes = {}, {}
+            for cid in meta["order"]:
+                length_km[cid] = read('f')
+                minutes[cid] = read('f')
+        return cls(
+            lats, lons,
+            {cid: tuple(loc) for cid, loc in meta["centers"].items()},
+            meta["centerNodes"], length_km, minutes, WEIGHTS[weight]
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Network distance field from an offline road graph")
+    parser.add_argument("--graph", required=True, help="Edge-list CSV or OSM XML extract")
+    parser.add_argument("--nodes", help="Node CSV (id, lat, lon) if the edge CSV has no coordinates")
+    parser.add_argument("--centers", required=True, metavar="JSON",
+                        help='Centers file: { "CBD": {"lat": .., "lon": ..}, ... }')
+    parser.add_argument("--output", required=True, help="Field file to write")
+    parser.add_argument("--weight", choices=WEIGHTS, default="length")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    with open(args.centers, "r", encoding="utf-8") as f:
+        centers = {cid: (c["lat"], c["lon"]) for cid, c in json.load(f).items()}
+
+    started = time.perf_counter()
+    graph = load_graph(args.graph, args.nodes)
+    loaded = time.perf_counter()
+    field = NetworkDistanceField.compute(graph, centers, args.weight, args.workers)
+    computed = time.perf_counter()
+    field.save(args.output)
+    print(f"Graph: {graph.node_count:,} nodes, {graph.edge_count:,} directed edges ({loaded - started:.1f}s)")
+    print(f"Field: {len(centers)} centers by {args.weight} ({computed - loaded:.1f}s) -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
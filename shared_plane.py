@@ -0,0 +1,483 @@
+"""
+Shared-Memory Data Plane
+Column tables in one `multiprocessing.shared_memory` block, so process-pool
+audits stop pickling parcel and lease data to every worker.
+
+The parent stages the input columns (parcels, center configs, lease
+table) and preallocated output columns into a SharedPlane. Each worker
+attaches once, from a small picklable PlaneSchema (block name plus a
+name -> typecode/offset/length layout), and reads the columns as
+zero-copy memoryviews. Tasks then carry only (kernel, start, stop);
+workers write their rows straight into the output columns and return a
+row count.
+
+Kernels:
+    density   theoretical density (mono- or polycentric), efficiency index,
+              status code (density_projection.STATUSES) and FAR gap per parcel
+    npv       state NPV per lease row (financial_audit.state_npv)
+
+Benchmark (pickled chunks vs. shared plane at the same worker count):
+    python shared_plane.py --parcels 1000000 --leases 200000 --workers 8
+
+Author: BaanBid Development Team
+"""
+
+import argparse
+import math
+import os
+import pickle
+import sys
+import time
+from array import array
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from density_projection import status_code
+
+
+# --- Constants ---
+ALIGNMENT = 8
+DEFAULT_CHUNK_ROWS = 65_536
+
+# Column layouts of the staged tables: name -> array typecode
+PARCEL_COLUMNS = {
+    "distance_km": 'd',     # Distance to the CBD (monocentric kernel)
+    "proposed_far": 'd',
+    "legal_far": 'd',       # NaN = no legal limit
+    "zone_code": 'H',       # Index into schema.categories["zone"]
+}
+CENTER_COLUMNS = {"center_d0": 'd', "center_g": 'd'}
+LEASE_COLUMNS = {
+    "upfront_fee": 'd',
+    "initial_annual_rent": 'd',
+    "lease_term_years": 'i',
+    "discount_rate": 'd',
+    "investment_cost": 'd',
+    "asset_useful_life_years": 'i',
+    "rent_escalation_rate": 'd',
+    "escalation_interval_years": 'i',
+}
+DENSITY_OUTPUTS = {"theoretical_density": 'd', "efficiency_index": 'd', "status_code": 'b', "far_gap": 'd'}
+NPV_OUTPUTS = {"npv": 'd'}
+
+
+@dataclass(frozen=True)
+class ColumnLayout:
+    typecode: str
+    offset: int
+    length: int
+
+
+@dataclass(frozen=True)
+class PlaneSchema:
+    """Picklable descriptor: everything a worker needs to attach (a few hundred bytes)."""
+    shm_name: str
+    size: int
+    columns: Dict[str, ColumnLayout]
+    categories: Dict[str, Tuple[str, ...]] = field(default_factory=dict)
+    meta: Dict[str, object] = field(default_factory=dict)
+
+
+# --- Plane ---
+class SharedPlane:
+    """
+    Named columns in a single shared-memory block.
+
+    Create in the parent with `SharedPlane.create(...)` and attach in
+    workers with `SharedPlane.attach(schema)`. Only the creator unlinks the
+    block (`close()`, or leaving the `with` block).
+    """
+
+    def __init__(self, shm, schema: PlaneSchema, owner: bool):
+        self._shm = shm
+        self.schema = schema
+        self._owner = owner
+        self._views: Dict[str, memoryview] = {}
+        # Parent-side row bookkeeping set by stage_parcels (never shipped to workers)
+        self.ids: List = []
+        self.skipped: List = []
+
+    @classmethod
+    def create(
+        cls,
+        columns: Dict[str, Tuple[str, object]],
+        categories: Optional[Dict[str, Sequence[str]]] = None,
+        meta: Optional[Dict[str, object]] = None
+    ) -> "SharedPlane":
+        """
+        Args:
+            columns: { name: (typecode, data) }, where data is a sequence to
+                copy in or an int row count for a zeroed output column.
+        """
+        from multiprocessing import shared_memory
+
+        layout: Dict[str, ColumnLayout] = {}
+        offset = 0
+        for name, (typecode, data) in columns.items():
+            length = data if isinstance(data, int) else len(data)
+            layout[name] = ColumnLayout(typecode, offset, length)
+            nbytes = length * array(typecode).itemsize
+            offset += (nbytes + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+        size = max(offset, ALIGNMENT)
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        schema = PlaneSchema(
+            shm.name, size, layout,
+            {key: tuple(values) for key, values in (categories or {}).items()},
+            dict(meta or {})
+        )
+        plane = cls(shm, schema, owner=True)
+        for name, (typecode, data) in columns.items():
+            if not isinstance(data, int):
+                source = data if isinstance(data, array) and data.typecode == typecode else array(typecode, data)
+                plane[name][:] = memoryview(source).cast('B').cast(typecode)
+        return plane
+
+    @classmethod
+    def attach(cls, schema: PlaneSchema) -> "SharedPlane":
+        from multiprocessing import shared_memory
+
+        return cls(shared_memory.SharedMemory(name=schema.shm_name), schema, owner=False)
+
+    def __getitem__(self, name: str) -> memoryview:
+        """Zero-copy typed view of a column."""
+        view = self._views.get(name)
+        if view is None:
+            layout = self.schema.columns[name]
+            nbytes = layout.length * array(layout.typecode).itemsize
+            view = self._shm.buf[layout.offset:layout.offset + nbytes].cast(layout.typecode)
+            self._views[name] = view
+        return view
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.schema.columns
+
+    def column(self, name: str) -> array:
+        """Private copy of a column (e.g. results to keep after close())."""
+        return array(self.schema.columns[name].typecode, self[name])
+
+    def close(self) -> None:
+        for view in self._views.values():
+            view.release()
+        self._views.clear()
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+    def __enter__(self) -> "SharedPlane":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# --- Staging ---
+def _get(record, name: str):
+    return record.get(name) if isinstance(record, dict) else getattr(record, name, None)
+
+
+def _as_distance(value) -> Optional[float]:
+    """Float km, or None when missing, not a number or NaN."""
+    try:
+        distance = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if distance != distance else distance
+
+
+def stage_parcels(
+    parcels: Sequence,
+    centers_config: Optional[Dict[str, Dict[str, float]]] = None,
+    distance_columns: Optional[Dict[str, Sequence[float]]] = None,
+    d0: Optional[float] = None,
+    g: Optional[float] = None
+) -> SharedPlane:
+    """
+    Stages LandParcel objects (or dicts) for the density kernel.
+
+    Monocentric: pass d0 and g; distances come from distance_from_cbd_km.
+    Polycentric: pass centers_config and one distance column per center
+    (e.g. CenterDistanceStage.distances or NetworkDistanceField.parcel_columns),
+    each with one row per parcel.
+
+    Parcels without a usable distance (missing, not a number or NaN) are
+    not staged; their ids are in `plane.skipped`, and `plane.ids` holds
+    the id of every staged row in row order.
+    """
+    n = len(parcels)
+    center_ids: List[str] = []
+    if centers_config:
+        center_ids = [cid for cid in centers_config if distance_columns and cid in distance_columns]
+        if not center_ids:
+            raise ValueError("Polycentric staging needs a distance column for at least one center")
+        for cid in center_ids:
+            if len(distance_columns[cid]) != n:
+                raise ValueError(
+                    f"Distance column for center '{cid}' has {len(distance_columns[cid])} rows, "
+                    f"expected one per parcel ({n})"
+                )
+    elif d0 is None or g is None:
+        raise ValueError("Pass d0 and g (monocentric) or centers_config (polycentric)")
+
+    zones: Dict[str, int] = {}
+    distance, proposed, legal, zone_code = array('d'), array('d'), array('d'), array('H')
+    center_distances = [array('d') for _ in center_ids]
+    ids, skipped = [], []
+    for row, parcel in enumerate(parcels):
+        cbd_km = _as_distance(_get(parcel, "distance_from_cbd_km"))
+        if center_ids:
+            row_km = [_as_distance(distance_columns[cid][row]) for cid in center_ids]
+            usable = None not in row_km
+        else:
+            usable = cbd_km is not None
+        if not usable:
+            skipped.append(_get(parcel, "id"))
+            continue
+        ids.append(_get(parcel, "id"))
+        distance.append(math.nan if cbd_km is None else cbd_km)
+        for column, km in zip(center_distances, row_km if center_ids else ()):
+            column.append(km)
+        proposed.append(_get(parcel, "current_far") or 0.0)
+        limit = _get(parcel, "legal_far_limit")
+        legal.append(math.nan if limit is None else limit)
+        zone = _get(parcel, "zone_color") or ""
+        zone_code.append(zones.setdefault(zone, len(zones)))
+
+    rows = len(ids)
+    staged = {"distance_km": distance, "proposed_far": proposed, "legal_far": legal, "zone_code": zone_code}
+    columns: Dict[str, Tuple[str, object]] = {
+        name: (typecode, staged[name]) for name, typecode in PARCEL_COLUMNS.items()
+    }
+    meta: Dict[str, object] = {"rows": rows}
+    categories = {"zone": list(zones)}
+    if center_ids:
+        columns["center_d0"] = (CENTER_COLUMNS["center_d0"], [centers_config[cid].get("d0", 0) for cid in center_ids])
+        columns["center_g"] = (CENTER_COLUMNS["center_g"], [centers_config[cid].get("g", 0) for cid in center_ids])
+        for k, column in enumerate(center_distances):
+            columns[f"center_distance_{k}"] = ('d', column)
+        categories["center"] = center_ids
+    else:
+        meta.update(d0=d0, g=g)
+    for name, typecode in DENSITY_OUTPUTS.items():
+        columns[name] = (typecode, rows)
+    plane = SharedPlane.create(columns, categories, meta)
+    plane.ids, plane.skipped = ids, skipped
+    return plane
+
+
+def stage_leases(leases: Sequence[Dict[str, float]]) -> SharedPlane:
+    """
+    Stages lease rows (dicts or FinancialParams-like objects with the
+    FinancialParams field names) for the npv kernel. Rows must already be
+    validated (FinancialParams bounds).
+    """
+    defaults = {"rent_escalation_rate": 0.15, "escalation_interval_years": 3}
+    columns: Dict[str, Tuple[str, object]] = {}
+    for name, typecode in LEASE_COLUMNS.items():
+        values = []
+        for lease in leases:
+            value = _get(lease, name)
+            values.append(defaults[name] if value is None and name in defaults else value)
+        columns[name] = (typecode, values)
+    for name, typecode in NPV_OUTPUTS.items():
+        columns[name] = (typecode, len(leases))
+    return SharedPlane.create(columns, meta={"rows": len(leases)})
+
+
+# --- Kernels (run in workers on [start, stop)) ---
+def density_kernel(plane: SharedPlane, start: int, stop: int) -> int:
+    """Same math as BertaudAuditEngine.calculate_optimal_density / calculate_polycentric_density."""
+    schema = plane.schema
+    exp = math.exp
+    if "center_d0" in plane:
+        theoretical = [0.0] * (stop - start)
+        for k, (d0_i, g_i) in enumerate(zip(plane["center_d0"], plane["center_g"])):
+            column = plane[f"center_distance_{k}"][start:stop]
+            theoretical = [t + d0_i * exp(-g_i * x) for t, x in zip(theoretical, column)]
+    else:
+        d0, g = schema.meta["d0"], schema.meta["g"]
+        theoretical = [d0 * exp(-g * x) for x in plane["distance_km"][start:stop]]
+
+    yellow = [("yellow" in zone.lower()) for zone in schema.categories["zone"]]
+    efficiency = [p / t if t != 0 else 0.0 for p, t in zip(plane["proposed_far"][start:stop], theoretical)]
+    plane["theoretical_density"][start:stop] = array('d', theoretical)
+    plane["efficiency_index"][start:stop] = array('d', efficiency)
+    plane["status_code"][start:stop] = array('b', [
+        status_code(e, yellow[z]) for e, z in zip(efficiency, plane["zone_code"][start:stop])
+    ])
+    plane["far_gap"][start:stop] = array('d', [
+        t - l for t, l in zip(theoretical, plane["legal_far"][start:stop])  # NaN stays NaN
+    ])
+    return stop - start
+
+
+def npv_kernel(plane: SharedPlane, start: int, stop: int) -> int:
+    from financial_audit import state_npv
+
+    columns = [plane[name][start:stop] for name in LEASE_COLUMNS]
+    plane["npv"][start:stop] = array('d', [state_npv(*row) for row in zip(*columns)])
+    return stop - start
+
+
+KERNELS: Dict[str, Callable[[SharedPlane, int, int], int]] = {
+    "density": density_kernel,
+    "npv": npv_kernel,
+}
+
+
+# --- Process Pool ---
+_worker_planes: Dict[str, SharedPlane] = {}
+
+
+def _attach_worker(schemas: Sequence[PlaneSchema]) -> None:
+    for schema in schemas:
+        _worker_planes[schema.shm_name] = SharedPlane.attach(schema)
+
+
+def _run_task(task: Tuple[str, str, int, int]) -> int:
+    kernel, shm_name, start, stop = task
+    return KERNELS[kernel](_worker_planes[shm_name], start, stop)
+
+
+def run_kernel(
+    plane: SharedPlane,
+    kernel: str,
+    workers: int = os.cpu_count() or 1,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    pool=None
+) -> int:
+    """
+    Runs `kernel` over every row of `plane`, writing its output columns in
+    place. Pass a `pool` from `make_pool([...schemas])` to reuse attached
+    workers across calls; otherwise a pool is created for this call.
+    Returns the number of rows processed.
+    """
+    rows = plane.schema.meta["rows"]
+    tasks = [(kernel, plane.schema.shm_name, start, min(start + chunk_rows, rows))
+             for start in range(0, rows, chunk_rows)]
+    if pool is None and workers <= 1:
+        return sum(KERNELS[kernel](plane, start, stop) for _, _, start, stop in tasks)
+    if pool is not None:
+        return sum(pool.map(_run_task, tasks))
+    with make_pool([plane.schema], workers) as own_pool:
+        return sum(own_pool.map(_run_task, tasks))
+
+
+def make_pool(schemas: Sequence[PlaneSchema], workers: int = os.cpu_count() or 1):
+    """Process pool whose workers attach to `schemas` once at start-up."""
+    from concurrent.futures import ProcessPoolExecutor
+
+    return ProcessPoolExecutor(max_workers=workers, initializer=_attach_worker, initargs=(list(schemas),))
+
+
+# --- Benchmark ---
+def _pickled_density_chunk(job: Tuple[float, float, List[Tuple[float, float, float, str]]]) -> List[Tuple[float, float, int, float]]:
+    """Baseline: the chunk's rows travel to the worker and results travel back, both pickled."""
+    d0, g, rows = job
+    exp = math.exp
+    out = []
+    for distance, proposed, legal, zone in rows:
+        t = d0 * exp(-g * distance)
+        e = proposed / t if t != 0 else 0.0
+        out.append((t, e, status_code(e, "yellow" in zone.lower()), t - legal))
+    return out
+
+
+def _pickled_npv_chunk(rows: List[Tuple]) -> List[float]:
+    from financial_audit import state_npv
+
+    return [state_npv(*row) for row in rows]
+
+
+def _synthetic(n_parcels: int, n_leases: int, seed: int = 42):
+    import random
+
+    rng = random.Random(seed)
+    zones = ("Red", "Orange", "Yellow", "Brown", "")
+    parcels = [
+        {"distance_from_cbd_km": rng.uniform(0.1, 40.0), "current_far": rng.uniform(0.5, 12.0),
+         "legal_far_limit": rng.choice((4.0, 6.0, 8.0, 10.0)), "zone_color": rng.choice(zones)}
+        for _ in range(n_parcels)
+    ]
+    leases = [
+        {"upfront_fee": rng.uniform(0, 1e8), "initial_annual_rent": rng.uniform(1e6, 5e7),
+         "lease_term_years": rng.choice((30, 50, 99)), "discount_rate": rng.uniform(0.02, 0.08),
+         "investment_cost": rng.uniform(1e8, 5e9), "asset_useful_life_years": 50,
+         "rent_escalation_rate": 0.15, "escalation_interval_years": 3}
+        for _ in range(n_leases)
+    ]
+    return parcels, leases
+
+
+def benchmark(n_parcels: int, n_leases: int, workers: int, chunk_rows: int) -> Dict[str, Dict[str, float]]:
+    """Wall time and bytes shipped per run: pickled chunks vs. shared plane (same pool size)."""
+    from concurrent.futures import ProcessPoolExecutor
+
+    d0, g = 20.0, 0.15
+    parcels, leases = _synthetic(n_parcels, n_leases)
+    report: Dict[str, Dict[str, float]] = {}
+
+    # Pickled baseline: rows in, results out
+    parcel_rows = [(p["distance_from_cbd_km"], p["current_far"], p["legal_far_limit"], p["zone_color"]) for p in parcels]
+    lease_rows = [tuple(lease[name] for name in LEASE_COLUMNS) for lease in leases]
+    density_jobs = [(d0, g, parcel_rows[i:i + chunk_rows]) for i in range(0, n_parcels, chunk_rows)]
+    npv_jobs = [lease_rows[i:i + chunk_rows] for i in range(0, n_leases, chunk_rows)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(abs, range(workers)))  # Start workers outside the timing
+        started = time.perf_counter()
+        density_out = list(pool.map(_pickled_density_chunk, density_jobs))
+        npv_out = list(pool.map(_pickled_npv_chunk, npv_jobs))
+        elapsed = time.perf_counter() - started
+    shipped = sum(len(pickle.dumps(job, pickle.HIGHEST_PROTOCOL)) for job in density_jobs + npv_jobs)
+    shipped += sum(len(pickle.dumps(out, pickle.HIGHEST_PROTOCOL)) for out in density_out + npv_out)
+    report["pickled"] = {"seconds": elapsed, "bytesShipped": shipped}
+
+    # Shared plane: staging is a one-off copy in the parent, reported separately
+    started = time.perf_counter()
+    parcel_plane = stage_parcels(parcels, d0=d0, g=g)
+    lease_plane = stage_leases(leases)
+    staging = time.perf_counter() - started
+    try:
+        schemas = [parcel_plane.schema, lease_plane.schema]
+        with make_pool(schemas, workers) as pool:
+            list(pool.map(abs, range(workers)))
+            started = time.perf_counter()
+            run_kernel(parcel_plane, "density", chunk_rows=chunk_rows, pool=pool)
+            run_kernel(lease_plane, "npv", chunk_rows=chunk_rows, pool=pool)
+            elapsed = time.perf_counter() - started
+        tasks = -(-n_parcels // chunk_rows) + -(-n_leases // chunk_rows)
+        shipped = tasks * len(pickle.dumps(("density", parcel_plane.schema.shm_name, 0, 0), pickle.HIGHEST_PROTOCOL))
+        shipped += tasks * len(pickle.dumps(chunk_rows, pickle.HIGHEST_PROTOCOL))
+        report["shared"] = {"seconds": elapsed, "bytesShipped": shipped, "stagingSeconds": staging}
+
+        # Same answers both ways
+        flat = [row for chunk in density_out for row in chunk]
+        same = all(status == s for (_, _, status, _), s in zip(flat, parcel_plane["status_code"]))
+        same = same and all(a == b for a, b in zip((v for chunk in npv_out for v in chunk), lease_plane["npv"]))
+        if not same:
+            raise RuntimeError("Shared-plane results differ from the pickled baseline")
+    finally:
+        parcel_plane.close()
+        lease_plane.close()
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Shared-memory vs. pickled process-pool audits")
+    parser.add_argument("--parcels", type=int, default=1_000_000)
+    parser.add_argument("--leases", type=int, default=200_000)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    args = parser.parse_args(argv)
+
+    report = benchmark(args.parcels, args.leases, args.workers, args.chunk_rows)
+    print(f"{args.parcels:,} parcels + {args.leases:,} leases, {args.workers} workers, "
+          f"{args.chunk_rows:,} rows per task")
+    print(f"{'mode':<8} {'seconds':>9} {'bytes shipped':>15}")
+    for mode, row in report.items():
+        print(f"{mode:<8} {row['seconds']:>9.2f} {row['bytesShipped']:>15,}")
+    print(f"(shared staging, one-off: {report['shared']['stagingSeconds']:.2f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""
+Content-Addressed Economic Parameter Snapshots
+Stores each distinct `economic_parameters_snapshot` once, keyed by the
+SHA-256 of its canonical JSON, and lets ProjectProposal documents refer
+to it through `economic_parameters_hash`.
+
+Decoding goes through an in-process intern cache: every proposal that
+references the same hash gets the same snapshot dict object, so loading
+100k proposals holds one copy per parameter version. Interned snapshots
+are shared and must be treated as read-only.
+
+Collection: 'economic_parameter_snapshots'
+
+Author: BaanBid Development Team
+"""
+
+import hashlib
+import json
+from dataclasses import fields
+from typing import Dict, Iterable, List, Optional, Union
+
+from firestore_models import EconomicParameters, ProjectProposal
+
+
+# --- Constants ---
+SNAPSHOT_COLLECTION = "economic_parameter_snapshots"
+_PROPOSAL_FIELDS = {f.name for f in fields(ProjectProposal)}
+_PARAMETER_FIELDS = {f.name for f in fields(EconomicParameters)}
+
+
+def snapshot_hash(snapshot: Dict) -> str:
+    """SHA-256 hex digest of the snapshot's canonical JSON form."""
+    canonical = json.dumps(snapshot, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ParameterSnapshotStore:
+    """
+    In-process store and intern cache of parameter snapshots.
+
+    `put()` registers a snapshot and returns its hash; `get()` returns the
+    shared dict for a hash. Use `to_documents()` / `load_documents()` to
+    persist the store to the snapshot collection.
+    """
+
+    def __init__(self):
+        self._snapshots: Dict[str, Dict] = {}
+        self._parameters: Dict[str, EconomicParameters] = {}
+
+    def __len__(self) -> int:
+        return len(self._snapshots)
+
+    def __contains__(self, digest: str) -> bool:
+        return digest in self._snapshots
+
+    @staticmethod
+    def hash_of(snapshot: Union[Dict, EconomicParameters]) -> str:
+        """Hash a snapshot would be stored under, without registering it."""
+        if isinstance(snapshot, EconomicParameters):
+            snapshot = snapshot.to_dict()
+        return snapshot_hash(snapshot)
+
+    def put(self, snapshot: Union[Dict, EconomicParameters]) -> str:
+        """Registers a snapshot (dict or EconomicParameters) and returns its hash."""
+        if isinstance(snapshot, EconomicParameters):
+            snapshot = snapshot.to_dict()
+        digest = snapshot_hash(snapshot)
+        if digest not in self._snapshots:
+            self._snapshots[digest] = dict(snapshot)
+        return digest
+
+    def intern(self, snapshot: Dict) -> Dict:
+        """Returns the shared copy of an equal snapshot, registering it if new."""
+        return self._snapshots[self.put(snapshot)]
+
+    def get(self, digest: str) -> Dict:
+        """Returns the shared snapshot dict for `digest`."""
+        try:
+            return self._snapshots[digest]
+        except KeyError:
+            raise KeyError(f"Unknown economic parameter snapshot: {digest}") from None
+
+    def get_parameters(self, digest: str) -> EconomicParameters:
+        """
+        Returns one shared EconomicParameters object per snapshot hash.
+        Snapshot keys that are not EconomicParameters fields (written by
+        other tools or older schemas) are ignored.
+        """
+        params = self._parameters.get(digest)
+        if params is None:
+            snapshot = self.get(digest)
+            params = EconomicParameters(**{k: v for k, v in snapshot.items() if k in _PARAMETER_FIELDS})
+            self._parameters[digest] = params
+        return params
+
+    # --- Proposal Encoding ---
+    def encode_proposal(self, proposal: ProjectProposal) -> Dict:
+        """
+        Produces the document to store: the embedded snapshot is replaced by
+        `economic_parameters_hash` (the snapshot itself goes into the store).
+        """
+        doc = proposal.to_dict()
+        snapshot = doc.pop("economic_parameters_snapshot") or {}
+        if snapshot:
+            doc["economic_parameters_hash"] = self.put(snapshot)
+        doc["economic_parameters_snapshot"] = {}
+        return doc
+
+    def decode_proposal(self, doc: Dict) -> ProjectProposal:
+        """
+        Builds a ProjectProposal from a stored document. Hash references
+        resolve to the interned snapshot; legacy documents that still embed
+        a full snapshot are interned as well.
+        """
+        data = {k: v for k, v in doc.items() if k in _PROPOSAL_FIELDS}
+        digest = data.get("economic_parameters_hash")
+        if digest:
+            data["economic_parameters_snapshot"] = self.get(digest)
+        elif data.get("economic_parameters_snapshot"):
+            snapshot = self.intern(data["economic_parameters_snapshot"])
+            data["economic_parameters_snapshot"] = snapshot
+            data["economic_parameters_hash"] = snapshot_hash(snapshot)
+        return ProjectProposal(**data)
+
+    def decode_proposals(self, docs: Iterable[Dict]) -> List[ProjectProposal]:
+        """Bulk decode; proposals sharing a parameter version share one snapshot object."""
+        return [self.decode_proposal(doc) for doc in docs]
+
+    # --- Persistence ---
+    def to_documents(self) -> Dict[str, Dict]:
+        """{ hash: snapshot } ready to write to the snapshot collection."""
+        return dict(self._snapshots)
+
+    def load_documents(self, documents: Dict[str, Dict], verify: bool = True) -> None:
+        """
+        Loads { hash: snapshot } documents. With `verify`, each hash is
+        recomputed and a mismatch raises ValueError.
+        """
+        for digest, snapshot in documents.items():
+            if verify and snapshot_hash(snapshot) != digest:
+                raise ValueError(f"Snapshot content does not match its hash: {digest}")
+            self._snapshots.setdefault(digest, dict(snapshot))
+
+
+# Process-wide default store used by callers that do not manage their own
+_default_store: Optional[ParameterSnapshotStore] = None
+
+
+def get_default_store() -> ParameterSnapshotStore:
+    global _default_store
+    if _default_store is None:
+        _default_store = ParameterSnapshotStore()
+    return _default_store
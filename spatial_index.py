@@ -0,0 +1,372 @@
+"""
+Spatial Index for Land Parcels
+Parses LandParcel.gps_coordinates ("lat, lon") once into float arrays and
+maintains a uniform grid hash over them for radius, bounding-box and
+k-nearest queries.
+
+Cells are fixed in degrees; radius and k-nearest results are always
+confirmed with the exact haversine distance, so the grid only prunes
+candidates and never changes the answer.
+
+Longitudes wrap: grid columns run round the globe, so radius, bbox and
+k-nearest queries near +-180 see parcels on both sides of the antimeridian.
+
+Measured cost with parcels spread over ~0.5 x 0.6 degrees and 0.01 degree
+cells (pure Python, see verify_spatial_index.py). The cost follows the hit
+count, since every id returned is a Python object:
+  - 200k parcels: 3 km radius ~1.9 ms (~1,560 hits), 0.5 km ~0.13 ms
+  - 1M parcels:   3 km radius ~12.5 ms (~7,900 hits), 1 km ~2.3 ms,
+                  0.5 km ~0.7 ms (~220 hits)
+Sub-millisecond queries at 1M parcels therefore hold only for radii up to
+about 0.5 km. `with_distance=True` costs roughly 2.5x more (sqrt/asin and
+a sort per hit).
+
+Author: BaanBid Development Team
+"""
+
+import bisect
+import heapq
+import math
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+# --- Constants ---
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = EARTH_RADIUS_KM * math.pi / 180.0
+DEFAULT_CELL_SIZE_DEG = 0.01  # ~1.1 km at Bangkok latitude
+WHOLE_CELL_MAX_RADIUS_KM = 1000.0  # Corner test bounds a cell only for radii well under a quarter circumference
+
+
+# --- Coordinate Helpers ---
+def parse_gps_coordinates(text: str) -> Tuple[float, float]:
+    """
+    Parses a free-text "lat, lon" string into (lat, lon) floats.
+
+    Raises:
+        ValueError: if the string is not two numbers or is out of range.
+    """
+    if text is None:
+        raise ValueError("GPS coordinates are missing")
+    parts = text.replace(";", ",").split(",")
+    if len(parts) != 2:
+        raise ValueError(f"GPS coordinates must be 'lat, lon': {text!r}")
+    lat = float(parts[0].strip())
+    lon = float(parts[1].strip())
+    if not (-90.0 <= lat <= 90.0) or not (-180.0 <= lon <= 180.0):
+        raise ValueError(f"GPS coordinates out of range: {text!r}")
+    return lat, lon
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in km between two (lat, lon) points."""
+    p1 = math.radians(lat1)
+    p2 = math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lon2 - lon1)
+    a = math.sin(dp / 2.0) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2.0) ** 2
+    return 2.0 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _lon_gap(lon_a: float, lon_b: float) -> float:
+    """Absolute longitude difference in degrees, taken the short way round."""
+    return abs((lon_a - lon_b + 180.0) % 360.0 - 180.0)
+
+
+class ParcelSpatialIndex:
+    """
+    Grid-hash index over parcel coordinates.
+
+    Coordinates live in parallel `array('d')` columns (`lats`, `lons`) and
+    `ids`; each grid cell holds its row numbers sorted by latitude, next to
+    the sorted latitudes, so queries can bisect to the rows of a band.
+    Rows are append-only so row numbers stay stable for callers that keep
+    their own per-row arrays (see `geodesic_distance`).
+
+    Longitudes are stored in [-180, 180) and grid columns wrap, so queries
+    that cross the antimeridian see parcels on both sides. `cell_size_deg`
+    is rounded down so a whole number of columns spans 360 degrees.
+    """
+
+    def __init__(self, cell_size_deg: float = DEFAULT_CELL_SIZE_DEG):
+        if cell_size_deg <= 0:
+            raise ValueError(f"cell_size_deg must be positive: {cell_size_deg}")
+        self._columns_total = max(1, math.ceil(360.0 / cell_size_deg - 1e-9))
+        self.cell_size_deg = 360.0 / self._columns_total
+        self.ids: List[str] = []
+        self.lats = array('d')
+        self.lons = array('d')
+        self.invalid_ids: List[str] = []  # Parcels whose coordinates failed to parse
+        self._cos_lats = array('d')
+        self._row_by_id: Dict[str, int] = {}
+        self._alive: List[bool] = []
+        self._cells: Dict[Tuple[int, int], List[int]] = {}
+        self._cell_lats: Dict[Tuple[int, int], List[float]] = {}  # Sorted, parallel to _cells
+        self._max_abs_lat = 0.0
+        self._extent: Optional[List[int]] = None  # [min_ci, max_ci, min_cj, max_cj] ever populated
+
+    def __len__(self) -> int:
+        return len(self._row_by_id)
+
+    # --- Building ---
+    @classmethod
+    def from_parcels(cls, parcels: Iterable, cell_size_deg: float = DEFAULT_CELL_SIZE_DEG) -> "ParcelSpatialIndex":
+        """
+        Builds an index from LandParcel objects (or dicts with the same keys).
+        Parcels with unparseable coordinates are listed in `invalid_ids`.
+        """
+        index = cls(cell_size_deg)
+        for parcel in parcels:
+            if isinstance(parcel, dict):
+                parcel_id, text = parcel["id"], parcel.get("gps_coordinates")
+            else:
+                parcel_id, text = parcel.id, parcel.gps_coordinates
+            try:
+                lat, lon = parse_gps_coordinates(text)
+            except (TypeError, ValueError):
+                index.invalid_ids.append(parcel_id)
+                continue
+            index.insert(parcel_id, lat, lon)
+        return index
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return (
+            math.floor(lat / self.cell_size_deg),
+            math.floor((lon + 180.0) / self.cell_size_deg) % self._columns_total,
+        )
+
+    def _columns(self, lon_low: float, lon_high: float) -> List[int]:
+        """Grid columns covering [lon_low, lon_high]; the span may run past +-180."""
+        first = math.floor((lon_low + 180.0) / self.cell_size_deg)
+        last = math.floor((lon_high + 180.0) / self.cell_size_deg)
+        total = self._columns_total
+        if last - first + 1 >= total:
+            return list(range(total))
+        return [cj % total for cj in range(first, last + 1)]
+
+    def insert(self, parcel_id: str, lat: float, lon: float) -> int:
+        """
+        Inserts (or moves) a parcel and returns its row number.
+        Re-inserting an existing id retires the old row first.
+        """
+        if parcel_id in self._row_by_id:
+            self.remove(parcel_id)
+        if not -180.0 <= lon < 180.0:
+            lon = (lon + 180.0) % 360.0 - 180.0
+        row = len(self.ids)
+        self.ids.append(parcel_id)
+        self.lats.append(lat)
+        self.lons.append(lon)
+        self._cos_lats.append(math.cos(math.radians(lat)))
+        self._alive.append(True)
+        self._row_by_id[parcel_id] = row
+        cell = self._cell(lat, lon)
+        cell_lats = self._cell_lats.setdefault(cell, [])
+        position = bisect.bisect_right(cell_lats, lat)
+        cell_lats.insert(position, lat)
+        self._cells.setdefault(cell, []).insert(position, row)
+        self._max_abs_lat = max(self._max_abs_lat, abs(lat))
+        if self._extent is None:
+            self._extent = [cell[0], cell[0], cell[1], cell[1]]
+        else:
+            extent = self._extent
+            extent[0] = min(extent[0], cell[0])
+            extent[1] = max(extent[1], cell[0])
+            extent[2] = min(extent[2], cell[1])
+            extent[3] = max(extent[3], cell[1])
+        return row
+
+    def remove(self, parcel_id: str) -> bool:
+        """Removes a parcel from the index. Returns False if it was not indexed."""
+        row = self._row_by_id.pop(parcel_id, None)
+        if row is None:
+            return False
+        self._alive[row] = False
+        lat = self.lats[row]
+        cell = self._cell(lat, self.lons[row])
+        bucket = self._cells.get(cell)
+        if bucket is not None:
+            cell_lats = self._cell_lats[cell]
+            position = bucket.index(row, bisect.bisect_left(cell_lats, lat))
+            del bucket[position]
+            del cell_lats[position]
+            if not bucket:
+                del self._cells[cell]
+                del self._cell_lats[cell]
+        return True
+
+    def row_of(self, parcel_id: str) -> Optional[int]:
+        return self._row_by_id.get(parcel_id)
+
+    def coordinates_of(self, parcel_id: str) -> Optional[Tuple[float, float]]:
+        row = self._row_by_id.get(parcel_id)
+        if row is None:
+            return None
+        return self.lats[row], self.lons[row]
+
+    # --- Queries ---
+    def _cells_in_window(self, ci0: int, ci1: int, columns: List[int]):
+        """Yields (cell, rows, sorted lats) for populated cells in rows ci0..ci1 and `columns`."""
+        cells, cell_lats = self._cells, self._cell_lats
+        if (ci1 - ci0 + 1) * len(columns) > len(cells):
+            # Query window larger than the populated grid: walk the populated cells instead
+            wanted = set(columns)
+            for cell, rows in cells.items():
+                if ci0 <= cell[0] <= ci1 and cell[1] in wanted:
+                    yield cell, rows, cell_lats[cell]
+            return
+        for ci in range(ci0, ci1 + 1):
+            for cj in columns:
+                rows = cells.get((ci, cj))
+                if rows:
+                    yield (ci, cj), rows, cell_lats[(ci, cj)]
+
+    def query_bbox(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> List[str]:
+        """
+        Returns ids of parcels inside the inclusive lat/lon bounding box.
+        A box with min_lon > max_lon crosses the antimeridian.
+        """
+        wraps = min_lon > max_lon
+        columns = self._columns(min_lon, max_lon + 360.0 if wraps else max_lon)
+        ci0 = math.floor(min_lat / self.cell_size_deg)
+        ci1 = math.floor(max_lat / self.cell_size_deg)
+        lons, ids = self.lons, self.ids
+        found = []
+        for _, rows, cell_lats in self._cells_in_window(ci0, ci1, columns):
+            band = rows[bisect.bisect_left(cell_lats, min_lat):bisect.bisect_right(cell_lats, max_lat)]
+            if wraps:
+                found.extend(ids[row] for row in band if lons[row] >= min_lon or lons[row] <= max_lon)
+            else:
+                found.extend(ids[row] for row in band if min_lon <= lons[row] <= max_lon)
+        return found
+
+    def query_radius(self, lat: float, lon: float, radius_km: float, with_distance: bool = False) -> List:
+        """
+        Returns ids of parcels within `radius_km` (haversine) of (lat, lon),
+        or (id, distance_km) pairs sorted by distance if `with_distance` is set.
+
+        Cells whose farthest corner is inside the circle are taken whole
+        (ids only); the rest are cut to the latitude band by bisection and
+        tested with the haversine term compared against the radius, so no
+        asin/sqrt runs per candidate unless the distance is returned.
+        """
+        if radius_km < 0:
+            raise ValueError(f"radius_km cannot be negative: {radius_km}")
+        dlat = radius_km / KM_PER_DEGREE_LAT
+        # Widest longitude span occurs at the box edge closest to a pole
+        edge_lat = min(89.9, abs(lat) + dlat)
+        dlon = min(180.0, dlat / max(math.cos(math.radians(edge_lat)), 1e-6))
+        columns = self._columns(lon - dlon, lon + dlon)
+        low_lat, high_lat = lat - dlat, lat + dlat
+        ci0 = math.floor(low_lat / self.cell_size_deg)
+        ci1 = math.floor(high_lat / self.cell_size_deg)
+
+        # d <= r  <=>  a <= sin^2(r / 2R); a thin band around the bound is settled by haversine_km
+        half_angle = min(math.pi / 2.0, radius_km / (2.0 * EARTH_RADIUS_KM))
+        a_max = math.sin(half_angle) ** 2
+        a_low, a_high = a_max * (1.0 - 1e-12), a_max * (1.0 + 1e-12)
+        take_whole = not with_distance and radius_km <= WHOLE_CELL_MAX_RADIUS_KM
+        size = self.cell_size_deg
+        lats, lons, cos_lats, ids = self.lats, self.lons, self._cos_lats, self.ids
+        cos_lat, sin = math.cos(math.radians(lat)), math.sin
+        half_rad = math.pi / 360.0  # Degrees to radians, halved
+
+        hits = []
+        for (ci, cj), rows, cell_lats in self._cells_in_window(ci0, ci1, columns):
+            if take_whole:
+                # For a fixed latitude the distance grows with |dlon|, so the farthest
+                # corner sits on the column edge farther from `lon`
+                west = cj * size - 180.0
+                far_lon = west if _lon_gap(lon, west) > _lon_gap(lon, west + size) else west + size
+                if (haversine_km(lat, lon, ci * size, far_lon) <= radius_km
+                        and haversine_km(lat, lon, (ci + 1) * size, far_lon) <= radius_km):
+                    hits.extend(rows)
+                    continue
+            if cell_lats[0] < low_lat or cell_lats[-1] > high_lat:
+                rows = rows[bisect.bisect_left(cell_lats, low_lat):bisect.bisect_right(cell_lats, high_lat)]
+            for row in rows:
+                s_lat = sin((lats[row] - lat) * half_rad)
+                s_lon = sin((lons[row] - lon) * half_rad)
+                a = s_lat * s_lat + cos_lat * cos_lats[row] * s_lon * s_lon
+                if a > a_high:
+                    continue
+                if a > a_low and haversine_km(lat, lon, lats[row], lons[row]) > radius_km:
+                    continue
+                if with_distance:
+                    hits.append((2.0 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a))), ids[row]))
+                else:
+                    hits.append(row)
+        if with_distance:
+            hits.sort()
+            return [(parcel_id, d) for d, parcel_id in hits]
+        return [ids[row] for row in hits]
+
+    def query_nearest(self, lat: float, lon: float, k: int = 1) -> List[Tuple[str, float]]:
+        """
+        Returns the k nearest parcels as (id, distance_km), closest first.
+        Searches outward ring by ring (columns wrap at the antimeridian) and
+        stops once no unvisited cell can beat the current k-th best distance.
+        Rings never go past the populated extent. Once the rings cover more
+        cells than are populated, the remaining populated cells are visited
+        directly, nearest bound first. Queries far from the data therefore
+        cost O(populated cells) rather than O(rings^2).
+        """
+        if k <= 0 or not self._row_by_id:
+            return []
+        ci, cj = self._cell(lat, lon)
+        total = self._columns_total
+        # Lower bound on the distance covered by one ring of cells
+        min_cos = math.cos(math.radians(min(89.9, max(self._max_abs_lat, abs(lat)))))
+        ring_km = self.cell_size_deg * KM_PER_DEGREE_LAT * min_cos
+        min_ci, max_ci, min_cj, max_cj = self._extent
+        # Wrapped columns are never more than half the grid away
+        max_ring = max(ci - min_ci, max_ci - ci, min(max(cj - min_cj, max_cj - cj), total // 2))
+
+        lats, lons, ids, cells = self.lats, self.lons, self.ids, self._cells
+        best: List[Tuple[float, int]] = []  # max-heap via negated distance
+        visited = set()
+
+        def scan(cell: Tuple[int, int]) -> None:
+            visited.add(cell)
+            for row in cells[cell]:
+                d = haversine_km(lat, lon, lats[row], lons[row])
+                if len(best) < k:
+                    heapq.heappush(best, (-d, row))
+                elif d < -best[0][0]:
+                    heapq.heapreplace(best, (-d, row))
+
+        ring = 0
+        while ring <= max_ring:
+            if ring == 0:
+                ring_cells = [(ci, cj)]
+            else:
+                ring_cells = [(ci + di, (cj - ring) % total) for di in range(-ring, ring + 1)]
+                ring_cells += [(ci + di, (cj + ring) % total) for di in range(-ring, ring + 1)]
+                ring_cells += [(ci - ring, (cj + dj) % total) for dj in range(-ring + 1, ring)]
+                ring_cells += [(ci + ring, (cj + dj) % total) for dj in range(-ring + 1, ring)]
+            for cell in ring_cells:
+                if cell in cells and cell not in visited:
+                    scan(cell)
+            if len(best) == k and ring * ring_km >= -best[0][0]:
+                break
+            ring += 1
+            if (2 * ring + 1) ** 2 > len(cells):
+                # Rings so far cover more cells than are populated: rank the rest by a
+                # triangle-inequality bound (centre distance minus cell reach) instead
+                half = 0.5 * self.cell_size_deg
+                remaining = []
+                for cell in cells:
+                    if cell in visited:
+                        continue
+                    clat = (cell[0] + 0.5) * self.cell_size_deg
+                    clon = (cell[1] + 0.5) * self.cell_size_deg - 180.0
+                    reach = max(haversine_km(clat, clon, clat - half, clon - half),
+                                haversine_km(clat, clon, clat + half, clon + half))
+                    remaining.append((haversine_km(lat, lon, clat, clon) - reach, cell))
+                remaining.sort()
+                for bound, cell in remaining:
+                    if len(best) == k and bound >= -best[0][0]:
+                        break
+                    scan(cell)
+                break
+        return [(ids[row], -neg_d) for neg_d, row in sorted(best, reverse=True)]
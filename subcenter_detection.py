@@ -0,0 +1,558 @@
+"""
+Automatic Sub-Center Detection
+Finds employment / density sub-centers from parcel data and returns a
+`centers_config` (and center locations) ready for
+BertaudAuditEngine.calculate_polycentric_density and CenterDistanceStage,
+instead of hand-picking sub-centers in GIS.
+
+Pipeline:
+    1. Grid: parcels are binned into square cells on a local
+       equirectangular km plane. Cell density is floor area / land area,
+       i.e. the land-weighted mean of `current_far`.
+    2. Smooth: normalized Gaussian convolution (floor and land are
+       smoothed separately, then divided), as two separable 1-D passes of
+       whole-row shift-and-add, so empty cells do not dilute their
+       neighbours.
+    3. Peaks: occupied cells equal to the max filter of the smoothed grid
+       within `peak_radius_km` (separable shift-and-max).
+    4. Monocentric fit: robust (Huber) fit of raw cell density against
+       distance to the CBD. A peak is a sub-center candidate when its
+       smoothed density is at least `min_excess` above the fit and its
+       log residual is at least `min_z` robust sigmas.
+    5. Candidates closer than `min_separation_km` to the CBD or to a
+       stronger candidate are suppressed.
+    6. Per sub-center (d0, g): density in excess of the CBD curve, on the
+       cells nearer to it than to any other sub-center and within
+       `fit_radius_km`, fitted with calibrate_parameters (the additive
+       model of calculate_polycentric_density). A few backfitting rounds
+       then refit every center, the CBD included, on the density the
+       other centers leave over.
+
+Distances on the grid are planar km; at city scale they agree with the
+haversine distances of CenterDistanceStage to well under one cell.
+
+Author: BaanBid Development Team
+"""
+
+import argparse
+import json
+import math
+import operator
+import statistics
+import sys
+import time
+from array import array
+from dataclasses import dataclass, field
+from itertools import repeat
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from geodesic_distance import CBD_CENTER_ID
+from spatial_index import KM_PER_DEGREE_LAT, parse_gps_coordinates
+
+
+# --- Constants ---
+DEFAULT_CELL_KM = 0.5
+DEFAULT_SMOOTH_KM = 1.0         # Gaussian sigma
+DEFAULT_PEAK_RADIUS_KM = 1.5
+DEFAULT_MIN_Z = 2.0             # Robust sigmas above the monocentric fit
+DEFAULT_MIN_EXCESS = 0.25       # Smoothed density >= 1.25x the fit
+DEFAULT_MIN_SEPARATION_KM = 3.0
+DEFAULT_FIT_RADIUS_KM = 4.0
+DEFAULT_MAX_CENTERS = 10
+DEFAULT_BACKFIT_ROUNDS = 2
+KERNEL_SIGMAS = 3.0             # Gaussian kernel truncated at 3 sigma
+MIN_FIT_CELLS = 5
+MAD_TO_SIGMA = 0.6745
+SUBCENTER_PREFIX = "SC"
+
+
+@dataclass
+class DetectedCenter:
+    """ศูนย์กลางเมือง (หลักหรือรอง) ที่ตรวจพบพร้อมพารามิเตอร์ D0 และ g"""
+    center_id: str
+    lat: float
+    lon: float
+    d0: float
+    g: float
+    peak_density: float         # Smoothed FAR at the center cell
+    expected_density: float     # Monocentric (CBD) fit at the center
+    z_score: float              # Log residual in robust sigmas (0 for the CBD)
+    cells_fitted: int
+
+    def to_dict(self) -> dict:
+        return {
+            "centerId": self.center_id,
+            "lat": self.lat,
+            "lon": self.lon,
+            "d0": self.d0,
+            "g": self.g,
+            "peakDensity": self.peak_density,
+            "expectedDensity": self.expected_density,
+            "zScore": self.z_score,
+            "cellsFitted": self.cells_fitted,
+        }
+
+
+@dataclass
+class SubcenterResult:
+    """ผลการตรวจหาศูนย์กลางรองอัตโนมัติ (Polycentric Sub-Center Detection)"""
+    cbd: DetectedCenter
+    subcenters: List[DetectedCenter]
+    rejected: List[Dict]            # Candidate peaks that failed a test, with the reason
+    scale: float                    # Robust sigma of log residuals (smoothed grid)
+    grid_shape: Tuple[int, int]     # (rows, cols)
+    cell_km: float
+    occupied_cells: int
+    parcels: int
+    skipped_parcels: int            # Missing / invalid coordinates or FAR
+    warnings: List[str] = field(default_factory=list)
+
+    @property
+    def centers(self) -> List[DetectedCenter]:
+        return [self.cbd] + self.subcenters
+
+    @property
+    def centers_config(self) -> Dict[str, Dict[str, float]]:
+        """{ "center_id": { "d0": ..., "g": ... } } for calculate_polycentric_density."""
+        return {c.center_id: {"d0": c.d0, "g": c.g} for c in self.centers}
+
+    @property
+    def center_locations(self) -> Dict[str, Tuple[float, float]]:
+        """{ "center_id": (lat, lon) } for CenterDistanceStage."""
+        return {c.center_id: (c.lat, c.lon) for c in self.centers}
+
+    def to_dict(self) -> dict:
+        return {
+            "centersConfig": self.centers_config,
+            "centerLocations": {cid: list(loc) for cid, loc in self.center_locations.items()},
+            "cbd": self.cbd.to_dict(),
+            "subcenters": [c.to_dict() for c in self.subcenters],
+            "rejected": self.rejected,
+            "scale": self.scale,
+            "gridShape": list(self.grid_shape),
+            "cellKm": self.cell_km,
+            "occupiedCells": self.occupied_cells,
+            "parcels": self.parcels,
+            "skippedParcels": self.skipped_parcels,
+            "warnings": self.warnings,
+        }
+
+
+# --- Density Grid ---
+class DensityGrid:
+    """
+    Row-major (rows x cols) floor and land sums per cell on a local km
+    plane anchored at the south-west corner of the data.
+    """
+
+    def __init__(self, min_lat: float, min_lon: float, km_per_deg_lon: float,
+                 cell_km: float, rows: int, cols: int):
+        self.min_lat = min_lat
+        self.min_lon = min_lon
+        self.km_per_deg_lon = km_per_deg_lon
+        self.cell_km = cell_km
+        self.rows = rows
+        self.cols = cols
+        self.floor = array('d', bytes(8 * rows * cols))
+        self.land = array('d', bytes(8 * rows * cols))
+        self.parcels = 0
+        self.skipped = 0
+
+    @classmethod
+    def from_columns(
+        cls,
+        lats: Sequence[float],
+        lons: Sequence[float],
+        fars: Sequence[float],
+        land_areas: Optional[Sequence[float]] = None,
+        cell_km: float = DEFAULT_CELL_KM
+    ) -> "DensityGrid":
+        """Grid from coordinate / FAR columns (land area defaults to 1 per parcel)."""
+        if cell_km <= 0:
+            raise ValueError(f"cell_km must be positive: {cell_km}")
+        if not len(lats):
+            raise ValueError("No parcels with coordinates and current_far to grid")
+        min_lat, max_lat = min(lats), max(lats)
+        min_lon, max_lon = min(lons), max(lons)
+        km_per_deg_lon = KM_PER_DEGREE_LAT * math.cos(math.radians(0.5 * (min_lat + max_lat)))
+        rows = int((max_lat - min_lat) * KM_PER_DEGREE_LAT / cell_km) + 1
+        cols = int((max_lon - min_lon) * km_per_deg_lon / cell_km) + 1
+        grid = cls(min_lat, min_lon, km_per_deg_lon, cell_km, rows, cols)
+
+        row_scale = KM_PER_DEGREE_LAT / cell_km
+        col_scale = km_per_deg_lon / cell_km
+        cell_rows = map(int, map(row_scale.__mul__, map(float.__sub__, map(float, lats), repeat(min_lat))))
+        cell_cols = map(int, map(col_scale.__mul__, map(float.__sub__, map(float, lons), repeat(min_lon))))
+        cells = list(map(operator.add, map(cols.__mul__, cell_rows), cell_cols))
+        areas = land_areas if land_areas is not None else [1.0] * len(cells)
+        floor, land = grid.floor, grid.land
+        for cell, far, area in zip(cells, fars, areas):
+            floor[cell] += far * area
+            land[cell] += area
+        grid.parcels = len(cells)
+        return grid
+
+    @classmethod
+    def from_parcels(cls, parcels: Iterable, cell_km: float = DEFAULT_CELL_KM) -> "DensityGrid":
+        """Grid from LandParcel objects or dicts (gps_coordinates, current_far, land_area_rai)."""
+        lats, lons, fars, areas = array('d'), array('d'), array('d'), array('d')
+        skipped = 0
+        for parcel in parcels:
+            if isinstance(parcel, dict):
+                text, far, area = parcel.get("gps_coordinates"), parcel.get("current_far"), parcel.get("land_area_rai")
+            else:
+                text, far, area = parcel.gps_coordinates, parcel.current_far, parcel.land_area_rai
+            try:
+                lat, lon = parse_gps_coordinates(text)
+            except (TypeError, ValueError):
+                skipped += 1
+                continue
+            if far is None or far < 0:
+                skipped += 1
+                continue
+            lats.append(lat)
+            lons.append(lon)
+            fars.append(far)
+            areas.append(area if area and area > 0 else 1.0)
+        grid = cls.from_columns(lats, lons, fars, areas, cell_km)
+        grid.skipped = skipped
+        return grid
+
+    def cell_of(self, lat: float, lon: float) -> Tuple[int, int]:
+        row = int((lat - self.min_lat) * KM_PER_DEGREE_LAT / self.cell_km)
+        col = int((lon - self.min_lon) * self.km_per_deg_lon / self.cell_km)
+        return min(max(row, 0), self.rows - 1), min(max(col, 0), self.cols - 1)
+
+    def km_of(self, lat: float, lon: float) -> Tuple[float, float]:
+        """(y, x) km of a coordinate on the grid plane."""
+        return (lat - self.min_lat) * KM_PER_DEGREE_LAT, (lon - self.min_lon) * self.km_per_deg_lon
+
+    def lat_lon_of(self, y_km: float, x_km: float) -> Tuple[float, float]:
+        return self.min_lat + y_km / KM_PER_DEGREE_LAT, self.min_lon + x_km / self.km_per_deg_lon
+
+    def density(self) -> List[float]:
+        """Raw cell density (floor / land); 0 for empty cells."""
+        return [f / a if a > 0 else 0.0 for f, a in zip(self.floor, self.land)]
+
+
+# --- Separable Filters ---
+def gaussian_kernel(sigma_cells: float) -> List[Tuple[int, float]]:
+    """(offset, weight) taps of a Gaussian truncated at KERNEL_SIGMAS."""
+    if sigma_cells <= 0:
+        return [(0, 1.0)]
+    radius = max(1, int(math.ceil(KERNEL_SIGMAS * sigma_cells)))
+    taps = [(k, math.exp(-0.5 * (k / sigma_cells) ** 2)) for k in range(-radius, radius + 1)]
+    total = sum(w for _, w in taps)
+    return [(k, w / total) for k, w in taps]
+
+
+def _convolve_rows(rows: List[List[float]], kernel: List[Tuple[int, float]]) -> List[List[float]]:
+    """Zero-padded 1-D convolution of every row, one whole-row shift per tap."""
+    add = operator.add
+    out = []
+    for row in rows:
+        n = len(row)
+        acc = [0.0] * n
+        for k, w in kernel:
+            lo, hi = max(0, -k), min(n, n - k)
+            if lo < hi:
+                acc[lo:hi] = map(add, acc[lo:hi], map(w.__mul__, row[lo + k:hi + k]))
+        out.append(acc)
+    return out
+
+
+def _max_filter_rows(rows: List[List[float]], radius: int) -> List[List[float]]:
+    out = []
+    for row in rows:
+        n = len(row)
+        acc = list(row)
+        for k in range(-radius, radius + 1):
+            lo, hi = max(0, -k), min(n, n - k)
+            if k and lo < hi:
+                acc[lo:hi] = map(max, acc[lo:hi], row[lo + k:hi + k])
+        out.append(acc)
+    return out
+
+
+def _split(flat: Sequence[float], cols: int) -> List[List[float]]:
+    return [list(flat[i:i + cols]) for i in range(0, len(flat), cols)]
+
+
+def _transpose(rows: List[List[float]]) -> List[List[float]]:
+    return [list(column) for column in zip(*rows)]
+
+
+def _separable(flat: Sequence[float], cols: int, row_pass) -> List[float]:
+    """Applies `row_pass` along rows, then along columns; returns a flat grid."""
+    columns = row_pass(_transpose(row_pass(_split(flat, cols))))
+    return [value for row in _transpose(columns) for value in row]
+
+
+def smooth_density(grid: DensityGrid, sigma_km: float) -> Tuple[List[float], List[float]]:
+    """(smoothed density, smoothed land) by normalized Gaussian convolution."""
+    kernel = gaussian_kernel(sigma_km / grid.cell_km)
+    convolve = lambda rows: _convolve_rows(rows, kernel)
+    floor = _separable(grid.floor, grid.cols, convolve)
+    land = _separable(grid.land, grid.cols, convolve)
+    return [f / a if a > 0 else 0.0 for f, a in zip(floor, land)], land
+
+
+def find_peaks(values: Sequence[float], cols: int, radius_cells: int,
+               mask: Optional[Sequence[bool]] = None) -> List[int]:
+    """Flat indices of cells equal to their (2r+1)^2 neighbourhood max (and > 0)."""
+    maxed = _separable(values, cols, lambda rows: _max_filter_rows(rows, radius_cells))
+    candidates = [i for i, (v, m) in enumerate(zip(values, maxed)) if v > 0 and v >= m]
+    if mask is not None:
+        candidates = [i for i in candidates if mask[i]]
+    return candidates
+
+
+# --- Detector ---
+class SubcenterDetector:
+    """
+    Detects sub-centers on a DensityGrid and fits (d0, g) per center.
+
+    Args:
+        smooth_km: Gaussian smoothing sigma.
+        peak_radius_km: A peak is the maximum within this radius.
+        min_z: Minimum log residual above the monocentric fit, in robust sigmas.
+        min_excess: Minimum relative excess over the fit (0.25 = 25%).
+        min_separation_km: Minimum distance between centers (CBD included).
+        fit_radius_km: Cells used to fit a sub-center's (d0, g).
+        max_centers: Maximum number of sub-centers returned.
+        backfit_rounds: Rounds of refitting each center (CBD included)
+            on the density left after subtracting all the others.
+    """
+
+    def __init__(
+        self,
+        smooth_km: float = DEFAULT_SMOOTH_KM,
+        peak_radius_km: float = DEFAULT_PEAK_RADIUS_KM,
+        min_z: float = DEFAULT_MIN_Z,
+        min_excess: float = DEFAULT_MIN_EXCESS,
+        min_separation_km: float = DEFAULT_MIN_SEPARATION_KM,
+        fit_radius_km: float = DEFAULT_FIT_RADIUS_KM,
+        max_centers: int = DEFAULT_MAX_CENTERS,
+        backfit_rounds: int = DEFAULT_BACKFIT_ROUNDS
+    ):
+        self.smooth_km = smooth_km
+        self.peak_radius_km = peak_radius_km
+        self.min_z = min_z
+        self.min_excess = min_excess
+        self.min_separation_km = min_separation_km
+        self.fit_radius_km = fit_radius_km
+        self.max_centers = max_centers
+        self.backfit_rounds = backfit_rounds
+
+    def _refine(self, grid: DensityGrid, smoothed: Sequence[float], cell: int) -> Tuple[float, float]:
+        """Sub-cell (y, x) km: density-weighted centroid of the 3x3 block around `cell`."""
+        row, col = divmod(cell, grid.cols)
+        total = sy = sx = 0.0
+        for r in range(max(0, row - 1), min(grid.rows, row + 2)):
+            for c in range(max(0, col - 1), min(grid.cols, col + 2)):
+                w = smoothed[r * grid.cols + c]
+                total += w
+                sy += w * (r + 0.5)
+                sx += w * (c + 0.5)
+        if total <= 0:
+            return (row + 0.5) * grid.cell_km, (col + 0.5) * grid.cell_km
+        return sy / total * grid.cell_km, sx / total * grid.cell_km
+
+    def detect(self, grid: DensityGrid, cbd: Optional[Tuple[float, float]] = None) -> SubcenterResult:
+        """
+        Runs the pipeline. `cbd` is the (lat, lon) of the main center;
+        by default the highest smoothed peak is taken as the CBD.
+        """
+        from bertaud_engine import BertaudAuditEngine
+
+        warnings: List[str] = []
+        cols, cell_km = grid.cols, grid.cell_km
+        raw = grid.density()
+        occupied = [a > 0 for a in grid.land]
+        smoothed, _ = smooth_density(grid, self.smooth_km)
+        radius_cells = max(1, int(round(self.peak_radius_km / cell_km)))
+        peaks = find_peaks(smoothed, cols, radius_cells, occupied)
+        if not peaks:
+            raise ValueError("No occupied cells with positive density; cannot detect centers")
+
+        # Cell-center coordinates on the km plane
+        cells = [i for i, o in enumerate(occupied) if o]
+        cell_y = [(i // cols + 0.5) * cell_km for i in range(len(raw))]
+        cell_x = [(i % cols + 0.5) * cell_km for i in range(len(raw))]
+
+        if cbd is not None:
+            cbd_y, cbd_x = grid.km_of(*cbd)
+            cbd_cell = grid.cell_of(*cbd)
+            cbd_cell = cbd_cell[0] * cols + cbd_cell[1]
+        else:
+            cbd_cell = max(peaks, key=smoothed.__getitem__)
+            cbd_y, cbd_x = self._refine(grid, smoothed, cbd_cell)
+        cbd_lat, cbd_lon = grid.lat_lon_of(cbd_y, cbd_x)
+
+        def distances_to(y: float, x: float, rows: Sequence[int]) -> List[float]:
+            return [math.hypot(cell_y[i] - y, cell_x[i] - x) for i in rows]
+
+        # 4. Robust monocentric fit on raw cell densities
+        cbd_dist = distances_to(cbd_y, cbd_x, cells)
+        samples = [(d, raw[i]) for d, i in zip(cbd_dist, cells)]
+        if len(samples) < 3:
+            raise ValueError(f"Need at least 3 occupied cells to fit the CBD, got {len(samples)}")
+        mono = BertaudAuditEngine.calibrate_robust(samples, loss="huber")
+        warnings.extend(mono.warnings)
+        d0, g = mono.d0, mono.g
+        ln_d0 = math.log(d0)
+        positive = [(i, d) for i, d in zip(cells, cbd_dist) if smoothed[i] > 0]
+        log_residuals = [math.log(smoothed[i]) - ln_d0 + g * d for i, d in positive]
+        scale = statistics.median(map(abs, log_residuals)) / MAD_TO_SIGMA if log_residuals else 0.0
+        if scale <= 0:
+            scale = mono.scale or 1e-12
+        cbd_center = DetectedCenter(
+            CBD_CENTER_ID, cbd_lat, cbd_lon, d0, g, smoothed[cbd_cell], d0, 0.0, len(cells)
+        )
+
+        # 5. Candidates: significant peaks, strongest first, separated
+        rejected: List[Dict] = []
+        candidates = []
+        for cell in peaks:
+            if cell == cbd_cell:
+                continue
+            y, x = self._refine(grid, smoothed, cell)
+            distance = math.hypot(y - cbd_y, x - cbd_x)
+            expected = d0 * math.exp(-g * distance)
+            z = (math.log(smoothed[cell]) - math.log(expected)) / scale
+            lat, lon = grid.lat_lon_of(y, x)
+            info = {"lat": lat, "lon": lon, "peakDensity": smoothed[cell],
+                    "expectedDensity": expected, "zScore": z}
+            if smoothed[cell] < (1.0 + self.min_excess) * expected:
+                rejected.append(dict(info, reason="excess below min_excess"))
+            elif z < self.min_z:
+                rejected.append(dict(info, reason="z below min_z"))
+            else:
+                candidates.append((z, cell, y, x, expected, info))
+        candidates.sort(key=lambda c: c[0], reverse=True)
+
+        accepted = []
+        for z, cell, y, x, expected, info in candidates:
+            near = [(cbd_y, cbd_x)] + [(a[2], a[3]) for a in accepted]
+            if any(math.hypot(y - ay, x - ax) < self.min_separation_km for ay, ax in near):
+                rejected.append(dict(info, reason="within min_separation_km of a stronger center"))
+            elif len(accepted) >= self.max_centers:
+                rejected.append(dict(info, reason="beyond max_centers"))
+            else:
+                accepted.append((z, cell, y, x, expected, info))
+
+        # 6. (d0, g) per sub-center on the excess over the CBD curve
+        owner_dist = [distances_to(a[2], a[3], cells) for a in accepted]
+        regions = [
+            [j for j in range(len(cells))
+             if own[j] <= self.fit_radius_km and all(own[j] <= other[j] for other in owner_dist)]
+            for own in owner_dist
+        ]
+
+        def curve(params: Tuple[float, float], dist: Sequence[float]) -> List[float]:
+            c_d0, c_g = params
+            return [c_d0 * math.exp(-c_g * d) for d in dist]
+
+        def fit_excess(rows: Sequence[int], dist: Sequence[float], others: List[float]):
+            fit_samples = [(dist[j], raw[cells[j]] - others[j]) for j in rows if raw[cells[j]] > others[j]]
+            if len(fit_samples) < MIN_FIT_CELLS:
+                return None, len(fit_samples)
+            return BertaudAuditEngine.calibrate_parameters(fit_samples), len(fit_samples)
+
+        cbd_curve = curve((d0, g), cbd_dist)
+        fits: Dict[int, Tuple[float, float]] = {}
+        fitted_cells: Dict[int, int] = {}
+        for k, rows in enumerate(regions):
+            params, count = fit_excess(rows, owner_dist[k], cbd_curve)
+            if params is None:
+                rejected.append(dict(accepted[k][5], reason=f"fewer than {MIN_FIT_CELLS} cells above the CBD curve"))
+            elif params[0] <= 0 or params[1] <= 0:
+                rejected.append(dict(accepted[k][5], reason=f"fitted g={params[1]:.4f} is not a decaying peak"))
+            else:
+                fits[k], fitted_cells[k] = params, count
+
+        # Backfitting: refit each center on the density the others leave over
+        for _ in range(self.backfit_rounds if fits else 0):
+            sub_curves = {k: curve(fits[k], owner_dist[k]) for k in fits}
+            others = [sum(column) for column in zip(*sub_curves.values())]
+            leftover = [(d, raw[i] - o) for d, i, o in zip(cbd_dist, cells, others) if raw[i] > o]
+            if len(leftover) >= 3:
+                refit = BertaudAuditEngine.calibrate_robust(leftover, loss="huber")
+                d0, g = refit.d0, refit.g
+            cbd_curve = curve((d0, g), cbd_dist)
+            for k in fits:
+                rest = [c + o - s for c, o, s in zip(cbd_curve, others, sub_curves[k])]
+                params, count = fit_excess(regions[k], owner_dist[k], rest)
+                if params is not None and params[0] > 0 and params[1] > 0:
+                    fits[k], fitted_cells[k] = params, count
+                    sub_curves[k] = curve(params, owner_dist[k])
+                    others = [sum(column) for column in zip(*sub_curves.values())]
+
+        cbd_center.d0, cbd_center.g, cbd_center.expected_density = d0, g, d0
+        subcenters = [
+            DetectedCenter(
+                f"{SUBCENTER_PREFIX}{n + 1}", accepted[k][5]["lat"], accepted[k][5]["lon"],
+                fits[k][0], fits[k][1], smoothed[accepted[k][1]], accepted[k][4], accepted[k][0],
+                fitted_cells[k]
+            )
+            for n, k in enumerate(sorted(fits))
+        ]
+
+        return SubcenterResult(
+            cbd=cbd_center, subcenters=subcenters, rejected=rejected, scale=scale,
+            grid_shape=(grid.rows, grid.cols), cell_km=cell_km, occupied_cells=len(cells),
+            parcels=grid.parcels, skipped_parcels=grid.skipped, warnings=warnings
+        )
+
+
+def detect_subcenters(
+    parcels: Iterable,
+    cbd: Optional[Tuple[float, float]] = None,
+    cell_km: float = DEFAULT_CELL_KM,
+    **options
+) -> SubcenterResult:
+    """Grids parcels (LandParcel objects or dicts) and runs SubcenterDetector(**options)."""
+    return SubcenterDetector(**options).detect(DensityGrid.from_parcels(parcels, cell_km), cbd)
+
+
+# --- CLI ---
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Detect polycentric sub-centers from parcel FAR")
+    parser.add_argument("--parcels", required=True, help="Land parcels file (.csv, .jsonl, .parquet)")
+    parser.add_argument("--cbd", help='CBD "lat, lon" (default: highest density peak)')
+    parser.add_argument("--output", help="Write centers_config / locations JSON here")
+    parser.add_argument("--cell-km", type=float, default=DEFAULT_CELL_KM)
+    parser.add_argument("--smooth-km", type=float, default=DEFAULT_SMOOTH_KM)
+    parser.add_argument("--min-z", type=float, default=DEFAULT_MIN_Z)
+    parser.add_argument("--min-separation-km", type=float, default=DEFAULT_MIN_SEPARATION_KM)
+    parser.add_argument("--max-centers", type=int, default=DEFAULT_MAX_CENTERS)
+    args = parser.parse_args(argv)
+
+    from bertaud_audit import read_records
+    from firestore_models import LandParcel
+
+    started = time.perf_counter()
+    grid = DensityGrid.from_parcels(read_records(args.parcels, LandParcel), args.cell_km)
+    gridded = time.perf_counter()
+    detector = SubcenterDetector(
+        smooth_km=args.smooth_km, min_z=args.min_z,
+        min_separation_km=args.min_separation_km, max_centers=args.max_centers
+    )
+    result = detector.detect(grid, parse_gps_coordinates(args.cbd) if args.cbd else None)
+    detected = time.perf_counter()
+
+    print(f"Grid: {grid.parcels:,} parcels ({grid.skipped:,} skipped) into "
+          f"{grid.rows}x{grid.cols} cells of {grid.cell_km} km ({gridded - started:.1f}s)")
+    for center in result.centers:
+        print(f"  {center.center_id:<5} ({center.lat:.5f}, {center.lon:.5f})  "
+              f"d0={center.d0:.3f}  g={center.g:.4f}  z={center.z_score:.1f}")
+    print(f"Detected {len(result.subcenters)} sub-centers, rejected {len(result.rejected)} peaks "
+          f"({detected - gridded:.1f}s)")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result.to_dict(), f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+import asyncio
+from async_audit_runner import (
+    AsyncAuditConfig, AsyncAuditRunner, LocalDocumentStore,
+    PARCELS_COLLECTION, PROPOSALS_COLLECTION, run_sequential
+)
+
+def build_store(n, latency_s, failure_rate=0.0):
+    store = LocalDocumentStore(latency_s=latency_s, failure_rate=failure_rate, seed=42)
+    store.load(PARCELS_COLLECTION, (
+        {"id": f"parcel_{i}", "land_area_rai": 5.0, "distance_from_cbd_km": 1.0 + (i % 15),
+         "legal_far_limit": 8.0, "appraisal_price_per_wah": 150000.0, "zone_color": "Red"}
+        for i in range(n)
+    ))
+    store.load(PROPOSALS_COLLECTION, (
+        {"id": f"proposal_{i}", "parcel_id": f"parcel_{i}", "proposed_gfa": 40000.0,
+         "proposed_investment_cost": 1.2e9, "proposed_upfront_fee": 5e7, "proposed_annual_rent": 1.2e7,
+         "calculation_inputs": {"d0": 10.0, "g": 0.1, "formula_version": "v1.0"},
+         "economic_parameters_snapshot": {"discount_rate_state": 0.05}}
+        for i in range(n)
+    ))
+    return store
+
+def broken_pool(items, include_financial):
+    from concurrent.futures.process import BrokenProcessPool
+    raise BrokenProcessPool("A child process terminated abruptly")
+
+class BrokenStore(LocalDocumentStore):
+    """Raises a non-transient error on every write (or read)."""
+
+    def __init__(self, broken: str, **kwargs):
+        super().__init__(**kwargs)
+        self.broken = broken
+
+    async def get_many(self, collection, doc_ids):
+        if self.broken == "read":
+            raise ValueError("Corrupt document")
+        return await super().get_many(collection, doc_ids)
+
+    async def update_many(self, collection, updates):
+        if self.broken == "write":
+            raise KeyError("update_many bug")
+        return await super().update_many(collection, updates)
+
+def verify_async_runner():
+    print("--- Verifying Async Batch Audit Runner (5 ms store latency) ---")
+    n = 400
+    ids = [f"proposal_{i}" for i in range(n)]
+
+    # 1. Sequential baseline (density/FAR only so it runs without pydantic)
+    seq = asyncio.run(run_sequential(build_store(n, 0.005), ids, include_financial=False))
+    print(f"  Sequential: {seq.written} written in {seq.elapsed_s:.2f}s ({seq.throughput_per_s:.0f}/s)")
+
+    # 2. Pipelined, batched
+    config = AsyncAuditConfig(read_batch_size=50, write_batch_size=50, executor="thread", include_financial=False)
+    store = build_store(n, 0.005)
+    piped = AsyncAuditRunner(store, config).run(ids)
+    print(f"  Pipeline:   {piped.written} written in {piped.elapsed_s:.2f}s ({piped.throughput_per_s:.0f}/s)")
+    speedup = seq.elapsed_s / piped.elapsed_s
+    print(f"  Speed-up: {speedup:.1f}x [{'PASS' if speedup > 2 and piped.written == n else 'FAIL'}]")
+
+    # 3. Transient failures are retried
+    flaky = build_store(n, 0.001, failure_rate=0.2)
+    retried = AsyncAuditRunner(flaky, AsyncAuditConfig(executor="inline", include_financial=False, max_retries=8)).run(ids)
+    ok = retried.written == n and retried.retries > 0
+    print(f"  Retries under 20% failures: {retried.retries}, written={retried.written} [{'PASS' if ok else 'FAIL'}]")
+
+    # 4. A failing executor call is recorded per proposal instead of stalling the readers
+    config = AsyncAuditConfig(read_batch_size=10, queue_size=1, compute_concurrency=2, executor="thread")
+    runner = AsyncAuditRunner(build_store(n, 0.0), config, audit_fn=broken_pool)
+    try:
+        broken = asyncio.run(asyncio.wait_for(runner.run_async(ids), timeout=30))
+        ok = broken.written == 0 and len(broken.errors) == n and set(broken.errors.values()) == {"COMPUTE_FAILED"}
+    except asyncio.TimeoutError:
+        ok = False
+    print(f"  Broken pool finishes with COMPUTE_FAILED per proposal: {'PASS' if ok else 'FAIL'}")
+
+    # 5. Non-transient store errors are recorded per proposal instead of hanging the run
+    for broken, code in (("read", "READ_FAILED"), ("write", "WRITE_FAILED")):
+        store = build_store(n, 0.0)
+        failing = BrokenStore(broken)
+        failing.collections = store.collections
+        config = AsyncAuditConfig(read_batch_size=10, write_batch_size=10, queue_size=1, executor="inline",
+                                  include_financial=False)
+        try:
+            report = asyncio.run(asyncio.wait_for(AsyncAuditRunner(failing, config).run_async(ids), timeout=30))
+            ok = report.written == 0 and len(report.errors) == n and set(report.errors.values()) == {code}
+        except asyncio.TimeoutError:
+            ok = False
+        print(f"  Non-transient {broken} error recorded as {code}: {'PASS' if ok else 'FAIL'}")
+
+    print("\n--- Verification Complete ---")
+
+if __name__ == "__main__":
+    verify_async_runner()
@@ -0,0 +1,54 @@
+import os
+import shutil
+import tempfile
+
+from audit_pipeline import AuditPipeline, PipelineConfig
+from firestore_models import LandParcel, ProjectProposal
+
+def build_pair(i, distance_km=2.5):
+    parcel = LandParcel(id=f"parcel_{i}", gps_coordinates="13.75, 100.50", land_area_rai=5.0,
+                        appraisal_price_per_wah=150000.0, distance_from_cbd_km=distance_km,
+                        current_far=2.0, legal_far_limit=8.0, zone_color="Red", district="Bang Rak")
+    proposal = ProjectProposal(
+        id=f"proposal_{i}", parcel_id=parcel.id, param_id="ty2025",
+        economic_parameters_snapshot={"discount_rate_state": 0.05},
+        calculation_inputs={"d0": 20.0, "g": 0.15}, efficiency_score=0.0, audit_status="Draft",
+        proposed_gfa=40000.0 + i, proposed_building_type="high-rise",
+        proposed_investment_cost=1.2e9, proposed_upfront_fee=5e7, proposed_annual_rent=1.2e7
+    )
+    return proposal, parcel
+
+def verify_audit_pipeline():
+    print("--- Verifying Audit Pipeline ---")
+
+    # 1. A good pair audits end to end
+    result = AuditPipeline().run(*build_pair(0))
+    print(f"  Full audit: {result.audit_data['overall_status'] if result.audit_data else result.error} "
+          f"[{'PASS' if result.error is None and result.audit_data else 'FAIL'}]")
+
+    # 2. A None parcel field is returned as INVALID_INPUT, also from a process pool
+    pairs = [build_pair(i) for i in range(6)]
+    pairs[3] = build_pair(3, distance_km=None)
+    for workers in (1, 2):
+        results = AuditPipeline().run_batch(pairs, workers=workers, chunk_size=2)
+        errors = [r.error for r in results]
+        ok = len(results) == 6 and errors[3].startswith("INVALID_INPUT") and errors.count(None) == 5
+        print(f"  Bad pair isolated (workers={workers}): {'PASS' if ok else 'FAIL'}")
+
+    # 3. Report stage failures are returned and the report directory is created up front
+    root = tempfile.mkdtemp(prefix="audit_pipeline_")
+    try:
+        report_dir = os.path.join(root, "reports", "2025")
+        results = AuditPipeline(PipelineConfig(report_dir=report_dir)).run_batch(pairs[:2])
+        ok = os.path.isdir(report_dir) and all(
+            r.report_path is not None or (r.error or "").startswith("REPORT_FAILED") for r in results
+        )
+        print(f"  Report dir created, report errors returned ({results[0].error or 'report written'}): "
+              f"{'PASS' if ok else 'FAIL'}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    print("\n--- Verification Complete ---")
+
+if __name__ == "__main__":
+    verify_audit_pipeline()
@@ -0,0 +1,56 @@
+import random
+
+from bertaud_engine import BertaudAuditEngine
+from bid_rent import BidRentParams, BidRentSolver
+
+def verify_bid_rent():
+    print("--- Verifying Bid-Rent Solver ---")
+    params = BidRentParams()
+    solver = BidRentSolver(10.0, params)
+    capital_k, land_cost_e, transport = 500.0, 2500.0, 1000.0
+
+    # 1. Floor rents solve y - t(x) - p*q_min = u * p^beta, and FAR(0) = D0
+    distances = [i * 0.5 for i in range(61)]
+    profile = solver.solve(distances, capital_k, land_cost_e, transport)
+    utility = solver.utility_level(capital_k, transport)
+    worst = 0.0
+    for x, p in zip(distances, profile.floor_rent):
+        m = params.income_y - transport * x
+        if p > 0:
+            worst = max(worst, abs(m - p * params.min_floor_sqm - utility * p ** params.housing_share_beta) / m)
+    print(f"  Max relative residual: {worst:.1e} [{'PASS' if worst < 1e-8 else 'FAIL'}]")
+    print(f"  FAR(0) = D0: {profile.far[0]:.6f} [{'PASS' if abs(profile.far[0] - 10.0) < 1e-6 else 'FAIL'}]")
+    decreasing = all(a >= b for a, b in zip(profile.far, profile.far[1:]))
+    print(f"  FAR non-increasing with distance (fringe {profile.fringe_km} km): {'PASS' if decreasing else 'FAIL'}")
+
+    # 2. Engine keeps the density audit and records unsolvable bid-rent inputs in the block
+    engine = BertaudAuditEngine(10.0, 0.1, bid_rent_params=params)
+    solved = engine.calculate_optimal_density(capital_k, land_cost_e, transport, 5.0, 6.0)
+    ok = solved["bid_rent"]["inside_fringe"] and "error" not in solved["bid_rent"]
+    print(f"  Solvable inputs give a bid_rent block: {'PASS' if ok else 'FAIL'}")
+    for label, k in (("capital_k=0", 0.0), ("capital_k=1.2e9", 1.2e9)):
+        result = engine.calculate_optimal_density(k, land_cost_e, transport, 5.0, 6.0)
+        ok = result["status"] == "Optimal" and "error" in result["bid_rent"]
+        print(f"  {label} recorded as bid_rent error: {'PASS' if ok else 'FAIL'}")
+
+    # 3. Grid interpolation agrees with the exact solve, and parcels share one grid profile
+    rng = random.Random(44)
+    xs = [rng.uniform(0.0, 45.0) for _ in range(2_000)]
+    ok = True
+    for t in (transport, lambda x: 800.0 * x + 50.0 * x * x):
+        approx, exact = solver.interpolate(xs, capital_k, land_cost_e, t), solver.solve(xs, capital_k, land_cost_e, t)
+        ok = ok and approx.fringe_km == exact.fringe_km and all(
+            abs(a - b) <= 1e-5 * b for a, b in zip(approx.floor_rent + approx.far, exact.floor_rent + exact.far)
+        )
+    print(f"  Interpolated profile matches the exact solve: {'PASS' if ok else 'FAIL'}")
+    engine = BertaudAuditEngine(10.0, 0.1, bid_rent_params=params)
+    blocks = [engine.calculate_optimal_density(capital_k, land_cost_e, transport, x, 6.0)["bid_rent"] for x in xs]
+    exact = solver.solve(xs, capital_k, land_cost_e, transport)
+    ok = all(abs(b["equilibrium_far"] - f) <= 1e-5 * f for b, f in zip(blocks, exact.far))
+    cached = len(engine._bid_rent_solver._cache)
+    print(f"  {len(xs)} parcel audits solved {cached} profile(s): {'PASS' if ok and cached == 1 else 'FAIL'}")
+
+    print("\n--- Verification Complete ---")
+
+if __name__ == "__main__":
+    verify_bid_rent()
@@ -0,0 +1,49 @@
+import math
+
+from bertaud_engine import BertaudAuditEngine
+from density_projection import STATUSES, DensityProjection, ProjectionInputs, status_code
+from geodesic_distance import CBD_CENTER_ID
+
+def verify_density_projection():
+    print("--- Verifying Multi-Year Density Projection ---")
+
+    # 1. Vectorized status codes match classify_status, including the band edges
+    grid = [i / 1000 for i in range(1500)] + [0.7, 0.8, 1.0, 1.1, 1.2, 1.2 - 0.1, 1.1 - 0.1, 0.8 - 0.1]
+    ok = all(
+        STATUSES[status_code(e, "yellow" in zone.lower())] == BertaudAuditEngine.classify_status(e, zone)
+        for e in grid for zone in ("Red", "Yellow", "")
+    )
+    print(f"  status_code matches classify_status: {'PASS' if ok else 'FAIL'}")
+
+    # 2. Parcels without a distance are skipped, not a TypeError
+    parcels = [
+        {"id": f"p{i}", "current_far": 2.0 + (i % 7), "zone_color": "Yellow" if i % 3 == 0 else "Red",
+         "distance_from_cbd_km": float(i % 25)}
+        for i in range(300)
+    ]
+    parcels += [{"id": "no_distance", "current_far": 4.0, "distance_from_cbd_km": None},
+                {"id": "bad_distance", "current_far": 4.0, "distance_from_cbd_km": "n/a"}]
+    inputs = ProjectionInputs.from_parcels(parcels)
+    ok = inputs.skipped == ["no_distance", "bad_distance"] and len(inputs.ids) == 300
+    print(f"  Missing / non-numeric distances skipped: {'PASS' if ok else 'FAIL'}")
+
+    # 3. Projected counts agree with the engine parcel by parcel, chunk boundaries included
+    projection = DensityProjection.monocentric({2025: (10.0, 0.10), 2035: (12.0, 0.08)}, chunk_size=64)
+    result = projection.run(inputs, keep_matrices=True)
+    ok = result.skipped == 2 and result.parcel_count == 300
+    for y, year in enumerate(projection.years):
+        d0s, gs = projection.params[CBD_CENTER_ID]
+        d0, g = d0s[y], gs[y]
+        expected = {s: 0 for s in STATUSES}
+        for parcel in parcels[:300]:
+            theoretical = d0 * math.exp(-g * parcel["distance_from_cbd_km"])
+            expected[BertaudAuditEngine.classify_status(parcel["current_far"] / theoretical, parcel["zone_color"])] += 1
+        ok = ok and result.status_counts[year] == expected
+    changed = sum(result.base_to_final.values())
+    print(f"  Status counts match the engine for {len(projection.years)} years "
+          f"({changed} parcels change status): {'PASS' if ok else 'FAIL'}")
+
+    print("\n--- Verification Complete ---")
+
+if __name__ == "__main__":
+    verify_density_projection()
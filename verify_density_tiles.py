@@ -0,0 +1,67 @@
+import math
+
+from bertaud_engine import BertaudAuditEngine
+from caching import LRUCache
+from density_tiles import (DensityTileService, decode_density_curve, decode_tile, density_curve, render_tile,
+                           tile_scale)
+from spatial_index import haversine_km
+
+LOCATIONS = {"CBD": (13.7466, 100.5393), "SC1": (13.8210, 100.5560)}
+CONFIG = {"CBD": {"d0": 10.0, "g": 0.1}, "SC1": {"d0": 4.0, "g": 0.3}}
+TILE = (12, 3191, 1890)  # Central Bangkok at zoom 12
+
+def pixel_location(zoom, x, y, size, i, j):
+    n = 1 << zoom
+    lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + (j + 0.5) / size) / n))))
+    lon = (x + (i + 0.5) / size) / n * 360.0 - 180.0
+    return lat, lon
+
+def verify_density_tiles():
+    print("--- Verifying Density Curves and Heatmap Tiles ---")
+    engine = BertaudAuditEngine(d0_center_density=10.0, density_gradient_g=0.1)
+
+    # 1. Curve samples match the engine formula (Float32)
+    header, values = decode_density_curve(density_curve(10.0, 0.1, 20.0, 101))
+    ok = header["count"] == 101 and all(
+        abs(v - engine.calculate_optimal_density(0, 0, 0, i * header["step_km"], 0)["theoretical_density"]) < 1e-5
+        for i, v in enumerate(values)
+    )
+    print(f"  Density curve matches D0 * e^(-g x): {'PASS' if ok else 'FAIL'}")
+
+    # 2. Tile pixels match calculate_polycentric_density at the pixel centers
+    centers = [(lat, lon, CONFIG[cid]["d0"], CONFIG[cid]["g"]) for cid, (lat, lon) in sorted(LOCATIONS.items())]
+    size = 32
+    _, floats = decode_tile(render_tile(centers, *TILE, size=size, dtype="float32"))
+    _, quantized = decode_tile(render_tile(centers, *TILE, size=size, dtype="uint8"))
+    step = tile_scale(centers) / 255.0
+    ok = True
+    for j in range(0, size, 3):
+        for i in range(0, size, 3):
+            lat, lon = pixel_location(*TILE, size, i, j)
+            distances = {cid: haversine_km(lat, lon, *loc) for cid, loc in LOCATIONS.items()}
+            expected = engine.calculate_polycentric_density(distances, CONFIG)
+            ok = ok and abs(floats[j * size + i] - expected) < 1e-4 * expected
+            ok = ok and abs(quantized[j * size + i] - expected) <= 0.5 * step + 1e-6
+    print(f"  Float32 and Uint8 tiles match the engine: {'PASS' if ok else 'FAIL'}")
+
+    # 3. Service cache: repeat hits, parameter changes invalidate
+    service = DensityTileService(LOCATIONS, CONFIG, tile_size=16)
+    first = service.get_tile(*TILE)
+    ok = service.get_tile(*TILE) is first and service.stats == {"hits": 1, "misses": 1, "invalidations": 0}
+    service.set_parameters({"CBD": {"d0": 12.0, "g": 0.1}, "SC1": CONFIG["SC1"]})
+    ok = ok and service.get_tile(*TILE) != first and service.stats["misses"] == 2
+    print(f"  Tile cache hits and invalidation: {'PASS' if ok else 'FAIL'}")
+
+    # 4. Shared LRU cache evicts the least recently used key
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    ok = len(cache) == 2 and cache.get("b") is None and cache.get("a") == 1 and cache.get("c") == 3
+    print(f"  LRUCache eviction order: {'PASS' if ok else 'FAIL'}")
+
+    print("\n--- Verification Complete ---")
+
+if __name__ == "__main__":
+    verify_density_tiles()
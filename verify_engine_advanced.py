@@ -1,3 +1,6 @@
+import math
+import random
+
 from bertaud_engine import BertaudAuditEngine
 
 def verify_advanced_features():
@@ -70,6 +73,26 @@ def verify_advanced_features():
     else:
         print("FAIL: Calibration inaccurate.")
 
+    # 4b. Robust Calibration (outliers, convergence reported)
+    print("\n[Test 4b] Robust Calibration:")
+    rng = random.Random(4)
+    samples = [(x * 0.01, 10.0 * math.exp(-0.1 * x * 0.01 + rng.gauss(0, 0.1))) for x in range(3000)]
+    samples += [(x * 0.3, 80.0) for x in range(30)]  # Mis-recorded towers
+    result = BertaudAuditEngine.calibrate_robust(samples, subsample=500)
+    print(f"Estimated g: {result.g:.3f}, converged={result.converged}")
+
+    if 0.09 < result.g < 0.11 and result.converged:
+        print("PASS: Robust calibration accurate and converged.")
+    else:
+        print("FAIL: Robust calibration inaccurate or not converged.")
+
+    # 3030 samples > 5 x 500: the full-data pass is skipped unless asked for
+    refined = BertaudAuditEngine.calibrate_robust(samples, subsample=500, full_passes=1)
+    if refined.iterations == result.iterations + 1 and 0.09 < refined.g < 0.11 and refined.converged:
+        print("PASS: Full-data pass skipped by default on large inputs, runs when requested.")
+    else:
+        print("FAIL: full_passes default not applied.")
+
     # 5. Status Logic (Granularity & Context)
     print("\n[Test 5] Status Logic Granularity:")
     # Base: D0=10, g=0 -> Dx=10 everyday
@@ -0,0 +1,63 @@
+import random
+
+from bertaud_engine import BertaudAuditEngine
+from geodesic_distance import CBD_CENTER_ID, CenterDistanceStage
+from spatial_index import haversine_km
+
+def verify_geodesic_distance():
+    print("--- Verifying Bulk Geodesic Distance Stage ---")
+    rng = random.Random(27)
+    centers = {CBD_CENTER_ID: (13.7466, 100.5393), "SC1": (13.8210, 100.5560), "SC2": (13.6900, 100.4500)}
+    parcels = [{"id": f"p{i}", "gps_coordinates": f"{13.6 + rng.random() * 0.3}, {100.4 + rng.random() * 0.3}"}
+               for i in range(5_000)]
+    parcels += [{"id": "no_gps", "gps_coordinates": None}, {"id": "bad_gps", "gps_coordinates": "n/a"}]
+
+    def matches_scalar(stage):
+        for parcel in parcels[:5_000]:
+            lat, lon = map(float, parcel["gps_coordinates"].split(","))
+            dmap = stage.distance_map(parcel["id"])
+            if set(dmap) != set(stage.center_locations):
+                return False
+            for center_id, (c_lat, c_lon) in stage.center_locations.items():
+                if abs(dmap[center_id] - haversine_km(lat, lon, c_lat, c_lon)) > 1e-9:
+                    return False
+        return True
+
+    # 1. Chunked matrix matches scalar haversine; CBD written back, bad coordinates listed
+    stage = CenterDistanceStage(centers, chunk_size=777)
+    stage.load_parcels(parcels)
+    stage.compute()
+    ok = matches_scalar(stage) and stage.invalid_ids == ["no_gps", "bad_gps"]
+    ok = ok and all(p["distance_from_cbd_km"] == stage.distance_map(p["id"])[CBD_CENTER_ID] for p in parcels[:5_000])
+    print(f"  Chunked matrix matches scalar haversine: {'PASS' if ok else 'FAIL'}")
+
+    # 2. Moving one center recomputes only that column
+    untouched = stage.distances["SC2"]
+    moved = dict(centers, SC1=(13.80, 100.60), SC3=(13.75, 100.70))
+    moved.pop("SC2")
+    changed = stage.update_centers(moved)
+    ok = sorted(changed) == ["SC1", "SC3"] and "SC2" not in stage.distances and matches_scalar(stage)
+    ok = ok and stage.update_centers(dict(moved, SC2=centers["SC2"])) == ["SC2"]
+    ok = ok and stage.distances["SC2"] == untouched
+    print(f"  update_centers recomputes only moved centers: {'PASS' if ok else 'FAIL'}")
+
+    # 3. Editing parcels recomputes only their rows
+    for parcel in parcels[:10]:
+        parcel["gps_coordinates"] = f"{13.6 + rng.random() * 0.3}, {100.4 + rng.random() * 0.3}"
+    ok = stage.update_parcels(parcels[:10]) == 10 and matches_scalar(stage)
+    print(f"  update_parcels recomputes edited rows: {'PASS' if ok else 'FAIL'}")
+
+    # 4. Column-wise polycentric densities equal the engine's scalar formula
+    config = {CBD_CENTER_ID: {"d0": 10.0, "g": 0.1}, "SC1": {"d0": 4.0, "g": 0.3}, "SC2": {"d0": 3.0, "g": 0.4}}
+    engine = BertaudAuditEngine(d0_center_density=10.0, density_gradient_g=0.1)
+    densities = stage.polycentric_densities(config)
+    ok = all(
+        abs(densities[pid] - engine.calculate_polycentric_density(stage.distance_map(pid), config)) < 1e-9
+        for pid in stage.ids[:500]
+    )
+    print(f"  polycentric_densities matches the engine: {'PASS' if ok else 'FAIL'}")
+
+    print("\n--- Verification Complete ---")
+
+if __name__ == "__main__":
+    verify_geodesic_distance()
@@ -0,0 +1,78 @@
+import random
+from firestore_models import EconomicParameters, ProjectProposal, ProposalHistory
+from proposal_history import ProposalHistoryLog, apply_delta, compact_history, diff_snapshots, storage_savings
+
+def build_proposal(i):
+    params = EconomicParameters(id="tax_year_2025", year=2025, effective_date="2025-01-01",
+                                bertaud_density_gradient_coefficient=0.15)
+    return ProjectProposal(
+        id=f"proposal_{i:03d}",
+        parcel_id=f"parcel_{i:03d}",
+        param_id=params.id,
+        economic_parameters_snapshot=params.to_dict(),
+        calculation_inputs={"d0": 20.0, "g": 0.15, "distance_km": 2.5, "formula_version": "v1.0"},
+        proposed_gfa=45000.0,
+        proposed_building_type="high-rise",
+        proposed_investment_cost=1_200_000_000.0,
+        proposed_upfront_fee=50_000_000.0,
+        proposed_annual_rent=12_000_000.0,
+        created_at="2025-01-02T14:30:00Z",
+        updated_at="2025-01-02T14:30:00Z"
+    ).to_dict()
+
+def verify_delta_history():
+    print("--- Verifying Delta-Encoded Proposal History ---")
+    random.seed(7)
+
+    # 1. Edit-heavy workload: 50 proposals x 60 edits touching 1-3 fields each
+    full_histories = {}
+    for i in range(50):
+        snapshot = build_proposal(i)
+        entries = []
+        for k in range(60):
+            entries.append(ProposalHistory(
+                id=f"hist_{k:06d}", proposal_id=snapshot["id"], changed_by="auditor_007",
+                changed_at=f"2025-02-01T10:{k:02d}:00Z", change_summary="Edit",
+                previous_snapshot=dict(snapshot, economic_parameters_snapshot=dict(snapshot["economic_parameters_snapshot"]),
+                                       calculation_inputs=dict(snapshot["calculation_inputs"]))
+            ))
+            snapshot["proposed_annual_rent"] *= 1 + random.uniform(-0.05, 0.05)
+            if random.random() < 0.3:
+                snapshot["calculation_inputs"]["distance_km"] = round(random.uniform(1, 10), 2)
+            if random.random() < 0.2:
+                snapshot["audit_status"] = random.choice(["Pending", "Approved", "Rejected"])
+            snapshot["updated_at"] = f"2025-02-01T10:{k:02d}:30Z"
+            snapshot["version"] += 1
+        full_histories[snapshot["id"]] = entries
+
+    # 2. Compact and measure
+    before, after = [], []
+    all_match = True
+    for proposal_id, entries in full_histories.items():
+        compacted = compact_history(entries, checkpoint_interval=10)
+        before.extend(entries)
+        after.extend(compacted)
+        log = ProposalHistoryLog(proposal_id, compacted, checkpoint_interval=10)
+        for k, original in enumerate(entries):
+            if log.reconstruct(k) != original.previous_snapshot:
+                all_match = False
+
+    savings = storage_savings(before, after)
+    print(f"  Entries: {len(before)}")
+    print(f"  Full-copy storage: {savings['before_bytes']:,} bytes")
+    print(f"  Delta storage:     {savings['after_bytes']:,} bytes")
+    print(f"  Saved: {savings['saved_percent']:.1f}%")
+    print(f"  Reconstruction matches originals: {'PASS' if all_match else 'FAIL'}")
+
+    # 3. Keys containing "." survive diff and apply
+    old = {"calculation_inputs": {"formula_version": "v1.0", "zone.code": "Red"}, "v1.0": {"a": 1}}
+    new = {"calculation_inputs": {"formula_version": "v1.1", "zone.code": "Yellow"}, "v1.0": {"a": 2, "b": 3}}
+    delta = diff_snapshots(old, new)
+    back = diff_snapshots(new, old)
+    ok = apply_delta(old, delta) == new and apply_delta(new, back) == old
+    print(f"  Dotted keys round-trip: {'PASS' if ok else 'FAIL'}")
+
+    print("\n--- Verification Complete ---")
+
+if __name__ == "__main__":
+    verify_delta_history()
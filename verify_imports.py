@@ -0,0 +1,100 @@
+"""
+Import-Time Budget Check
+Measures the cold import cost of each entry point with
+`python -X importtime -c "import <module>"` (best of several fresh
+interpreters) and fails if an entry point goes over its budget or loads a
+heavy optional dependency it should only load on use.
+
+Usage:
+    python verify_imports.py              # report + enforce budgets
+    python verify_imports.py --runs 10 --scale 2.0   # slower machine
+
+Exit code 1 on any failure.
+
+Author: BaanBid Development Team
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+
+# --- Budgets ---
+HEAVY_DEPENDENCIES = ("reportlab", "PIL", "pydantic", "numpy", "pyarrow", "msgpack")
+
+# entry point -> (budget in ms of cumulative import time, modules that must not be loaded)
+ENTRY_POINTS: Dict[str, Tuple[float, Tuple[str, ...]]] = {
+    "far_calculation": (75.0, HEAVY_DEPENDENCIES + ("multiprocessing",)),
+    "bertaud_engine": (75.0, HEAVY_DEPENDENCIES + ("multiprocessing",)),
+    "financial_audit": (75.0, HEAVY_DEPENDENCIES),
+    "report_generator": (75.0, HEAVY_DEPENDENCIES),
+    "audit_pipeline": (120.0, HEAVY_DEPENDENCIES + ("multiprocessing",)),
+    "bertaud_audit": (120.0, HEAVY_DEPENDENCIES + ("multiprocessing",)),
+    "density_tiles": (150.0, HEAVY_DEPENDENCIES),
+    "audit_service": (200.0, HEAVY_DEPENDENCIES),
+    "result_store": (75.0, HEAVY_DEPENDENCIES + ("multiprocessing",)),
+}
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def measure_import_ms(module: str, runs: int = 5) -> float:
+    """Best-of-`runs` cumulative import time (ms) of `module` in a fresh interpreter."""
+    best = float("inf")
+    for _ in range(runs + 1):  # Extra run warms the bytecode cache; only the best counts
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=REPO_DIR, capture_output=True, text=True
+        )
+        if proc.returncode != 0:
+            raise ImportError(proc.stderr.strip().splitlines()[-1])
+        for line in proc.stderr.splitlines():
+            if not line.startswith("import time:"):
+                continue
+            _, _, cumulative, name = (part.strip() for part in line.replace("import time:", "|", 1).split("|"))
+            if name == module:
+                best = min(best, int(cumulative) / 1000.0)
+    return best
+
+
+def loaded_modules(module: str) -> List[str]:
+    proc = subprocess.run(
+        [sys.executable, "-c", f"import json, sys, {module}; print(json.dumps(sorted(sys.modules)))"],
+        cwd=REPO_DIR, capture_output=True, text=True, check=True
+    )
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def verify_import_budgets(runs: int = 5, scale: float = 1.0) -> bool:
+    print("--- Verifying Import-Time Budgets ---")
+    print(f"{'entry point':<20} {'import ms':>10} {'budget ms':>10}  result")
+    ok = True
+    for module, (budget_ms, forbidden) in ENTRY_POINTS.items():
+        try:
+            elapsed_ms = measure_import_ms(module, runs)
+        except ImportError as e:
+            ok = False
+            print(f"{module:<20} {'-':>10} {budget_ms * scale:>10.1f}  FAIL ({e})")
+            continue
+        budget_ms *= scale
+        loaded = set(loaded_modules(module))
+        leaked = [name for name in forbidden if name in loaded]
+        passed = elapsed_ms <= budget_ms and not leaked
+        ok = ok and passed
+        status = "PASS" if passed else "FAIL"
+        print(f"{module:<20} {elapsed_ms:>10.1f} {budget_ms:>10.1f}  {status}"
+              + (f" (loads {', '.join(leaked)})" if leaked else ""))
+    print("\n--- Verification Complete ---" if ok else "\n--- Verification FAILED ---")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import-time budget check per entry point")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per entry point (best is kept)")
+    parser.add_argument("--scale", type=float, default=float(os.environ.get("BERTAUD_IMPORT_BUDGET_SCALE", 1.0)),
+                        help="Multiply all budgets (slow CI machines)")
+    args = parser.parse_args()
+    sys.exit(0 if verify_import_budgets(args.runs, args.scale) else 1)
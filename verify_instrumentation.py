@@ -0,0 +1,88 @@
+import csv
+import os
+import shutil
+import tempfile
+
+import instrumentation
+from instrumentation import REGISTRY
+
+def far_calls():
+    hist = REGISTRY.durations.get("calculate_far")
+    return hist.count if hist is not None else 0
+
+def verify_instrumentation():
+    print("--- Verifying Instrumentation Across Process Pools ---")
+    instrumentation.enable()
+    n = 40
+
+    # 1. AsyncAuditRunner with a process executor
+    from async_audit_runner import AsyncAuditConfig, AsyncAuditRunner
+    from verify_async_runner import build_store
+    ids = [f"proposal_{i}" for i in range(n)]
+    REGISTRY.reset()
+    REGISTRY.observe("calculate_far", 0.001)  # Parent-side metric a forked worker must not send back
+    config = AsyncAuditConfig(read_batch_size=10, executor="process", max_workers=2, include_financial=False)
+    report = AsyncAuditRunner(build_store(n, 0.0), config).run(ids)
+    ok = report.written == n and far_calls() == n + 1
+    print(f"  Async runner process pool: {far_calls() - 1} of {n} FAR calls counted: {'PASS' if ok else 'FAIL'}")
+
+    # 2. bertaud_audit CLI with worker processes
+    import bertaud_audit
+    root = tempfile.mkdtemp(prefix="instrumentation_")
+    try:
+        path = os.path.join(root, "parcels.csv")
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["id", "gps_coordinates", "land_area_rai", "appraisal_price_per_wah",
+                             "distance_from_cbd_km", "current_far", "legal_far_limit"])
+            for i in range(n):
+                writer.writerow([f"parcel_{i}", "13.75, 100.50", 5.0, 150000.0, 1.0 + i % 15, 3.0, 8.0])
+        REGISTRY.reset()
+        args = bertaud_audit.build_parser().parse_args([
+            "--parcels", path, "--output", os.path.join(root, "out"), "--d0", "10", "--g", "0.1",
+            "--workers", "2", "--chunk-size", "10", "--quiet"
+        ])
+        stats = bertaud_audit.run(args)
+        hist = REGISTRY.durations.get("calculate_optimal_density")
+        counted = hist.count if hist is not None else 0
+        ok = stats["rows"] == n and counted == n
+        print(f"  bertaud_audit workers: {counted} of {n} density calls counted: {'PASS' if ok else 'FAIL'}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    # 3. AuditPipeline.run_batch across worker processes (distinct GFAs, so no stage cache hits)
+    from audit_pipeline import AuditPipeline
+    from firestore_models import LandParcel, ProjectProposal
+    pairs = []
+    for i in range(n):
+        parcel = LandParcel(id=f"parcel_{i}", gps_coordinates="13.75, 100.50", land_area_rai=5.0,
+                            appraisal_price_per_wah=150000.0, distance_from_cbd_km=2.5,
+                            current_far=2.0, legal_far_limit=8.0)
+        proposal = ProjectProposal(
+            id=f"proposal_{i}", parcel_id=parcel.id, param_id="ty2025", economic_parameters_snapshot={},
+            calculation_inputs={"d0": 20.0, "g": 0.15}, efficiency_score=0.0, audit_status="Draft",
+            proposed_gfa=40000.0 + i, proposed_building_type="high-rise",
+            proposed_investment_cost=1.2e9, proposed_upfront_fee=5e7, proposed_annual_rent=1.2e7
+        )
+        pairs.append((proposal, parcel))
+    REGISTRY.reset()
+    results = AuditPipeline().run_batch(pairs, workers=2, chunk_size=10)
+    ok = all(r.error is None for r in results) and far_calls() == n
+    print(f"  AuditPipeline.run_batch workers: {far_calls()} of {n} FAR calls counted: {'PASS' if ok else 'FAIL'}")
+
+    # 4. Snapshots merge into the same totals as in-process recording
+    a, b = instrumentation.MetricsRegistry(), instrumentation.MetricsRegistry()
+    for v in (0.001, 0.002):
+        a.observe("x", v)
+    b.observe("x", 0.5)
+    b.count_cache("far", hit=True)
+    a.merge(b.drain())
+    ok = a.durations["x"].count == 3 and a.cache == {("far", "hit"): 1} and not b.durations
+    print(f"  Registry drain/merge: {'PASS' if ok else 'FAIL'}")
+
+    instrumentation.disable()
+    REGISTRY.reset()
+    print("\n--- Verification Complete ---")
+
+if __name__ == "__main__":
+    verify_instrumentation()
@@ -0,0 +1,81 @@
+import random
+
+from local_index import LocalIndexEngine, MissingIndexError
+
+STATUSES = ["Pending", "Approved", "Rejected"]
+
+def make_doc(i, rng):
+    return {"id": f"proposal_{i:05d}", "audit_status": rng.choice(STATUSES),
+            "efficiency_score": round(rng.uniform(0.0, 2.0), 2),
+            "created_at": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"}
+
+def brute_query(docs, equals, field, lower, upper, descending=False):
+    """List scan with the same filters, ordered by (field, id)."""
+    hits = [d for d in docs.values()
+            if all(d.get(k) == v for k, v in equals.items())
+            and (field is None or ((lower is None or d[field] >= lower) and (upper is None or d[field] <= upper)))]
+    hits.sort(key=lambda d: d["id"])
+    if field is not None:
+        hits.sort(key=lambda d: d[field], reverse=descending)
+    return [d["id"] for d in hits]
+
+def verify_local_index():
+    print("--- Verifying In-Memory Composite Indexes ---")
+    rng = random.Random(30)
+    engine = LocalIndexEngine.from_index_file()
+    coll = engine.collection("project_proposals")
+    docs = {}
+    for i in range(5_000):
+        doc = make_doc(i, rng)
+        docs[doc["id"]] = doc
+    coll.put_many(docs.values())
+    for doc_id in rng.sample(sorted(docs), 1_000):
+        coll.delete(doc_id)
+        del docs[doc_id]
+    for i in range(0, 5_000, 7):
+        doc = make_doc(i, rng)
+        coll.put(doc["id"], doc)
+        docs[doc["id"]] = doc
+
+    # 1. Equality + range queries match a list scan, ascending and descending indexes
+    ok = True
+    for _ in range(200):
+        status = rng.choice(STATUSES)
+        lo, hi = sorted(round(rng.uniform(0.0, 2.0), 2) for _ in range(2))
+        got = [d["id"] for d in coll.query({"audit_status": status}, "efficiency_score", lo, hi)]
+        ok = ok and got == brute_query(docs, {"audit_status": status}, "efficiency_score", lo, hi)
+        got = [d["id"] for d in coll.query({"audit_status": status}, "created_at", lower="2025-03-01")]
+        ok = ok and got == brute_query(docs, {"audit_status": status}, "created_at", "2025-03-01", None, True)
+    print(f"  Equality + range queries match a list scan: {'PASS' if ok else 'FAIL'}")
+
+    # 2. Unfiltered queries: document-ID order, or the order_by field's own index
+    ok = [d["id"] for d in coll.query()] == sorted(docs)
+    ok = ok and [d["id"] for d in coll.query(order_by="efficiency_score")] == brute_query(
+        docs, {}, "efficiency_score", None, None)
+    print(f"  Unfiltered queries ordered by id / order_by: {'PASS' if ok else 'FAIL'}")
+
+    # 3. Pagination survives deleting the cursor document
+    expected = brute_query(docs, {"audit_status": "Approved"}, "efficiency_score", None, None)
+    pages, cursor = [], None
+    while True:
+        page = coll.query({"audit_status": "Approved"}, "efficiency_score", limit=50, start_after=cursor)
+        if not page:
+            break
+        pages.extend(d["id"] for d in page)
+        cursor = page[-1]["id"]
+        coll.delete(cursor)
+    print(f"  Paging past deleted cursors ({len(pages)} docs): {'PASS' if pages == expected else 'FAIL'}")
+
+    # 4. Missing index errors name the requested fields
+    try:
+        coll.query({"audit_status": "Approved", "parcel_id": "p1"})
+        message = ""
+    except MissingIndexError as e:
+        message = str(e)
+    ok = "audit_status ==" in message and "parcel_id ==" in message and "None" not in message
+    print(f"  MissingIndexError lists requested fields: {'PASS' if ok else 'FAIL'}")
+
+    print("\n--- Verification Complete ---")
+
+if __name__ == "__main__":
+    verify_local_index()
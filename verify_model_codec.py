@@ -0,0 +1,76 @@
+import json
+from dataclasses import asdict
+
+from firestore_models import EconomicParameters, LandParcel, ProjectProposal, ProposalHistory
+from model_codec import CodecError, benchmark_against_asdict, get_codec
+
+def sample_models():
+    snapshot = EconomicParameters(id="tax_year_2025", year=2025, effective_date="2025-01-01")
+    return [
+        LandParcel(id="parcel_1", gps_coordinates="13.75, 100.50", land_area_rai=5.0,
+                   appraisal_price_per_wah=150000.0, distance_from_cbd_km=2.5, current_far=2.0,
+                   legal_far_limit=8.0, zone_color="Red", district="Bang Rak"),
+        snapshot,
+        ProjectProposal(id="proposal_1", parcel_id="parcel_1", param_id="tax_year_2025",
+                        economic_parameters_snapshot=snapshot.to_dict(),
+                        calculation_inputs={"d0": 20.0, "g": 0.15, "distance_km": 2.5},
+                        proposed_gfa=45000.0, proposed_building_type="high-rise",
+                        proposed_investment_cost=1.2e9, proposed_upfront_fee=5e7, proposed_annual_rent=1.2e7),
+        ProposalHistory(id="h1", proposal_id="proposal_1", changed_by="analyst", changed_at="2025-01-02T00:00:00",
+                        change_summary="Update GFA", previous_snapshot={}, sequence=1, is_checkpoint=False,
+                        delta={"set": [[["proposed_gfa"], 40000.0]], "unset": []}),
+    ]
+
+def verify_model_codec():
+    print("--- Verifying Schema-Driven Model Codec ---")
+    models = sample_models()
+
+    # 1. dict and JSON round trips agree with asdict for every model
+    ok = True
+    for model in models:
+        codec = get_codec(type(model))
+        ok = ok and codec.encode(model) == asdict(model) and codec.decode(codec.encode(model)) == model
+        ok = ok and codec.from_json(codec.to_json(model)) == model
+        ok = ok and json.loads(codec.to_json_many([model, model])) == [asdict(model)] * 2
+    print(f"  dict / JSON round trips match asdict: {'PASS' if ok else 'FAIL'}")
+
+    # 2. Defaults, unknown keys and missing required fields
+    codec = get_codec(LandParcel)
+    doc = {k: v for k, v in asdict(models[0]).items() if k not in ("district", "version")}
+    doc["legacy_field"] = "ignored"
+    decoded = codec.decode(doc)
+    ok = decoded.district is None and decoded.version == 1
+    try:
+        codec.decode({"id": "parcel_2"})
+        ok = False
+    except CodecError:
+        pass
+    print(f"  Defaults, unknown keys, missing required fields: {'PASS' if ok else 'FAIL'}")
+
+    # 3. Positional msgpack form (optional dependency)
+    try:
+        import msgpack  # noqa: F401
+    except ImportError:
+        print("  msgpack round trip: SKIPPED (msgpack not installed)")
+    else:
+        proposal_codec = get_codec(ProjectProposal)
+        ok = proposal_codec.from_msgpack(proposal_codec.to_msgpack(models[2])) == models[2]
+        ok = ok and proposal_codec.from_msgpack_many(proposal_codec.to_msgpack_many(models[2:3] * 3)) == models[2:3] * 3
+        try:
+            get_codec(LandParcel).from_msgpack(proposal_codec.to_msgpack(models[2]))
+            ok = False
+        except CodecError:
+            pass
+        print(f"  msgpack round trip and fingerprint check: {'PASS' if ok else 'FAIL'}")
+
+    # 4. Bulk encode beats asdict; decode is at least as fast as cls(**d)
+    results = benchmark_against_asdict(n=10_000)
+    encode_speedup = results["asdict_encode_s"] / results["codec_encode_s"]
+    decode_speedup = results["init_decode_s"] / results["codec_decode_s"]
+    ok = encode_speedup > 2.0 and decode_speedup > 0.9
+    print(f"  Encode {encode_speedup:.1f}x / decode {decode_speedup:.1f}x vs asdict: {'PASS' if ok else 'FAIL'}")
+
+    print("\n--- Verification Complete ---")
+
+if __name__ == "__main__":
+    verify_model_codec()
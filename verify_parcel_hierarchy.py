@@ -0,0 +1,131 @@
+import math
+import random
+
+from bertaud_engine import BertaudAuditEngine
+from parcel_hierarchy import SQM_PER_RAI, HierarchyCycleError, ParcelHierarchy
+
+D0, G = 10.0, 0.1
+
+def make_parcel(parcel_id, parent_id, rng):
+    return {"id": parcel_id, "parent_parcel_id": parent_id, "land_area_rai": rng.uniform(0.5, 10.0),
+            "current_far": rng.uniform(0.5, 8.0), "legal_far_limit": rng.choice([4.0, 6.0, 8.0, 10.0]),
+            "distance_from_cbd_km": rng.uniform(0.0, 25.0), "zone_color": rng.choice(["Red", "Yellow", "Orange"])}
+
+def brute_rollup(parcels, children, parcel_id):
+    """Sums over current (childless) parcels under parcel_id by walking the live parent links."""
+    totals = {"parcels": 0, "land": 0.0, "floor": 0.0, "headroom": 0.0, "status": {}}
+    stack = [parcel_id]
+    while stack:
+        pid = stack.pop()
+        kids = children.get(pid)
+        if kids:
+            stack.extend(kids)
+            continue
+        p = parcels[pid]
+        land = p["land_area_rai"] * SQM_PER_RAI
+        totals["parcels"] += 1
+        totals["land"] += land
+        totals["floor"] += p["current_far"] * land
+        totals["headroom"] += (p["legal_far_limit"] - p["current_far"]) * land
+        optimal = D0 * math.exp(-G * p["distance_from_cbd_km"])
+        status = BertaudAuditEngine.classify_status(p["current_far"] / optimal, p["zone_color"])
+        totals["status"][status] = totals["status"].get(status, 0) + 1
+    return totals
+
+def matches(rollup, expected):
+    close = lambda a, b: abs(a - b) <= 1e-6 * max(1.0, abs(b))
+    counts = {s: c for s, c in rollup.status_counts.items() if c}
+    return (rollup.parcels == expected["parcels"] and close(rollup.land_area_sqm, expected["land"])
+            and close(rollup.floor_area_sqm, expected["floor"])
+            and close(rollup.far_headroom_sqm, expected["headroom"]) and counts == expected["status"])
+
+def verify_parcel_hierarchy():
+    print("--- Verifying Subdivision Hierarchy Index ---")
+    rng = random.Random(50)
+
+    # 1. Random forest: 20k parcels under 2k roots, plus an orphan
+    parcels = {}
+    for i in range(20_000):
+        parent = None if i < 2_000 else f"P{rng.randrange(max(0, i - 3_000), i)}"
+        parcels[f"P{i}"] = make_parcel(f"P{i}", parent, rng)
+    parcels["orphan"] = make_parcel("orphan", "missing_parent", rng)
+    hierarchy = ParcelHierarchy.from_parcels(list(parcels.values()), d0=D0, g=G)
+    parcels["orphan"]["parent_parcel_id"] = None
+    children = {}
+    for pid, p in parcels.items():
+        if p["parent_parcel_id"] is not None:
+            children.setdefault(p["parent_parcel_id"], []).append(pid)
+    print(f"  Orphans reported as roots: {'PASS' if hierarchy.orphans == ['orphan'] else 'FAIL'}")
+
+    def check(sample):
+        return all(matches(hierarchy.rollup(pid), brute_rollup(parcels, children, pid)) for pid in sample)
+
+    ok = check(hierarchy.roots()[:300] + rng.sample(list(parcels), 300))
+    print(f"  Fresh index matches brute force: {'PASS' if ok else 'FAIL'}")
+
+    # 2. 1500 random subdivide / merge / update operations (triggers incremental rebuilds)
+    next_id = 0
+    ok = True
+    for step in range(1, 1501):
+        op = rng.random()
+        leaves = [pid for pid in rng.sample(list(parcels), 20) if not children.get(pid)]
+        if op < 0.4 and leaves:
+            parent = leaves[0]
+            kids = []
+            for _ in range(rng.randint(2, 3)):
+                kids.append(make_parcel(f"N{next_id}", parent, rng))
+                next_id += 1
+            hierarchy.subdivide(parent, kids)
+            for kid in kids:
+                parcels[kid["id"]] = kid
+            children[parent] = [kid["id"] for kid in kids]
+        elif op < 0.7:
+            parent = rng.choice(list(children))
+            kids = children[parent]
+            if all(not children.get(k) for k in kids):
+                if rng.random() < 0.5:
+                    hierarchy.merge(kids)
+                    del children[parent]
+                else:
+                    merged = make_parcel(f"N{next_id}", parent, rng)
+                    next_id += 1
+                    hierarchy.merge(kids, merged)
+                    parcels[merged["id"]] = merged
+                    children[parent] = [merged["id"]]
+                for k in kids:
+                    del parcels[k]
+        elif leaves:
+            pid = leaves[0]
+            updated = dict(make_parcel(pid, parcels[pid]["parent_parcel_id"], rng))
+            hierarchy.update_parcel(updated)
+            parcels[pid] = updated
+        if step % 300 == 0:
+            ok = ok and check(hierarchy.roots()[:100] + rng.sample(list(parcels), 100))
+    print(f"  1500 random operations match brute force: {'PASS' if ok else 'FAIL'}")
+
+    # 3. Forced rebuild keeps every rollup
+    hierarchy.build()
+    ok = check(rng.sample(list(parcels), 300)) and len(hierarchy) == len(parcels)
+    print(f"  Rebuilt index matches brute force: {'PASS' if ok else 'FAIL'}")
+
+    # 4. Cycles are reported, or broken on request
+    cyclic = [make_parcel("A", "C", rng), make_parcel("B", "A", rng), make_parcel("C", "B", rng),
+              make_parcel("D", None, rng)]
+    try:
+        ParcelHierarchy.from_parcels(cyclic)
+        ok = False
+    except HierarchyCycleError as e:
+        ok = len(e.cycles) == 1 and sorted(e.cycles[0]) == ["A", "B", "C"]
+    broken = ParcelHierarchy.from_parcels(cyclic, break_cycles=True)
+    ok = ok and len(broken.broken_cycles) == 1 and sorted(broken.roots()) == ["A", "D"]
+    try:
+        broken.update_parcel(dict(cyclic[0], parent_parcel_id="C"))
+        ok = False
+    except HierarchyCycleError:
+        pass
+    print(f"  Cycles detected and broken: {'PASS' if ok else 'FAIL'}")
+
+    print("\n--- Verification Complete ---")
+
+if __name__ == "__main__":
+    verify_parcel_hierarchy()
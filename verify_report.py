@@ -1,4 +1,6 @@
 from report_generator import PDFReportGenerator
+from audit_pipeline import AuditPipeline
+from firestore_models import LandParcel, ProjectProposal
 import os
 from PIL import Image, ImageDraw
 
@@ -23,25 +25,31 @@ def verify_report_generation():
     
     chart_path = create_dummy_chart_image()
     
-    audit_data = {
-        'project_name': 'โครงการสยามสแควร์ทาวเวอร์ (ทดสอบ)',
-        'overall_status': 'ผ่านเกณฑ์ (Pass)',
-        'summary_text': (
-            "โครงการมีการใช้ประโยชน์ที่ดินอย่างเหมาะสม (Optimal) ตามดัชนี Bertaud "
-            "ผลตอบแทนทางการเงินเป็นบวกและค่าก่อสร้างอยู่ในเกณฑ์มาตรฐาน"
-        ),
-        
-        # Spatial
-        'efficiency_index': 0.95,
-        'density_status': 'เหมาะสม (Optimal)',
-        
-        # Financial
-        'state_npv': 1250000000.00,
-        'roa_percent': 12.5,
-        'roa_status': 'ตามเป้าหมาย (Target)',
-        'cost_deviation': 5.2,
-        'cost_status': 'ผ่านเกณฑ์ (Pass)'
-    }
+    # Build audit_data from a real proposal/parcel instead of hard-coding it
+    parcel = LandParcel(
+        id="parcel_siam_001",
+        gps_coordinates="13.7456, 100.5341",
+        land_area_rai=5.0,
+        appraisal_price_per_wah=450000.0,
+        distance_from_cbd_km=1.5,
+        current_far=4.5,
+        legal_far_limit=10.0,
+        zone_color="Red"
+    )
+    proposal = ProjectProposal(
+        id="โครงการสยามสแควร์ทาวเวอร์ (ทดสอบ)",
+        parcel_id=parcel.id,
+        param_id="tax_year_2025",
+        economic_parameters_snapshot={"discount_rate_state": 0.035, "bertaud_density_gradient_coefficient": 0.1},
+        calculation_inputs={"d0": 10.0, "g": 0.1, "distance_km": 1.5, "formula_version": "v1.0"},
+        proposed_gfa=70000.0,
+        proposed_building_type="high-rise",
+        proposed_investment_cost=2_200_000_000.0,
+        proposed_upfront_fee=250_000_000.0,
+        proposed_annual_rent=90_000_000.0
+    )
+    audit_data = AuditPipeline().build_audit_data(proposal, parcel)
+    print(f"Overall status: {audit_data['overall_status']}")
 
     output_pdf = "Official_Audit_Report_Thai.pdf"
     generator = PDFReportGenerator(output_pdf)
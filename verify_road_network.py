@@ -0,0 +1,110 @@
+import csv
+import math
+import os
+import random
+import shutil
+import tempfile
+
+from road_network import NetworkDistanceField, RoadGraphBuilder, load_edge_csv
+
+SIDE = 25
+STEP_DEG = 0.004
+
+def build_edges(rng):
+    """Jittered street grid with random lengths and some one-way streets."""
+    nodes, edges = {}, []
+    for r in range(SIDE):
+        for c in range(SIDE):
+            nodes[f"n{r}_{c}"] = (13.70 + r * STEP_DEG + rng.uniform(-5e-4, 5e-4),
+                                  100.50 + c * STEP_DEG + rng.uniform(-5e-4, 5e-4))
+    for r in range(SIDE):
+        for c in range(SIDE):
+            for dr, dc in ((0, 1), (1, 0)):
+                if r + dr < SIDE and c + dc < SIDE and rng.random() < 0.9:
+                    edges.append((f"n{r}_{c}", f"n{r + dr}_{c + dc}", rng.uniform(0.3, 0.9),
+                                  rng.uniform(0.5, 3.0), rng.random() < 0.2))
+    return nodes, edges
+
+def brute_distances_to(nodes, edges, target):
+    """Bellman-Ford over the directed edges: km from every node to `target`."""
+    dist = {node: math.inf for node in nodes}
+    dist[target] = 0.0
+    directed = []
+    for u, v, km, _, oneway in edges:
+        directed.append((u, v, km))
+        if not oneway:
+            directed.append((v, u, km))
+    changed = True
+    while changed:
+        changed = False
+        for u, v, km in directed:
+            if dist[v] + km < dist[u]:
+                dist[u] = dist[v] + km
+                changed = True
+    return dist
+
+def verify_road_network():
+    print("--- Verifying Road-Network Distance Field ---")
+    rng = random.Random(45)
+    nodes, edges = build_edges(rng)
+    builder = RoadGraphBuilder()
+    for node_id, (lat, lon) in nodes.items():
+        builder.add_node(node_id, lat, lon)
+    for u, v, km, minutes, oneway in edges:
+        builder.add_edge(u, v, km, minutes=minutes, oneway=oneway)
+    graph = builder.build()
+    centers = {"CBD": nodes["n12_12"], "SC1": nodes["n3_20"], "SC2": nodes["n22_2"]}
+
+    # 1. Per-node km agree with Bellman-Ford in the commute (node -> center) direction
+    field = NetworkDistanceField.compute(graph, centers, workers=1)
+    ok = True
+    for center_id, node_id in (("CBD", "n12_12"), ("SC1", "n3_20"), ("SC2", "n22_2")):
+        expected = brute_distances_to(nodes, edges, node_id)
+        column = field.length_km[center_id]
+        for i, other in enumerate(graph.node_ids):
+            want, got = expected[other], column[i]
+            ok = ok and (got == want if math.isinf(want) else abs(got - want) <= 1e-4 * max(1.0, want))
+    print(f"  Dijkstra matches Bellman-Ford on one-way streets: {'PASS' if ok else 'FAIL'}")
+
+    # 2. Process pool gives the same columns
+    pooled = NetworkDistanceField.compute(graph, centers, workers=2)
+    ok = all(pooled.length_km[c] == field.length_km[c] and pooled.minutes[c] == field.minutes[c] for c in centers)
+    print(f"  Process pool matches single process: {'PASS' if ok else 'FAIL'}")
+
+    # 3. Parcels: access leg plus network km, far-off or bad coordinates unsnapped
+    parcels = [{"id": "on_node", "gps_coordinates": "{}, {}".format(*nodes["n5_5"])},
+               {"id": "far_away", "gps_coordinates": "14.50, 101.50"},
+               {"id": "no_gps", "gps_coordinates": None}]
+    ids, columns, unsnapped = field.parcel_columns(parcels)
+    node = graph.node_ids.index("n5_5")
+    ok = (unsnapped == ["far_away", "no_gps"] and ids == ["on_node", "far_away", "no_gps"]
+          and abs(columns["CBD"][0] - field.length_km["CBD"][node]) < 1e-6 and math.isinf(columns["CBD"][1]))
+    dmap = field.distance_map(*nodes["n5_5"])
+    ok = ok and set(dmap) <= set(centers) and field.distance_map(14.50, 101.50) is None
+    print(f"  Parcel snapping and unsnapped rows: {'PASS' if ok else 'FAIL'}")
+
+    # 4. Edge CSV load and field save / load round trip
+    root = tempfile.mkdtemp(prefix="road_network_")
+    try:
+        path = os.path.join(root, "edges.csv")
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["from_id", "to_id", "from_lat", "from_lon", "to_lat", "to_lon",
+                             "length_km", "minutes", "oneway"])
+            for u, v, km, minutes, oneway in edges:
+                writer.writerow([u, v, *nodes[u], *nodes[v], km, minutes, "yes" if oneway else ""])
+        loaded = load_edge_csv(path)
+        ok = loaded.node_count == graph.node_count and loaded.edge_count == graph.edge_count
+        field_path = os.path.join(root, "city.field")
+        field.save(field_path)
+        restored = NetworkDistanceField.load(field_path)
+        ok = ok and all(restored.length_km[c] == field.length_km[c] for c in centers)
+        ok = ok and restored.distance_map(*nodes["n5_5"]) == dmap
+        print(f"  Edge CSV load and field save/load: {'PASS' if ok else 'FAIL'}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    print("\n--- Verification Complete ---")
+
+if __name__ == "__main__":
+    verify_road_network()
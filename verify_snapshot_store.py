@@ -0,0 +1,58 @@
+from firestore_models import EconomicParameters, ProjectProposal
+from snapshot_store import ParameterSnapshotStore, snapshot_hash
+
+def make_proposal(i, snapshot):
+    return ProjectProposal(
+        id=f"proposal_{i}", parcel_id=f"parcel_{i}", param_id="tax_year_2025",
+        economic_parameters_snapshot=dict(snapshot), proposed_gfa=45000.0, proposed_building_type="high-rise",
+        proposed_investment_cost=1.2e9, proposed_upfront_fee=5e7, proposed_annual_rent=1.2e7
+    )
+
+def verify_snapshot_store():
+    print("--- Verifying Content-Addressed Parameter Snapshots ---")
+    store = ParameterSnapshotStore()
+    params = EconomicParameters(id="tax_year_2025", year=2025, effective_date="2025-01-01")
+    snapshot = params.to_dict()
+
+    # 1. Equal snapshots hash the same regardless of key order
+    reordered = dict(reversed(list(snapshot.items())))
+    ok = store.put(params) == store.put(reordered) == snapshot_hash(snapshot) and len(store) == 1
+    print(f"  Key-order independent hashing: {'PASS' if ok else 'FAIL'}")
+
+    # 2. Encoded proposals carry only the hash; decoded ones share one snapshot object
+    docs = [store.encode_proposal(make_proposal(i, snapshot)) for i in range(1_000)]
+    decoded = store.decode_proposals(docs)
+    ok = all(d["economic_parameters_snapshot"] == {} and d["economic_parameters_hash"] for d in docs)
+    ok = ok and decoded[0].economic_parameters_snapshot == snapshot
+    ok = ok and len({id(p.economic_parameters_snapshot) for p in decoded}) == 1
+    print(f"  Proposals store hashes and share one snapshot: {'PASS' if ok else 'FAIL'}")
+
+    # 3. Legacy documents with an embedded snapshot are interned too
+    legacy = make_proposal(9_999, snapshot).to_dict()
+    proposal = store.decode_proposal(legacy)
+    ok = proposal.economic_parameters_snapshot is decoded[0].economic_parameters_snapshot
+    ok = ok and proposal.economic_parameters_hash == docs[0]["economic_parameters_hash"]
+    print(f"  Legacy embedded snapshots interned: {'PASS' if ok else 'FAIL'}")
+
+    # 4. get_parameters ignores snapshot keys that are not EconomicParameters fields
+    extended = dict(snapshot, source_system="treasury_export", bertaud_notes="v2")
+    digest = store.put(extended)
+    params_out = store.get_parameters(digest)
+    ok = params_out == params and store.get_parameters(digest) is params_out
+    print(f"  get_parameters tolerates extra snapshot keys: {'PASS' if ok else 'FAIL'}")
+
+    # 5. Persistence round trip, tampered documents rejected
+    restored = ParameterSnapshotStore()
+    restored.load_documents(store.to_documents())
+    ok = len(restored) == len(store) and restored.get(digest) == extended
+    try:
+        restored.load_documents({digest: dict(extended, year=1999)})
+        ok = False
+    except ValueError:
+        pass
+    print(f"  Document round trip and hash verification: {'PASS' if ok else 'FAIL'}")
+
+    print("\n--- Verification Complete ---")
+
+if __name__ == "__main__":
+    verify_snapshot_store()
@@ -0,0 +1,84 @@
+import random
+import time
+
+from spatial_index import ParcelSpatialIndex, haversine_km
+
+def brute_nearest(points, lat, lon, k):
+    ranked = sorted((haversine_km(lat, lon, plat, plon), pid) for pid, (plat, plon) in points.items())
+    return [pid for _, pid in ranked[:k]]
+
+def verify_spatial_index():
+    print("--- Verifying Parcel Spatial Index ---")
+    random.seed(26)
+
+    # 1. Index matches brute force for radius, bbox and k-nearest, including after removals
+    points = {f"P{i}": (random.uniform(13.5, 14.0), random.uniform(100.3, 100.9)) for i in range(5000)}
+    parcels = [{"id": pid, "gps_coordinates": f"{lat}, {lon}"} for pid, (lat, lon) in points.items()]
+    parcels.append({"id": "bad", "gps_coordinates": "not a coordinate"})
+    index = ParcelSpatialIndex.from_parcels(parcels)
+    for pid in list(points)[:500]:
+        index.remove(pid)
+        del points[pid]
+
+    ok = index.invalid_ids == ["bad"] and len(index) == len(points)
+    for _ in range(50):
+        lat, lon = random.uniform(13.4, 14.1), random.uniform(100.2, 101.0)
+        radius = random.uniform(0.5, 5.0)
+        expected = {pid for pid, (plat, plon) in points.items() if haversine_km(lat, lon, plat, plon) <= radius}
+        ok = ok and set(index.query_radius(lat, lon, radius)) == expected
+        ranked = index.query_radius(lat, lon, radius, with_distance=True)
+        ok = ok and [pid for pid, _ in ranked] == [pid for pid in brute_nearest(points, lat, lon, len(expected))]
+        # A box with min_lon > max_lon wraps round the antimeridian
+        in_lon = (lambda plon: 100.4 <= plon <= lon) if lon >= 100.4 else (lambda plon: plon >= 100.4 or plon <= lon)
+        expected = {pid for pid, (plat, plon) in points.items() if 13.6 <= plat <= lat and in_lon(plon)}
+        ok = ok and set(index.query_bbox(13.6, 100.4, lat, lon)) == expected
+        ok = ok and [pid for pid, _ in index.query_nearest(lat, lon, k=5)] == brute_nearest(points, lat, lon, 5)
+    print(f"  Radius / bbox / nearest match brute force: {'PASS' if ok else 'FAIL'}")
+
+    # 2. Queries far outside the populated grid fall back to the populated cells
+    far_queries = [(51.5, -0.1), (-33.9, 151.2), (13.75, -79.0)]
+    start = time.perf_counter()
+    ok = all(
+        [pid for pid, _ in index.query_nearest(lat, lon, k=3)] == brute_nearest(points, lat, lon, 3)
+        for lat, lon in far_queries
+    )
+    elapsed_ms = (time.perf_counter() - start) * 1000 / len(far_queries)
+    print(f"  Far-away nearest ({elapsed_ms:.1f} ms/query): {'PASS' if ok and elapsed_ms < 500 else 'FAIL'}")
+
+    # 3. k larger than the index returns everything, closest first
+    small = ParcelSpatialIndex()
+    small.insert("a", 13.70, 100.50)
+    small.insert("b", 13.80, 100.50)
+    found = small.query_nearest(13.71, 100.50, k=10)
+    print(f"  k > size returns all parcels: {'PASS' if [pid for pid, _ in found] == ['a', 'b'] else 'FAIL'}")
+
+    # 4. Queries across the antimeridian see both sides
+    points = {f"F{i}": (random.uniform(-17.5, -16.5), random.uniform(179.5, 180.5)) for i in range(3000)}
+    dateline = ParcelSpatialIndex()
+    for pid, (lat, lon) in points.items():
+        dateline.insert(pid, lat, lon)
+    wrapped = {pid: (lat, lon - 360.0 if lon >= 180.0 else lon) for pid, (lat, lon) in points.items()}
+    ok = all(-180.0 <= dateline.coordinates_of(pid)[1] < 180.0 for pid in points)
+    for lat, lon in [(-17.0, 179.99), (-17.0, -179.99), (-16.8, 180.0), (-17.2, 179.7)]:
+        expected = {pid for pid, (plat, plon) in wrapped.items() if haversine_km(lat, lon, plat, plon) <= 8.0}
+        ok = ok and set(dateline.query_radius(lat, lon, 8.0)) == expected and len(expected) > 0
+        ok = ok and [pid for pid, _ in dateline.query_nearest(lat, lon, k=7)] == brute_nearest(wrapped, lat, lon, 7)
+    expected = {pid for pid, (plat, plon) in wrapped.items() if plon >= 179.9 or plon <= -179.8}
+    ok = ok and set(dateline.query_bbox(-18.0, 179.9, -16.0, -179.8)) == expected
+    print(f"  Antimeridian radius / bbox / nearest: {'PASS' if ok else 'FAIL'}")
+
+    # 5. Cost of radius queries at 200k parcels (see the module docstring for 1M figures)
+    big = ParcelSpatialIndex()
+    for i in range(200_000):
+        big.insert(f"Q{i}", random.uniform(13.5, 14.0), random.uniform(100.3, 100.9))
+    queries = [(random.uniform(13.6, 13.9), random.uniform(100.4, 100.8)) for _ in range(50)]
+    for radius in (0.5, 3.0):
+        start = time.perf_counter()
+        hits = sum(len(big.query_radius(lat, lon, radius)) for lat, lon in queries)
+        elapsed_ms = (time.perf_counter() - start) * 1000 / len(queries)
+        print(f"  {radius} km radius at 200k parcels: {elapsed_ms:.2f} ms/query, {hits // len(queries):,} hits/query")
+
+    print("\n--- Verification Complete ---")
+
+if __name__ == "__main__":
+    verify_spatial_index()
@@ -0,0 +1,57 @@
+import math
+import random
+
+from spatial_index import haversine_km
+from subcenter_detection import DensityGrid, SubcenterDetector, detect_subcenters
+
+CBD = (13.75, 100.50)
+SUBCENTERS = [(13.80, 100.56), (13.69, 100.44)]
+
+def synthetic_city(rng, centers, n=40_000):
+    """Parcels around the CBD whose FAR is the additive polycentric curve with log-normal noise."""
+    parcels = []
+    for i in range(n):
+        lat = CBD[0] + rng.uniform(-0.15, 0.15)
+        lon = CBD[1] + rng.uniform(-0.15, 0.15)
+        far = sum(d0 * math.exp(-g * haversine_km(lat, lon, c_lat, c_lon)) for (c_lat, c_lon), d0, g in centers)
+        parcels.append({"id": f"p{i}", "gps_coordinates": f"{lat}, {lon}",
+                        "current_far": far * math.exp(rng.gauss(0, 0.1)), "land_area_rai": rng.uniform(1.0, 5.0)})
+    return parcels
+
+def verify_subcenter_detection():
+    print("--- Verifying Automatic Sub-Center Detection ---")
+    rng = random.Random(49)
+
+    # 1. Two planted sub-centers are found near their true locations
+    centers = [(CBD, 10.0, 0.15)] + [(loc, 5.0, 0.5) for loc in SUBCENTERS]
+    parcels = synthetic_city(rng, centers)
+    parcels += [{"id": "no_gps", "gps_coordinates": None, "current_far": 2.0},
+                {"id": "no_far", "gps_coordinates": "13.75, 100.50", "current_far": None}]
+    result = detect_subcenters(parcels)
+    found = [(c.lat, c.lon) for c in result.subcenters]
+    errors = [min((haversine_km(*true, *loc) for loc in found), default=float("inf")) for true in SUBCENTERS]
+    ok = len(found) == 2 and max(errors) < 1.0
+    print(f"  Planted sub-centers found ({len(found)}, worst error {max(errors):.2f} km): {'PASS' if ok else 'FAIL'}")
+
+    cbd_error = haversine_km(result.cbd.lat, result.cbd.lon, *CBD)
+    print(f"  CBD taken from the highest peak ({cbd_error:.2f} km off): {'PASS' if cbd_error < 1.0 else 'FAIL'}")
+    print(f"  Bad parcels skipped: {'PASS' if result.skipped_parcels == 2 else 'FAIL'}")
+
+    # 2. centers_config is ready for the polycentric engine
+    config = result.centers_config
+    ok = set(config) == set(result.center_locations) and all(
+        v["d0"] > 0 and v["g"] > 0 for v in config.values()
+    ) and 0.1 < config[result.cbd.center_id]["g"] < 0.2
+    print(f"  centers_config usable (CBD g={config[result.cbd.center_id]['g']:.3f}): {'PASS' if ok else 'FAIL'}")
+
+    # 3. A monocentric city yields no sub-centers
+    mono = synthetic_city(random.Random(7), [(CBD, 10.0, 0.15)])
+    grid = DensityGrid.from_parcels(mono)
+    result = SubcenterDetector().detect(grid, cbd=CBD)
+    print(f"  Monocentric city: {len(result.subcenters)} sub-centers "
+          f"[{'PASS' if not result.subcenters else 'FAIL'}]")
+
+    print("\n--- Verification Complete ---")
+
+if __name__ == "__main__":
+    verify_subcenter_detection()
@@ -0,0 +1,91 @@
+import bisect
+import random
+from types import SimpleNamespace
+
+from zone_summaries import ZoneSummaries
+
+ZONES = [("Red", "Bang Rak"), ("Red", "Sathon"), ("Yellow", "Bang Kapi"), (None, None)]
+STATUSES = ["Optimal", "Over-densification", "Under-utilization"]
+
+def rank_error(sorted_values, estimate, q):
+    """Distance, as a fraction of n, between q and the rank of the estimate."""
+    n = len(sorted_values)
+    lo, hi = bisect.bisect_left(sorted_values, estimate), bisect.bisect_right(sorted_values, estimate)
+    target = q * n
+    return 0.0 if lo <= target <= hi else min(abs(lo - target), abs(hi - target)) / n
+
+def verify_zone_summaries():
+    print("--- Verifying Per-Zone Audit Summaries ---")
+    rng = random.Random(42)
+    quantiles = (0.1, 0.5, 0.9)
+
+    # 1. Four shards of 50k results each, with an exact record kept alongside
+    shards = [ZoneSummaries() for _ in range(4)]
+    exact = {}
+    for i in range(200_000):
+        zone, district = ZONES[i % len(ZONES)]
+        efficiency = rng.lognormvariate(0.0, 0.5)
+        gap = rng.uniform(-15.0, 25.0)
+        status = STATUSES[i % 3]
+        far = SimpleNamespace(efficiency_score=rng.random(), status=SimpleNamespace(name="OVER" if i % 2 else "UNDER"))
+        shards[i % 4].observe(zone, district, density={"efficiency_index": efficiency, "status": status,
+                                                      "gap_analysis": {"far_mismatch_gap": gap}}, far=far)
+        record = exact.setdefault((zone or "Unknown", district or "Unknown"),
+                                  {"efficiency": [], "gaps": [], "status": {}})
+        record["efficiency"].append(efficiency)
+        record["gaps"].append(gap)
+        record["status"][status] = record["status"].get(status, 0) + 1
+
+    book = shards[0].empty_like()
+    for shard in shards:
+        book.merge(shard)
+
+    # 2. Counts and histograms merge exactly
+    ok = True
+    for key, record in exact.items():
+        summary = book.zones[key]
+        hist = summary.gap_histogram
+        width = (hist.hi - hist.lo) / hist.bins
+        expected = [0] * (hist.bins + 2)
+        for gap in record["gaps"]:
+            expected[0 if gap < hist.lo else -1 if gap >= hist.hi else 1 + min(hist.bins - 1, int((gap - hist.lo) / width))] += 1
+        ok = ok and summary.count == len(record["gaps"]) and summary.status_counts == record["status"]
+        ok = ok and list(hist.counts) == expected
+    print(f"  Merged counts and gap histograms exact: {'PASS' if ok else 'FAIL'}")
+
+    # 3. Merged quantiles within the KLL rank error bound
+    worst = 0.0
+    for key, record in exact.items():
+        values = sorted(record["efficiency"])
+        estimates = book.zones[key].efficiency.quantiles(quantiles)
+        worst = max(worst, *(rank_error(values, est, q) for q, est in zip(quantiles, estimates)))
+    rolled = sorted(v for key, record in exact.items() if key[0] == "Red" for v in record["efficiency"])
+    estimates = book.rollup(zone_color="Red").efficiency.quantiles(quantiles)
+    worst = max(worst, *(rank_error(rolled, est, q) for q, est in zip(quantiles, estimates)))
+    print(f"  Quantile rank error {worst:.2%} (limit 3%): {'PASS' if worst < 0.03 else 'FAIL'}")
+
+    # 4. Serialization round trip (sketch items are stored as Float32)
+    restored = ZoneSummaries.from_bytes(book.to_bytes())
+    ok = len(book.to_bytes()) < 8_192 * len(exact)
+    for key, summary in book.zones.items():
+        other = restored.zones[key]
+        ok = ok and other.count == summary.count and other.status_counts == summary.status_counts
+        ok = ok and other.far_status_counts == summary.far_status_counts
+        ok = ok and other.gap_histogram.counts == summary.gap_histogram.counts
+        for mine, theirs in ((summary.efficiency, other.efficiency), (summary.far_efficiency, other.far_efficiency)):
+            ok = ok and all(abs(a - b) <= 1e-6 * max(1.0, abs(a))
+                            for a, b in zip(mine.quantiles(quantiles), theirs.quantiles(quantiles)))
+    print(f"  to_bytes / from_bytes round trip ({len(book.to_bytes()):,} bytes): {'PASS' if ok else 'FAIL'}")
+
+    # 5. Mismatched settings refuse to merge
+    try:
+        book.merge(ZoneSummaries(k=100))
+        ok = False
+    except ValueError:
+        ok = True
+    print(f"  Mismatched settings rejected: {'PASS' if ok else 'FAIL'}")
+
+    print("\n--- Verification Complete ---")
+
+if __name__ == "__main__":
+    verify_zone_summaries()
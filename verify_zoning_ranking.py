@@ -0,0 +1,79 @@
+import csv
+import os
+import random
+import shutil
+import tempfile
+
+from bertaud_engine import BertaudAuditEngine
+from zoning_ranking import TopKUpgradeRanking, rank_files
+
+D0, G = 20.0, 0.15
+COLUMNS = ["id", "gps_coordinates", "land_area_rai", "appraisal_price_per_wah", "distance_from_cbd_km",
+           "current_far", "legal_far_limit", "zone_color", "ownership_type"]
+
+def make_parcel(i, rng):
+    return {"id": f"parcel_{i}", "gps_coordinates": "13.75, 100.50", "land_area_rai": rng.uniform(0.5, 20.0),
+            "appraisal_price_per_wah": rng.uniform(5e4, 5e5), "distance_from_cbd_km": rng.uniform(0.0, 20.0),
+            "current_far": rng.uniform(0.5, 6.0), "legal_far_limit": rng.choice([2.0, 4.0, 6.0, 8.0, 10.0]),
+            "zone_color": rng.choice(["Red", "Orange", "Yellow"]),
+            "ownership_type": rng.choice(["T.Ratchaphatsadu", "Private"])}
+
+def brute_top(parcels, k, zones=None):
+    """Every parcel the engine recommends for an upsize, scored and fully sorted."""
+    engine = BertaudAuditEngine(D0, G)
+    scored = []
+    for p in parcels:
+        if zones and p["zone_color"] not in zones:
+            continue
+        gap = engine.calculate_optimal_density(0, 0, 0, p["distance_from_cbd_km"], 0,
+                                               legal_far_limit=p["legal_far_limit"])["gap_analysis"]
+        if gap["policy_recommendation"] == "Request Zoning Upgrade (Upsize)":
+            score = gap["far_mismatch_gap"] * p["land_area_rai"] * 1600.0 * p["appraisal_price_per_wah"] / 4.0
+            scored.append((score, p["id"]))
+    return [pid for _, pid in sorted(scored, reverse=True)[:k]]
+
+def verify_zoning_ranking():
+    print("--- Verifying Zoning-Upgrade Candidate Ranking ---")
+    rng = random.Random(41)
+    parcels = [make_parcel(i, rng) for i in range(20_000)]
+
+    # 1. Streaming top-K equals a full sort of the engine's upsize recommendations
+    ranking = TopKUpgradeRanking(D0, G, k=100, chunk_size=999).add_parcels(parcels)
+    ok = [c.parcel_id for c in ranking.results()] == brute_top(parcels, 100)
+    print(f"  Top-100 matches the engine recommendations: {'PASS' if ok else 'FAIL'}")
+
+    # 2. Shard rankings merge into the global top-K, with zone filters
+    shards = [TopKUpgradeRanking(D0, G, k=50, zone_colors=["red"]).add_parcels(parcels[i::4]) for i in range(4)]
+    merged = shards[0]
+    for shard in shards[1:]:
+        merged.merge(shard)
+    ok = [c.parcel_id for c in merged.results()] == brute_top(parcels, 50, zones={"Red"})
+    ok = ok and merged.stats["scanned"] == len(parcels)
+    print(f"  Merged shards match the filtered global top-50: {'PASS' if ok else 'FAIL'}")
+
+    # 3. Bad rows in shard files are counted as invalid, not fatal
+    root = tempfile.mkdtemp(prefix="zoning_ranking_")
+    try:
+        paths = []
+        for s in range(2):
+            path = os.path.join(root, f"shard_{s}.csv")
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=COLUMNS)
+                writer.writeheader()
+                writer.writerows(parcels[s * 1000:(s + 1) * 1000])
+                writer.writerow(dict(parcels[0], id=f"bad_far_{s}", legal_far_limit="n/a"))
+                writer.writerow(dict(parcels[0], id=f"no_distance_{s}", distance_from_cbd_km=""))
+            paths.append(path)
+        expected = brute_top(parcels[:2000], 20)
+        for workers in (1, 2):
+            total = rank_files(paths, D0, G, k=20, workers=workers)
+            ok = [c.parcel_id for c in total.results()] == expected and total.stats["invalid"] == 4
+            print(f"  rank_files counts bad rows (workers={workers}, invalid={total.stats['invalid']}): "
+                  f"{'PASS' if ok else 'FAIL'}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    print("\n--- Verification Complete ---")
+
+if __name__ == "__main__":
+    verify_zoning_ranking()
@@ -0,0 +1,414 @@
+"""
+Mergeable Per-Zone Audit Summaries
+Streaming distribution summaries of audit results, keyed by
+(zone_color, district), for city dashboards:
+
+    - efficiency index quantiles (p10 / p50 / p90 ...)  KLL sketch
+    - FAR efficiency score quantiles                   KLL sketch
+    - density and FAR status counts                    exact counters
+    - far_mismatch_gap histogram                       fixed bins
+
+Results are folded in as calculate_optimal_density / calculate_far
+produce them (AuditPipeline does this when given a ZoneSummaries), so
+millions of results never need to be collected. Summaries built on
+different shards or days merge exactly for counts and histograms, and
+within the KLL error bound (~1.5% rank error at k=200) for quantiles.
+`to_bytes()` serializes a whole book to a few KB per zone.
+
+Author: BaanBid Development Team
+"""
+
+import json
+import math
+import struct
+import sys
+import zlib
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+# --- Constants ---
+DEFAULT_K = 200
+DEFAULT_GAP_RANGE = (-10.0, 20.0)
+DEFAULT_GAP_BINS = 60
+DEFAULT_QUANTILES = (0.1, 0.5, 0.9)
+UNKNOWN_KEY = "Unknown"
+
+_KLL_HEADER = struct.Struct("<4sBHQddB")
+_HIST_HEADER = struct.Struct("<4sBddI")
+_BOOK_HEADER = struct.Struct("<4sBHddII")
+_FRAME = struct.Struct("<I")
+
+
+def _le(buf: array) -> array:
+    if sys.byteorder != "little":
+        buf.byteswap()
+    return buf
+
+
+# --- KLL Quantile Sketch ---
+class KLLSketch:
+    """
+    KLL quantile sketch (Karnin, Lang & Liberty 2016). Level h holds items
+    of weight 2^h. When the sketch is full, the lowest over-capacity level
+    is sorted and every other item is promoted. Compaction alternates its
+    offset deterministically, so results are reproducible.
+    """
+
+    def __init__(self, k: int = DEFAULT_K):
+        if k < 8:
+            raise ValueError(f"k must be >= 8: {k}")
+        self.k = k
+        self.n = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.levels: List[List[float]] = [[]]
+        self._size = 0
+        self._max_size = self._capacity(0)
+        self._offset = 0
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - 1 - level
+        return max(2, int(math.ceil(self.k * (2.0 / 3.0) ** depth)))
+
+    def _recompute_max_size(self) -> None:
+        self._max_size = sum(self._capacity(h) for h in range(len(self.levels)))
+
+    def update(self, value: float) -> None:
+        value = float(value)
+        if value != value:  # NaN
+            return
+        self.levels[0].append(value)
+        self.n += 1
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self._size += 1
+        if self._size >= self._max_size:
+            self._compress()
+
+    def update_many(self, values: Iterable[float]) -> None:
+        for value in values:
+            self.update(value)
+
+    def _compress(self) -> None:
+        while self._size >= self._max_size:
+            for h in range(len(self.levels)):
+                items = self.levels[h]
+                if len(items) < self._capacity(h):
+                    continue
+                if h + 1 == len(self.levels):
+                    self.levels.append([])
+                    self._recompute_max_size()
+                items.sort()
+                leftover = [items.pop()] if len(items) % 2 else []
+                self.levels[h + 1].extend(items[self._offset::2])
+                self._offset ^= 1
+                self.levels[h] = leftover
+                self._size = sum(len(level) for level in self.levels)
+                break
+            else:
+                return
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        if other.k != self.k:
+            raise ValueError(f"Cannot merge KLL sketches with k={self.k} and k={other.k}")
+        if other.n == 0:
+            return self
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for h, items in enumerate(other.levels):
+            self.levels[h].extend(items)
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._size = sum(len(level) for level in self.levels)
+        self._recompute_max_size()
+        self._compress()
+        return self
+
+    def quantiles(self, qs: Sequence[float]) -> List[float]:
+        if self.n == 0:
+            return [math.nan] * len(qs)
+        weighted = sorted(
+            (value, 1 << h) for h, items in enumerate(self.levels) for value in items
+        )
+        total = sum(w for _, w in weighted)
+        out = []
+        for q in qs:
+            if q <= 0.0:
+                out.append(self.min)
+                continue
+            if q >= 1.0:
+                out.append(self.max)
+                continue
+            target = q * total
+            cumulative = 0
+            for value, weight in weighted:
+                cumulative += weight
+                if cumulative >= target:
+                    out.append(value)
+                    break
+            else:
+                out.append(self.max)
+        return out
+
+    def quantile(self, q: float) -> float:
+        return self.quantiles((q,))[0]
+
+    # --- Serialization ---
+    def to_bytes(self) -> bytes:
+        """Header, per-level counts (uint32), then all items as Float32."""
+        header = _KLL_HEADER.pack(b"KLL1", 1, self.k, self.n, self.min, self.max, len(self.levels))
+        counts = _le(array('I', (len(level) for level in self.levels)))
+        items = _le(array('f', (v for level in self.levels for v in level)))
+        return header + counts.tobytes() + items.tobytes()
+
+    @classmethod
+    def from_bytes(cls, buf: bytes) -> "KLLSketch":
+        magic, _, k, n, lo, hi, n_levels = _KLL_HEADER.unpack_from(buf)
+        if magic != b"KLL1":
+            raise ValueError("Not a KLL sketch buffer")
+        offset = _KLL_HEADER.size
+        counts = array('I')
+        counts.frombytes(buf[offset:offset + 4 * n_levels])
+        _le(counts)
+        offset += 4 * n_levels
+        items = array('f')
+        items.frombytes(buf[offset:offset + 4 * sum(counts)])
+        _le(items)
+
+        sketch = cls(k)
+        sketch.n, sketch.min, sketch.max = n, lo, hi
+        sketch.levels = []
+        start = 0
+        for count in counts:
+            sketch.levels.append(list(items[start:start + count]))
+            start += count
+        sketch._size = len(items)
+        sketch._recompute_max_size()
+        return sketch
+
+
+# --- Fixed-Bin Histogram ---
+class FixedHistogram:
+    """Equal-width bins over [lo, hi) plus underflow and overflow counts."""
+
+    def __init__(self, lo: float, hi: float, bins: int):
+        if not hi > lo or bins <= 0:
+            raise ValueError(f"Invalid histogram range [{lo}, {hi}) with {bins} bins")
+        self.lo = float(lo)
+        self.hi = float(hi)
+        self.bins = bins
+        self.counts = array('Q', [0] * (bins + 2))  # [underflow, bins..., overflow]
+        self._scale = bins / (self.hi - self.lo)
+
+    def add(self, value: float) -> None:
+        if value != value:
+            return
+        if value < self.lo:
+            self.counts[0] += 1
+        elif value >= self.hi:
+            self.counts[-1] += 1
+        else:
+            self.counts[1 + min(self.bins - 1, int((value - self.lo) * self._scale))] += 1
+
+    def merge(self, other: "FixedHistogram") -> "FixedHistogram":
+        if (self.lo, self.hi, self.bins) != (other.lo, other.hi, other.bins):
+            raise ValueError("Cannot merge histograms with different bins")
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        return self
+
+    def edges(self) -> List[float]:
+        width = (self.hi - self.lo) / self.bins
+        return [self.lo + i * width for i in range(self.bins + 1)]
+
+    def to_dict(self) -> dict:
+        return {
+            "edges": self.edges(),
+            "counts": list(self.counts[1:-1]),
+            "underflow": self.counts[0],
+            "overflow": self.counts[-1],
+        }
+
+    def to_bytes(self) -> bytes:
+        header = _HIST_HEADER.pack(b"HST1", 1, self.lo, self.hi, self.bins)
+        return header + _le(array('Q', self.counts)).tobytes()
+
+    @classmethod
+    def from_bytes(cls, buf: bytes) -> "FixedHistogram":
+        magic, _, lo, hi, bins = _HIST_HEADER.unpack_from(buf)
+        if magic != b"HST1":
+            raise ValueError("Not a histogram buffer")
+        hist = cls(lo, hi, bins)
+        counts = array('Q')
+        counts.frombytes(buf[_HIST_HEADER.size:_HIST_HEADER.size + 8 * (bins + 2)])
+        hist.counts = _le(counts)
+        return hist
+
+
+# --- Zone Summaries ---
+class ZoneSummary:
+    """Summary of the audit results of one (zone_color, district)."""
+
+    def __init__(self, k: int, gap_range: Tuple[float, float], gap_bins: int):
+        self.count = 0
+        self.efficiency = KLLSketch(k)       # calculate_optimal_density efficiency_index
+        self.far_efficiency = KLLSketch(k)   # calculate_far efficiency_score
+        self.status_counts: Dict[str, int] = {}
+        self.far_status_counts: Dict[str, int] = {}
+        self.gap_histogram = FixedHistogram(gap_range[0], gap_range[1], gap_bins)
+
+    def merge(self, other: "ZoneSummary") -> "ZoneSummary":
+        self.count += other.count
+        self.efficiency.merge(other.efficiency)
+        self.far_efficiency.merge(other.far_efficiency)
+        for mine, theirs in ((self.status_counts, other.status_counts),
+                             (self.far_status_counts, other.far_status_counts)):
+            for status, n in theirs.items():
+                mine[status] = mine.get(status, 0) + n
+        self.gap_histogram.merge(other.gap_histogram)
+        return self
+
+    def to_dict(self, quantiles: Sequence[float] = DEFAULT_QUANTILES) -> dict:
+        def named(sketch: KLLSketch) -> Dict[str, float]:
+            return {f"p{round(q * 100):g}": v for q, v in zip(quantiles, sketch.quantiles(quantiles))}
+
+        return {
+            "count": self.count,
+            "efficiencyIndex": named(self.efficiency),
+            "farEfficiencyScore": named(self.far_efficiency),
+            "statusCounts": dict(self.status_counts),
+            "farStatusCounts": dict(self.far_status_counts),
+            "farGapHistogram": self.gap_histogram.to_dict(),
+        }
+
+
+def _frame(payload: bytes) -> bytes:
+    return _FRAME.pack(len(payload)) + payload
+
+
+def _read_frame(buf: bytes, offset: int) -> Tuple[bytes, int]:
+    (length,) = _FRAME.unpack_from(buf, offset)
+    start = offset + _FRAME.size
+    return buf[start:start + length], start + length
+
+
+class ZoneSummaries:
+    """
+    Book of ZoneSummary objects keyed by (zone_color, district).
+
+    Example:
+        >>> book = ZoneSummaries()
+        >>> book.observe("Red", "Bang Rak", density=engine_result, far=far_result)
+        >>> book.report()["Red|Bang Rak"]["efficiencyIndex"]["p50"]
+    """
+
+    def __init__(
+        self,
+        k: int = DEFAULT_K,
+        gap_range: Tuple[float, float] = DEFAULT_GAP_RANGE,
+        gap_bins: int = DEFAULT_GAP_BINS
+    ):
+        self.k = k
+        self.gap_range = (float(gap_range[0]), float(gap_range[1]))
+        self.gap_bins = gap_bins
+        self.zones: Dict[Tuple[str, str], ZoneSummary] = {}
+
+    def empty_like(self) -> "ZoneSummaries":
+        return ZoneSummaries(self.k, self.gap_range, self.gap_bins)
+
+    def _summary(self, zone_color: Optional[str], district: Optional[str]) -> ZoneSummary:
+        key = (zone_color or UNKNOWN_KEY, district or UNKNOWN_KEY)
+        summary = self.zones.get(key)
+        if summary is None:
+            summary = self.zones[key] = ZoneSummary(self.k, self.gap_range, self.gap_bins)
+        return summary
+
+    # --- Updates ---
+    def observe(self, zone_color: Optional[str], district: Optional[str],
+                density: Optional[Dict] = None, far=None) -> None:
+        """
+        Folds in one audited parcel/proposal.
+
+        Args:
+            density: calculate_optimal_density result dict.
+            far: calculate_far FARResult.
+        """
+        summary = self._summary(zone_color, district)
+        summary.count += 1
+        if density is not None:
+            summary.efficiency.update(density["efficiency_index"])
+            status = density["status"]
+            summary.status_counts[status] = summary.status_counts.get(status, 0) + 1
+            gap = density.get("gap_analysis", {}).get("far_mismatch_gap")
+            if gap is not None:
+                summary.gap_histogram.add(gap)
+        if far is not None:
+            summary.far_efficiency.update(far.efficiency_score)
+            status = far.status.name
+            summary.far_status_counts[status] = summary.far_status_counts.get(status, 0) + 1
+
+    def merge(self, other: "ZoneSummaries") -> "ZoneSummaries":
+        if (self.k, self.gap_range, self.gap_bins) != (other.k, other.gap_range, other.gap_bins):
+            raise ValueError("Cannot merge ZoneSummaries with different sketch or histogram settings")
+        for key, summary in other.zones.items():
+            mine = self.zones.get(key)
+            if mine is None:
+                self.zones[key] = mine = ZoneSummary(self.k, self.gap_range, self.gap_bins)
+            mine.merge(summary)
+        return self
+
+    # --- Queries ---
+    def rollup(self, zone_color: Optional[str] = None, district: Optional[str] = None) -> ZoneSummary:
+        """Merged summary over every key matching the given zone and/or district (None = any)."""
+        total = ZoneSummary(self.k, self.gap_range, self.gap_bins)
+        for (zone, dist), summary in self.zones.items():
+            if (zone_color is None or zone == zone_color) and (district is None or dist == district):
+                total.merge(summary)
+        return total
+
+    def report(self, quantiles: Sequence[float] = DEFAULT_QUANTILES) -> Dict[str, dict]:
+        return {
+            f"{zone}|{district}": summary.to_dict(quantiles)
+            for (zone, district), summary in sorted(self.zones.items())
+        }
+
+    # --- Serialization ---
+    def to_bytes(self) -> bytes:
+        body = bytearray(_BOOK_HEADER.pack(
+            b"BZS1", 1, self.k, self.gap_range[0], self.gap_range[1], self.gap_bins, len(self.zones)
+        ))
+        for (zone, district), summary in self.zones.items():
+            meta = [zone, district, summary.count, summary.status_counts, summary.far_status_counts]
+            body += _frame(json.dumps(meta, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+            body += _frame(summary.efficiency.to_bytes())
+            body += _frame(summary.far_efficiency.to_bytes())
+            body += _frame(summary.gap_histogram.to_bytes())
+        return zlib.compress(bytes(body), 6)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "ZoneSummaries":
+        buf = zlib.decompress(data)
+        magic, _, k, gap_lo, gap_hi, gap_bins, n_zones = _BOOK_HEADER.unpack_from(buf)
+        if magic != b"BZS1":
+            raise ValueError("Not a ZoneSummaries buffer")
+        book = cls(k, (gap_lo, gap_hi), gap_bins)
+        offset = _BOOK_HEADER.size
+        for _ in range(n_zones):
+            meta, offset = _read_frame(buf, offset)
+            zone, district, count, status_counts, far_status_counts = json.loads(meta)
+            summary = ZoneSummary(k, book.gap_range, gap_bins)
+            summary.count = count
+            summary.status_counts = status_counts
+            summary.far_status_counts = far_status_counts
+            raw, offset = _read_frame(buf, offset)
+            summary.efficiency = KLLSketch.from_bytes(raw)
+            raw, offset = _read_frame(buf, offset)
+            summary.far_efficiency = KLLSketch.from_bytes(raw)
+            raw, offset = _read_frame(buf, offset)
+            summary.gap_histogram = FixedHistogram.from_bytes(raw)
+            book.zones[(zone, district)] = summary
+        return book
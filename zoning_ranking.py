@@ -0,0 +1,289 @@
+"""
+Zoning-Upgrade Candidate Ranking
+Streams a parcel set and keeps the top-K "Request Zoning Upgrade (Upsize)"
+candidates, i.e. parcels whose theoretical Bertaud FAR exceeds the legal
+limit by more than bertaud_engine.UPSIZE_GAP_THRESHOLD. The gap is taken
+from the gap analysis of BertaudAuditEngine.calculate_optimal_density, so
+ranking and audit always agree on which parcels qualify.
+
+Ranking score (suppressed floor area valued at land price):
+    far_mismatch_gap = gap_analysis["far_mismatch_gap"]
+    score            = far_mismatch_gap * land_area_sqm * appraisal_price_per_sqm
+
+Parcels are processed in chunks. Only the K best candidates are held in a
+min-heap, so memory is O(K) regardless of input size. Rows without a
+usable distance or legal FAR, and shard records that fail to decode, are
+counted as `invalid` instead of stopping the run. Rankings built over
+disjoint shards merge into the exact global top-K, which is how
+`rank_files` parallelises over shard files.
+
+Usage:
+    python zoning_ranking.py --parcels shards/*.parquet --d0 20 --g 0.15 --top 500 \\
+        --zone Red --zone Orange --ownership T.Ratchaphatsadu --workers 8
+
+Author: BaanBid Development Team
+"""
+
+import argparse
+import heapq
+import json
+import os
+import sys
+from dataclasses import dataclass
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from bertaud_engine import UPSIZE_GAP_THRESHOLD, BertaudAuditEngine
+
+
+# --- Constants ---
+DEFAULT_TOP_K = 500
+DEFAULT_CHUNK_SIZE = 8192
+SQM_PER_RAI = 1600.0
+SQM_PER_WAH = 4.0
+
+
+@dataclass
+class UpgradeCandidate:
+    """ที่ดินที่ควรพิจารณาขอปรับผังสี (Upsize)"""
+    parcel_id: str
+    score: float                   # far_mismatch_gap * land sqm * price per sqm
+    far_mismatch_gap: float        # Theoretical FAR - legal FAR
+    theoretical_far: float
+    legal_far_limit: float
+    land_area_rai: float
+    appraisal_price_per_wah: float
+    distance_km: float
+    zone_color: Optional[str] = None
+    ownership_type: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "parcelId": self.parcel_id,
+            "score": self.score,
+            "farMismatchGap": round(self.far_mismatch_gap, 2),
+            "theoreticalFar": round(self.theoretical_far, 2),
+            "legalMaxFar": round(self.legal_far_limit, 2),
+            "landAreaRai": self.land_area_rai,
+            "appraisalPricePerWah": self.appraisal_price_per_wah,
+            "distanceKm": self.distance_km,
+            "zoneColor": self.zone_color,
+            "ownershipType": self.ownership_type,
+        }
+
+
+def _field(parcel, name: str):
+    return parcel.get(name) if isinstance(parcel, dict) else getattr(parcel, name, None)
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and value == value
+
+
+class TopKUpgradeRanking:
+    """
+    Bounded top-K ranking of zoning-upgrade candidates.
+
+    Args:
+        d0, g: Bertaud parameters used for the theoretical FAR.
+        k: Number of candidates kept.
+        zone_colors / ownership_types: Optional filters (case-insensitive).
+            Parcels outside them are skipped before any math.
+        min_gap: Minimum far_mismatch_gap for a parcel to qualify.
+    """
+
+    def __init__(
+        self,
+        d0: float,
+        g: float,
+        k: int = DEFAULT_TOP_K,
+        zone_colors: Optional[Iterable[str]] = None,
+        ownership_types: Optional[Iterable[str]] = None,
+        min_gap: float = UPSIZE_GAP_THRESHOLD,
+        chunk_size: int = DEFAULT_CHUNK_SIZE
+    ):
+        errors = BertaudAuditEngine.validate_inputs(d0, g, 0.0)
+        if errors:
+            raise ValueError("; ".join(errors))
+        if k <= 0:
+            raise ValueError(f"k must be positive: {k}")
+        self.d0 = d0
+        self.g = g
+        self.engine = BertaudAuditEngine(d0, g)
+        self.k = k
+        self.zone_colors = frozenset(z.lower() for z in zone_colors) if zone_colors else None
+        self.ownership_types = frozenset(o.lower() for o in ownership_types) if ownership_types else None
+        self.min_gap = min_gap
+        self.chunk_size = chunk_size
+        self.stats = {"scanned": 0, "filtered_out": 0, "invalid": 0, "qualified": 0}
+        self._heap: List[Tuple[float, str, UpgradeCandidate]] = []  # Min-heap on (score, parcel_id)
+
+    # --- Streaming ---
+    def _accepts(self, parcel) -> bool:
+        if self.zone_colors is not None:
+            zone = _field(parcel, "zone_color")
+            if zone is None or zone.lower() not in self.zone_colors:
+                return False
+        if self.ownership_types is not None:
+            ownership = _field(parcel, "ownership_type")
+            if ownership is None or ownership.lower() not in self.ownership_types:
+                return False
+        return True
+
+    def add_chunk(self, parcels: Sequence) -> None:
+        """Runs the engine gap analysis on one chunk and offers the qualifying rows to the heap."""
+        self.stats["scanned"] += len(parcels)
+        rows = [p for p in parcels if self._accepts(p)]
+        self.stats["filtered_out"] += len(parcels) - len(rows)
+
+        audit = self.engine.calculate_optimal_density
+        heap, k, min_gap = self._heap, self.k, self.min_gap
+        for parcel in rows:
+            distance = _field(parcel, "distance_from_cbd_km")
+            legal = _field(parcel, "legal_far_limit")
+            if not (_is_number(distance) and distance >= 0 and _is_number(legal)):
+                self.stats["invalid"] += 1
+                continue
+            gap_analysis = audit(0.0, 0.0, 0.0, distance, 0.0, legal_far_limit=legal)["gap_analysis"]
+            gap = gap_analysis["far_mismatch_gap"]
+            if gap <= min_gap:
+                continue
+            rai = _field(parcel, "land_area_rai") or 0.0
+            price = _field(parcel, "appraisal_price_per_wah") or 0.0
+            score = gap * rai * SQM_PER_RAI * price / SQM_PER_WAH
+            self.stats["qualified"] += 1
+            parcel_id = _field(parcel, "id")
+            if len(heap) >= k and (score, parcel_id) <= heap[0][:2]:
+                continue
+            entry = (score, parcel_id, UpgradeCandidate(
+                parcel_id=parcel_id,
+                score=score,
+                far_mismatch_gap=gap,
+                theoretical_far=gap_analysis["theoretical_demand_far"],
+                legal_far_limit=legal,
+                land_area_rai=rai,
+                appraisal_price_per_wah=price,
+                distance_km=distance,
+                zone_color=_field(parcel, "zone_color"),
+                ownership_type=_field(parcel, "ownership_type")
+            ))
+            if len(heap) < k:
+                heapq.heappush(heap, entry)
+            else:
+                heapq.heapreplace(heap, entry)
+
+    def add_parcels(self, parcels: Iterable) -> "TopKUpgradeRanking":
+        """Streams any iterable of LandParcel objects or dicts in chunks."""
+        iterator = iter(parcels)
+        while True:
+            chunk = list(islice(iterator, self.chunk_size))
+            if not chunk:
+                return self
+            self.add_chunk(chunk)
+
+    # --- Merging ---
+    def _check_compatible(self, other: "TopKUpgradeRanking") -> None:
+        mine = (self.d0, self.g, self.zone_colors, self.ownership_types, self.min_gap)
+        theirs = (other.d0, other.g, other.zone_colors, other.ownership_types, other.min_gap)
+        if mine != theirs:
+            raise ValueError("Cannot merge rankings built with different parameters or filters")
+
+    def merge(self, other: "TopKUpgradeRanking") -> "TopKUpgradeRanking":
+        """Folds a ranking over a disjoint shard into this one (exact top-K of the union)."""
+        self._check_compatible(other)
+        for key in self.stats:
+            self.stats[key] += other.stats[key]
+        combined = self._heap + other._heap
+        self._heap = heapq.nlargest(self.k, combined, key=lambda e: e[:2])
+        heapq.heapify(self._heap)
+        return self
+
+    # --- Results ---
+    def results(self) -> List[UpgradeCandidate]:
+        """Candidates by descending score."""
+        return [entry[2] for entry in sorted(self._heap, key=lambda e: e[:2], reverse=True)]
+
+    def to_dict(self) -> dict:
+        return {
+            "d0": self.d0,
+            "g": self.g,
+            "k": self.k,
+            "stats": dict(self.stats),
+            "candidates": [c.to_dict() for c in self.results()],
+        }
+
+
+# --- Parallel Runs ---
+def _rank_file(job: Dict) -> TopKUpgradeRanking:
+    from bertaud_audit import InvalidRecord, _decode_or_invalid, _raw_records, _record_decoder
+    from firestore_models import LandParcel
+
+    ranking = TopKUpgradeRanking(**job["options"])
+    decode = _record_decoder(job["path"], LandParcel)
+
+    def decoded():
+        # Undecodable rows are counted, like INVALID_INPUT rows in bertaud_audit
+        for raw in _raw_records(job["path"]):
+            parcel = _decode_or_invalid(decode, raw)
+            if isinstance(parcel, InvalidRecord):
+                ranking.stats["scanned"] += 1
+                ranking.stats["invalid"] += 1
+            else:
+                yield parcel
+
+    return ranking.add_parcels(decoded())
+
+
+def rank_files(
+    paths: Sequence[str],
+    d0: float,
+    g: float,
+    k: int = DEFAULT_TOP_K,
+    workers: int = os.cpu_count() or 1,
+    **filters
+) -> TopKUpgradeRanking:
+    """
+    Ranks parcel shard files (CSV / JSONL / Parquet) in parallel. Each
+    worker reads and ranks its own shard and returns only its O(K)
+    ranking, and the shard rankings are merged in the parent.
+    """
+    options = dict(d0=d0, g=g, k=k, **filters)
+    total = TopKUpgradeRanking(**options)
+    if workers <= 1 or len(paths) <= 1:
+        for path in paths:
+            total.merge(_rank_file({"options": options, "path": path}))
+        return total
+
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+        futures = [pool.submit(_rank_file, {"options": options, "path": path}) for path in paths]
+        for future in as_completed(futures):
+            total.merge(future.result())
+    return total
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Top-K zoning-upgrade (Upsize) candidates")
+    parser.add_argument("--parcels", required=True, nargs="+",
+                        help="Land parcel shard file(s) (.csv, .jsonl, .parquet)")
+    parser.add_argument("--d0", type=float, required=True)
+    parser.add_argument("--g", type=float, required=True)
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP_K)
+    parser.add_argument("--zone", action="append", help="Zone color filter (repeatable)")
+    parser.add_argument("--ownership", action="append", help="Ownership type filter (repeatable)")
+    parser.add_argument("--min-gap", type=float, default=UPSIZE_GAP_THRESHOLD)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    ranking = rank_files(
+        args.parcels, args.d0, args.g, args.top, args.workers,
+        zone_colors=args.zone, ownership_types=args.ownership, min_gap=args.min_gap
+    )
+    json.dump(ranking.to_dict(), sys.stdout, ensure_ascii=False, indent=2)
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())